@@ -0,0 +1,102 @@
+"""
+Prueba de carga de las rutas de lectura de la API con clientes concurrentes.
+
+Lanza `--concurrencia` clientes que recorren en bucle las rutas indicadas durante `--duracion`
+segundos y muestra las peticiones por segundo y la latencia (p50/p95/p99) de cada servidor.
+
+Para comparar antes y después de un cambio, se arrancan dos servidores (p. ej. la versión
+anterior en el puerto 8001 y la actual en el 8000) y se pasan ambas URL:
+
+    uvicorn server:app --port 8000 --workers 1
+    python -m clinica.benchmarks.benchmark_api --url http://localhost:8001 --url http://localhost:8000
+
+Con `--en-proceso` se mide la aplicación de este árbol sin levantar un servidor (ASGI en memoria).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+RUTAS_POR_DEFECTO = [
+    "/clientes/",
+    "/mascotas/",
+    "/tratamientos/",
+    "/citas/?limit=100",
+    "/clientes/1",
+    "/mascotas/1",
+]
+
+
+async def cliente_de_carga(http, rutas, fin, latencias, errores):
+    """Recorre las rutas en bucle hasta `fin` registrando la latencia de cada petición."""
+    i = 0
+    while time.perf_counter() < fin:
+        ruta = rutas[i % len(rutas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            respuesta = await http.get(ruta)
+            if respuesta.status_code >= 500:
+                errores.append(ruta)
+        except httpx.HTTPError:
+            errores.append(ruta)
+        latencias.append(time.perf_counter() - inicio)
+
+
+async def medir(nombre, http, rutas, concurrencia, duracion):
+    """Ejecuta la carga contra `http` y devuelve las peticiones por segundo."""
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*(cliente_de_carga(http, rutas, fin, latencias, errores) for _ in range(concurrencia)))
+    total = time.perf_counter() - inicio
+
+    rps = len(latencias) / total
+    percentiles = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+    print(f"{nombre:<30} {rps:9.1f} req/s   p50 {percentiles[49] * 1000:7.1f} ms   "
+          f"p95 {percentiles[94] * 1000:7.1f} ms   p99 {percentiles[98] * 1000:7.1f} ms   "
+          f"errores {len(errores)}")
+    return rps
+
+
+async def ejecutar(args):
+    rutas = args.ruta or RUTAS_POR_DEFECTO
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    print(f"{args.concurrencia} clientes concurrentes, {args.duracion:.0f} s, rutas: {', '.join(rutas)}")
+
+    resultados = {}
+    if args.en_proceso:
+        from server import app
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://testserver", timeout=args.timeout) as http:
+            resultados["en proceso"] = await medir("en proceso", http, rutas, args.concurrencia, args.duracion)
+
+    for url in args.url or []:
+        async with httpx.AsyncClient(base_url=url, limits=limites, timeout=args.timeout) as http:
+            resultados[url] = await medir(url, http, rutas, args.concurrencia, args.duracion)
+
+    if len(resultados) > 1:
+        (antes, rps_antes), *resto = resultados.items()
+        for nombre, rps in resto:
+            print(f"{nombre} frente a {antes}: x{rps / rps_antes:.2f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", help="URL base de un servidor (se puede repetir)")
+    parser.add_argument("--en-proceso", action="store_true", help="Mide la aplicación de este árbol sin servidor")
+    parser.add_argument("--ruta", action="append", help="Ruta a consultar (se puede repetir)")
+    parser.add_argument("--concurrencia", type=int, default=50, help="Clientes concurrentes")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga por servidor")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por petición en segundos")
+    args = parser.parse_args()
+
+    if not args.url and not args.en_proceso:
+        parser.error("indica al menos una --url o --en-proceso")
+    asyncio.run(ejecutar(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Latencia de la búsqueda de texto completo (FTS5) frente a `ilike('%...%')` sobre datos sintéticos.
+
+Genera `--registros` clientes y otras tantas mascotas en una base de datos temporal, lanza
+`--consultas` búsquedas con prefijos de nombres, DNI y razas reales de los datos y muestra p50, p95
+y p99 de cada método.
+
+Uso:
+    python -m clinica.benchmarks.benchmark_busqueda --registros 1000000 --consultas 500
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from clinica.dbconfig import Base
+from clinica.models import Cliente, Mascota
+from clinica.services.gestion_busqueda import GestionBusqueda
+
+NOMBRES = ["Ana", "Andrés", "Lucía", "José", "María", "Íñigo", "Sofía", "Pablo", "Inés", "Álvaro", "Nuria", "Óscar"]
+APELLIDOS = ["García", "Pérez", "Martínez", "López", "Sánchez", "Gómez", "Muñoz", "Álvarez", "Jiménez", "Ruiz"]
+MASCOTAS = ["Luna", "Coco", "Toby", "Nala", "Rocky", "Kira", "Simba", "Lola", "Thor", "Canela"]
+RAZAS = ["Beagle", "Labrador", "Pastor Alemán", "Persa", "Siamés", "Bulldog", "Caniche", "Galgo"]
+AFECCIONES = [None, "Otitis", "Dermatitis", "Artrosis", "Alergia alimentaria"]
+
+LOTE = 20000
+
+
+def generar(engine, registros):
+    """Inserta `registros` clientes y `registros` mascotas sintéticos en lotes (los triggers indexan)."""
+    aleatorio = random.Random(0)
+    with engine.begin() as conexion:
+        for inicio in range(1, registros + 1, LOTE):
+            ids = range(inicio, min(inicio + LOTE, registros + 1))
+            conexion.execute(insert(Cliente), [
+                {"id_cliente": i, "nombre_cliente": f"{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)} "
+                                                    f"{aleatorio.choice(APELLIDOS)}",
+                 "edad": aleatorio.randint(18, 90), "dni": f"{i:08d}{'TRWAGMYFPDXBNJZSQVHLCKE'[i % 23]}",
+                 "direccion": f"Calle {aleatorio.choice(APELLIDOS)} {aleatorio.randint(1, 200)}",
+                 "telefono": f"6{aleatorio.randint(0, 99999999):08d}"}
+                for i in ids
+            ])
+            conexion.execute(insert(Mascota), [
+                {"id_mascota": i, "nombre_mascota": aleatorio.choice(MASCOTAS), "raza": aleatorio.choice(RAZAS),
+                 "edad": aleatorio.randint(0, 20), "afeccion": aleatorio.choice(AFECCIONES), "estado": "Vivo",
+                 "id_cliente": aleatorio.randint(1, registros)}
+                for i in ids
+            ])
+
+
+def consultas(n):
+    """Textos de búsqueda: prefijos de nombres y apellidos, de DNI y de razas."""
+    aleatorio = random.Random(1)
+    textos = []
+    for i in range(n):
+        tipo = i % 3
+        if tipo == 0:
+            textos.append(f"{aleatorio.choice(NOMBRES)[:3]} {aleatorio.choice(APELLIDOS)[:4]}")
+        elif tipo == 1:
+            textos.append(f"{aleatorio.randint(1, 999999):06d}")
+        else:
+            textos.append(aleatorio.choice(RAZAS)[:4])
+    return textos
+
+
+def ilike(session, texto, limite):
+    """La búsqueda anterior: una subcadena en cualquier columna, sin índice utilizable."""
+    patron = f"%{texto}%"
+    clientes = session.execute(select(Cliente).where(or_(
+        Cliente.nombre_cliente.ilike(patron), Cliente.dni.ilike(patron), Cliente.telefono.ilike(patron),
+    )).limit(limite)).scalars().all()
+    mascotas = session.execute(select(Mascota).where(or_(
+        Mascota.nombre_mascota.ilike(patron), Mascota.raza.ilike(patron),
+    )).limit(limite)).scalars().all()
+    return clientes + mascotas
+
+
+def medir(nombre, funcion, textos):
+    latencias = []
+    for texto in textos:
+        inicio = time.perf_counter()
+        funcion(texto)
+        latencias.append(time.perf_counter() - inicio)
+    percentiles = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+    print(f"{nombre:<8} p50 {percentiles[49] * 1000:8.2f} ms   p95 {percentiles[94] * 1000:8.2f} ms   "
+          f"p99 {percentiles[98] * 1000:8.2f} ms")
+    return percentiles[94]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registros", type=int, default=1_000_000, help="Clientes (y mascotas) sintéticos")
+    parser.add_argument("--consultas", type=int, default=300, help="Búsquedas por método")
+    parser.add_argument("--limite", type=int, default=20, help="Resultados por búsqueda")
+    parser.add_argument("--sin-ilike", action="store_true", help="Mide solo FTS5 (ilike es muy lento con 1M filas)")
+    args = parser.parse_args()
+
+    # El log de sentencias de desarrollo falsearía las medidas
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = create_engine(f"sqlite:///{os.path.join(directorio, 'busqueda.sqlite')}", echo=False)
+        Base.metadata.create_all(engine)
+
+        inicio = time.perf_counter()
+        generar(engine, args.registros)
+        print(f"{args.registros:,} clientes y mascotas generados e indexados en {time.perf_counter() - inicio:.1f} s")
+
+        textos = consultas(args.consultas)
+        with sessionmaker(bind=engine)() as session:
+            gestion = GestionBusqueda(session)
+            p95_fts = medir("FTS5", lambda texto: gestion.buscar(texto, limite=args.limite), textos)
+            if not args.sin_ilike:
+                p95_ilike = medir("ilike", lambda texto: ilike(session, texto, args.limite), textos)
+                print(f"p95: x{p95_ilike / p95_fts:.1f} más rápido con FTS5")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
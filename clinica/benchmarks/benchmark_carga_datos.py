@@ -0,0 +1,93 @@
+"""
+Compara la carga fila a fila (`cargar_datos`) con la carga masiva (`cargar_datos_masivo`).
+
+Uso:
+    python -m clinica.benchmarks.benchmark_carga_datos --registros 200000 --lote 5000
+"""
+import argparse
+import contextlib
+import copy
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from clinica.dbconfig import Base
+from clinica.models import Cita
+from clinica.database import cargar_datos, cargar_datos_masivo
+
+
+def generar_citas(n):
+    """Genera `n` citas sintéticas con el formato de `datos_citas.json`."""
+    inicio = datetime(2020, 1, 1, 9, 0)
+    estados = ["Pendiente", "Finalizada", "Cancelada"]
+    metodos = ["Efectivo", "Tarjeta", "Bizum", "Transferencia"]
+    return [
+        {
+            "id_cita": i,
+            "fecha": (inicio + timedelta(minutes=30 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "descripcion": f"Cita sintética {i}",
+            "metodo_pago": random.choice(metodos),
+            "estado": random.choice(estados),
+            "id_mascota": random.randint(1, 5000),
+            "id_cliente": random.randint(1, 2000),
+            "id_tratamiento": random.randint(1, 300),
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def medir(nombre, funcion, datos, ruta_db):
+    """Ejecuta dos pasadas (inserción y actualización) sobre una base de datos nueva."""
+    engine = create_engine(f"sqlite:///{ruta_db}", echo=False)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    tiempos = []
+    for _ in range(2):
+        session = Session()
+        copia = copy.deepcopy(datos)
+        inicio = time.perf_counter()
+        # La carga fila a fila imprime cada registro; se descarta para no medir la consola
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcion(session, copia)
+        tiempos.append(time.perf_counter() - inicio)
+        session.close()
+
+    engine.dispose()
+    print(f"{nombre:<12} inserción: {tiempos[0]:8.2f} s   actualización: {tiempos[1]:8.2f} s   "
+          f"({len(datos) / tiempos[0]:,.0f} registros/s)")
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registros", type=int, default=20000, help="Número de citas sintéticas")
+    parser.add_argument("--lote", type=int, default=5000, help="Tamaño de lote de la carga masiva")
+    args = parser.parse_args()
+
+    datos = generar_citas(args.registros)
+    print(f"Cargando {args.registros} citas...")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        fila_a_fila = medir(
+            "fila a fila",
+            lambda session, copia: cargar_datos(session, Cita, copia, "id_cita"),
+            datos, os.path.join(directorio, "fila_a_fila.sqlite"),
+        )
+        masiva = medir(
+            "masiva",
+            lambda session, copia: cargar_datos_masivo(session, Cita, copia, "id_cita", tamano_lote=args.lote),
+            datos, os.path.join(directorio, "masiva.sqlite"),
+        )
+
+    print(f"Aceleración: inserción x{fila_a_fila[0] / masiva[0]:.1f}, actualización x{fila_a_fila[1] / masiva[1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Microsegundos por fila del listado de clientes: ruta ORM frente a columnas + orjson.
+
+Genera `--filas` clientes en una base de datos temporal y mide, con el mejor de `--repeticiones`
+intentos, lo que cuesta producir el JSON de GET /clientes/ por cada camino:
+
+- ORM: objetos ORM, to_dict(), validación con el response_model y json.dumps (lo que hacía la ruta)
+- columnas: filas de columnas validadas en bloque y codificadas con orjson (lo que hace ahora)
+
+Uso:
+    python -m clinica.benchmarks.benchmark_listados --filas 100000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from clinica.dbconfig import Base
+from clinica.models import Cliente
+from clinica.services.gestion_clientes import GestionClientes
+from clinica.services.opciones_carga import serializar
+from clinica_api.schemas import ClienteConRelaciones, ClienteResponse
+from clinica_api.serializacion import codificar_lista
+
+
+def generar(ruta_db, filas):
+    """Crea la base de datos en `ruta_db` con `filas` clientes sintéticos."""
+    engine = create_engine(f"sqlite:///{ruta_db}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexion:
+        conexion.execute(insert(Cliente), [
+            {"id_cliente": i, "nombre_cliente": f"Cliente {i}", "edad": 30 + i % 50, "dni": f"{i:08d}z",
+             "direccion": "Calle Mayor 1", "telefono": f"6{i:08d}"}
+            for i in range(1, filas + 1)
+        ])
+    engine.dispose()
+
+
+async def ruta_orm(sesiones):
+    """Lo que hacía GET /clientes/: objetos ORM, to_dict(), response_model y json.dumps."""
+    async with sesiones() as db:
+        clientes = await GestionClientes(db).listar_clientes_async()
+        datos = [serializar(cliente, ()) for cliente in clientes]
+    validados = TypeAdapter(List[ClienteConRelaciones]).validate_python(datos)
+    return json.dumps(jsonable_encoder(validados, exclude_unset=True)).encode()
+
+
+async def ruta_columnas(sesiones):
+    """Lo que hace GET /clientes/: filas de columnas validadas en bloque y codificadas con orjson."""
+    async with sesiones() as db:
+        filas = await GestionClientes(db).listar_clientes_filas_async()
+        return codificar_lista(filas, ClienteResponse)
+
+
+async def microsegundos_por_fila(ruta, sesiones, filas, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await ruta(sesiones)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor / filas * 1e6
+
+
+async def medir(ruta_db, filas, repeticiones):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{ruta_db}")
+    sesiones = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    try:
+        orm = await microsegundos_por_fila(ruta_orm, sesiones, filas, repeticiones)
+        columnas = await microsegundos_por_fila(ruta_columnas, sesiones, filas, repeticiones)
+    finally:
+        await async_engine.dispose()
+    print(f"GET /clientes/ con {filas:,} filas: ORM {orm:.1f} µs/fila, columnas + orjson {columnas:.1f} µs/fila "
+          f"(x{orm / columnas:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10_000, help="Clientes sintéticos")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Intentos por ruta; se toma el mejor")
+    args = parser.parse_args()
+
+    # El log de sentencias de desarrollo registra cada fila y falsearía las medidas
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_db = os.path.join(directorio, "listados.sqlite")
+        generar(ruta_db, args.filas)
+        asyncio.run(medir(ruta_db, args.filas, args.repeticiones))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
 import os
 import logging
-from sqlalchemy import inspect
-from clinica.dbconfig import engine, Base, SessionLocal
+import pandas as pd
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from clinica.dbconfig import engine, SessionLocal
 from clinica.models import *
 from datetime import datetime
-from clinica.services.gestion_clientes import GestionClientes
-from clinica.services.gestion_de_citas import GestionCitas
-from clinica.services.gestion_mascotas import GestionMascotas
-from clinica.services.gestion_tratamiento import GestionTratamientos
+from clinica.utils.exportacion import exportar_consulta_json
+from clinica.utils.helper_functions import MAX_VARIABLES_SQLITE, trocear
+from clinica.migraciones import aplicar_migraciones
+from clinica.services.gestion_resumenes import GestionResumenes
 import json
 
 # Configurar el logger
@@ -32,8 +34,8 @@ PROYECTO_BASE = os.path.dirname(RUTA_BASE)  # Ruta de la raíz del proyecto
 # Ruta a la carpeta 'data' para los JSON
 RUTA_DATA = os.path.join(RUTA_BASE, "data")
 
-# Ruta para la base de datos en la raíz del proyecto
-DATABASE_PATH = os.path.join(PROYECTO_BASE, "clinica_db.sqlite")
+# Ruta para la base de datos en la raíz del proyecto (CLINICA_DB_PATH la sustituye)
+DATABASE_PATH = os.getenv("CLINICA_DB_PATH", os.path.join(PROYECTO_BASE, "clinica_db.sqlite"))
 
 # Verificar las rutas
 print(f"Base de datos: {DATABASE_PATH}")
@@ -45,10 +47,10 @@ if not os.path.exists(PROYECTO_BASE):
 else:
     print("El directorio raíz del proyecto existe.")
 
-# Crear tablas si no existen
+# Crear tablas si no existen (o actualizar el esquema con las migraciones pendientes)
 def create_tables():
     try:
-        Base.metadata.create_all(bind=engine)
+        aplicar_migraciones(engine)
         inspector = inspect(engine)
         tables = inspector.get_table_names()
         if tables:
@@ -93,8 +95,104 @@ def cargar_datos(session, modelo, datos, clave_primaria):
     session.commit()
 
 
+# Tamaño de lote por defecto para la carga masiva (configurable por entorno)
+LOTE_CARGA = int(os.getenv("CLINICA_LOTE_CARGA", "1000"))
+
+def _parsear_fechas(filas, campo="fecha"):
+    """Convierte en bloque las fechas en texto de `filas` a datetime (ISO 8601, con o sin 'T')."""
+    indices = [i for i, fila in enumerate(filas) if isinstance(fila.get(campo), str)]
+    if not indices:
+        return
+
+    fechas = pd.to_datetime([filas[i][campo] for i in indices], format="ISO8601", errors="coerce")
+    nulas = fechas.isna()
+    if nulas.any():
+        logger.warning(f"{int(nulas.sum())} registros con '{campo}' no válida se cargarán sin fecha.")
+
+    for i, fecha, nula in zip(indices, fechas.to_pydatetime(), nulas):
+        filas[i][campo] = None if nula else fecha
+
+def _ids_existentes(session, columna_pk, ids):
+    """Devuelve las claves primarias de `ids` que ya existen, consultando por bloques."""
+    existentes = set()
+    for bloque in trocear(ids, MAX_VARIABLES_SQLITE):
+        existentes.update(session.execute(select(columna_pk).where(columna_pk.in_(bloque))).scalars())
+    return existentes
+
+def _agrupar_por_columnas(filas):
+    """Agrupa las filas por el conjunto de columnas presentes (una sentencia por grupo)."""
+    grupos = {}
+    for fila in filas:
+        grupos.setdefault(tuple(sorted(fila)), []).append(fila)
+    return grupos.items()
+
+# Función de carga masiva con INSERT ... ON CONFLICT DO UPDATE
+def cargar_datos_masivo(session, modelo, datos, clave_primaria, tamano_lote=LOTE_CARGA):
+    """
+    Inserta o actualiza `datos` en la tabla de `modelo` por lotes mediante upserts de SQLite.
+
+    Solo se actualizan las columnas presentes en cada registro, igual que `cargar_datos`,
+    y se hace commit al terminar cada lote.
+
+    Args:
+        session (Session): Sesión de base de datos
+        modelo: Modelo ORM de destino
+        datos (list[dict]): Registros a cargar
+        clave_primaria (str): Nombre de la columna clave primaria
+        tamano_lote (int): Registros por lote y por commit
+
+    Returns:
+        dict: Número de registros insertados, actualizados y descartados
+    """
+    tabla = modelo.__table__
+    columnas = set(tabla.columns.keys())
+    columna_pk = tabla.c[clave_primaria]
+
+    filas = [
+        {clave: valor for clave, valor in item.items() if clave in columnas}
+        for item in datos
+        if item.get(clave_primaria) is not None
+    ]
+    descartados = len(datos) - len(filas)
+    if descartados:
+        logger.warning(f"{tabla.name}: {descartados} registros sin '{clave_primaria}' descartados.")
+
+    if "fecha" in columnas:
+        _parsear_fechas(filas)
+
+    ids = [fila[clave_primaria] for fila in filas]
+    existentes = _ids_existentes(session, columna_pk, ids)
+    actualizados = sum(1 for id_registro in ids if id_registro in existentes)
+
+    total = len(filas)
+    for inicio in range(0, total, tamano_lote):
+        lote = filas[inicio:inicio + tamano_lote]
+        try:
+            for claves, grupo in _agrupar_por_columnas(lote):
+                sentencia = sqlite_insert(tabla)
+                actualizar = {c: sentencia.excluded[c] for c in claves if c != clave_primaria}
+                if actualizar:
+                    sentencia = sentencia.on_conflict_do_update(index_elements=[columna_pk], set_=actualizar)
+                else:
+                    sentencia = sentencia.on_conflict_do_nothing(index_elements=[columna_pk])
+                session.execute(sentencia, grupo)
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.error(f"{tabla.name}: error al cargar el lote que empieza en el registro {inicio}.", exc_info=True)
+            raise
+        logger.info(f"{tabla.name}: {min(inicio + tamano_lote, total)}/{total} registros cargados.")
+
+    resumen = {
+        "insertados": total - actualizados,
+        "actualizados": actualizados,
+        "descartados": descartados,
+    }
+    logger.info(f"{tabla.name}: carga completada {resumen}")
+    return resumen
+
 # Función para cargar todos los datos
-def cargar_todos_los_datos():
+def cargar_todos_los_datos(tamano_lote=LOTE_CARGA):
     session = SessionLocal()
     try:
         for modelo, archivo, clave in [
@@ -104,9 +202,12 @@ def cargar_todos_los_datos():
             (Cita, "datos_citas.json", "id_cita"),
         ]:
             datos = cargar_json(os.path.join(RUTA_DATA, archivo))
-            cargar_datos(session, modelo, datos, clave)
+            cargar_datos_masivo(session, modelo, datos, clave, tamano_lote=tamano_lote)
+
+        # La carga masiva no pasa por los servicios: se recalculan los resúmenes al terminar
+        GestionResumenes(session).reconstruir()
     except Exception as e:
-        print(f"Error inesperado al cargar datos: {e}")
+        logger.error(f"Error inesperado al cargar datos: {e}")
     finally:
         session.close()
 
@@ -120,40 +221,41 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-def exportar_todos_json():
-    """Exporta todos los datos a archivos JSON individuales."""
+def exportar_todos_json(formato="json"):
+    """
+    Exporta todas las tablas a archivos JSON (o NDJSON) individuales en `clinica/data`.
+
+    Cada tabla se escribe en streaming a un archivo temporal que se renombra al terminar.
+
+    Returns:
+        dict | bool: Registros y bytes escritos por tabla, o False si la exportación falla
+    """
+    extension = "ndjson" if formato == "ndjson" else "json"
     try:
         # Crear una sesión de base de datos
         db_session = SessionLocal()
+        resumen = {}
 
-        # Instanciar las clases 
-        gestion_clientes = GestionClientes(db_session)
-        gestion_mascotas = GestionMascotas(db_session)
-        gestion_citas = GestionCitas(db_session)
-        gestion_tratamientos = GestionTratamientos(db_session)
-
-        # Llamar a los métodos de exportación de cada clase
-        logger.info("Iniciando exportación de clientes...")
-        gestion_clientes.exportar_clientes_a_json(os.path.join(RUTA_DATA, "datos_clientes.json"))
-        logger.info("Exportación de clientes completada exitosamente.")
-
-        logger.info("Iniciando exportación de mascotas...")
-        gestion_mascotas.exportar_mascotas_a_json(os.path.join(RUTA_DATA, "datos_mascotas.json"))
-        logger.info("Exportación de mascotas completada exitosamente.")
-
-        logger.info("Iniciando exportación de citas...")
-        gestion_citas.exportar_citas_a_json(os.path.join(RUTA_DATA, "datos_citas.json"))
-        logger.info("Exportación de citas completada exitosamente.")
-
-        logger.info("Iniciando exportación de tratamientos...")
-        gestion_tratamientos.exportar_tratamientos_a_json(os.path.join(RUTA_DATA, "datos_tratamientos.json"))
-        logger.info("Exportación de tratamientos completada exitosamente.")
-
-        # Cerrar la sesión de base de datos
-        db_session.close()
+        try:
+            for nombre, modelo in [
+                ("clientes", Cliente),
+                ("mascotas", Mascota),
+                ("citas", Cita),
+                ("tratamientos", Tratamiento),
+            ]:
+                logger.info(f"Iniciando exportación de {nombre}...")
+                ruta = os.path.join(RUTA_DATA, f"datos_{nombre}.{extension}")
+                resumen[nombre] = exportar_consulta_json(db_session.query(modelo), ruta, formato=formato)
+                logger.info(
+                    f"Exportación de {nombre} completada exitosamente: "
+                    f"{resumen[nombre]['registros']} registros, {resumen[nombre]['bytes']} bytes."
+                )
+        finally:
+            # Cerrar la sesión de base de datos
+            db_session.close()
 
         logger.info("Todas las exportaciones fueron completadas con éxito.")
-        return True
+        return resumen
 
     except Exception as e:
         logger.error(f"Error al exportar los datos: {str(e)}", exc_info=True)
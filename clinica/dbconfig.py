@@ -1,41 +1,155 @@
 import os
 import logging
 import sys
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import OperationalError
-from typing import Generator
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import AsyncGenerator, Generator
+
+# Entorno de ejecución: "desarrollo" (por defecto) o "produccion"
+ENTORNO = os.getenv("CLINICA_ENTORNO", "desarrollo")
+EN_PRODUCCION = ENTORNO == "produccion"
 
 # Configurar logging para SQLAlchemy
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.INFO if EN_PRODUCCION else logging.DEBUG,
     format='%(asctime)s [%(levelname)s] %(name)s - %(message)s',
     stream=sys.stdout,
 )
 
-# Configurar el logger específico de SQLAlchemy
-logging.getLogger('sqlalchemy.engine').setLevel(logging.DEBUG)
+# Configurar el logger específico de SQLAlchemy; en producción no se registra cada sentencia
+logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING if EN_PRODUCCION else logging.DEBUG)
+
+logger = logging.getLogger(__name__)
+
+# Perfil del motor; cada valor se puede sobrescribir con su variable de entorno CLINICA_*
+PERFIL_MOTOR = {
+    "echo": os.getenv("CLINICA_SQL_ECHO", "0" if EN_PRODUCCION else "1") == "1",
+    "pool_pre_ping": os.getenv("CLINICA_POOL_PRE_PING", "0" if EN_PRODUCCION else "1") == "1",
+    "pool_size": int(os.getenv("CLINICA_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("CLINICA_POOL_MAX_OVERFLOW", "20")),
+}
+
+# PRAGMAs que se aplican a cada conexión nueva de SQLite
+PRAGMAS_SQLITE = {
+    "journal_mode": os.getenv("CLINICA_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("CLINICA_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("CLINICA_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Un valor negativo se interpreta en KiB: -65536 son 64 MiB de caché de páginas por conexión
+    "cache_size": int(os.getenv("CLINICA_SQLITE_CACHE_SIZE", "-65536")),
+    "temp_store": os.getenv("CLINICA_SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": int(os.getenv("CLINICA_SQLITE_BUSY_TIMEOUT", "5000")),
+}
+
+# Valores que devuelve SQLite al consultar los PRAGMAs numéricos
+_CODIGOS_PRAGMA = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+}
 
 # Ruta a la carpeta raíz del proyecto
 RUTA_BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# Ruta al archivo de la base de datos en la raíz del proyecto
-DATABASE_PATH = os.path.join(RUTA_BASE, "clinica_db.sqlite")
+# Ruta al archivo de la base de datos en la raíz del proyecto (CLINICA_DB_PATH la sustituye)
+DATABASE_PATH = os.getenv("CLINICA_DB_PATH", os.path.join(RUTA_BASE, "clinica_db.sqlite"))
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+# Misma base de datos a través del driver asíncrono aiosqlite
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
 # Imprimir la ruta completa para verificar
 print(f"Ruta completa de la base de datos: {DATABASE_PATH}")
 
+
+def aplicar_pragmas(dbapi_connection, connection_record=None):
+    """Aplica PRAGMAS_SQLITE a una conexión DBAPI recién abierta."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, valor in PRAGMAS_SQLITE.items():
+            cursor.execute(f"PRAGMA {pragma}={valor}")
+    finally:
+        cursor.close()
+
+
+def pragmas_en_vigor(conexion):
+    """
+    Devuelve los PRAGMAs de PRAGMAS_SQLITE con el valor que tiene realmente la conexión.
+
+    Args:
+        conexion (Connection): Conexión síncrona de SQLAlchemy
+
+    Returns:
+        dict: {pragma: valor}
+    """
+    en_vigor = {}
+    for pragma in PRAGMAS_SQLITE:
+        valor = conexion.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+        en_vigor[pragma] = _CODIGOS_PRAGMA.get(pragma, {}).get(valor, valor)
+    return en_vigor
+
+
+def comprobar_pragmas(bind=None):
+    """
+    Comprueba al arrancar que los PRAGMAs configurados están en vigor.
+
+    Returns:
+        dict: {"pragmas": {...}, "diferencias": {pragma: (esperado, en_vigor)}}
+    """
+    with (bind or engine).connect() as conexion:
+        en_vigor = pragmas_en_vigor(conexion)
+
+    diferencias = {
+        pragma: (esperado, en_vigor[pragma])
+        for pragma, esperado in PRAGMAS_SQLITE.items()
+        if str(en_vigor[pragma]).upper() != str(esperado).upper()
+    }
+    if diferencias:
+        logger.warning(f"PRAGMAs de SQLite distintos de los configurados: {diferencias}")
+    else:
+        logger.info(f"PRAGMAs de SQLite en vigor: {en_vigor}")
+    return {"pragmas": en_vigor, "diferencias": diferencias}
+
+
 # Crear el motor de la base de datos
 try:
-    engine = create_engine(DATABASE_URL, echo=True, pool_pre_ping=True, connect_args={"check_same_thread": False})
+    engine = create_engine(
+        DATABASE_URL,
+        echo=PERFIL_MOTOR["echo"],
+        pool_pre_ping=PERFIL_MOTOR["pool_pre_ping"],
+        # SQLite en archivo: conexiones reutilizables entre hilos del threadpool
+        poolclass=QueuePool,
+        pool_size=PERFIL_MOTOR["pool_size"],
+        max_overflow=PERFIL_MOTOR["max_overflow"],
+        connect_args={"check_same_thread": False},
+    )
 except OperationalError as e:
     print(f"Error al crear el motor de la base de datos: {e}")
     exit(1)
 
+# Motor asíncrono para las rutas de lectura, que no ocupan un hilo del threadpool mientras esperan a SQLite
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=PERFIL_MOTOR["echo"],
+    pool_pre_ping=PERFIL_MOTOR["pool_pre_ping"],
+    # Mismo tamaño de pool que el motor síncrono: las conexiones (y sus PRAGMAs) se reutilizan.
+    # Cada conexión aiosqlite vive en un hilo no daemon, así que hay que cerrar el pool con
+    # dispose() al terminar (lo hace el lifespan; los tests, en su tearDown)
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=PERFIL_MOTOR["pool_size"],
+    max_overflow=PERFIL_MOTOR["max_overflow"],
+)
+
+event.listen(engine, "connect", aplicar_pragmas)
+event.listen(async_engine.sync_engine, "connect", aplicar_pragmas)
+
 # Crear la sesión de la base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sesiones asíncronas; expire_on_commit=False evita recargas implícitas (no permitidas en asyncio) tras un commit
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession,
+                                       autoflush=False, expire_on_commit=False)
+
 # Base para definir los modelos de datos
 Base = declarative_base()
 
@@ -46,3 +160,8 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+# Función get_async_db para obtener una sesión asíncrona de la base de datos
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
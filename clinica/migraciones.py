@@ -0,0 +1,189 @@
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+Cada migración tiene un número de versión y se aplica una sola vez. La versión actual se guarda
+en `PRAGMA user_version`, de modo que el arranque solo necesita una consulta cuando el esquema
+está al día, y el historial completo queda en la tabla `historial_migraciones`.
+
+Uso:
+    python -m clinica.migraciones            # aplica las migraciones pendientes
+    python -m clinica.migraciones --estado   # muestra la versión y el historial
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, inspect, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from sqlalchemy.orm import Session
+
+from clinica.dbconfig import Base, engine
+import clinica.models  # noqa: F401  (registra los modelos en Base.metadata)
+from clinica.models import INDICES_BUSQUEDA, OcurrenciaSerie, SerieCita, crear_indice_busqueda
+from clinica.services.gestion_resumenes import RESUMENES, GestionResumenes
+
+logger = logging.getLogger(__name__)
+
+# Segundos de pausa entre la creación de dos índices para que las escrituras pendientes avancen
+PAUSA_ENTRE_INDICES = 0.05
+
+historial_migraciones = Table(
+    "historial_migraciones",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("nombre", String, nullable=False),
+    Column("aplicada_en", DateTime, nullable=False),
+    Column("duracion_ms", Float),
+)
+
+
+def crear_indices_en_linea(bind, tablas=None, pausa=PAUSA_ENTRE_INDICES):
+    """
+    Crea los índices declarados en los modelos que falten, uno por transacción.
+
+    SQLite bloquea las escrituras mientras construye un índice; creando cada índice en su propia
+    transacción corta y haciendo una pausa entre ellos, las peticiones que esperan (busy_timeout)
+    pueden escribir entre un índice y el siguiente en lugar de esperar a que terminen todos.
+
+    Args:
+        bind (Engine): Motor de la base de datos
+        tablas (Iterable[str], optional): Limita la creación a estas tablas
+        pausa (float): Segundos de espera entre índices
+
+    Returns:
+        list: Nombres de los índices creados
+    """
+    inspector = inspect(bind)
+    creados = []
+    for tabla in Base.metadata.sorted_tables:
+        if (tablas is not None and tabla.name not in tablas) or not inspector.has_table(tabla.name):
+            continue
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabla.name)}
+        for indice in sorted(tabla.indexes, key=lambda i: i.name):
+            if indice.name in existentes:
+                continue
+            inicio = time.perf_counter()
+            try:
+                with bind.begin() as conexion:
+                    indice.create(conexion)
+            except IntegrityError as e:
+                # Un índice único no se puede crear mientras haya duplicados en los datos
+                logger.error(f"No se pudo crear el índice {indice.name}: {e.orig}")
+                continue
+            creados.append(indice.name)
+            logger.info(f"Índice {indice.name} creado sobre {tabla.name} en {time.perf_counter() - inicio:.2f} s.")
+            time.sleep(pausa)
+    return creados
+
+
+def _esquema_inicial(bind):
+    """Crea las tablas de los modelos que no existan (equivale al antiguo create_all del arranque)."""
+    Base.metadata.create_all(bind=bind)
+
+
+def _indices_secundarios(bind):
+    """Añade a las bases de datos existentes los índices secundarios de cita, mascota y cliente."""
+    crear_indices_en_linea(bind, tablas={"cita", "mascota", "cliente"})
+
+
+def _tablas_resumen(bind):
+    """Crea las tablas de resumen del dashboard y las rellena a partir de los datos existentes."""
+    Base.metadata.create_all(bind=bind, tables=[modelo.__table__ for modelo, _, _ in RESUMENES.values()])
+    with Session(bind) as sesion:
+        GestionResumenes(sesion).reconstruir()
+
+
+def _indice_busqueda(bind):
+    """Crea los índices FTS5 de clientes y mascotas con sus triggers e indexa las filas existentes."""
+    for origen in INDICES_BUSQUEDA:
+        with bind.begin() as conexion:
+            crear_indice_busqueda(conexion, origen, reconstruir=True)
+
+
+def _series_citas(bind):
+    """Crea las tablas de las series de citas recurrentes y de sus ocurrencias confirmadas."""
+    Base.metadata.create_all(bind=bind, tables=[SerieCita.__table__, OcurrenciaSerie.__table__])
+
+
+# (versión, nombre, función); las versiones son consecutivas y nunca se reordenan
+MIGRACIONES = [
+    (1, "esquema_inicial", _esquema_inicial),
+    (2, "indices_secundarios", _indices_secundarios),
+    (3, "tablas_resumen", _tablas_resumen),
+    (4, "indice_busqueda", _indice_busqueda),
+    (5, "series_citas", _series_citas),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def version_del_esquema(bind=engine):
+    """Devuelve la versión del esquema guardada en la base de datos (0 si nunca se migró)."""
+    with bind.connect() as conexion:
+        return conexion.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def aplicar_migraciones(bind=engine):
+    """
+    Aplica en orden las migraciones pendientes.
+
+    Si la base de datos ya está en VERSION_ACTUAL no se hace nada más que leer `user_version`.
+
+    Returns:
+        list: Nombres de las migraciones aplicadas
+    """
+    version = version_del_esquema(bind)
+    if version >= VERSION_ACTUAL:
+        logger.info(f"Esquema de la base de datos al día (versión {version}).")
+        return []
+
+    historial_migraciones.create(bind, checkfirst=True)
+
+    aplicadas = []
+    for numero, nombre, migracion in MIGRACIONES:
+        if numero <= version:
+            continue
+        logger.info(f"Aplicando migración {numero:04d} {nombre}...")
+        inicio = time.perf_counter()
+        migracion(bind)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+
+        with bind.begin() as conexion:
+            conexion.execute(insert(historial_migraciones).values(
+                version=numero, nombre=nombre, aplicada_en=datetime.now(), duracion_ms=round(duracion_ms, 1)
+            ))
+            conexion.exec_driver_sql(f"PRAGMA user_version = {int(numero)}")
+        aplicadas.append(nombre)
+        logger.info(f"Migración {numero:04d} {nombre} aplicada en {duracion_ms:.0f} ms.")
+
+    return aplicadas
+
+
+def historial(bind=engine):
+    """Devuelve las migraciones registradas en `historial_migraciones`, de la más antigua a la más reciente."""
+    if not inspect(bind).has_table(historial_migraciones.name):
+        return []
+    with bind.connect() as conexion:
+        filas = conexion.execute(select(historial_migraciones).order_by(historial_migraciones.c.version))
+        return [dict(fila._mapping) for fila in filas]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estado", action="store_true", help="Muestra la versión y el historial sin migrar")
+    args = parser.parse_args()
+
+    if not args.estado:
+        aplicadas = aplicar_migraciones()
+        print(f"Migraciones aplicadas: {', '.join(aplicadas) if aplicadas else 'ninguna'}")
+
+    print(f"Versión del esquema: {version_del_esquema()} (última disponible: {VERSION_ACTUAL})")
+    for migracion in historial():
+        print(f"  {migracion['version']:04d} {migracion['nombre']:<24} {migracion['aplicada_en']:%Y-%m-%d %H:%M:%S}"
+              f"  {migracion['duracion_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
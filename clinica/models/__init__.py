@@ -4,8 +4,11 @@ from .tabla_mascota import Mascota
 from .tabla_citas import Cita
 from .tabla_tratamiento import Tratamiento
 from .tabla_productos import Producto
+from .tabla_resumenes import ResumenCitasDia, ResumenIngresosMetodoPago, ResumenMascotasCliente
+from .tabla_series import SerieCita, OcurrenciaSerie
 from .tabla_cliente import Cliente as ClienteModel
 from .tabla_mascota import Mascota as MascotaModel
 from .tabla_citas import Cita as CitaModel
 from .tabla_tratamiento import Tratamiento as TratamientoModel
-from .tabla_productos import Producto as ProductoModel
\ No newline at end of file
+from .tabla_productos import Producto as ProductoModel
+from .tabla_busqueda import INDICES_BUSQUEDA, crear_indice_busqueda
\ No newline at end of file
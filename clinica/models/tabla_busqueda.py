@@ -0,0 +1,82 @@
+from sqlalchemy import event
+from clinica.models.tabla_cliente import Cliente
+from clinica.models.tabla_mascota import Mascota
+
+# Índices de texto completo (SQLite FTS5) de clientes y mascotas. Son tablas virtuales de
+# contenido externo: solo guardan el índice y leen el texto de la tabla de origen. Los triggers
+# las mantienen al día en la misma transacción que cada INSERT, UPDATE o DELETE.
+#
+# El tokenizador unicode61 con remove_diacritics 2 ignora mayúsculas y acentos ("Pérez" = "perez")
+# y prefix='2 3' guarda índices de prefijos para que las búsquedas "ana*" no recorran el índice.
+
+INDICES_BUSQUEDA = {
+    "cliente": {
+        "tabla": "busqueda_cliente",
+        "clave": "id_cliente",
+        "columnas": ("nombre_cliente", "dni", "telefono", "direccion"),
+    },
+    "mascota": {
+        "tabla": "busqueda_mascota",
+        "clave": "id_mascota",
+        "columnas": ("nombre_mascota", "raza", "afeccion"),
+    },
+}
+
+TOKENIZADOR_BUSQUEDA = "unicode61 remove_diacritics 2"
+
+
+def sentencias_indice_busqueda(origen):
+    """Sentencias CREATE de la tabla FTS5 de `origen` ("cliente" o "mascota") y de sus triggers."""
+    indice = INDICES_BUSQUEDA[origen]
+    tabla, clave = indice["tabla"], indice["clave"]
+    columnas = ", ".join(indice["columnas"])
+    nuevos = ", ".join(f"new.{columna}" for columna in indice["columnas"])
+    antiguos = ", ".join(f"old.{columna}" for columna in indice["columnas"])
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla} USING fts5({columnas}, content='{origen}', "
+        f"content_rowid='{clave}', tokenize='{TOKENIZADOR_BUSQUEDA}', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {tabla}_ai AFTER INSERT ON {origen} BEGIN "
+        f"INSERT INTO {tabla}(rowid, {columnas}) VALUES (new.{clave}, {nuevos}); END",
+        # Las tablas de contenido externo se actualizan borrando con los valores antiguos
+        f"CREATE TRIGGER IF NOT EXISTS {tabla}_ad AFTER DELETE ON {origen} BEGIN "
+        f"INSERT INTO {tabla}({tabla}, rowid, {columnas}) VALUES ('delete', old.{clave}, {antiguos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {tabla}_au AFTER UPDATE OF {columnas} ON {origen} BEGIN "
+        f"INSERT INTO {tabla}({tabla}, rowid, {columnas}) VALUES ('delete', old.{clave}, {antiguos}); "
+        f"INSERT INTO {tabla}(rowid, {columnas}) VALUES (new.{clave}, {nuevos}); END",
+    ]
+
+
+def crear_indice_busqueda(conexion, origen, reconstruir=False):
+    """
+    Crea (si no existen) la tabla FTS5 de `origen` y sus triggers.
+
+    Args:
+        conexion (Connection): Conexión síncrona de SQLAlchemy
+        origen (str): "cliente" o "mascota"
+        reconstruir (bool): Vuelve a indexar todas las filas existentes de la tabla de origen
+    """
+    for sentencia in sentencias_indice_busqueda(origen):
+        conexion.exec_driver_sql(sentencia)
+    if reconstruir:
+        tabla = INDICES_BUSQUEDA[origen]["tabla"]
+        conexion.exec_driver_sql(f"INSERT INTO {tabla}({tabla}) VALUES ('rebuild')")
+
+
+def _al_crear(origen):
+    def crear(target, connection, **kw):
+        if connection.dialect.name == "sqlite":
+            crear_indice_busqueda(connection, origen)
+    return crear
+
+
+def _al_borrar(origen):
+    def borrar(target, connection, **kw):
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {INDICES_BUSQUEDA[origen]['tabla']}")
+    return borrar
+
+
+# create_all / drop_all crean y borran también el índice de búsqueda de cada tabla
+for _modelo in (Cliente, Mascota):
+    event.listen(_modelo.__table__, "after_create", _al_crear(_modelo.__tablename__))
+    event.listen(_modelo.__table__, "after_drop", _al_borrar(_modelo.__tablename__))
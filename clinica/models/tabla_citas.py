@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from clinica.dbconfig import Base
 
@@ -12,12 +12,23 @@ class Cita(Base):
     estado = Column(String)
     id_mascota = Column(Integer, ForeignKey("mascota.id_mascota"))
     id_cliente = Column(Integer, ForeignKey("cliente.id_cliente"))
-    id_tratamiento = Column(Integer, ForeignKey("tratamiento.id_tratamiento"))
+    id_tratamiento = Column(Integer, ForeignKey("tratamiento.id_tratamiento"), index=True)
+
+    __table_args__ = (
+        # Listado filtrado por estado y ordenado por fecha (cubre también los filtros solo por estado)
+        Index("ix_cita_estado_fecha", "estado", "fecha"),
+        # Orden del listado paginado y paginación por clave (fecha, id_cita)
+        Index("ix_cita_fecha_id_cita", "fecha", "id_cita"),
+        # buscar_cita y comprobación de duplicados en registrar_cita
+        Index("ix_cita_mascota_cliente", "id_mascota", "id_cliente"),
+    )
 
     # Relaciones
     mascota = relationship("Mascota", back_populates="citas")
     cliente = relationship("Cliente", back_populates="citas")
     tratamiento = relationship("Tratamiento", back_populates="citas")
+    # Solo las citas confirmadas desde una serie recurrente tienen ocurrencia
+    ocurrencia = relationship("OcurrenciaSerie", back_populates="cita", uselist=False)
 
     def to_dict(self):
         return {
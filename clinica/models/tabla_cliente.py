@@ -8,9 +8,9 @@ class Cliente(Base):
     id_cliente = Column(Integer, primary_key=True, index=True)
     nombre_cliente = Column(String, index=True)
     edad = Column(Integer)
-    dni = Column(String)
+    dni = Column(String, unique=True, index=True)
     direccion = Column(String)
-    telefono = Column(String)
+    telefono = Column(String, index=True)
 
     # Relaciones
     mascotas = relationship("Mascota", back_populates="cliente")
@@ -11,7 +11,7 @@ class Mascota(Base):
     edad = Column(Integer)
     afeccion = Column(String)
     estado = Column(String)
-    id_cliente = Column(Integer, ForeignKey("cliente.id_cliente"))
+    id_cliente = Column(Integer, ForeignKey("cliente.id_cliente"), index=True)
 
     # Relaciones
     cliente = relationship("Cliente", back_populates="mascotas")
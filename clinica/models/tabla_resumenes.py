@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String
+from clinica.dbconfig import Base
+
+# Tablas de resumen para el dashboard. Los servicios las actualizan en la misma transacción que
+# la escritura que las afecta (ver GestionResumenes), así que leerlas es O(1) respecto al tamaño
+# de las tablas de origen.
+
+class ResumenCitasDia(Base):
+    __tablename__ = "resumen_citas_dia"
+
+    dia = Column(String, primary_key=True)  # YYYY-MM-DD
+    estado = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'dia': self.dia,
+            'estado': self.estado,
+            'total': self.total
+        }
+
+class ResumenIngresosMetodoPago(Base):
+    __tablename__ = "resumen_ingresos_metodo_pago"
+
+    metodo_pago = Column(String, primary_key=True)
+    citas = Column(Integer, nullable=False, default=0)
+    ingresos = Column(Integer, nullable=False, default=0)  # Suma de Tratamiento.precio de las citas finalizadas
+
+    def to_dict(self):
+        return {
+            'metodo_pago': self.metodo_pago,
+            'citas': self.citas,
+            'ingresos': self.ingresos
+        }
+
+class ResumenMascotasCliente(Base):
+    __tablename__ = "resumen_mascotas_cliente"
+
+    id_cliente = Column(Integer, primary_key=True)
+    mascotas = Column(Integer, nullable=False, default=0, index=True)
+
+    def to_dict(self):
+        return {
+            'id_cliente': self.id_cliente,
+            'mascotas': self.mascotas
+        }
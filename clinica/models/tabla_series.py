@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from sqlalchemy.orm import relationship
+from clinica.dbconfig import Base
+
+# Series de citas recurrentes. La serie solo guarda la regla (ver clinica.utils.recurrencia) y los
+# datos comunes de sus citas; cada ocurrencia se convierte en una fila de `cita` cuando se confirma
+# y queda enlazada a la serie en `ocurrencia_serie`.
+
+class SerieCita(Base):
+    __tablename__ = "serie_cita"
+
+    id_serie = Column(Integer, primary_key=True, index=True)
+    regla = Column(String, nullable=False)  # RRULE normalizada, p. ej. "FREQ=WEEKLY;INTERVAL=1;COUNT=12"
+    inicio = Column(DateTime, nullable=False)  # Primera ocurrencia (DTSTART)
+    descripcion = Column(String)
+    id_mascota = Column(Integer, ForeignKey("mascota.id_mascota"), index=True)
+    id_cliente = Column(Integer, ForeignKey("cliente.id_cliente"))
+    id_tratamiento = Column(Integer, ForeignKey("tratamiento.id_tratamiento"))
+
+    # Relaciones
+    ocurrencias = relationship("OcurrenciaSerie", back_populates="serie")
+
+    def to_dict(self):
+        return {
+            'id_serie': self.id_serie,
+            'regla': self.regla,
+            'inicio': self.inicio.isoformat() if self.inicio else None,
+            'descripcion': self.descripcion,
+            'id_mascota': self.id_mascota,
+            'id_cliente': self.id_cliente,
+            'id_tratamiento': self.id_tratamiento
+        }
+
+class OcurrenciaSerie(Base):
+    __tablename__ = "ocurrencia_serie"
+
+    id_cita = Column(Integer, ForeignKey("cita.id_cita"), primary_key=True)
+    id_serie = Column(Integer, ForeignKey("serie_cita.id_serie"), nullable=False)
+    # Fecha que da la regla; la cita puede moverse después sin que la ocurrencia se vuelva a ofrecer
+    ocurrencia = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Cada ocurrencia se confirma una sola vez; también sirve para leer las de una ventana
+        Index("ix_ocurrencia_serie_serie_ocurrencia", "id_serie", "ocurrencia", unique=True),
+    )
+
+    # Relaciones
+    serie = relationship("SerieCita", back_populates="ocurrencias")
+    cita = relationship("Cita", back_populates="ocurrencia")
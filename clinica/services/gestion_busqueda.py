@@ -0,0 +1,149 @@
+# gestion_busqueda.py
+"""
+Búsqueda de texto completo de clientes y mascotas sobre los índices FTS5 (ver tabla_busqueda).
+
+Cada palabra del texto buscado se convierte en un prefijo ("ana" encuentra "Ana" y "Anabel") y
+todas tienen que aparecer en alguna de las columnas indexadas. Mayúsculas y acentos se ignoran.
+Los resultados se ordenan por relevancia (bm25), con más peso para el nombre.
+"""
+
+import logging
+import re
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.exc import SQLAlchemyError
+from clinica.models import INDICES_BUSQUEDA
+
+# Tipos de resultado que se pueden buscar -> tabla de origen
+TIPOS_BUSQUEDA = {"clientes": "cliente", "mascotas": "mascota"}
+
+# Peso de cada columna indexada en bm25, en el orden de INDICES_BUSQUEDA
+PESOS_BUSQUEDA = {
+    "cliente": (10.0, 5.0, 5.0, 1.0),  # nombre, dni, teléfono, dirección
+    "mascota": (10.0, 3.0, 1.0),       # nombre, raza, afección
+}
+
+LIMITE_BUSQUEDA = 20
+
+
+def expresion_fts(texto):
+    """
+    Convierte el texto de búsqueda en una expresión MATCH de FTS5 con un prefijo por palabra.
+
+    Las comillas y operadores del texto se descartan, así que el usuario no puede escribir una
+    expresión FTS5 inválida.
+
+    Raises:
+        ValueError: Si el texto no contiene ninguna palabra
+    """
+    terminos = re.findall(r"\w+", texto or "")
+    if not terminos:
+        raise ValueError("El texto de búsqueda debe contener al menos una letra o un número.")
+    return " ".join(f'"{termino}"*' for termino in terminos)
+
+
+def filtrar_por_texto(consulta, modelo, texto, columnas=None):
+    """
+    Restringe un SELECT de `modelo` (Cliente o Mascota) a las filas que encuentra su índice FTS5.
+
+    Añade el JOIN con el índice, el MATCH y el orden por relevancia (bm25, a igualdad por ID), de
+    modo que la consulta puede seguir llevando opciones de carga, LIMIT y OFFSET.
+
+    Args:
+        consulta (Select): SELECT del modelo
+        modelo: Cliente o Mascota
+        texto (str): Texto libre; cada palabra se busca como prefijo
+        columnas (Iterable[str], optional): Limita la búsqueda a estas columnas indexadas
+
+    Raises:
+        ValueError: Si el texto no contiene palabras
+    """
+    indice = INDICES_BUSQUEDA[modelo.__tablename__]
+    expresion = expresion_fts(texto)
+    if columnas:
+        expresion = f"{{{' '.join(columnas)}}} : ({expresion})"
+    fts = table(indice["tabla"], column("rowid"))
+    clave = getattr(modelo, indice["clave"])
+    return (consulta.join(fts, fts.c.rowid == clave)
+            .where(literal_column(indice["tabla"]).op("MATCH")(expresion))
+            .order_by(func.bm25(literal_column(indice["tabla"])), clave))
+
+
+def _consulta(origen):
+    indice = INDICES_BUSQUEDA[origen]
+    tabla, clave = indice["tabla"], indice["clave"]
+    pesos = ", ".join(str(peso) for peso in PESOS_BUSQUEDA[origen])
+    return text(
+        f"SELECT {origen}.*, -bm25({tabla}, {pesos}) AS puntuacion "
+        f"FROM {tabla} JOIN {origen} ON {origen}.{clave} = {tabla}.rowid "
+        f"WHERE {tabla} MATCH :expresion "
+        f"ORDER BY bm25({tabla}, {pesos}) LIMIT :limite"
+    )
+
+
+def _resultados(origen, filas):
+    clave = INDICES_BUSQUEDA[origen]["clave"]
+    resultados = []
+    for fila in filas:
+        datos = dict(fila)
+        puntuacion = datos.pop("puntuacion")
+        resultados.append({"tipo": origen, "id": datos[clave], "puntuacion": round(puntuacion, 4), origen: datos})
+    return resultados
+
+
+def _tipos(tipos):
+    tipos = [tipos] if isinstance(tipos, str) else list(tipos or TIPOS_BUSQUEDA)
+    desconocidos = [tipo for tipo in tipos if tipo not in TIPOS_BUSQUEDA]
+    if desconocidos:
+        raise ValueError(f"Tipo de búsqueda no válido: {', '.join(desconocidos)}. "
+                         f"Tipos disponibles: {', '.join(TIPOS_BUSQUEDA)}")
+    return [TIPOS_BUSQUEDA[tipo] for tipo in tipos]
+
+
+def _combinar(resultados, limite):
+    # bm25 no es exactamente comparable entre dos índices, pero con el mismo peso para el nombre
+    # basta para intercalar clientes y mascotas en una sola lista
+    return sorted(resultados, key=lambda r: r["puntuacion"], reverse=True)[:limite]
+
+
+class GestionBusqueda:
+    def __init__(self, db_session):
+        self.db_session = db_session
+
+    def buscar(self, texto, tipos=None, limite=LIMITE_BUSQUEDA):
+        """
+        Busca clientes y/o mascotas que contengan todas las palabras de `texto` como prefijo.
+
+        Args:
+            texto (str): Texto libre (nombre, DNI, teléfono, raza...)
+            tipos (Iterable[str], optional): "clientes", "mascotas" o ambos (por defecto)
+            limite (int): Número máximo de resultados en total
+
+        Returns:
+            list[dict]: {"tipo", "id", "puntuacion", "cliente" | "mascota"}, de más a menos relevante
+
+        Raises:
+            ValueError: Si el texto no contiene palabras o algún tipo no existe
+        """
+        expresion = expresion_fts(texto)
+        resultados = []
+        try:
+            for origen in _tipos(tipos):
+                filas = self.db_session.execute(_consulta(origen), {"expresion": expresion, "limite": limite})
+                resultados.extend(_resultados(origen, filas.mappings()))
+        except SQLAlchemyError as e:
+            logging.error(f"Error al buscar '{texto}': {e}")
+            return []
+        return _combinar(resultados, limite)
+
+    async def buscar_async(self, texto, tipos=None, limite=LIMITE_BUSQUEDA):
+        """Variante asíncrona de `buscar`; requiere una AsyncSession."""
+        expresion = expresion_fts(texto)
+        resultados = []
+        try:
+            for origen in _tipos(tipos):
+                filas = await self.db_session.execute(_consulta(origen), {"expresion": expresion, "limite": limite})
+                resultados.extend(_resultados(origen, filas.mappings()))
+        except SQLAlchemyError as e:
+            logging.error(f"Error al buscar '{texto}': {e}")
+            return []
+        return _combinar(resultados, limite)
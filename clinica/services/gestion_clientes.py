@@ -1,10 +1,17 @@
 import logging
-import json
 import os
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from clinica.models.tabla_cliente import Cliente as ClienteModel
-from clinica.models.tabla_mascota import Mascota as MascotaModel
+from clinica.services.gestion_busqueda import LIMITE_BUSQUEDA, filtrar_por_texto
+from clinica.services.gestion_resumenes import GestionResumenes
+from clinica.services.opciones_carga import buscar_por_ids, buscar_por_ids_async, opciones_carga, preset
+from clinica.utils.cache_entidades import cache_entidades
+from clinica.utils.diario_cambios import diario_cambios
+from clinica.utils.exportacion import exportar_consulta_json
+from clinica.utils.helper_functions import TAMANO_LOTE_STREAMING, iterar_lotes_async, patron_contiene
+from clinica.utils.versiones_tablas import versiones_tablas
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,24 +20,15 @@ class GestionClientes:
     def __init__(self, db_session: Session):
         self.db_session = db_session
 
-    def exportar_clientes_a_json(self, ruta_json=None):
+    def exportar_clientes_a_json(self, ruta_json=None, formato="json"):
+        """Exporta los clientes a un archivo JSON (o NDJSON) escribiendo de forma incremental."""
         if ruta_json is None:
             ruta_json = os.path.join(os.getcwd(), 'clinica/data/tabla_clientes.json')
 
-        # Verifica que el directorio exista y créalo si no existe
-        directorio = os.path.dirname(ruta_json)
-        if not os.path.exists(directorio):
-            os.makedirs(directorio)
-        
         try:
-            clientes = self.db_session.query(ClienteModel).all()
-            datos = [cliente.to_dict() for cliente in clientes]  # Asegúrate de que `to_dict()` esté implementado en `ClienteModel`
-            
-            print("Clientes exportados:", datos)  # Depuración: Verifica los datos antes de escribir
-
-            with open(ruta_json, 'w', encoding='utf-8') as archivo:
-                json.dump(datos, archivo, ensure_ascii=False, indent=4)
-            logging.info(f"Clientes exportados a {ruta_json} exitosamente.")
+            resumen = exportar_consulta_json(self.db_session.query(ClienteModel), ruta_json, formato=formato)
+            logging.info(f"Clientes exportados a {ruta_json} exitosamente ({resumen['registros']} registros, {resumen['bytes']} bytes).")
+            return resumen
         except Exception as e:
             logging.error(f"Error al exportar clientes a JSON: {e}")
 
@@ -80,6 +78,8 @@ class GestionClientes:
             
             # Refrescar para asegurar que tenemos todos los datos actualizados
             self.db_session.refresh(nuevo_cliente)
+            diario_cambios.registrar("cliente", "upsert", nuevo_cliente.id_cliente, nuevo_cliente.to_dict())
+            versiones_tablas.incrementar("cliente")
             
             # Log de éxito
             logging.info(
@@ -165,8 +165,10 @@ class GestionClientes:
                 self.db_session.commit()
                 logging.info(f"Cliente con ID '{id_cliente}' modificado con éxito.")
                 
-                # Exportar a JSON después de la operación
-                self.exportar_clientes_a_json()
+                # Registrar el cambio en el diario; el compactador actualiza el snapshot JSON
+                diario_cambios.registrar("cliente", "upsert", cliente.id_cliente, cliente.to_dict())
+                versiones_tablas.incrementar("cliente")
+                cache_entidades.invalidar("cliente", cliente.id_cliente)
 
                 return f"Cliente con ID '{id_cliente}' modificado con éxito."
             else:
@@ -190,11 +192,17 @@ class GestionClientes:
 
             if cliente:
                 self.db_session.delete(cliente)
+                GestionResumenes(self.db_session).olvidar_cliente(id_cliente)
                 self.db_session.commit()
                 logging.info(f"Cliente con ID '{id_cliente}' eliminado con éxito.")
                 
-                # Exportar a JSON después de la operación
-                self.exportar_clientes_a_json()
+                # Registrar el cambio en el diario; el compactador actualiza el snapshot JSON
+                diario_cambios.registrar("cliente", "delete", id_cliente)
+                versiones_tablas.incrementar("cliente", "mascota", "tratamiento", "cita")
+                cache_entidades.invalidar("cliente", id_cliente)
+                cache_entidades.invalidar("mascota")
+                cache_entidades.invalidar("tratamiento")
+                cache_entidades.invalidar("cita")
 
                 return f"Cliente con ID '{id_cliente}' eliminado con éxito."
             else:
@@ -220,69 +228,73 @@ class GestionClientes:
             logging.error("Error al buscar cliente por DNI: %s", e)
             return None
 
-    def buscar_cliente_por_nombre(self, nombre_cliente):
-        """Busca clientes por nombre y muestra los nombres de las mascotas asociadas si hay múltiples coincidencias."""
-        try:
-            clientes = self.db_session.query(ClienteModel).filter(
-                ClienteModel.nombre_cliente.ilike(f"%{nombre_cliente}%")
-            ).all()
-
-            if not clientes:
-                logging.warning(f"No se encontró ningún cliente con el nombre '{nombre_cliente}'.")
-                return None
-
-            # Si hay un solo cliente, se devuelve directamente junto con sus mascotas
-            if len(clientes) == 1:
-                mascotas = self.db_session.query(MascotaModel).filter_by(id_cliente=clientes[0].id_cliente).all()
-                nombres_mascotas = [mascota.nombre_mascota for mascota in mascotas]
-                logging.info(f"Cliente encontrado: {clientes[0].nombre_cliente} (ID: {clientes[0].id_cliente}), Mascotas: {', '.join(nombres_mascotas) if nombres_mascotas else 'Ninguna'}")
-                return {
-                    "cliente": clientes[0],
-                    "mascotas": nombres_mascotas
-                }
-
-            # Si hay múltiples clientes, se listan y se pide una selección
-            logging.info(f"Se encontraron múltiples clientes con el nombre '{nombre_cliente}'.")
-            for idx, cliente in enumerate(clientes, start=1):
-                mascotas = self.db_session.query(MascotaModel).filter_by(id_cliente=cliente.id_cliente).all()
-                nombres_mascotas = [mascota.nombre_mascota for mascota in mascotas]
-                print(f"{idx}. {cliente.nombre_cliente} - ID: {cliente.id_cliente} - DNI: {cliente.dni} - Teléfono: {cliente.telefono} - Mascotas: {', '.join(nombres_mascotas) if nombres_mascotas else 'Ninguna'}")
-
-            try:
-                seleccion = int(input("Seleccione el número del cliente deseado (0 para cancelar): "))
-                if seleccion == 0:
-                    print("Operación cancelada.")
-                    return None
-                elif 1 <= seleccion <= len(clientes):
-                    cliente_seleccionado = clientes[seleccion - 1]
-                    mascotas = self.db_session.query(MascotaModel).filter_by(id_cliente=cliente_seleccionado.id_cliente).all()
-                    nombres_mascotas = [mascota.nombre_mascota for mascota in mascotas]
-                    logging.info(f"Cliente seleccionado: {cliente_seleccionado.nombre_cliente} (ID: {cliente_seleccionado.id_cliente})")
-                    return {
-                        "cliente": cliente_seleccionado,
-                        "mascotas": nombres_mascotas
-                    }
-                else:
-                    print("Selección no válida. Operación cancelada.")
-                    return None
-
-            except ValueError:
-                print("Entrada no válida. Operación cancelada.")
-                return None
+    def buscar_clientes_por_nombre(self, nombre_cliente, limite=LIMITE_BUSQUEDA, desplazamiento=0):
+        """
+        Busca clientes por nombre, de más a menos relevante, con los nombres de sus mascotas.
+
+        Cada palabra de `nombre_cliente` se busca como prefijo en el índice de texto completo, sin
+        distinguir mayúsculas ni acentos. Nunca pide datos por consola: todas las coincidencias se
+        devuelven por páginas (para elegir una de forma interactiva, ver `clinica.utils.seleccion_cli`).
 
+        Args:
+            nombre_cliente (str): Nombre o parte del nombre
+            limite (int): Coincidencias por página
+            desplazamiento (int): Coincidencias que se saltan
+
+        Returns:
+            dict: {"resultados": [{"cliente": Cliente, "mascotas": [nombres]}], "hay_mas": bool}
+
+        Raises:
+            ValueError: Si el nombre no contiene letras ni números
+        """
+        try:
+            # Las mascotas de los clientes de la página se cargan en una sola consulta adicional
+            consulta = filtrar_por_texto(self.db_session.query(ClienteModel).options(*preset("cliente_con_mascotas")),
+                                         ClienteModel, nombre_cliente, columnas=("nombre_cliente",))
+            # Un registro extra indica si hay otra página
+            clientes = consulta.offset(desplazamiento).limit(limite + 1).all()
         except SQLAlchemyError as sae:
             logging.error("Error de SQLAlchemy al buscar el cliente por nombre: %s", sae)
-            return None
+            return {"resultados": [], "hay_mas": False}
 
-        except Exception as e:
-            logging.critical("Error inesperado al buscar el cliente por nombre: %s", e)
+        resultados = [
+            {"cliente": cliente, "mascotas": [mascota.nombre_mascota for mascota in cliente.mascotas]}
+            for cliente in clientes[:limite]
+        ]
+        logging.info(f"{len(resultados)} clientes encontrados con el nombre '{nombre_cliente}'.")
+        return {"resultados": resultados, "hay_mas": len(clientes) > limite}
+
+    def buscar_cliente_por_nombre(self, nombre_cliente):
+        """
+        Devuelve el cliente más relevante para `nombre_cliente` con los nombres de sus mascotas.
+
+        Returns:
+            dict | None: {"cliente": Cliente, "mascotas": [nombres]}, o None si no hay coincidencias
+        """
+        try:
+            resultados = self.buscar_clientes_por_nombre(nombre_cliente, limite=1)["resultados"]
+        except ValueError as ve:
+            logging.warning(f"Nombre de cliente no válido '{nombre_cliente}': {ve}")
             return None
+        if not resultados:
+            logging.warning(f"No se encontró ningún cliente con el nombre '{nombre_cliente}'.")
+            return None
+        return resultados[0]
 
             
-    def listar_clientes(self):
-        """Devuelve una lista de todos los clientes en la base de datos."""
+    def listar_clientes(self, include=()):
+        """
+        Devuelve una lista de todos los clientes en la base de datos.
+
+        Args:
+            include (Iterable[str] | str): Relaciones a cargar por adelantado (mascotas, citas, tratamientos)
+
+        Raises:
+            ValueError: Si se pide una relación que no existe
+        """
+        opciones = opciones_carga(ClienteModel, include)
         try:
-            clientes = self.db_session.query(ClienteModel).all()
+            clientes = self.db_session.query(ClienteModel).options(*opciones).all()
             logging.info("Listado de clientes obtenido con éxito.")
             return clientes
         except SQLAlchemyError as sae:
@@ -291,7 +303,64 @@ class GestionClientes:
         except Exception as e:
             logging.critical("Error inesperado al listar los clientes: %s", e)
             return []
-        
+
+    @staticmethod
+    def _condiciones_listado(nombre=None):
+        """Filtros de los listados: parte del nombre del cliente."""
+        condiciones = []
+        if nombre:
+            condiciones.append(ClienteModel.nombre_cliente.ilike(patron_contiene(nombre), escape="\\"))
+        return condiciones
+
+    async def listar_clientes_async(self, include=(), nombre=None):
+        """Variante asíncrona de `listar_clientes` con filtros opcionales; requiere una AsyncSession."""
+        opciones = opciones_carga(ClienteModel, include)
+        consulta = select(ClienteModel).options(*opciones).where(*self._condiciones_listado(nombre))
+        try:
+            resultado = await self.db_session.execute(consulta)
+            clientes = resultado.scalars().all()
+            logging.info("Listado de clientes obtenido con éxito.")
+            return clientes
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al listar los clientes: %s", sae)
+            return []
+        except Exception as e:
+            logging.critical("Error inesperado al listar los clientes: %s", e)
+            return []
+
+    async def listar_clientes_filas_async(self, nombre=None):
+        """
+        Listado de clientes como filas de columnas (SELECT de Core, sin objetos ORM).
+
+        Lo usa la ruta rápida de la API para los listados sin relaciones; requiere una AsyncSession.
+
+        Returns:
+            list[RowMapping]: Una fila por cliente con sus columnas por nombre
+        """
+        try:
+            consulta = select(*ClienteModel.__table__.columns).where(*self._condiciones_listado(nombre))
+            resultado = await self.db_session.execute(consulta)
+            filas = resultado.mappings().all()
+            logging.info("Listado de clientes obtenido con éxito.")
+            return filas
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al listar los clientes: %s", sae)
+            return []
+
+    def iterar_clientes_async(self, nombre=None, tamano_lote=TAMANO_LOTE_STREAMING):
+        """
+        Recorre los clientes en lotes de filas de columnas, ordenados por ID.
+
+        Para los listados NDJSON / CSV: la memoria no depende del tamaño de la tabla.
+
+        Returns:
+            AsyncIterator[list[RowMapping]]
+        """
+        consulta = (select(*ClienteModel.__table__.columns)
+                    .where(*self._condiciones_listado(nombre))
+                    .order_by(ClienteModel.id_cliente))
+        return iterar_lotes_async(self.db_session, consulta, tamano_lote)
+
     def buscar_cliente_por_id(self, id_cliente: int):
         """Busca un cliente por su ID."""
         try:
@@ -300,3 +369,49 @@ class GestionClientes:
         except Exception as e:
             logging.error(f"Error al buscar cliente por ID: {e}")
             return None
+
+    async def buscar_cliente_por_id_async(self, id_cliente: int):
+        """Variante asíncrona de `buscar_cliente_por_id`; requiere una AsyncSession."""
+        try:
+            return await self.db_session.get(ClienteModel, id_cliente)
+        except Exception as e:
+            logging.error(f"Error al buscar cliente por ID: {e}")
+            return None
+
+    def obtener_cliente_serializado(self, id_cliente: int):
+        """
+        Devuelve el cliente como diccionario (to_dict()) pasando por la caché de entidades.
+
+        Returns:
+            dict | None: None si el cliente no existe
+        """
+        def cargar():
+            cliente = self.buscar_cliente_por_id(id_cliente)
+            return cliente.to_dict() if cliente else None
+        return cache_entidades.obtener("cliente", id_cliente, cargar)
+
+    async def obtener_cliente_serializado_async(self, id_cliente: int):
+        """Variante asíncrona de `obtener_cliente_serializado`; requiere una AsyncSession."""
+        async def cargar():
+            cliente = await self.buscar_cliente_por_id_async(id_cliente)
+            return cliente.to_dict() if cliente else None
+        return await cache_entidades.obtener_async("cliente", id_cliente, cargar)
+
+    def buscar_clientes_por_ids(self, ids, include=()):
+        """
+        Clientes con esos IDs, en el orden de `ids`, con una consulta IN (...) por bloque (ver
+        opciones_carga.buscar_por_ids). `include` admite: mascotas, citas, tratamientos.
+        """
+        try:
+            return buscar_por_ids(self.db_session, ClienteModel, ClienteModel.id_cliente, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar clientes por IDs: %s", sae)
+            return []
+
+    async def buscar_clientes_por_ids_async(self, ids, include=()):
+        """Variante asíncrona de `buscar_clientes_por_ids`; requiere una AsyncSession."""
+        try:
+            return await buscar_por_ids_async(self.db_session, ClienteModel, ClienteModel.id_cliente, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar clientes por IDs: %s", sae)
+            return []
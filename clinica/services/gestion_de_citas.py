@@ -2,45 +2,78 @@
 
 import logging
 import os
-import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select, tuple_
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from clinica.models.tabla_citas import Cita
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica.services.gestion_resumenes import GestionResumenes, huella_cita
+from clinica.services.opciones_carga import buscar_por_ids, buscar_por_ids_async, opciones_carga, serializar
+from clinica.utils.agenda_citas import (DURACION_CITA, ESTADOS_LIBRES, NUMERO_CONSULTAS, AgendaCitas,
+                                        CitaSolapadaError, agendas_citas, consulta_de_mascota, numero_consulta)
+from clinica.utils.cache_entidades import cache_entidades
+from clinica.utils.diario_cambios import diario_cambios
+from clinica.utils.exportacion import exportar_consulta_json
+from clinica.utils.helper_functions import (MAX_VARIABLES_SQLITE, TAMANO_LOTE_STREAMING, codificar_cursor,
+                                            decodificar_cursor, fecha_sin_zona, iterar_lotes_async,
+                                            parsear_ids, patron_contiene, trocear)
+from clinica.utils.versiones_tablas import versiones_tablas
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Caché de totales por (base de datos, estado) para no repetir el COUNT en cada página
+TOTALES_TTL = 30  # segundos
+_TOTALES_CACHE = {}
+
+
+def invalidar_totales_citas():
+    """Descarta los totales cacheados; se llama tras cualquier escritura sobre `cita`."""
+    _TOTALES_CACHE.clear()
+
+
+# Calendario: ventana máxima y color de cada cita según su estado
+MAX_DIAS_CALENDARIO = 92
+COLORES_ESTADO = {
+    "Pendiente": "#FFBD45",
+    "Confirmada": "#3DD56D",
+    "Finalizada": "#3D9DF3",
+    "Cancelada": "#FF4B4B",
+}
+COLOR_POR_DEFECTO = "#FF6C6C"
+
+# Validación de citas: campos de una cita nueva, estados con los que se puede registrar o cambiar
+CAMPOS_CITA = ('fecha', 'descripcion', 'id_mascota', 'id_cliente', 'id_tratamiento', 'estado')
+ESTADOS_REGISTRO = ("Pendiente", "Finalizada", "Cancelada")
+ESTADOS_CITA = ("Pendiente", "Confirmada", "En Proceso", "Finalizada", "Cancelada")
+METODOS_PAGO = ("Efectivo", "Tarjeta", "Bizum", "Transferencia")
+
+# Operaciones por lotes: tamaño máximo y columnas que identifican una cita duplicada
+MAX_CITAS_LOTE = 1000
+CLAVE_DUPLICADO = ('fecha', 'descripcion', 'id_mascota', 'id_cliente', 'id_tratamiento')
+ERROR_LOTE_ATOMICO = "No se ha guardado porque otras citas del lote tienen errores."
+
 class GestionCitas:
     def __init__(self, db_session: Session):
         self.db_session = db_session
 
-    def exportar_citas_a_json(self, ruta_json=None):
-        """Exporta las citas a un archivo JSON."""
+    def exportar_citas_a_json(self, ruta_json=None, formato="json"):
+        """Exporta las citas a un archivo JSON (o NDJSON) escribiendo de forma incremental."""
         if ruta_json is None:
             ruta_json = os.path.join(os.getcwd(), 'clinica/data/tabla_citas.json')
 
-        # Verifica que el directorio exista y créalo si no existe
-        directorio = os.path.dirname(ruta_json)
-        if not os.path.exists(directorio):
-            os.makedirs(directorio)
-        
         try:
-            citas = self.db_session.query(Cita).all()
-            
+            resumen = exportar_consulta_json(self.db_session.query(Cita), ruta_json, formato=formato)
+
             # Control adicional: verificar si hay citas registradas
-            if not citas:
+            if not resumen["registros"]:
                 mensaje = "No hay citas registradas para exportar."
                 logging.warning(mensaje)
                 return {"warning": mensaje}
 
-            # Convertir las citas a diccionarios
-            datos = [cita.to_dict() for cita in citas]  # Asegúrate de que `to_dict()` esté implementado en `Cita`
-            
-            # Exportar a JSON
-            with open(ruta_json, 'w', encoding='utf-8') as archivo:
-                json.dump(datos, archivo, ensure_ascii=False, indent=4)
-            
-            logging.info(f"Citas exportadas a {ruta_json} exitosamente.")
+            logging.info(f"Citas exportadas a {ruta_json} exitosamente ({resumen['registros']} registros, {resumen['bytes']} bytes).")
             return f"Citas exportadas a {ruta_json} exitosamente."
         
         except SQLAlchemyError as e:
@@ -52,38 +85,123 @@ class GestionCitas:
             return {"error": f"Error inesperado al exportar citas a JSON: {e}"}
 
             
+    def comprobar_disponibilidad(self, fecha, id_mascota, excluir=None):
+        """
+        Comprueba que la consulta de la mascota y la propia mascota están libres en `fecha`.
+
+        Args:
+            fecha (datetime): Inicio de la cita (dura DURACION_CITA)
+            id_mascota (int): Mascota de la cita
+            excluir (int, optional): Cita que se está moviendo
+
+        Raises:
+            CitaSolapadaError: Si la cita se solapa con otra de la mascota o de su consulta
+        """
+        conflictos = agendas_citas.conflictos(self.db_session, fecha_sin_zona(fecha), id_mascota, excluir)
+        self._comprobar_conflictos(conflictos, id_mascota)
+
+    @staticmethod
+    def _comprobar_conflictos(conflictos, id_mascota, referencia="cita {}"):
+        """
+        Lanza CitaSolapadaError con la primera cita de `conflictos` que se solapa, si hay alguna.
+
+        Args:
+            conflictos (dict): {"consulta": [...], "mascota": [...]}, como los de AgendaCitas.conflictos
+            referencia (str): Cómo se nombra en el mensaje la cita que se solapa ("{}" es su clave)
+        """
+        if conflictos["mascota"]:
+            raise CitaSolapadaError(f"La mascota ya tiene una cita que se solapa con ese horario "
+                                    f"({referencia.format(conflictos['mascota'][0])}).")
+        if conflictos["consulta"]:
+            raise CitaSolapadaError(f"La {consulta_de_mascota(id_mascota)} está ocupada en ese horario "
+                                    f"({referencia.format(conflictos['consulta'][0])}).")
+
+    @contextmanager
+    def _escritura(self):
+        """
+        Transacción de las escrituras que ocupan huecos, desde la comprobación de solapes al commit.
+
+        En SQLite se abre con BEGIN IMMEDIATE, que da el cerrojo de escritura de la base de datos a
+        esta conexión antes de comprobar nada: otra reserva (de otro hilo o de otro worker) espera
+        a que esta termine, así que no pueden comprobar el mismo hueco a la vez y guardar las dos.
+        Si el bloque falla, o termina sin commit, se hace rollback para soltar el cerrojo; los errores
+        de SQLAlchemy los deshace quien llama, al traducirlos.
+        """
+        conexion = self.db_session.connection()
+        if conexion.dialect.name == "sqlite" and not conexion.connection.dbapi_connection.in_transaction:
+            conexion.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield
+        except SQLAlchemyError:
+            raise
+        except BaseException:
+            self.db_session.rollback()
+            raise
+        else:
+            if self.db_session.in_transaction():
+                self.db_session.rollback()
+
+    def citas_solapadas(self, fecha, id_mascota, excluir=None):
+        """IDs de las citas de la mascota o de su consulta que se solaparían con una cita en `fecha`."""
+        conflictos = agendas_citas.conflictos(self.db_session, fecha_sin_zona(fecha), id_mascota, excluir)
+        return sorted(set(conflictos["consulta"]) | set(conflictos["mascota"]))
+
+    def huecos_disponibles(self, desde, cantidad=10, id_mascota=None, recurso=None):
+        """
+        Próximos huecos libres desde `desde` según la agenda en memoria.
+
+        Args:
+            desde (datetime): Primer instante a considerar
+            cantidad (int): Número de huecos a devolver
+            id_mascota (int, optional): Libres para la mascota y en su consulta
+            recurso (str, optional): Libres en esa consulta ("consulta_N")
+
+        Returns:
+            list[dict]: {"inicio", "fin", "recurso"}
+
+        Raises:
+            ValueError: Si el recurso no es válido
+        """
+        return agendas_citas.de(self.db_session).huecos_libres(fecha_sin_zona(desde), cantidad,
+                                                               id_mascota=id_mascota, recurso=recurso)
+
     def registrar_cita(self, cita_data, validar_duplicados=True):
-        """Registra una nueva cita en la base de datos."""
-        try:
-            # Validar campos obligatorios
-            campos_requeridos = ['fecha', 'descripcion', 'id_mascota', 'id_cliente', 'id_tratamiento', 'estado']
-            for campo in campos_requeridos:
-                if campo not in cita_data:
-                    raise ValueError(f"El campo '{campo}' es obligatorio para registrar una cita.")
-
-            # Validar estado
-            estados_permitidos = {"Pendiente", "Finalizada", "Cancelada"}
-            if cita_data['estado'] not in estados_permitidos:
-                raise ValueError(f"Estado '{cita_data['estado']}' no es válido. Estados permitidos: {', '.join(estados_permitidos)}.")
-
-            # Verificar duplicados solo si está habilitado
-            if validar_duplicados:
-                cita_existente = self.db_session.query(Cita).filter_by(
-                    fecha=cita_data['fecha'],
-                    descripcion=cita_data['descripcion'],
-                    id_mascota=cita_data['id_mascota'],
-                    id_cliente=cita_data['id_cliente'],
-                    id_tratamiento=cita_data['id_tratamiento']
-                ).first()
-
-                if cita_existente:
-                    raise ValueError("Ya existe una cita para este animal, dueño y horario.")
-
-            # Crear y añadir la nueva cita a la base de datos
-            nueva_cita = Cita(**cita_data)
-            self.db_session.add(nueva_cita)
-            self.db_session.commit()
+        """
+        Registra una nueva cita en la base de datos.
+
+        Con `validar_duplicados` se rechazan las citas idénticas a una existente y las que se solapan
+        con otra de la misma mascota o de su consulta.
+        """
+        try:
+            cita_data = self._validar_datos_cita(cita_data)
+
+            with self._escritura():
+                # Verificar duplicados solo si está habilitado
+                if validar_duplicados:
+                    cita_existente = self.db_session.query(Cita).filter_by(
+                        fecha=cita_data['fecha'],
+                        descripcion=cita_data['descripcion'],
+                        id_mascota=cita_data['id_mascota'],
+                        id_cliente=cita_data['id_cliente'],
+                        id_tratamiento=cita_data['id_tratamiento']
+                    ).first()
+
+                    if cita_existente:
+                        raise ValueError("Ya existe una cita para este animal, dueño y horario.")
+
+                    if cita_data['estado'] not in ESTADOS_LIBRES:
+                        self.comprobar_disponibilidad(cita_data['fecha'], cita_data['id_mascota'])
+
+                # Crear y añadir la nueva cita a la base de datos
+                nueva_cita = Cita(**cita_data)
+                self.db_session.add(nueva_cita)
+                GestionResumenes(self.db_session).aplicar_cita(None, huella_cita(nueva_cita))
+                self.db_session.commit()
             self.db_session.refresh(nueva_cita)
+            invalidar_totales_citas()
+            diario_cambios.registrar("cita", "upsert", nueva_cita.id_cita, nueva_cita.to_dict())
+            versiones_tablas.incrementar("cita")
+            self._actualizar_agenda(nueva_cita)
 
             logging.info(f"Cita registrada con éxito para el cliente ID {cita_data['id_cliente']}.")
             return nueva_cita
@@ -98,30 +216,575 @@ class GestionCitas:
             logging.error("Error de SQLAlchemy al registrar la cita: %s", sae)
             raise RuntimeError(f"Error: Ocurrió un problema con la base de datos: {sae}")
 
-    def ver_todas_las_citas(self, estado=None):
-        print("Entrando en ver_todas_las_citas...")  # DEBUG
+    @staticmethod
+    def _validar_datos_cita(cita_data):
+        """
+        Comprueba que los datos de una cita nueva traen los campos obligatorios y un estado permitido.
+
+        Returns:
+            dict: Copia de los datos con la fecha sin zona horaria, como se guarda y se compara
+
+        Raises:
+            ValueError: Si falta algún campo o el estado no es válido
+        """
+        for campo in CAMPOS_CITA:
+            if campo not in cita_data:
+                raise ValueError(f"El campo '{campo}' es obligatorio para registrar una cita.")
+        if cita_data['estado'] not in ESTADOS_REGISTRO:
+            raise ValueError(f"Estado '{cita_data['estado']}' no es válido. Estados permitidos: {', '.join(ESTADOS_REGISTRO)}.")
+        return {**cita_data, 'fecha': fecha_sin_zona(cita_data['fecha'])}
+
+    def _actualizar_agenda(self, cita):
+        """Refleja en la agenda en memoria una cita recién guardada."""
+        agendas_citas.de(self.db_session).actualizar(cita.id_cita, cita.fecha, cita.id_mascota, cita.estado)
+
+    def _claves_existentes(self, claves):
+        """
+        Claves CLAVE_DUPLICADO de `claves` que ya tienen una cita en la tabla.
+
+        Una sola consulta `(fecha, descripcion, ...) IN (...)` por bloque, sin pasar del límite de
+        variables de SQLite.
+        """
+        columnas = tuple_(*(getattr(Cita, campo) for campo in CLAVE_DUPLICADO))
+        existentes = set()
+        for lote in trocear(set(claves), MAX_VARIABLES_SQLITE // len(CLAVE_DUPLICADO)):
+            consulta = select(*(getattr(Cita, campo) for campo in CLAVE_DUPLICADO)).where(columnas.in_(lote))
+            existentes.update(tuple(fila) for fila in self.db_session.execute(consulta))
+        return existentes
+
+    def _comprobar_disponibilidad_lote(self, agenda_lote, fecha, id_mascota, excluir=None, referencia="{}",
+                                       ocupados=None):
+        """
+        `comprobar_disponibilidad` frente a la base de datos y frente a las citas ya aceptadas del lote.
+
+        Args:
+            agenda_lote (AgendaCitas): Agenda con las citas del lote que ya ocupan hueco
+            referencia (str): Cómo se nombra en el mensaje una cita de `agenda_lote` ("{}" es su clave)
+            ocupados (AgendaCitas, optional): Citas de la tabla ya leídas para todo el lote
+                (AgendasCitas.ocupados); sin ella se consulta la tabla para esta cita
+        """
+        if ocupados is None:
+            self.comprobar_disponibilidad(fecha, id_mascota, excluir=excluir)
+        else:
+            self._comprobar_conflictos(ocupados.conflictos(fecha, id_mascota, excluir), id_mascota)
+        self._comprobar_conflictos(agenda_lote.conflictos(fecha, id_mascota, excluir), id_mascota, referencia)
+
+    def registrar_citas_lote(self, citas_data, atomico=False, validar=None, al_guardar=None):
+        """
+        Registra varias citas validándolas juntas y guardándolas en una sola transacción.
+
+        Cada cita pasa las mismas comprobaciones que en `registrar_cita`, pero los duplicados se buscan
+        con una consulta por bloque de citas (y también dentro del propio lote) y los solapes se
+        comprueban contra las citas de la tabla en el rango de fechas del lote, leídas con una sola
+        consulta dentro de la transacción de escritura, y contra las citas del lote ya aceptadas.
+
+        Args:
+            citas_data (list[dict]): Datos de cada cita, como en `registrar_cita`
+            atomico (bool): Si alguna cita no es válida no se registra ninguna
+            validar (callable, optional): Valida y normaliza los datos de cada cita antes de las
+                comprobaciones del servicio; lanza ValueError si no son válidos
+            al_guardar (callable, optional): Recibe {indice: Cita} con las citas ya insertadas (con ID)
+                antes del commit, para guardar filas relacionadas en la misma transacción
+
+        Returns:
+            list[dict]: Un resultado por cita, en el orden recibido: {"indice", "ok", "id_cita", "error"}
+
+        Raises:
+            ValueError: Si el lote está vacío o es demasiado grande
+            RuntimeError: Si falla la escritura (no se registra ninguna cita)
+        """
+        if not citas_data:
+            raise ValueError("El lote no contiene ninguna cita.")
+        if len(citas_data) > MAX_CITAS_LOTE:
+            raise ValueError(f"Un lote admite como mucho {MAX_CITAS_LOTE} citas.")
+
+        resultados = [{"indice": indice, "ok": False, "id_cita": None, "error": None}
+                      for indice in range(len(citas_data))]
+        validas = {}
+        for indice, datos in enumerate(citas_data):
+            try:
+                if validar is not None:
+                    datos = validar(datos)
+                validas[indice] = self._validar_datos_cita(datos)
+            except ValueError as ve:
+                resultados[indice]["error"] = str(ve)
+
+        try:
+            with self._escritura():
+                claves = {indice: tuple(datos[campo] for campo in CLAVE_DUPLICADO) for indice, datos in validas.items()}
+                existentes = self._claves_existentes(claves.values())
+                fechas = [datos['fecha'] for datos in validas.values()
+                          if datos['fecha'] is not None and datos['estado'] not in ESTADOS_LIBRES]
+                ocupados = agendas_citas.ocupados(self.db_session, min(fechas), max(fechas)) if fechas else AgendaCitas()
+                agenda_lote = AgendaCitas()
+                aceptadas = {}
+                for indice, datos in validas.items():
+                    try:
+                        if claves[indice] in existentes:
+                            raise ValueError("Ya existe una cita para este animal, dueño y horario.")
+                        if datos['estado'] not in ESTADOS_LIBRES:
+                            self._comprobar_disponibilidad_lote(agenda_lote, datos['fecha'], datos['id_mascota'],
+                                                                referencia="posición {} del lote", ocupados=ocupados)
+                    except ValueError as ve:
+                        resultados[indice]["error"] = str(ve)
+                        continue
+                    existentes.add(claves[indice])
+                    agenda_lote.actualizar(indice, datos['fecha'], datos['id_mascota'], datos['estado'])
+                    aceptadas[indice] = datos
+
+                if not aceptadas or (atomico and len(aceptadas) < len(citas_data)):
+                    for indice in aceptadas:
+                        resultados[indice]["error"] = ERROR_LOTE_ATOMICO
+                    return resultados
+
+                nuevas = {indice: Cita(**datos) for indice, datos in aceptadas.items()}
+                self.db_session.add_all(nuevas.values())
+                GestionResumenes(self.db_session).aplicar_citas((None, huella_cita(cita)) for cita in nuevas.values())
+                self.db_session.flush()
+                if al_guardar is not None:
+                    al_guardar(nuevas)
+                # El commit expira los objetos: se copian antes para no releer cada cita
+                guardadas = {indice: (cita.to_dict(), cita.fecha) for indice, cita in nuevas.items()}
+                self.db_session.commit()
+
+        except IntegrityError as ie:
+            self.db_session.rollback()
+            logging.error("Error de integridad al registrar el lote de citas: %s", ie)
+            raise ValueError("Error: No se pudo registrar el lote de citas debido a un problema de integridad.")
+
+        except SQLAlchemyError as sae:
+            self.db_session.rollback()
+            logging.error("Error de SQLAlchemy al registrar el lote de citas: %s", sae)
+            raise RuntimeError(f"Error: Ocurrió un problema con la base de datos: {sae}")
+
+        invalidar_totales_citas()
+        agenda = agendas_citas.de(self.db_session)
+        for indice, (datos, fecha) in guardadas.items():
+            diario_cambios.registrar("cita", "upsert", datos["id_cita"], datos)
+            agenda.actualizar(datos["id_cita"], fecha, datos["id_mascota"], datos["estado"])
+            resultados[indice].update(ok=True, id_cita=datos["id_cita"])
+        versiones_tablas.incrementar("cita")
+
+        logging.info(f"Lote de citas registrado: {len(guardadas)} de {len(citas_data)} citas.")
+        return resultados
+
+    def cambiar_estado_lote(self, ids, estado, metodo_pago=None, atomico=False):
+        """
+        Cambia el estado de varias citas en una sola transacción.
+
+        Finalizar exige un método de pago válido y reactivar una cita cancelada comprueba que su
+        hueco sigue libre, también frente a las demás citas del lote que se reactivan.
+
+        Args:
+            ids (Iterable[int] | str): IDs de las citas; los repetidos se ignoran
+            estado (str): Estado nuevo
+            metodo_pago (str, optional): Método de pago; obligatorio para "Finalizada"
+            atomico (bool): Si alguna cita no puede cambiar no se cambia ninguna
+
+        Returns:
+            list[dict]: Un resultado por ID, en el orden recibido: {"indice", "ok", "id_cita", "error"}
+
+        Raises:
+            ValueError: Si no hay IDs, son demasiados o el estado o el método de pago no son válidos
+            RuntimeError: Si falla la escritura (no se cambia ninguna cita)
+        """
+        ids = parsear_ids(ids)
+        if not ids:
+            raise ValueError("El lote no contiene ninguna cita.")
+        if len(ids) > MAX_CITAS_LOTE:
+            raise ValueError(f"Un lote admite como mucho {MAX_CITAS_LOTE} citas.")
+        if estado not in ESTADOS_CITA:
+            raise ValueError(f"Estado '{estado}' no es válido. Estados permitidos: {', '.join(ESTADOS_CITA)}.")
+        if estado == "Finalizada" and metodo_pago is None:
+            raise ValueError("Para finalizar citas hay que indicar el método de pago.")
+        if metodo_pago is not None and metodo_pago not in METODOS_PAGO:
+            raise ValueError(f"Método de pago '{metodo_pago}' no es válido. Métodos aceptados: {', '.join(METODOS_PAGO)}.")
+
+        resultados = [{"indice": indice, "ok": False, "id_cita": id_cita, "error": None}
+                      for indice, id_cita in enumerate(ids)]
+        try:
+            with self._escritura():
+                citas = {}
+                for lote in trocear(ids):
+                    for cita in self.db_session.execute(select(Cita).where(Cita.id_cita.in_(lote))).scalars():
+                        citas[cita.id_cita] = cita
+
+                agenda_lote = AgendaCitas()
+                cambiadas = []
+                for resultado in resultados:
+                    cita = citas.get(resultado["id_cita"])
+                    try:
+                        if cita is None:
+                            raise ValueError("Cita no encontrada.")
+                        # Solo las citas que se reactivan vuelven a ocupar un hueco
+                        if estado not in ESTADOS_LIBRES and cita.estado in ESTADOS_LIBRES and cita.fecha is not None:
+                            self._comprobar_disponibilidad_lote(agenda_lote, cita.fecha, cita.id_mascota,
+                                                                excluir=cita.id_cita, referencia="cita {} del lote")
+                            agenda_lote.actualizar(cita.id_cita, cita.fecha, cita.id_mascota, estado)
+                    except ValueError as ve:
+                        resultado["error"] = str(ve)
+                        continue
+                    cambiadas.append((resultado, cita))
+
+                if not cambiadas or (atomico and len(cambiadas) < len(resultados)):
+                    for resultado, _ in cambiadas:
+                        resultado["error"] = ERROR_LOTE_ATOMICO
+                    return resultados
+
+                cambios = []
+                for _, cita in cambiadas:
+                    antes = huella_cita(cita)
+                    cita.estado = estado
+                    if metodo_pago is not None:
+                        cita.metodo_pago = metodo_pago
+                    cambios.append((antes, huella_cita(cita)))
+                GestionResumenes(self.db_session).aplicar_citas(cambios)
+                guardadas = [(resultado, cita.to_dict(), cita.fecha) for resultado, cita in cambiadas]
+                self.db_session.commit()
+
+        except SQLAlchemyError as sae:
+            self.db_session.rollback()
+            logging.error("Error de SQLAlchemy al cambiar el estado del lote de citas: %s", sae)
+            raise RuntimeError(f"Error al cambiar el estado de las citas: {sae}")
+
+        invalidar_totales_citas()
+        cache_entidades.invalidar("cita", *(datos["id_cita"] for _, datos, _ in guardadas))
+        agenda = agendas_citas.de(self.db_session)
+        for resultado, datos, fecha in guardadas:
+            diario_cambios.registrar("cita", "upsert", datos["id_cita"], datos)
+            agenda.actualizar(datos["id_cita"], fecha, datos["id_mascota"], datos["estado"])
+            resultado["ok"] = True
+        versiones_tablas.incrementar("cita")
+
+        logging.info(f"Estado '{estado}' aplicado a {len(guardadas)} de {len(ids)} citas.")
+        return resultados
+
+    def ver_todas_las_citas(self, estado=None, skip=0, limit=None, cursor=None, incluir_total=True, include=()):
+        """
+        Lista las citas, opcionalmente filtradas por estado y paginadas en SQL.
+
+        Args:
+            estado (str, optional): Estado de las citas a devolver
+            skip (int): Registros a saltar (paginación por desplazamiento)
+            limit (int, optional): Máximo de registros; None devuelve todas las citas
+            cursor (str, optional): Cursor opaco sobre (fecha, id_cita); si se indica, se ignora `skip`
+            incluir_total (bool): Si se calcula el total de citas (se cachea durante TOTALES_TTL segundos)
+            include (Iterable[str] | str): Relaciones a embeber en cada cita (cliente, mascota, tratamiento)
+
+        Returns:
+            dict: {"total", "citas", "next_cursor"}
+
+        Raises:
+            ValueError: Si el cursor no es válido o se pide una relación que no existe
+        """
+        posicion = decodificar_cursor(cursor) if cursor else None
+        opciones = opciones_carga(Cita, include)
         try:
             query = self.db_session.query(Cita)
-            print("Query inicial:", query)  # DEBUG
 
             if estado:
                 query = query.filter(Cita.estado == estado)
-                print("Filtro aplicado:", query)  # DEBUG
 
-            total_citas = query.count()
-            print("Total de citas filtradas:", total_citas)  # DEBUG
+            total_citas = self._contar_citas(query, estado) if incluir_total else None
+            if opciones:
+                query = query.options(*opciones)
+
+            if limit is None and posicion is None and not skip:
+                citas = query.all()
+                next_cursor = None
+            else:
+                query = query.order_by(Cita.fecha, Cita.id_cita)
+                if posicion is not None:
+                    query = query.filter(self._despues_de(*posicion))
+                elif skip:
+                    query = query.offset(skip)
+                if limit is not None:
+                    # Se pide un registro extra para saber si existe una página siguiente
+                    query = query.limit(limit + 1)
+                citas = query.all()
 
-            citas = query.all()
-            print("Citas obtenidas:", citas)  # DEBUG
+                next_cursor = None
+                if limit is not None and len(citas) > limit:
+                    citas = citas[:limit]
+                    next_cursor = codificar_cursor(citas[-1].fecha, citas[-1].id_cita)
 
             return {
                 "total": total_citas,
-                "citas": [cita.to_dict() for cita in citas],
+                "citas": [serializar(cita, include) for cita in citas],
+                "next_cursor": next_cursor,
             }
         except Exception as e:
-            print("Error en ver_todas_las_citas:", str(e))  # DEBUG
+            logging.error("Error al listar las citas: %s", e)
             return {"error": str(e)}
 
+    async def ver_todas_las_citas_async(self, estado=None, skip=0, limit=None, cursor=None, incluir_total=True, include=(),
+                                        columnas=False):
+        """
+        Variante asíncrona de `ver_todas_las_citas`; requiere una AsyncSession.
+
+        Acepta los mismos parámetros y devuelve el mismo diccionario. Con `columnas=True` (sin
+        `include`) las citas se leen con un SELECT de Core y se devuelven como filas de columnas
+        en lugar de diccionarios de `to_dict()`.
+
+        Raises:
+            ValueError: Si el cursor no es válido o se pide una relación que no existe
+        """
+        posicion = decodificar_cursor(cursor) if cursor else None
+        opciones = opciones_carga(Cita, include)
+        try:
+            consulta = select(*Cita.__table__.columns) if columnas else select(Cita)
+
+            if estado:
+                consulta = consulta.where(Cita.estado == estado)
+
+            total_citas = await self._contar_citas_async(consulta, estado) if incluir_total else None
+            consulta = consulta.options(*opciones)
+
+            if limit is not None or posicion is not None or skip:
+                consulta = consulta.order_by(Cita.fecha, Cita.id_cita)
+                if posicion is not None:
+                    consulta = consulta.where(self._despues_de(*posicion))
+                elif skip:
+                    consulta = consulta.offset(skip)
+                if limit is not None:
+                    # Se pide un registro extra para saber si existe una página siguiente
+                    consulta = consulta.limit(limit + 1)
+
+            resultado = await self.db_session.execute(consulta)
+            citas = resultado.mappings().all() if columnas else resultado.scalars().all()
+
+            next_cursor = None
+            if limit is not None and len(citas) > limit:
+                citas = citas[:limit]
+                ultima = citas[-1]
+                if columnas:
+                    next_cursor = codificar_cursor(ultima["fecha"], ultima["id_cita"])
+                else:
+                    next_cursor = codificar_cursor(ultima.fecha, ultima.id_cita)
+
+            return {
+                "total": total_citas,
+                "citas": citas if columnas else [serializar(cita, include) for cita in citas],
+                "next_cursor": next_cursor,
+            }
+        except Exception as e:
+            logging.error("Error al listar las citas: %s", e)
+            return {"error": str(e)}
+
+    def iterar_citas_async(self, estado=None, tamano_lote=TAMANO_LOTE_STREAMING):
+        """
+        Recorre las citas en lotes de filas de columnas, en el orden de la paginación (fecha, ID).
+
+        Para los listados NDJSON / CSV: la memoria no depende del tamaño de la tabla.
+
+        Returns:
+            AsyncIterator[list[RowMapping]]
+        """
+        consulta = select(*Cita.__table__.columns).order_by(Cita.fecha, Cita.id_cita)
+        if estado:
+            consulta = consulta.where(Cita.estado == estado)
+        return iterar_lotes_async(self.db_session, consulta, tamano_lote)
+
+    @staticmethod
+    def _consulta_calendario(desde, hasta, recurso=None):
+        """
+        SELECT de las citas que se solapan con [desde, hasta), con los nombres de cliente y mascota.
+
+        Es un rango sobre `fecha` (índice fecha, id_cita): una cita empieza como muy pronto una
+        duración antes de `desde` para solaparse con la ventana.
+        """
+        desde, hasta = fecha_sin_zona(desde), fecha_sin_zona(hasta)
+        if hasta <= desde:
+            raise ValueError("La fecha 'hasta' debe ser posterior a 'desde'.")
+        if hasta - desde > timedelta(days=MAX_DIAS_CALENDARIO):
+            raise ValueError(f"La ventana del calendario no puede superar {MAX_DIAS_CALENDARIO} días.")
+
+        consulta = (
+            select(Cita.id_cita, Cita.fecha, Cita.descripcion, Cita.estado, Cita.id_mascota,
+                   Cliente.nombre_cliente, Mascota.nombre_mascota)
+            .outerjoin(Cliente, Cliente.id_cliente == Cita.id_cliente)
+            .outerjoin(Mascota, Mascota.id_mascota == Cita.id_mascota)
+            .where(Cita.fecha > desde - DURACION_CITA, Cita.fecha < hasta)
+            .order_by(Cita.fecha, Cita.id_cita)
+        )
+        if recurso:
+            consulta = consulta.where(Cita.id_mascota % NUMERO_CONSULTAS == numero_consulta(recurso))
+        return consulta
+
+    @staticmethod
+    def _evento_calendario(fila):
+        """Evento listo para el componente de calendario a partir de una fila de `_consulta_calendario`."""
+        return {
+            "id": fila.id_cita,
+            "title": fila.descripcion or "",
+            "start": fila.fecha,
+            "end": fila.fecha + DURACION_CITA,
+            "color": COLORES_ESTADO.get(fila.estado, COLOR_POR_DEFECTO),
+            "resourceId": consulta_de_mascota(fila.id_mascota or 0),
+            "extendedProps": {
+                "id_cita": fila.id_cita,
+                "cliente": fila.nombre_cliente or "",
+                "mascota": fila.nombre_mascota or "",
+                "estado": fila.estado,
+            },
+        }
+
+    def calendario_citas(self, desde, hasta, recurso=None):
+        """
+        Eventos de calendario de las citas que se solapan con la ventana [desde, hasta).
+
+        Args:
+            desde (datetime): Inicio de la ventana visible
+            hasta (datetime): Fin de la ventana (excluido); como mucho MAX_DIAS_CALENDARIO días después
+            recurso (str, optional): Solo las citas de esa consulta ("consulta_0", "consulta_1"...)
+
+        Returns:
+            list[dict]: Eventos (title, start, end, color, resourceId, extendedProps) por fecha
+
+        Raises:
+            ValueError: Si la ventana o el recurso no son válidos
+        """
+        consulta = self._consulta_calendario(desde, hasta, recurso)
+        return [self._evento_calendario(fila) for fila in self.db_session.execute(consulta)]
+
+    async def calendario_citas_async(self, desde, hasta, recurso=None):
+        """Variante asíncrona de `calendario_citas`; requiere una AsyncSession."""
+        consulta = self._consulta_calendario(desde, hasta, recurso)
+        return [self._evento_calendario(fila) for fila in await self.db_session.execute(consulta)]
+
+    # Columnas de cada entidad embebida en el listado detallado
+    _COLUMNAS_EMBEBIDAS = {
+        "cliente": (Cliente, ("id_cliente", "nombre_cliente", "edad", "dni", "direccion", "telefono")),
+        "mascota": (Mascota, ("id_mascota", "nombre_mascota", "raza", "edad", "afeccion", "estado", "id_cliente")),
+        "tratamiento": (Tratamiento, ("id_tratamiento", "nombre_tratamiento", "descripcion", "precio", "estado")),
+    }
+
+    def _consulta_citas_detalladas(self, estado=None, nombre_cliente=None, dni=None, fecha=None, skip=0, limit=None):
+        """
+        SELECT de las citas con su cliente, mascota y tratamiento en una sola consulta (LEFT JOIN).
+
+        Las columnas de las entidades embebidas se etiquetan como `<entidad>__<columna>` para
+        reconstruir los diccionarios anidados en `_cita_detallada`.
+        """
+        columnas = [getattr(Cita, c.name) for c in Cita.__table__.columns]
+        for entidad, (modelo, nombres) in self._COLUMNAS_EMBEBIDAS.items():
+            columnas += [getattr(modelo, nombre).label(f"{entidad}__{nombre}") for nombre in nombres]
+
+        consulta = (
+            select(*columnas)
+            .outerjoin(Cliente, Cliente.id_cliente == Cita.id_cliente)
+            .outerjoin(Mascota, Mascota.id_mascota == Cita.id_mascota)
+            .outerjoin(Tratamiento, Tratamiento.id_tratamiento == Cita.id_tratamiento)
+        )
+        if estado:
+            consulta = consulta.where(Cita.estado == estado)
+        if nombre_cliente:
+            consulta = consulta.where(Cliente.nombre_cliente.ilike(patron_contiene(nombre_cliente), escape="\\"))
+        if dni:
+            consulta = consulta.where(Cliente.dni.ilike(patron_contiene(dni), escape="\\"))
+        if fecha:
+            # Rango del día completo para aprovechar el índice sobre (fecha, id_cita)
+            inicio = datetime.combine(fecha, datetime.min.time())
+            consulta = consulta.where(Cita.fecha >= inicio, Cita.fecha < inicio + timedelta(days=1))
+
+        consulta = consulta.order_by(Cita.fecha, Cita.id_cita)
+        if skip:
+            consulta = consulta.offset(skip)
+        if limit is not None:
+            consulta = consulta.limit(limit)
+        return consulta
+
+    @classmethod
+    def _cita_detallada(cls, fila):
+        """Convierte una fila de `_consulta_citas_detalladas` en la cita con sus entidades embebidas."""
+        datos = dict(fila._mapping)
+        cita = {c.name: datos[c.name] for c in Cita.__table__.columns}
+        for entidad, (modelo, nombres) in cls._COLUMNAS_EMBEBIDAS.items():
+            embebida = {nombre: datos[f"{entidad}__{nombre}"] for nombre in nombres}
+            # Con LEFT JOIN una entidad inexistente llega con la clave primaria a NULL
+            cita[entidad] = embebida if embebida[nombres[0]] is not None else None
+        return cita
+
+    def ver_citas_detalladas(self, estado=None, nombre_cliente=None, dni=None, fecha=None, skip=0, limit=None):
+        """
+        Lista las citas con su cliente, mascota y tratamiento embebidos, filtradas en SQL.
+
+        Args:
+            estado (str, optional): Estado exacto de la cita
+            nombre_cliente (str, optional): Parte del nombre del cliente (sin distinguir mayúsculas)
+            dni (str, optional): Parte del DNI del cliente
+            fecha (date, optional): Día de la cita
+            skip (int): Registros a saltar
+            limit (int, optional): Máximo de registros; None devuelve todas
+
+        Returns:
+            list: Citas como diccionarios con las claves `cliente`, `mascota` y `tratamiento`
+        """
+        consulta = self._consulta_citas_detalladas(estado, nombre_cliente, dni, fecha, skip, limit)
+        return [self._cita_detallada(fila) for fila in self.db_session.execute(consulta)]
+
+    async def ver_citas_detalladas_async(self, estado=None, nombre_cliente=None, dni=None, fecha=None, skip=0, limit=None):
+        """Variante asíncrona de `ver_citas_detalladas`; requiere una AsyncSession."""
+        consulta = self._consulta_citas_detalladas(estado, nombre_cliente, dni, fecha, skip, limit)
+        return [self._cita_detallada(fila) for fila in await self.db_session.execute(consulta)]
+
+    @staticmethod
+    def _despues_de(fecha, id_cita):
+        """Condición de paginación por clave: citas posteriores a (fecha, id_cita) en el orden del listado."""
+        if fecha is None:
+            # SQLite ordena los NULL primero en orden ascendente
+            return or_(
+                and_(Cita.fecha.is_(None), Cita.id_cita > id_cita),
+                Cita.fecha.isnot(None),
+            )
+        return or_(
+            Cita.fecha > fecha,
+            and_(Cita.fecha == fecha, Cita.id_cita > id_cita),
+        )
+
+    def _contar_citas(self, query, estado):
+        """Cuenta las citas de la consulta reutilizando el valor cacheado si sigue vigente."""
+        bind = self.db_session.get_bind()
+        clave = (str(getattr(bind, "url", id(bind))), estado)
+        ahora = time.monotonic()
+
+        cacheado = _TOTALES_CACHE.get(clave)
+        if cacheado and ahora - cacheado[1] < TOTALES_TTL:
+            return cacheado[0]
+
+        total = query.count()
+        _TOTALES_CACHE[clave] = (total, ahora)
+        return total
+
+    async def _contar_citas_async(self, consulta, estado):
+        """Variante asíncrona de `_contar_citas` que comparte la misma caché de totales."""
+        clave = (str(self.db_session.bind.url), estado)
+        ahora = time.monotonic()
+
+        cacheado = _TOTALES_CACHE.get(clave)
+        if cacheado and ahora - cacheado[1] < TOTALES_TTL:
+            return cacheado[0]
+
+        total = await self.db_session.scalar(select(func.count()).select_from(consulta.subquery()))
+        _TOTALES_CACHE[clave] = (total, ahora)
+        return total
+
+
+    async def buscar_cita_async(self, id_mascota, id_cliente):
+        """Variante asíncrona de `buscar_cita`; requiere una AsyncSession."""
+        try:
+            resultado = await self.db_session.execute(
+                select(Cita).where(Cita.id_mascota == id_mascota, Cita.id_cliente == id_cliente).limit(1)
+            )
+            return resultado.scalars().first()
+
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar la cita: %s", sae)
+            return None
+
+        except Exception as e:
+            logging.critical("Error inesperado al buscar la cita: %s", e)
+            return None
 
     def buscar_cita(self, id_mascota, id_cliente):
         """Busca una cita por el ID de la mascota y el cliente."""
@@ -143,14 +806,33 @@ class GestionCitas:
     def modificar_cita(self, id_cita, nuevos_datos):
         """Modifica una cita existente."""
         try:
-            cita = self.db_session.query(Cita).filter_by(id_cita=id_cita).first()
+            with self._escritura():
+                cita = self.db_session.query(Cita).filter_by(id_cita=id_cita).first()
+                if cita:
+                    if "fecha" in nuevos_datos:
+                        nuevos_datos = {**nuevos_datos, "fecha": fecha_sin_zona(nuevos_datos["fecha"])}
+                    # Mover la cita (o reactivarla) no puede pisar otra
+                    fecha = nuevos_datos.get("fecha", cita.fecha)
+                    estado = nuevos_datos.get("estado", cita.estado)
+                    id_mascota = nuevos_datos.get("id_mascota", cita.id_mascota)
+                    if fecha is not None and estado not in ESTADOS_LIBRES and (
+                            fecha != cita.fecha or id_mascota != cita.id_mascota or cita.estado in ESTADOS_LIBRES):
+                        self.comprobar_disponibilidad(fecha, id_mascota, excluir=cita.id_cita)
+
+                    antes = huella_cita(cita)
+                    # Actualizar los atributos de la cita con los nuevos datos
+                    for key, value in nuevos_datos.items():
+                        if hasattr(cita, key):
+                            setattr(cita, key, value)
+
+                    GestionResumenes(self.db_session).aplicar_cita(antes, huella_cita(cita))
+                    self.db_session.commit()
             if cita:
-                # Actualizar los atributos de la cita con los nuevos datos
-                for key, value in nuevos_datos.items():
-                    if hasattr(cita, key):
-                        setattr(cita, key, value)
-                
-                self.db_session.commit()
+                invalidar_totales_citas()
+                diario_cambios.registrar("cita", "upsert", cita.id_cita, cita.to_dict())
+                versiones_tablas.incrementar("cita")
+                cache_entidades.invalidar("cita", cita.id_cita)
+                self._actualizar_agenda(cita)
                 logging.info(f"Cita con ID '{id_cita}' modificada con éxito.")
                 return cita
             else:
@@ -167,8 +849,15 @@ class GestionCitas:
         try:
             cita = self.db_session.query(Cita).filter_by(id_cita=id_cita).first()
             if cita:
+                antes = huella_cita(cita)
                 cita.estado = "Cancelada"
+                GestionResumenes(self.db_session).aplicar_cita(antes, huella_cita(cita))
                 self.db_session.commit()
+                invalidar_totales_citas()
+                diario_cambios.registrar("cita", "upsert", cita.id_cita, cita.to_dict())
+                versiones_tablas.incrementar("cita")
+                cache_entidades.invalidar("cita", cita.id_cita)
+                self._actualizar_agenda(cita)
                 logging.info(f"Cita con ID '{id_cita}' cancelada con éxito.")
                 return cita
             else:
@@ -181,23 +870,44 @@ class GestionCitas:
             raise RuntimeError(f"Error al cancelar la cita: {sae}")
 
     def finalizar_cita(self, id_cita, metodo_pago):
-        """Finaliza la cita y establece el método de pago."""
+        """
+        Finaliza la cita y establece el método de pago.
+
+        Finalizar una cita cancelada la reactiva: como en `cambiar_estado_lote`, antes se comprueba
+        que su hueco sigue libre.
+
+        Raises:
+            CitaSolapadaError: Si la cita estaba cancelada y su hueco ya lo ocupa otra
+            ValueError: Si el método de pago no es válido
+        """
         try:
             # Validar el método de pago
-            if metodo_pago not in {"Efectivo", "Tarjeta", "Bizum", "Transferencia"}:
-                raise ValueError(f"Método de pago '{metodo_pago}' no es válido. Métodos aceptados: Efectivo, Tarjeta, Bizum, Transferencia.")
+            if metodo_pago not in METODOS_PAGO:
+                raise ValueError(f"Método de pago '{metodo_pago}' no es válido. Métodos aceptados: {', '.join(METODOS_PAGO)}.")
             
-            # Buscar la cita en la base de datos
-            cita = self.db_session.query(Cita).filter_by(id_cita=id_cita).first()
-            if not cita:
-                logging.warning(f"No se encontró la cita con ID '{id_cita}'.")
-                return None
+            with self._escritura():
+                # Buscar la cita en la base de datos
+                cita = self.db_session.query(Cita).filter_by(id_cita=id_cita).first()
+                if not cita:
+                    logging.warning(f"No se encontró la cita con ID '{id_cita}'.")
+                    return None
+
+                if cita.estado in ESTADOS_LIBRES and cita.fecha is not None:
+                    self.comprobar_disponibilidad(cita.fecha, cita.id_mascota, excluir=cita.id_cita)
 
-            # Finalizar la cita
-            cita.metodo_pago = metodo_pago  # Registrar el método de pago
-            cita.estado = "Finalizada"  # Cambiar el estado de la cita
+                # Finalizar la cita
+                antes = huella_cita(cita)
+                cita.metodo_pago = metodo_pago  # Registrar el método de pago
+                cita.estado = "Finalizada"  # Cambiar el estado de la cita
 
-            self.db_session.commit()
+                # Los resúmenes del dashboard se actualizan en la misma transacción
+                GestionResumenes(self.db_session).aplicar_cita(antes, huella_cita(cita))
+                self.db_session.commit()
+            invalidar_totales_citas()
+            diario_cambios.registrar("cita", "upsert", cita.id_cita, cita.to_dict())
+            versiones_tablas.incrementar("cita")
+            cache_entidades.invalidar("cita", cita.id_cita)
+            self._actualizar_agenda(cita)
             logging.info(f"Cita con ID '{id_cita}' finalizada correctamente con método de pago '{metodo_pago}'.")
             return cita
 
@@ -218,3 +928,49 @@ class GestionCitas:
         except Exception as e:
             logging.error(f"Error al buscar cita por ID: {e}")
             return None
+
+    async def buscar_cita_por_id_async(self, id_cita: int):
+        """Variante asíncrona de `buscar_cita_por_id`; requiere una AsyncSession."""
+        try:
+            return await self.db_session.get(Cita, id_cita)
+        except Exception as e:
+            logging.error(f"Error al buscar cita por ID: {e}")
+            return None
+
+    def obtener_cita_serializado(self, id_cita: int):
+        """
+        Devuelve la cita como diccionario (to_dict()) pasando por la caché de entidades.
+
+        Returns:
+            dict | None: None si la cita no existe
+        """
+        def cargar():
+            cita = self.buscar_cita_por_id(id_cita)
+            return cita.to_dict() if cita else None
+        return cache_entidades.obtener("cita", id_cita, cargar)
+
+    async def obtener_cita_serializado_async(self, id_cita: int):
+        """Variante asíncrona de `obtener_cita_serializado`; requiere una AsyncSession."""
+        async def cargar():
+            cita = await self.buscar_cita_por_id_async(id_cita)
+            return cita.to_dict() if cita else None
+        return await cache_entidades.obtener_async("cita", id_cita, cargar)
+
+    def buscar_citas_por_ids(self, ids, include=()):
+        """
+        Citas con esos IDs, en el orden de `ids`, con una consulta IN (...) por bloque (ver
+        opciones_carga.buscar_por_ids). `include` admite: cliente, mascota, tratamiento.
+        """
+        try:
+            return buscar_por_ids(self.db_session, Cita, Cita.id_cita, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar citas por IDs: %s", sae)
+            return []
+
+    async def buscar_citas_por_ids_async(self, ids, include=()):
+        """Variante asíncrona de `buscar_citas_por_ids`; requiere una AsyncSession."""
+        try:
+            return await buscar_por_ids_async(self.db_session, Cita, Cita.id_cita, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar citas por IDs: %s", sae)
+            return []
@@ -0,0 +1,185 @@
+# gestion_estadisticas.py
+
+import logging
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from clinica.models import Cita, Cliente, Mascota, Tratamiento, ResumenCitasDia, ResumenIngresosMetodoPago, ResumenMascotasCliente
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# strftime('%w') de SQLite: 0 = domingo
+DIAS_SEMANA = ["Domingo", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+
+CUANTILES_PRECIO = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+SECCIONES = ("kpis", "clientes", "mascotas", "tratamientos", "citas")
+
+
+class GestionEstadisticas:
+    """
+    Estadísticas agregadas para el dashboard calculadas en SQL con GROUP BY.
+
+    Cada método devuelve solo los agregados (unas decenas de filas como mucho), de modo que el
+    tamaño de la respuesta no depende del número de registros de las tablas. Las citas por día,
+    los ingresos y el ranking de clientes se leen de las tablas `resumen_*`, que los servicios
+    mantienen al escribir (ver GestionResumenes).
+    """
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def resumen(self, secciones=SECCIONES, top_n=10, ancho_edad=1):
+        """
+        Devuelve las secciones de estadísticas pedidas.
+
+        Args:
+            secciones (Iterable[str]): Subconjunto de SECCIONES
+            top_n (int): Número de elementos de los rankings
+            ancho_edad (int): Años por intervalo en los histogramas de edad
+
+        Returns:
+            dict: {seccion: {...}}
+
+        Raises:
+            ValueError: Si alguna sección no existe
+        """
+        desconocidas = set(secciones) - set(SECCIONES)
+        if desconocidas:
+            raise ValueError(f"Secciones no válidas: {', '.join(sorted(desconocidas))}. "
+                             f"Secciones disponibles: {', '.join(SECCIONES)}.")
+
+        calculos = {
+            "kpis": self.kpis,
+            "clientes": lambda: {
+                "edades": self.histograma_edades(Cliente.edad, ancho_edad),
+                "top_por_mascotas": self.top_clientes_por_mascotas(top_n),
+            },
+            "mascotas": lambda: {
+                "por_estado": self._contar_por(Mascota.estado, "estado"),
+                "por_raza": self._contar_por(Mascota.raza, "raza"),
+                "edades": self.histograma_edades(Mascota.edad, ancho_edad),
+                "afecciones": self._contar_por(Mascota.afeccion, "afeccion", limite=top_n),
+            },
+            "tratamientos": lambda: {
+                "por_estado": self._contar_por(Tratamiento.estado, "estado"),
+                "cuantiles_precio": self.cuantiles_precio_tratamientos(),
+                "mas_utilizados": self.tratamientos_mas_utilizados(top_n),
+            },
+            "citas": lambda: {
+                "por_estado": self._contar_por(Cita.estado, "estado"),
+                "por_dia": self.citas_por_dia(),
+                "por_dia_semana": self.citas_por_dia_semana(),
+                "por_metodo_pago": self._contar_por(Cita.metodo_pago, "metodo_pago"),
+                "ingresos_por_metodo_pago": self.ingresos_por_metodo_pago(),
+            },
+        }
+        return {seccion: calculos[seccion]() for seccion in SECCIONES if seccion in secciones}
+
+    def kpis(self):
+        """Totales del resumen general en una sola consulta."""
+        fila = self.db_session.execute(select(
+            select(func.count()).select_from(Cliente).scalar_subquery().label("total_clientes"),
+            select(func.count()).select_from(Mascota).scalar_subquery().label("total_mascotas"),
+            select(func.count()).select_from(Tratamiento).where(Tratamiento.estado == "Activo")
+                .scalar_subquery().label("tratamientos_activos"),
+            select(func.count()).select_from(Cita).scalar_subquery().label("total_citas"),
+            select(func.count()).select_from(Cita).where(Cita.estado == "Pendiente")
+                .scalar_subquery().label("citas_pendientes"),
+        )).one()
+        return dict(fila._mapping)
+
+    def _contar_por(self, columna, nombre, limite=None):
+        """Número de registros por valor de `columna`, de mayor a menor."""
+        total = func.count().label("total")
+        consulta = select(columna.label(nombre), total).group_by(columna).order_by(total.desc(), columna)
+        if limite:
+            consulta = consulta.limit(limite)
+        return [dict(fila._mapping) for fila in self.db_session.execute(consulta)]
+
+    def histograma_edades(self, columna, ancho=1):
+        """Histograma de `columna` en intervalos de `ancho` años: [{"desde", "hasta", "total"}]."""
+        ancho = max(int(ancho), 1)
+        intervalo = ((columna // ancho) * ancho).label("desde")
+        consulta = (
+            select(intervalo, func.count().label("total"))
+            .where(columna.isnot(None))
+            .group_by(intervalo)
+            .order_by(intervalo)
+        )
+        return [
+            {"desde": fila.desde, "hasta": fila.desde + ancho - 1, "total": fila.total}
+            for fila in self.db_session.execute(consulta)
+        ]
+
+    def citas_por_dia(self):
+        """Número de citas por día natural: [{"dia": "YYYY-MM-DD", "total"}]."""
+        total = func.sum(ResumenCitasDia.total).label("total")
+        consulta = select(ResumenCitasDia.dia, total).group_by(ResumenCitasDia.dia).order_by(ResumenCitasDia.dia)
+        return [dict(fila._mapping) for fila in self.db_session.execute(consulta)]
+
+    def ingresos_por_metodo_pago(self):
+        """Citas finalizadas e ingresos por método de pago: [{"metodo_pago", "citas", "ingresos"}]."""
+        consulta = select(ResumenIngresosMetodoPago).order_by(
+            ResumenIngresosMetodoPago.ingresos.desc(), ResumenIngresosMetodoPago.metodo_pago
+        )
+        return [fila.to_dict() for fila in self.db_session.execute(consulta).scalars()]
+
+    def citas_por_dia_semana(self):
+        """Número de citas por día de la semana, de lunes a domingo."""
+        dia = func.strftime("%w", Cita.fecha).label("dia")
+        consulta = select(dia, func.count().label("total")).where(Cita.fecha.isnot(None)).group_by(dia)
+        totales = {int(fila.dia): fila.total for fila in self.db_session.execute(consulta)}
+        return [
+            {"dia_semana": DIAS_SEMANA[numero], "total": totales.get(numero, 0)}
+            for numero in (1, 2, 3, 4, 5, 6, 0)
+        ]
+
+    def cuantiles_precio_tratamientos(self, cuantiles=CUANTILES_PRECIO):
+        """
+        Cuantiles del precio de los tratamientos con interpolación lineal.
+
+        SQLite no tiene funciones de percentil, así que cada cuantil se lee con ORDER BY y OFFSET
+        (dos filas como mucho por cuantil) en lugar de descargar todos los precios.
+
+        Returns:
+            dict: {"total", "media", "cuantiles": {"0.5": valor, ...}}
+        """
+        total, media = self.db_session.execute(
+            select(func.count(Tratamiento.precio), func.avg(Tratamiento.precio))
+        ).one()
+        resultado = {"total": total, "media": round(media, 2) if media is not None else None, "cuantiles": {}}
+        if not total:
+            return resultado
+
+        ordenados = select(Tratamiento.precio).where(Tratamiento.precio.isnot(None)).order_by(Tratamiento.precio)
+        for q in cuantiles:
+            posicion = q * (total - 1)
+            base = int(posicion)
+            valores = self.db_session.execute(ordenados.offset(base).limit(2)).scalars().all()
+            fraccion = posicion - base
+            valor = valores[0] + (valores[1] - valores[0]) * fraccion if fraccion and len(valores) > 1 else valores[0]
+            resultado["cuantiles"][str(q)] = valor
+        return resultado
+
+    def top_clientes_por_mascotas(self, n=10):
+        """Clientes con más mascotas: [{"id_cliente", "nombre_cliente", "mascotas"}]."""
+        consulta = (
+            select(Cliente.id_cliente, Cliente.nombre_cliente, ResumenMascotasCliente.mascotas)
+            .join(Cliente, Cliente.id_cliente == ResumenMascotasCliente.id_cliente)
+            .order_by(ResumenMascotasCliente.mascotas.desc(), ResumenMascotasCliente.id_cliente)
+            .limit(n)
+        )
+        return [dict(fila._mapping) for fila in self.db_session.execute(consulta)]
+
+    def tratamientos_mas_utilizados(self, n=10):
+        """Tratamientos con más citas: [{"nombre_tratamiento", "citas"}]."""
+        citas = func.count(Cita.id_cita).label("citas")
+        consulta = (
+            select(Tratamiento.nombre_tratamiento, citas)
+            .join(Cita, Cita.id_tratamiento == Tratamiento.id_tratamiento)
+            .group_by(Tratamiento.id_tratamiento, Tratamiento.nombre_tratamiento)
+            .order_by(citas.desc(), Tratamiento.nombre_tratamiento)
+            .limit(n)
+        )
+        return [dict(fila._mapping) for fila in self.db_session.execute(consulta)]
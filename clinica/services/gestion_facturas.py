@@ -0,0 +1,149 @@
+# gestion_facturas.py
+"""
+Datos de las facturas.
+
+Cada factura necesita la cita, su cliente, su mascota y su tratamiento; se leen con una sola
+consulta con JOIN, tanto para una factura como para todas las de un mes, y se devuelven como
+diccionarios planos que el motor de clinica.utils.facturas puede dibujar en otro proceso.
+"""
+
+import logging
+from datetime import date, datetime
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+COLUMNAS_FACTURA = (
+    Cita.id_cita, Cita.fecha, Cita.metodo_pago,
+    Cliente.id_cliente, Cliente.nombre_cliente, Cliente.dni, Cliente.direccion, Cliente.telefono,
+    Mascota.id_mascota, Mascota.nombre_mascota, Mascota.raza, Mascota.edad,
+    Tratamiento.id_tratamiento, Tratamiento.nombre_tratamiento, Tratamiento.descripcion, Tratamiento.precio,
+)
+
+# Estado de las citas que se facturan en los lotes mensuales
+ESTADO_FACTURADO = "Finalizada"
+
+
+def rango_mes(anio, mes):
+    """[desde, hasta) del mes indicado."""
+    if not 1 <= mes <= 12:
+        raise ValueError("El mes debe estar entre 1 y 12.")
+    desde = datetime(anio, mes, 1)
+    hasta = datetime(anio + 1, 1, 1) if mes == 12 else datetime(anio, mes + 1, 1)
+    return desde, hasta
+
+
+class GestionFacturas:
+    def __init__(self, db_session):
+        self.db_session = db_session
+
+    def _consulta_factura(self, id_tratamiento):
+        """
+        Tratamiento con su primera cita, cliente y mascota. Con LEFT JOIN se distingue si falta el
+        tratamiento (ninguna fila) o la cita, el cliente o la mascota (columnas a None).
+        """
+        primera_cita = (
+            select(Cita.id_cita)
+            .where(Cita.id_tratamiento == id_tratamiento)
+            .order_by(Cita.id_cita)
+            .limit(1)
+            .scalar_subquery()
+        )
+        return (
+            select(*COLUMNAS_FACTURA)
+            .select_from(Tratamiento)
+            .outerjoin(Cita, Cita.id_cita == primera_cita)
+            .outerjoin(Cliente, Cliente.id_cliente == Cita.id_cliente)
+            .outerjoin(Mascota, Mascota.id_mascota == Cita.id_mascota)
+            .where(Tratamiento.id_tratamiento == id_tratamiento)
+        )
+
+    def _consulta_mes(self, anio, mes):
+        """Citas finalizadas del mes con todos los datos de su factura, por fecha."""
+        desde, hasta = rango_mes(anio, mes)
+        return (
+            select(*COLUMNAS_FACTURA)
+            .select_from(Cita)
+            .join(Cliente, Cliente.id_cliente == Cita.id_cliente)
+            .join(Mascota, Mascota.id_mascota == Cita.id_mascota)
+            .join(Tratamiento, Tratamiento.id_tratamiento == Cita.id_tratamiento)
+            .where(Cita.estado == ESTADO_FACTURADO, Cita.fecha >= desde, Cita.fecha < hasta)
+            .order_by(Cita.fecha, Cita.id_cita)
+        )
+
+    @staticmethod
+    def _factura(fila, fecha_factura=None):
+        """
+        Diccionario de la factura. La fecha de una factura suelta es la de hoy, como hasta ahora;
+        en los lotes mensuales es la de la cita, para que el lote sea reproducible.
+        """
+        datos = dict(fila)
+        datos["fecha_factura"] = fecha_factura or datos["fecha"].date()
+        return datos
+
+    def _comprobar_factura(self, fila, id_tratamiento):
+        if fila is None:
+            logging.error(f"Tratamiento con ID {id_tratamiento} no encontrado.")
+            return {"error": "Tratamiento no encontrado"}
+        if fila["id_cita"] is None:
+            logging.error(f"No se encontró una cita para el tratamiento con ID {id_tratamiento}.")
+            return {"error": "Cita no encontrada"}
+        if fila["id_cliente"] is None or fila["id_mascota"] is None:
+            logging.error(f"Cliente o mascota no encontrados para la cita con ID {fila['id_cita']}.")
+            return {"error": "Cliente o mascota no encontrados"}
+        return self._factura(fila, date.today())
+
+    def datos_factura(self, id_tratamiento):
+        """
+        Datos de la factura de un tratamiento (de su primera cita).
+
+        Returns:
+            dict: Datos de la factura, o {"error": ...} si falta el tratamiento, la cita, el cliente o la mascota
+
+        Raises:
+            RuntimeError: Si falla la base de datos
+        """
+        try:
+            fila = self.db_session.execute(self._consulta_factura(id_tratamiento)).mappings().first()
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al obtener los datos de la factura: %s", sae)
+            raise RuntimeError(f"Error de base de datos al obtener los datos de la factura: {sae}")
+        return self._comprobar_factura(fila, id_tratamiento)
+
+    async def datos_factura_async(self, id_tratamiento):
+        """Igual que datos_factura, con una sesión asíncrona."""
+        try:
+            resultado = await self.db_session.execute(self._consulta_factura(id_tratamiento))
+            fila = resultado.mappings().first()
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al obtener los datos de la factura: %s", sae)
+            raise RuntimeError(f"Error de base de datos al obtener los datos de la factura: {sae}")
+        return self._comprobar_factura(fila, id_tratamiento)
+
+    def facturas_del_mes(self, anio, mes):
+        """
+        Datos de las facturas de las citas finalizadas en el mes, ordenadas por fecha.
+
+        Raises:
+            ValueError: Si el mes no es válido
+            RuntimeError: Si falla la base de datos
+        """
+        consulta = self._consulta_mes(anio, mes)
+        try:
+            return [self._factura(fila) for fila in self.db_session.execute(consulta).mappings()]
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al obtener las facturas del mes: %s", sae)
+            raise RuntimeError(f"Error de base de datos al obtener las facturas del mes: {sae}")
+
+    async def facturas_del_mes_async(self, anio, mes):
+        """Igual que facturas_del_mes, con una sesión asíncrona."""
+        consulta = self._consulta_mes(anio, mes)
+        try:
+            resultado = await self.db_session.execute(consulta)
+            return [self._factura(fila) for fila in resultado.mappings()]
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al obtener las facturas del mes: %s", sae)
+            raise RuntimeError(f"Error de base de datos al obtener las facturas del mes: {sae}")
@@ -1,12 +1,20 @@
 import logging
 import os
-import json
 import logging
 from typing import List, Optional
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from clinica.services.gestion_busqueda import LIMITE_BUSQUEDA, filtrar_por_texto
 from clinica.services.gestion_clientes import GestionClientes
+from clinica.services.gestion_resumenes import GestionResumenes
+from clinica.services.opciones_carga import buscar_por_ids, buscar_por_ids_async, opciones_carga, preset
 from clinica.models.tabla_cliente import Cliente as ClienteModel
 from clinica.models.tabla_mascota import Mascota as MascotaModel
+from clinica.utils.cache_entidades import cache_entidades
+from clinica.utils.diario_cambios import diario_cambios
+from clinica.utils.exportacion import exportar_consulta_json
+from clinica.utils.helper_functions import TAMANO_LOTE_STREAMING, iterar_lotes_async, patron_contiene
+from clinica.utils.versiones_tablas import versiones_tablas
 
 # Configuración del logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -14,21 +22,16 @@ logger = logging.getLogger(__name__)
 
 class GestionMascotas(GestionClientes):
 
-    def exportar_mascotas_a_json(self, ruta_json=None):
-        """Exporta las mascotas a un archivo JSON."""
+    def exportar_mascotas_a_json(self, ruta_json=None, formato="json"):
+        """Exporta las mascotas a un archivo JSON (o NDJSON) escribiendo de forma incremental."""
         if ruta_json is None:
             # Establece la ruta por defecto usando el directorio actual de trabajo
             ruta_json = os.path.join(os.getcwd(), 'clinica/data/datos_mascotas.json')
 
         try:
-            # Obtener todas las mascotas de la base de datos y convertir cada una en diccionario
-            mascotas = self.db_session.query(MascotaModel).all()
-            datos = [mascota.to_dict() for mascota in mascotas]  # Usando to_dict()
-
-            # Guardar los datos en el archivo JSON
-            with open(ruta_json, 'w', encoding='utf-8') as archivo:
-                json.dump(datos, archivo, ensure_ascii=False, indent=4)
-            logging.info(f"Mascotas exportadas a {ruta_json} exitosamente.")
+            resumen = exportar_consulta_json(self.db_session.query(MascotaModel), ruta_json, formato=formato)
+            logging.info(f"Mascotas exportadas a {ruta_json} exitosamente ({resumen['registros']} registros, {resumen['bytes']} bytes).")
+            return resumen
         except Exception as e:
             logging.error(f"Error al exportar mascotas a JSON: {e}")
             raise
@@ -51,8 +54,11 @@ class GestionMascotas(GestionClientes):
             # Crear y añadir la nueva mascota
             nueva_mascota = MascotaModel(**mascota_data, id_cliente=id_cliente)
             self.db_session.add(nueva_mascota)
+            GestionResumenes(self.db_session).aplicar_mascota(None, id_cliente)
             self.db_session.commit()
             self.db_session.refresh(nueva_mascota)
+            diario_cambios.registrar("mascota", "upsert", nueva_mascota.id_mascota, nueva_mascota.to_dict())
+            versiones_tablas.incrementar("mascota")
 
             logging.info(f"Mascota '{mascota_data['nombre_mascota']}' registrada para el cliente '{cliente.nombre_cliente}'.")
 
@@ -80,13 +86,17 @@ class GestionMascotas(GestionClientes):
             mascota = self.db_session.query(MascotaModel).filter_by(id_mascota=id_mascota).first()
 
             if mascota:
+                id_cliente_anterior = mascota.id_cliente
                 for key, value in nuevos_datos.items():
                     setattr(mascota, key, value)
+                GestionResumenes(self.db_session).aplicar_mascota(id_cliente_anterior, mascota.id_cliente)
                 self.db_session.commit()
                 logging.info(f"Mascota con ID '{id_mascota}' modificada con éxito.")
 
-                # Exportar a JSON después de la operación
-                self.exportar_mascotas_a_json()
+                # Registrar el cambio en el diario; el compactador actualiza el snapshot JSON
+                diario_cambios.registrar("mascota", "upsert", mascota.id_mascota, mascota.to_dict())
+                versiones_tablas.incrementar("mascota")
+                cache_entidades.invalidar("mascota", mascota.id_mascota)
 
                 return f"Mascota con ID '{id_mascota}' modificada con éxito."
             else:
@@ -109,12 +119,16 @@ class GestionMascotas(GestionClientes):
             mascota = self.db_session.query(MascotaModel).filter_by(id_mascota=id_mascota).first()
 
             if mascota:
+                GestionResumenes(self.db_session).aplicar_mascota(mascota.id_cliente, None)
                 self.db_session.delete(mascota)
                 self.db_session.commit()
                 logging.info(f"Mascota con ID '{id_mascota}' eliminada con éxito.")
 
-                # Exportar a JSON después de la operación
-                self.exportar_mascotas_a_json()
+                # Registrar el cambio en el diario; el compactador actualiza el snapshot JSON
+                diario_cambios.registrar("mascota", "delete", id_mascota)
+                versiones_tablas.incrementar("mascota", "cita")
+                cache_entidades.invalidar("mascota", id_mascota)
+                cache_entidades.invalidar("cita")
 
                 return f"Mascota con ID '{id_mascota}' eliminada con éxito."
             else:
@@ -131,10 +145,19 @@ class GestionMascotas(GestionClientes):
             logging.critical("Error inesperado al eliminar la mascota: %s", e)
             return f"Ocurrió un error inesperado al eliminar la mascota: {e}"
 
-    def listar_mascotas(self):
-        """Devuelve una lista de todas las mascotas en la base de datos."""
+    def listar_mascotas(self, include=()):
+        """
+        Devuelve una lista de todas las mascotas en la base de datos.
+
+        Args:
+            include (Iterable[str] | str): Relaciones a cargar por adelantado (cliente, citas)
+
+        Raises:
+            ValueError: Si se pide una relación que no existe
+        """
+        opciones = opciones_carga(MascotaModel, include)
         try:
-            mascotas = self.db_session.query(MascotaModel).all()
+            mascotas = self.db_session.query(MascotaModel).options(*opciones).all()
             logging.info("Listado de mascotas obtenido con éxito.")
             return mascotas
 
@@ -146,6 +169,69 @@ class GestionMascotas(GestionClientes):
             logging.critical("Error inesperado al listar las mascotas: %s", e)
             return []
 
+    @staticmethod
+    def _condiciones_listado(nombre=None, raza=None, estado=None):
+        """Filtros de los listados: parte del nombre o de la raza y estado (Vivo, Fallecido)."""
+        condiciones = []
+        if nombre:
+            condiciones.append(MascotaModel.nombre_mascota.ilike(patron_contiene(nombre), escape="\\"))
+        if raza:
+            condiciones.append(MascotaModel.raza.ilike(patron_contiene(raza), escape="\\"))
+        if estado:
+            condiciones.append(MascotaModel.estado == estado)
+        return condiciones
+
+    async def listar_mascotas_async(self, include=(), nombre=None, raza=None, estado=None):
+        """Variante asíncrona de `listar_mascotas` con filtros opcionales; requiere una AsyncSession."""
+        opciones = opciones_carga(MascotaModel, include)
+        consulta = select(MascotaModel).options(*opciones).where(*self._condiciones_listado(nombre, raza, estado))
+        try:
+            resultado = await self.db_session.execute(consulta)
+            mascotas = resultado.scalars().all()
+            logging.info("Listado de mascotas obtenido con éxito.")
+            return mascotas
+
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al listar las mascotas: %s", sae)
+            return []
+
+        except Exception as e:
+            logging.critical("Error inesperado al listar las mascotas: %s", e)
+            return []
+
+    async def listar_mascotas_filas_async(self, nombre=None, raza=None, estado=None):
+        """
+        Listado de mascotas como filas de columnas (SELECT de Core, sin objetos ORM).
+
+        Lo usa la ruta rápida de la API para los listados sin relaciones; requiere una AsyncSession.
+
+        Returns:
+            list[RowMapping]: Una fila por mascota con sus columnas por nombre
+        """
+        try:
+            consulta = select(*MascotaModel.__table__.columns).where(*self._condiciones_listado(nombre, raza, estado))
+            resultado = await self.db_session.execute(consulta)
+            filas = resultado.mappings().all()
+            logging.info("Listado de mascotas obtenido con éxito.")
+            return filas
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al listar las mascotas: %s", sae)
+            return []
+
+    def iterar_mascotas_async(self, nombre=None, raza=None, estado=None, tamano_lote=TAMANO_LOTE_STREAMING):
+        """
+        Recorre las mascotas en lotes de filas de columnas, ordenadas por ID.
+
+        Para los listados NDJSON / CSV: la memoria no depende del tamaño de la tabla.
+
+        Returns:
+            AsyncIterator[list[RowMapping]]
+        """
+        consulta = (select(*MascotaModel.__table__.columns)
+                    .where(*self._condiciones_listado(nombre, raza, estado))
+                    .order_by(MascotaModel.id_mascota))
+        return iterar_lotes_async(self.db_session, consulta, tamano_lote)
+
     def listar_mascotas_por_cliente(self, id_cliente: int):
         """
         Devuelve una lista de mascotas pertenecientes a un cliente específico.
@@ -175,61 +261,82 @@ class GestionMascotas(GestionClientes):
         except Exception as e:
             logger.error(f"Error inesperado al listar las mascotas por cliente: {e}")
             return []
-            
-    def buscar_mascota_por_nombre(self, nombre_mascota):
-        """Busca mascotas por nombre y muestra el nombre del cliente asociado si hay múltiples coincidencias."""
+
+    async def listar_mascotas_por_cliente_async(self, id_cliente: int):
+        """Variante asíncrona de `listar_mascotas_por_cliente`; requiere una AsyncSession."""
         try:
-            mascotas = self.db_session.query(MascotaModel).filter(
-                MascotaModel.nombre_mascota.ilike(f"%{nombre_mascota}%")
-            ).all()
-
-            if not mascotas:
-                logging.warning(f"No se encontró ninguna mascota con el nombre '{nombre_mascota}'.")
-                return None
-
-            # Si hay una sola mascota, se devuelve directamente con el nombre del cliente asociado
-            if len(mascotas) == 1:
-                cliente = self.db_session.query(ClienteModel).filter_by(id_cliente=mascotas[0].id_cliente).first()
-                logging.info(f"Mascota encontrada: {mascotas[0].nombre_mascota} (ID: {mascotas[0].id_mascota}), Cliente: {cliente.nombre_cliente if cliente else 'Desconocido'}")
-                return {
-                    "mascota": mascotas[0],
-                    "cliente": cliente.nombre_cliente if cliente else "Desconocido"
-                }
-
-            # Si hay múltiples mascotas, se listan y se pide una selección
-            logging.info(f"Se encontraron múltiples mascotas con el nombre '{nombre_mascota}'.")
-            for idx, mascota in enumerate(mascotas, start=1):
-                cliente = self.db_session.query(ClienteModel).filter_by(id_cliente=mascota.id_cliente).first()
-                print(f"{idx}. Mascota: {mascota.nombre_mascota} - ID: {mascota.id_mascota} - Estado: {mascota.estado} - Cliente: {cliente.nombre_cliente if cliente else 'Desconocido'}")
-
-            try:
-                seleccion = int(input("Seleccione el número de la mascota deseada (0 para cancelar): "))
-                if seleccion == 0:
-                    print("Operación cancelada.")
-                    return None
-                elif 1 <= seleccion <= len(mascotas):
-                    mascota_seleccionada = mascotas[seleccion - 1]
-                    cliente = self.db_session.query(ClienteModel).filter_by(id_cliente=mascota_seleccionada.id_cliente).first()
-                    logging.info(f"Mascota seleccionada: {mascota_seleccionada.nombre_mascota} (ID: {mascota_seleccionada.id_mascota}), Cliente: {cliente.nombre_cliente if cliente else 'Desconocido'}")
-                    return {
-                        "mascota": mascota_seleccionada,
-                        "cliente": cliente.nombre_cliente if cliente else "Desconocido"
-                    }
-                else:
-                    print("Selección no válida. Operación cancelada.")
-                    return None
-
-            except ValueError:
-                print("Entrada no válida. Operación cancelada.")
-                return None
+            cliente = await self.db_session.get(ClienteModel, id_cliente)
+            if not cliente:
+                logger.warning(f"Cliente con ID {id_cliente} no encontrado")
+                return []
+
+            resultado = await self.db_session.execute(
+                select(MascotaModel).where(MascotaModel.id_cliente == id_cliente)
+            )
+            mascotas = resultado.scalars().all()
+            logger.info(f"Se encontraron {len(mascotas)} mascotas para el cliente {id_cliente}")
+            return mascotas
 
         except SQLAlchemyError as sae:
-            logging.error("Error de SQLAlchemy al buscar la mascota por nombre: %s", sae)
-            return None
+            logger.error(f"Error de SQLAlchemy al listar las mascotas por cliente: {sae}")
+            return []
 
         except Exception as e:
-            logging.critical("Error inesperado al buscar la mascota por nombre: %s", e)
+            logger.error(f"Error inesperado al listar las mascotas por cliente: {e}")
+            return []
+            
+    def buscar_mascotas_por_nombre(self, nombre_mascota, limite=LIMITE_BUSQUEDA, desplazamiento=0):
+        """
+        Busca mascotas por nombre, de más a menos relevante, con el nombre de su cliente.
+
+        Cada palabra de `nombre_mascota` se busca como prefijo en el índice de texto completo, sin
+        distinguir mayúsculas ni acentos. Nunca pide datos por consola: todas las coincidencias se
+        devuelven por páginas (para elegir una de forma interactiva, ver `clinica.utils.seleccion_cli`).
+
+        Args:
+            nombre_mascota (str): Nombre o parte del nombre
+            limite (int): Coincidencias por página
+            desplazamiento (int): Coincidencias que se saltan
+
+        Returns:
+            dict: {"resultados": [{"mascota": Mascota, "cliente": nombre}], "hay_mas": bool}
+
+        Raises:
+            ValueError: Si el nombre no contiene letras ni números
+        """
+        try:
+            # El cliente de cada mascota llega en el mismo SELECT (JOIN)
+            consulta = filtrar_por_texto(self.db_session.query(MascotaModel).options(*preset("mascota_con_cliente")),
+                                         MascotaModel, nombre_mascota, columnas=("nombre_mascota",))
+            # Un registro extra indica si hay otra página
+            mascotas = consulta.offset(desplazamiento).limit(limite + 1).all()
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar la mascota por nombre: %s", sae)
+            return {"resultados": [], "hay_mas": False}
+
+        resultados = [
+            {"mascota": mascota, "cliente": mascota.cliente.nombre_cliente if mascota.cliente else "Desconocido"}
+            for mascota in mascotas[:limite]
+        ]
+        logging.info(f"{len(resultados)} mascotas encontradas con el nombre '{nombre_mascota}'.")
+        return {"resultados": resultados, "hay_mas": len(mascotas) > limite}
+
+    def buscar_mascota_por_nombre(self, nombre_mascota):
+        """
+        Devuelve la mascota más relevante para `nombre_mascota` con el nombre de su cliente.
+
+        Returns:
+            dict | None: {"mascota": Mascota, "cliente": nombre}, o None si no hay coincidencias
+        """
+        try:
+            resultados = self.buscar_mascotas_por_nombre(nombre_mascota, limite=1)["resultados"]
+        except ValueError as ve:
+            logging.warning(f"Nombre de mascota no válido '{nombre_mascota}': {ve}")
+            return None
+        if not resultados:
+            logging.warning(f"No se encontró ninguna mascota con el nombre '{nombre_mascota}'.")
             return None
+        return resultados[0]
 
     def marcar_mascota_como_fallecido(self, id_cliente, nombre_mascota):
         """Marca una mascota como fallecida para un cliente específico."""
@@ -241,8 +348,10 @@ class GestionMascotas(GestionClientes):
                 self.db_session.commit()
                 logging.info(f"La mascota '{mascota.nombre_mascota}' ha sido marcada como fallecida.")
 
-                # Exportar a JSON después de la operación (opcional)
-                self.exportar_mascotas_a_json()
+                # Registrar el cambio en el diario; el compactador actualiza el snapshot JSON
+                diario_cambios.registrar("mascota", "upsert", mascota.id_mascota, mascota.to_dict())
+                versiones_tablas.incrementar("mascota")
+                cache_entidades.invalidar("mascota", mascota.id_mascota)
 
                 return f"La mascota '{mascota.nombre_mascota}' ha sido marcada como fallecida."
             else:
@@ -294,3 +403,49 @@ class GestionMascotas(GestionClientes):
         except Exception as e:
             logging.error(f"Error al buscar mascota por ID: {e}")
             return None
+
+    async def buscar_mascota_por_id_async(self, id_mascota: int):
+        """Variante asíncrona de `buscar_mascota_por_id`; requiere una AsyncSession."""
+        try:
+            return await self.db_session.get(MascotaModel, id_mascota)
+        except Exception as e:
+            logging.error(f"Error al buscar mascota por ID: {e}")
+            return None
+
+    def obtener_mascota_serializado(self, id_mascota: int):
+        """
+        Devuelve la mascota como diccionario (to_dict()) pasando por la caché de entidades.
+
+        Returns:
+            dict | None: None si la mascota no existe
+        """
+        def cargar():
+            mascota = self.buscar_mascota_por_id(id_mascota)
+            return mascota.to_dict() if mascota else None
+        return cache_entidades.obtener("mascota", id_mascota, cargar)
+
+    async def obtener_mascota_serializado_async(self, id_mascota: int):
+        """Variante asíncrona de `obtener_mascota_serializado`; requiere una AsyncSession."""
+        async def cargar():
+            mascota = await self.buscar_mascota_por_id_async(id_mascota)
+            return mascota.to_dict() if mascota else None
+        return await cache_entidades.obtener_async("mascota", id_mascota, cargar)
+
+    def buscar_mascotas_por_ids(self, ids, include=()):
+        """
+        Mascotas con esos IDs, en el orden de `ids`, con una consulta IN (...) por bloque (ver
+        opciones_carga.buscar_por_ids). `include` admite: cliente, citas.
+        """
+        try:
+            return buscar_por_ids(self.db_session, MascotaModel, MascotaModel.id_mascota, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar mascotas por IDs: %s", sae)
+            return []
+
+    async def buscar_mascotas_por_ids_async(self, ids, include=()):
+        """Variante asíncrona de `buscar_mascotas_por_ids`; requiere una AsyncSession."""
+        try:
+            return await buscar_por_ids_async(self.db_session, MascotaModel, MascotaModel.id_mascota, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar mascotas por IDs: %s", sae)
+            return []
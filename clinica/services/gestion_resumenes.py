@@ -0,0 +1,262 @@
+# gestion_resumenes.py
+"""
+Mantenimiento de las tablas de resumen del dashboard.
+
+Las tablas `resumen_*` guardan agregados ya calculados (citas por día y estado, ingresos por
+método de pago y mascotas por cliente). Los servicios llaman a GestionResumenes antes de su
+commit, de modo que el resumen se actualiza con un UPSERT por fila afectada dentro de la misma
+transacción que la escritura de origen y nunca queda a medias.
+
+Uso:
+    python -m clinica.services.gestion_resumenes --comprobar    # compara con un recálculo completo
+    python -m clinica.services.gestion_resumenes --reconstruir  # recalcula las tablas desde cero
+"""
+
+import argparse
+import logging
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from clinica.models import (
+    Cita, Mascota, Tratamiento, ResumenCitasDia, ResumenIngresosMetodoPago, ResumenMascotasCliente
+)
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Nombre de cada tabla de resumen -> (modelo, columnas clave, columnas acumuladas)
+RESUMENES = {
+    "citas_dia": (ResumenCitasDia, ("dia", "estado"), ("total",)),
+    "ingresos_metodo_pago": (ResumenIngresosMetodoPago, ("metodo_pago",), ("citas", "ingresos")),
+    "mascotas_cliente": (ResumenMascotasCliente, ("id_cliente",), ("mascotas",)),
+}
+
+
+def huella_cita(cita):
+    """
+    Devuelve los campos de una cita que afectan a los resúmenes.
+
+    Se toma antes y después de modificar la cita para que `aplicar_cita` sume solo la diferencia.
+    """
+    if cita is None:
+        return None
+    fecha = cita.fecha
+    return (
+        fecha.date().isoformat() if isinstance(fecha, datetime) else (str(fecha)[:10] if fecha else None),
+        cita.estado,
+        cita.metodo_pago,
+        cita.id_tratamiento,
+    )
+
+
+class GestionResumenes:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    # ------------------------------------------------------------------
+    # Actualización incremental (la llaman los servicios antes del commit)
+    # ------------------------------------------------------------------
+
+    def aplicar_cita(self, antes, despues):
+        """
+        Actualiza los resúmenes de citas con el cambio de una cita.
+
+        Args:
+            antes: huella_cita() antes de la escritura (None si la cita es nueva)
+            despues: huella_cita() después de la escritura (None si la cita se elimina)
+        """
+        self.aplicar_citas([(antes, despues)])
+
+    def aplicar_citas(self, cambios):
+        """
+        Actualiza los resúmenes con los cambios de varias citas a la vez.
+
+        Los incrementos se suman en memoria, así que cada fila de resumen recibe un solo UPSERT
+        aunque la toquen muchas citas del lote.
+
+        Args:
+            cambios (Iterable[tuple]): Pares (huella antes, huella después) como en `aplicar_cita`
+        """
+        deltas = defaultdict(lambda: defaultdict(int))
+        precios = {}
+        for antes, despues in cambios:
+            for huella, signo in ((antes, -1), (despues, 1)):
+                if huella is None:
+                    continue
+                dia, estado, metodo_pago, id_tratamiento = huella
+                if dia and estado:
+                    deltas[("citas_dia", (dia, estado))]["total"] += signo
+                if estado == "Finalizada" and metodo_pago:
+                    if id_tratamiento not in precios:
+                        precios[id_tratamiento] = self._precio(id_tratamiento)
+                    deltas[("ingresos_metodo_pago", (metodo_pago,))]["citas"] += signo
+                    deltas[("ingresos_metodo_pago", (metodo_pago,))]["ingresos"] += signo * precios[id_tratamiento]
+
+        for (nombre, clave), incrementos in deltas.items():
+            self._sumar(nombre, clave, incrementos)
+
+    def aplicar_mascota(self, id_cliente_antes, id_cliente_despues):
+        """Actualiza mascotas por cliente cuando una mascota se crea, cambia de dueño o se elimina."""
+        if id_cliente_antes == id_cliente_despues:
+            return
+        if id_cliente_antes is not None:
+            self._sumar("mascotas_cliente", (id_cliente_antes,), {"mascotas": -1})
+        if id_cliente_despues is not None:
+            self._sumar("mascotas_cliente", (id_cliente_despues,), {"mascotas": 1})
+
+    def olvidar_cliente(self, id_cliente):
+        """Elimina el resumen de un cliente borrado (sus mascotas se quedan sin dueño)."""
+        self.db_session.execute(delete(ResumenMascotasCliente).where(ResumenMascotasCliente.id_cliente == id_cliente))
+
+    def ajustar_precio_tratamiento(self, id_tratamiento, precio_anterior, precio_nuevo):
+        """
+        Corrige los ingresos cuando cambia (o desaparece) el precio de un tratamiento.
+
+        Solo recorre las citas finalizadas de ese tratamiento a través del índice de `id_tratamiento`.
+        """
+        diferencia = (precio_nuevo or 0) - (precio_anterior or 0)
+        if not diferencia:
+            return
+        consulta = (
+            select(Cita.metodo_pago, func.count().label("citas"))
+            .where(Cita.id_tratamiento == id_tratamiento, Cita.estado == "Finalizada", Cita.metodo_pago.isnot(None))
+            .group_by(Cita.metodo_pago)
+        )
+        for fila in self.db_session.execute(consulta).all():
+            self._sumar("ingresos_metodo_pago", (fila.metodo_pago,), {"citas": 0, "ingresos": fila.citas * diferencia})
+
+    def _precio(self, id_tratamiento):
+        if id_tratamiento is None:
+            return 0
+        precio = self.db_session.execute(
+            select(Tratamiento.precio).where(Tratamiento.id_tratamiento == id_tratamiento)
+        ).scalar()
+        return precio or 0
+
+    def _sumar(self, nombre, clave, incrementos):
+        """UPSERT que suma `incrementos` a la fila `clave`; la fila se borra si su contador llega a cero."""
+        if not any(incrementos.values()):
+            return
+        modelo, columnas_clave, columnas_acumuladas = RESUMENES[nombre]
+        valores_clave = dict(zip(columnas_clave, clave))
+
+        sentencia = sqlite_insert(modelo).values(**valores_clave, **incrementos)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=list(columnas_clave),
+            set_={columna: getattr(modelo, columna) + sentencia.excluded[columna] for columna in incrementos},
+        )
+        self.db_session.execute(sentencia)
+
+        # La primera columna acumulada es el contador de registros de origen
+        contador = columnas_acumuladas[0]
+        if incrementos.get(contador, 0) < 0:
+            self.db_session.execute(
+                delete(modelo).filter_by(**valores_clave).where(getattr(modelo, contador) <= 0)
+            )
+
+    # ------------------------------------------------------------------
+    # Recalculo completo y comprobación
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _consultas_de_recalculo():
+        """SELECT que calcula cada resumen desde las tablas de origen, con las columnas en orden del modelo."""
+        dia = func.date(Cita.fecha)
+        return {
+            "citas_dia": (
+                select(dia, Cita.estado, func.count())
+                .where(Cita.fecha.isnot(None), Cita.estado.isnot(None))
+                .group_by(dia, Cita.estado)
+            ),
+            "ingresos_metodo_pago": (
+                select(Cita.metodo_pago, func.count(Cita.id_cita), func.coalesce(func.sum(func.coalesce(Tratamiento.precio, 0)), 0))
+                .outerjoin(Tratamiento, Tratamiento.id_tratamiento == Cita.id_tratamiento)
+                .where(Cita.estado == "Finalizada", Cita.metodo_pago.isnot(None))
+                .group_by(Cita.metodo_pago)
+            ),
+            "mascotas_cliente": (
+                select(Mascota.id_cliente, func.count())
+                .where(Mascota.id_cliente.isnot(None))
+                .group_by(Mascota.id_cliente)
+            ),
+        }
+
+    def reconstruir(self):
+        """
+        Vacía y recalcula todas las tablas de resumen con INSERT ... SELECT en una transacción.
+
+        Returns:
+            dict: {resumen: filas}
+        """
+        filas = {}
+        try:
+            for nombre, consulta in self._consultas_de_recalculo().items():
+                modelo, columnas_clave, columnas_acumuladas = RESUMENES[nombre]
+                self.db_session.execute(delete(modelo))
+                self.db_session.execute(
+                    modelo.__table__.insert().from_select(list(columnas_clave + columnas_acumuladas), consulta)
+                )
+                filas[nombre] = self.db_session.execute(select(func.count()).select_from(modelo)).scalar()
+            self.db_session.commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+        logging.info(f"Tablas de resumen reconstruidas: {filas}")
+        return filas
+
+    def comprobar(self):
+        """
+        Compara cada tabla de resumen con un recálculo completo sin modificar nada.
+
+        Returns:
+            dict: {resumen: [{"clave", "esperado", "actual"}]}; listas vacías si todo cuadra
+        """
+        diferencias = {}
+        for nombre, consulta in self._consultas_de_recalculo().items():
+            modelo, columnas_clave, columnas_acumuladas = RESUMENES[nombre]
+            n = len(columnas_clave)
+            esperado = {tuple(fila[:n]): tuple(fila[n:]) for fila in self.db_session.execute(consulta)}
+            actual = {
+                tuple(fila[:n]): tuple(fila[n:])
+                for fila in self.db_session.execute(
+                    select(*(getattr(modelo, c) for c in columnas_clave + columnas_acumuladas))
+                )
+            }
+            diferencias[nombre] = [
+                {"clave": list(clave), "esperado": esperado.get(clave), "actual": actual.get(clave)}
+                for clave in sorted(set(esperado) | set(actual), key=repr)
+                if esperado.get(clave) != actual.get(clave)
+            ]
+        return diferencias
+
+
+def main():
+    from clinica.dbconfig import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reconstruir", action="store_true", help="Recalcula las tablas de resumen desde cero")
+    parser.add_argument("--comprobar", action="store_true", help="Compara los resúmenes con un recálculo (por defecto)")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        gestion = GestionResumenes(session)
+        if args.reconstruir:
+            for nombre, filas in gestion.reconstruir().items():
+                print(f"{nombre}: {filas} filas")
+        if args.comprobar or not args.reconstruir:
+            diferencias = gestion.comprobar()
+            for nombre, lista in diferencias.items():
+                print(f"{nombre}: {'OK' if not lista else f'{len(lista)} diferencias'}")
+                for diferencia in lista[:20]:
+                    print(f"  {diferencia['clave']}: esperado {diferencia['esperado']}, actual {diferencia['actual']}")
+            if any(diferencias.values()):
+                raise SystemExit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# gestion_series.py
+"""
+Series de citas recurrentes (tratamientos crónicos con citas semanales o mensuales).
+
+Una serie guarda una regla de recurrencia y los datos comunes de sus citas. Sus ocurrencias no se
+guardan: se calculan al pedir una ventana, por lotes y con un generador, y para cada lote se
+comprueba la disponibilidad con una sola consulta por rango sobre `cita`. Solo las ocurrencias
+que se confirman se convierten en citas, con el alta por lotes de GestionCitas.
+"""
+
+import logging
+from itertools import islice
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from clinica.models import OcurrenciaSerie, SerieCita
+from clinica.services.gestion_de_citas import ERROR_LOTE_ATOMICO, MAX_CITAS_LOTE, GestionCitas
+from clinica.utils.agenda_citas import DURACION_CITA, agendas_citas
+from clinica.utils.helper_functions import fecha_sin_zona
+from clinica.utils.recurrencia import construir_regla, iterar_ocurrencias, normalizar_regla, validar_ventana
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CAMPOS_SERIE = ('regla', 'inicio', 'descripcion', 'id_mascota', 'id_cliente', 'id_tratamiento')
+
+# Ocurrencias que se comprueban juntas con una consulta sobre `cita`
+TAMANO_LOTE_OCURRENCIAS = 100
+
+# Estado de las citas que se crean al confirmar ocurrencias
+ESTADO_CITA_SERIE = "Pendiente"
+
+
+class GestionSeries:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def crear_serie(self, serie_data):
+        """
+        Registra una serie de citas. No crea ninguna cita: se crean al confirmar sus ocurrencias.
+
+        Args:
+            serie_data (dict): regla, inicio (primera ocurrencia), descripcion, id_mascota, id_cliente, id_tratamiento
+
+        Raises:
+            ValueError: Si falta algún campo, la regla no es válida o tiene demasiadas citas
+            RuntimeError: Si falla la base de datos
+        """
+        for campo in CAMPOS_SERIE:
+            if serie_data.get(campo) is None:
+                raise ValueError(f"El campo '{campo}' es obligatorio para crear una serie de citas.")
+        datos = {campo: serie_data[campo] for campo in CAMPOS_SERIE}
+        datos['regla'] = normalizar_regla(datos['regla'])
+        datos['inicio'] = fecha_sin_zona(datos['inicio'])
+        construir_regla(datos['regla'], datos['inicio'])
+
+        try:
+            serie = SerieCita(**datos)
+            self.db_session.add(serie)
+            self.db_session.commit()
+            self.db_session.refresh(serie)
+            logging.info(f"Serie de citas {serie.id_serie} creada para la mascota ID {serie.id_mascota} ({serie.regla}).")
+            return serie
+
+        except IntegrityError as ie:
+            self.db_session.rollback()
+            logging.error("Error de integridad al crear la serie de citas: %s", ie)
+            raise ValueError("Error: No se pudo crear la serie debido a un problema de integridad.")
+
+        except SQLAlchemyError as sae:
+            self.db_session.rollback()
+            logging.error("Error de SQLAlchemy al crear la serie de citas: %s", sae)
+            raise RuntimeError(f"Error: Ocurrió un problema con la base de datos: {sae}")
+
+    def buscar_serie_por_id(self, id_serie):
+        """Busca una serie por su ID; None si no existe."""
+        try:
+            return self.db_session.get(SerieCita, id_serie)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar la serie de citas: %s", sae)
+            return None
+
+    def _confirmadas(self, id_serie, primera, ultima):
+        """{ocurrencia: id_cita} de las ocurrencias de la serie ya confirmadas entre `primera` y `ultima`."""
+        consulta = select(OcurrenciaSerie.ocurrencia, OcurrenciaSerie.id_cita).where(
+            OcurrenciaSerie.id_serie == id_serie,
+            OcurrenciaSerie.ocurrencia >= primera,
+            OcurrenciaSerie.ocurrencia <= ultima,
+        )
+        return {fila.ocurrencia: fila.id_cita for fila in self.db_session.execute(consulta)}
+
+    def _ocupados(self, id_mascota, primera, ultima):
+        """
+        AgendaCitas con las citas que pueden solaparse con una cita de la mascota entre `primera` y
+        `ultima`: las de la mascota y las de su consulta. Es una sola consulta por rango de fechas.
+        """
+        return agendas_citas.ocupados(self.db_session, primera, ultima, id_mascota)
+
+    def _expandir(self, serie, desde, hasta, tamano_lote):
+        fechas = iterar_ocurrencias(serie.regla, serie.inicio, desde, hasta)
+        while True:
+            lote = list(islice(fechas, tamano_lote))
+            if not lote:
+                return
+            confirmadas = self._confirmadas(serie.id_serie, lote[0], lote[-1])
+            ocupados = self._ocupados(serie.id_mascota, lote[0], lote[-1])
+            for fecha in lote:
+                id_cita = confirmadas.get(fecha)
+                conflictos = []
+                if id_cita is None:
+                    solapes = ocupados.conflictos(fecha, serie.id_mascota)
+                    conflictos = sorted(set(solapes["consulta"]) | set(solapes["mascota"]))
+                yield {
+                    "fecha": fecha,
+                    "fin": fecha + DURACION_CITA,
+                    "estado": "confirmada" if id_cita is not None else ("ocupada" if conflictos else "libre"),
+                    "id_cita": id_cita,
+                    "conflictos": conflictos,
+                }
+
+    def ocurrencias(self, id_serie, desde, hasta, tamano_lote=TAMANO_LOTE_OCURRENCIAS):
+        """
+        Ocurrencias de la serie en [desde, hasta), calculadas de forma perezosa.
+
+        Cada ocurrencia es {"fecha", "fin", "estado", "id_cita", "conflictos"}, con estado
+        "confirmada" (ya es la cita `id_cita`), "libre" u "ocupada" (se solaparía con `conflictos`).
+
+        Returns:
+            Iterator[dict] | None: Generador de ocurrencias, o None si la serie no existe
+
+        Raises:
+            ValueError: Si la ventana no es válida
+        """
+        desde, hasta = fecha_sin_zona(desde), fecha_sin_zona(hasta)
+        validar_ventana(desde, hasta)
+        serie = self.buscar_serie_por_id(id_serie)
+        if serie is None:
+            return None
+        return self._expandir(serie, desde, hasta, tamano_lote)
+
+    def confirmar_ocurrencias(self, id_serie, fechas, atomico=False):
+        """
+        Crea las citas de las ocurrencias indicadas, en una sola transacción.
+
+        Cada fecha tiene que ser una ocurrencia de la serie que aún no se haya confirmado. Las citas
+        pasan por las mismas comprobaciones de duplicados y solapes que el alta por lotes.
+
+        Args:
+            id_serie (int): Serie
+            fechas (list[datetime]): Ocurrencias a confirmar
+            atomico (bool): Si alguna ocurrencia no se puede confirmar no se confirma ninguna
+
+        Returns:
+            list[dict] | None: Un resultado por fecha {"indice", "ok", "id_cita", "error"}, o None si
+            la serie no existe
+
+        Raises:
+            ValueError: Si no hay fechas, son demasiadas o abarcan una ventana demasiado larga
+            RuntimeError: Si falla la escritura
+        """
+        if not fechas:
+            raise ValueError("No se ha indicado ninguna ocurrencia.")
+        if len(fechas) > MAX_CITAS_LOTE:
+            raise ValueError(f"Se pueden confirmar como mucho {MAX_CITAS_LOTE} ocurrencias a la vez.")
+        serie = self.buscar_serie_por_id(id_serie)
+        if serie is None:
+            return None
+
+        fechas = [fecha_sin_zona(fecha) for fecha in fechas]
+        primera, ultima = min(fechas), max(fechas)
+        validar_ventana(primera, ultima + DURACION_CITA)
+        try:
+            validas = set(iterar_ocurrencias(serie.regla, serie.inicio, primera, ultima + DURACION_CITA))
+            confirmadas = self._confirmadas(serie.id_serie, primera, ultima)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al confirmar ocurrencias de la serie: %s", sae)
+            raise RuntimeError(f"Error al confirmar las ocurrencias: {sae}")
+
+        resultados = [{"indice": indice, "ok": False, "id_cita": None, "error": None} for indice in range(len(fechas))]
+        pendientes = {}  # posición en el lote de citas -> índice en `fechas`
+        vistas = set()
+        for indice, fecha in enumerate(fechas):
+            if fecha not in validas:
+                resultados[indice]["error"] = "La fecha no es una ocurrencia de la serie."
+            elif fecha in confirmadas:
+                resultados[indice].update(id_cita=confirmadas[fecha],
+                                          error=f"La ocurrencia ya está confirmada (cita {confirmadas[fecha]}).")
+            elif fecha in vistas:
+                resultados[indice]["error"] = "La ocurrencia está repetida en la petición."
+            else:
+                vistas.add(fecha)
+                pendientes[len(pendientes)] = indice
+
+        if not pendientes or (atomico and len(pendientes) < len(fechas)):
+            for indice in pendientes.values():
+                resultados[indice]["error"] = ERROR_LOTE_ATOMICO
+            return resultados
+
+        citas_data = [{
+            "fecha": fechas[indice],
+            "descripcion": serie.descripcion,
+            "estado": ESTADO_CITA_SERIE,
+            "id_mascota": serie.id_mascota,
+            "id_cliente": serie.id_cliente,
+            "id_tratamiento": serie.id_tratamiento,
+        } for indice in pendientes.values()]
+
+        def enlazar(nuevas):
+            self.db_session.add_all(OcurrenciaSerie(id_cita=cita.id_cita, id_serie=serie.id_serie, ocurrencia=cita.fecha)
+                                    for cita in nuevas.values())
+
+        registradas = GestionCitas(self.db_session).registrar_citas_lote(citas_data, atomico=atomico, al_guardar=enlazar)
+        for resultado in registradas:
+            indice = pendientes[resultado["indice"]]
+            resultados[indice].update(ok=resultado["ok"], id_cita=resultado["id_cita"], error=resultado["error"])
+
+        logging.info(f"Serie {id_serie}: {sum(1 for r in resultados if r['ok'])} de {len(fechas)} ocurrencias confirmadas.")
+        return resultados
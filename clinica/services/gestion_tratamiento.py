@@ -1,10 +1,17 @@
 # gestion_tratamiento.py
 
 import os
-import json
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from clinica.models import Tratamiento,Cita,Cliente,Mascota
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from clinica.services.gestion_resumenes import GestionResumenes
+from clinica.services.opciones_carga import buscar_por_ids, buscar_por_ids_async, opciones_carga
+from clinica.utils.cache_entidades import cache_entidades
+from clinica.utils.diario_cambios import diario_cambios
+from clinica.utils.exportacion import exportar_consulta_json
+from clinica.utils.helper_functions import TAMANO_LOTE_STREAMING, iterar_lotes_async
+from clinica.utils.versiones_tablas import versiones_tablas
 import logging
 
 # Configurar logging
@@ -14,23 +21,14 @@ class GestionTratamientos:
     def __init__(self, db_session: Session):
         self.db_session = db_session
 
-    def exportar_tratamientos_a_json(self, ruta_json=None):
-        """Exporta los tratamientos a un archivo JSON."""
+    def exportar_tratamientos_a_json(self, ruta_json=None, formato="json"):
+        """Exporta los tratamientos a un archivo JSON (o NDJSON) escribiendo de forma incremental."""
         if ruta_json is None:
             ruta_json = os.path.join(os.getcwd(), 'clinica/data/tabla_tratamientos.json')
 
-        # Verifica que el directorio exista y créalo si no existe
-        directorio = os.path.dirname(ruta_json)
-        if not os.path.exists(directorio):
-            os.makedirs(directorio)
-        
         try:
-            tratamientos = self.db_session.query(Tratamiento).all()
-            datos = [tratamiento.to_dict() for tratamiento in tratamientos]  # Asegúrate de que `to_dict()` esté implementado en `Tratamiento`
-            
-            with open(ruta_json, 'w', encoding='utf-8') as archivo:
-                json.dump(datos, archivo, ensure_ascii=False, indent=4)
-            logging.info(f"Tratamientos exportados a {ruta_json} exitosamente.")
+            resumen = exportar_consulta_json(self.db_session.query(Tratamiento), ruta_json, formato=formato)
+            logging.info(f"Tratamientos exportados a {ruta_json} exitosamente ({resumen['registros']} registros, {resumen['bytes']} bytes).")
             return f"Tratamientos exportados a {ruta_json} exitosamente."
         except SQLAlchemyError as e:
             logging.error(f"Error al exportar tratamientos a JSON: {e}")
@@ -50,8 +48,13 @@ class GestionTratamientos:
             # Crear una nueva instancia de tratamiento y agregarla a la base de datos
             nuevo_tratamiento = Tratamiento(**tratamiento_data)
             self.db_session.add(nuevo_tratamiento)
+            self.db_session.flush()
+            # Citas antiguas que apunten a este ID pasan a sumar su precio en los ingresos
+            GestionResumenes(self.db_session).ajustar_precio_tratamiento(nuevo_tratamiento.id_tratamiento, None, nuevo_tratamiento.precio)
             self.db_session.commit()
             self.db_session.refresh(nuevo_tratamiento)  # Actualiza el objeto para que los datos sean accesibles
+            diario_cambios.registrar("tratamiento", "upsert", nuevo_tratamiento.id_tratamiento, nuevo_tratamiento.to_dict())
+            versiones_tablas.incrementar("tratamiento")
             
             logging.info(f"Tratamiento '{tratamiento_data['nombre_tratamiento']}' dado de alta con éxito.")
             
@@ -73,8 +76,14 @@ class GestionTratamientos:
         try:
             tratamiento = self.db_session.query(Tratamiento).filter_by(nombre_tratamiento=nombre_tratamiento).first()
             if tratamiento:
+                id_tratamiento = tratamiento.id_tratamiento
+                GestionResumenes(self.db_session).ajustar_precio_tratamiento(id_tratamiento, tratamiento.precio, None)
                 self.db_session.delete(tratamiento)
                 self.db_session.commit()
+                diario_cambios.registrar("tratamiento", "delete", id_tratamiento)
+                versiones_tablas.incrementar("tratamiento", "cita")
+                cache_entidades.invalidar("tratamiento", id_tratamiento)
+                cache_entidades.invalidar("cita")
                 logging.info(f"Tratamiento '{nombre_tratamiento}' dado de baja con éxito.")
                 return f"Tratamiento '{nombre_tratamiento}' dado de baja con éxito."
             else:
@@ -95,12 +104,17 @@ class GestionTratamientos:
         try:
             tratamiento = self.db_session.query(Tratamiento).filter_by(id_tratamiento=id_tratamiento).first()
             if tratamiento:
+                precio_anterior = tratamiento.precio
                 # Actualizar los atributos del tratamiento con los nuevos datos
                 for key, value in nuevos_datos.items():
                     if hasattr(tratamiento, key):
                         setattr(tratamiento, key, value)
                 
+                GestionResumenes(self.db_session).ajustar_precio_tratamiento(id_tratamiento, precio_anterior, tratamiento.precio)
                 self.db_session.commit()
+                diario_cambios.registrar("tratamiento", "upsert", tratamiento.id_tratamiento, tratamiento.to_dict())
+                versiones_tablas.incrementar("tratamiento")
+                cache_entidades.invalidar("tratamiento", tratamiento.id_tratamiento)
                 logging.info(f"Tratamiento con ID '{id_tratamiento}' modificado con éxito.")
                 return f"Tratamiento con ID '{id_tratamiento}' modificado con éxito."
             else:
@@ -117,10 +131,19 @@ class GestionTratamientos:
             logging.critical("Error inesperado al modificar el tratamiento: %s", e)
             return f"Ocurrió un error inesperado al modificar el tratamiento: {e}"
             
-    def listar_tratamientos(self):
-        """Devuelve una lista de todos los tratamientos en la base de datos."""
+    def listar_tratamientos(self, include=()):
+        """
+        Devuelve una lista de todos los tratamientos en la base de datos.
+
+        Args:
+            include (Iterable[str] | str): Relaciones a cargar por adelantado (cliente, citas)
+
+        Raises:
+            ValueError: Si se pide una relación que no existe
+        """
+        opciones = opciones_carga(Tratamiento, include)
         try:
-            tratamientos = self.db_session.query(Tratamiento).all()
+            tratamientos = self.db_session.query(Tratamiento).options(*opciones).all()
             logging.info("Listado de tratamientos obtenido con éxito.")
             return tratamientos
 
@@ -132,6 +155,65 @@ class GestionTratamientos:
             logging.critical("Error inesperado al listar los tratamientos: %s", e)
             return []
 
+    @staticmethod
+    def _condiciones_listado(estado=None):
+        """Filtros de los listados: estado del tratamiento."""
+        condiciones = []
+        if estado:
+            condiciones.append(Tratamiento.estado == estado)
+        return condiciones
+
+    async def listar_tratamientos_async(self, include=(), estado=None):
+        """Variante asíncrona de `listar_tratamientos` con filtros opcionales; requiere una AsyncSession."""
+        opciones = opciones_carga(Tratamiento, include)
+        consulta = select(Tratamiento).options(*opciones).where(*self._condiciones_listado(estado))
+        try:
+            resultado = await self.db_session.execute(consulta)
+            tratamientos = resultado.scalars().all()
+            logging.info("Listado de tratamientos obtenido con éxito.")
+            return tratamientos
+
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al listar los tratamientos: %s", sae)
+            return []
+
+        except Exception as e:
+            logging.critical("Error inesperado al listar los tratamientos: %s", e)
+            return []
+
+    async def listar_tratamientos_filas_async(self, estado=None):
+        """
+        Listado de tratamientos como filas de columnas (SELECT de Core, sin objetos ORM).
+
+        Lo usa la ruta rápida de la API para los listados sin relaciones; requiere una AsyncSession.
+
+        Returns:
+            list[RowMapping]: Una fila por tratamiento con sus columnas por nombre
+        """
+        try:
+            consulta = select(*Tratamiento.__table__.columns).where(*self._condiciones_listado(estado))
+            resultado = await self.db_session.execute(consulta)
+            filas = resultado.mappings().all()
+            logging.info("Listado de tratamientos obtenido con éxito.")
+            return filas
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al listar los tratamientos: %s", sae)
+            return []
+
+    def iterar_tratamientos_async(self, estado=None, tamano_lote=TAMANO_LOTE_STREAMING):
+        """
+        Recorre los tratamientos en lotes de filas de columnas, ordenados por ID.
+
+        Para los listados NDJSON / CSV: la memoria no depende del tamaño de la tabla.
+
+        Returns:
+            AsyncIterator[list[RowMapping]]
+        """
+        consulta = (select(*Tratamiento.__table__.columns)
+                    .where(*self._condiciones_listado(estado))
+                    .order_by(Tratamiento.id_tratamiento))
+        return iterar_lotes_async(self.db_session, consulta, tamano_lote)
+
     def obtener_datos_factura(self, id_tratamiento: int):
         """
         Recupera la información completa para generar la factura de un tratamiento.
@@ -208,3 +290,49 @@ class GestionTratamientos:
         except Exception as e:
             logging.error(f"Error al buscar tratamiento por ID: {e}")
             return None
+
+    async def buscar_tratamiento_por_id_async(self, id_tratamiento: int):
+        """Variante asíncrona de `buscar_tratamiento_por_id`; requiere una AsyncSession."""
+        try:
+            return await self.db_session.get(Tratamiento, id_tratamiento)
+        except Exception as e:
+            logging.error(f"Error al buscar tratamiento por ID: {e}")
+            return None
+
+    def obtener_tratamiento_serializado(self, id_tratamiento: int):
+        """
+        Devuelve el tratamiento como diccionario (to_dict()) pasando por la caché de entidades.
+
+        Returns:
+            dict | None: None si el tratamiento no existe
+        """
+        def cargar():
+            tratamiento = self.buscar_tratamiento_por_id(id_tratamiento)
+            return tratamiento.to_dict() if tratamiento else None
+        return cache_entidades.obtener("tratamiento", id_tratamiento, cargar)
+
+    async def obtener_tratamiento_serializado_async(self, id_tratamiento: int):
+        """Variante asíncrona de `obtener_tratamiento_serializado`; requiere una AsyncSession."""
+        async def cargar():
+            tratamiento = await self.buscar_tratamiento_por_id_async(id_tratamiento)
+            return tratamiento.to_dict() if tratamiento else None
+        return await cache_entidades.obtener_async("tratamiento", id_tratamiento, cargar)
+
+    def buscar_tratamientos_por_ids(self, ids, include=()):
+        """
+        Tratamientos con esos IDs, en el orden de `ids`, con una consulta IN (...) por bloque (ver
+        opciones_carga.buscar_por_ids). `include` admite: cliente, citas.
+        """
+        try:
+            return buscar_por_ids(self.db_session, Tratamiento, Tratamiento.id_tratamiento, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar tratamientos por IDs: %s", sae)
+            return []
+
+    async def buscar_tratamientos_por_ids_async(self, ids, include=()):
+        """Variante asíncrona de `buscar_tratamientos_por_ids`; requiere una AsyncSession."""
+        try:
+            return await buscar_por_ids_async(self.db_session, Tratamiento, Tratamiento.id_tratamiento, ids, include)
+        except SQLAlchemyError as sae:
+            logging.error("Error de SQLAlchemy al buscar tratamientos por IDs: %s", sae)
+            return []
@@ -0,0 +1,133 @@
+# opciones_carga.py
+"""
+Opciones de carga de relaciones para las consultas de los servicios.
+
+Las relaciones de los modelos son perezosas: acceder a `cliente.mascotas` dentro de un bucle lanza
+una consulta por fila. Los servicios piden por adelantado las relaciones que van a usar, ya sea
+con un preset por caso de uso o con la lista `include` de los endpoints de listado, de modo que
+cada operación ejecuta un número de sentencias que no depende del número de filas.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica.utils.helper_functions import parsear_ids, trocear
+
+# Relaciones que se pueden incluir en cada modelo
+RELACIONES = {
+    Cliente: {"mascotas": Cliente.mascotas, "citas": Cliente.citas, "tratamientos": Cliente.tratamientos},
+    Mascota: {"cliente": Mascota.cliente, "citas": Mascota.citas},
+    Tratamiento: {"cliente": Tratamiento.cliente, "citas": Tratamiento.citas},
+    Cita: {"cliente": Cita.cliente, "mascota": Cita.mascota, "tratamiento": Cita.tratamiento},
+}
+
+# Relaciones que necesita cada caso de uso de los servicios
+PRESETS = {
+    "cliente_con_mascotas": (Cliente, ("mascotas",)),
+    "mascota_con_cliente": (Mascota, ("cliente",)),
+}
+
+
+def parsear_include(include):
+    """Normaliza `include` ("a,b", lista o None) a una tupla de nombres sin repetidos."""
+    if not include:
+        return ()
+    if isinstance(include, str):
+        include = include.split(",")
+    return tuple(dict.fromkeys(nombre.strip() for nombre in include if nombre and nombre.strip()))
+
+
+def opciones_carga(modelo, include=()):
+    """
+    Devuelve las opciones de carga para incluir las relaciones pedidas de `modelo`.
+
+    Las colecciones se cargan con selectinload (una consulta IN adicional por relación) y las
+    relaciones a uno con joinedload (en el mismo SELECT).
+
+    Raises:
+        ValueError: Si alguna relación no existe para el modelo
+    """
+    include = parsear_include(include)
+    disponibles = RELACIONES[modelo]
+    desconocidas = [nombre for nombre in include if nombre not in disponibles]
+    if desconocidas:
+        raise ValueError(f"Relaciones no válidas para {modelo.__tablename__}: {', '.join(desconocidas)}. "
+                         f"Disponibles: {', '.join(disponibles)}.")
+
+    opciones = []
+    for nombre in include:
+        relacion = disponibles[nombre]
+        opciones.append(selectinload(relacion) if relacion.property.uselist else joinedload(relacion))
+    return opciones
+
+
+def preset(nombre):
+    """Opciones de carga del preset `nombre` (ver PRESETS)."""
+    modelo, include = PRESETS[nombre]
+    return opciones_carga(modelo, include)
+
+
+def _consultas_por_ids(modelo, columna_pk, ids, include):
+    """IDs normalizados y un SELECT ... WHERE pk IN (...) por cada bloque de IDs."""
+    ids = parsear_ids(ids)
+    opciones = opciones_carga(modelo, include)
+    return ids, [select(modelo).options(*opciones).where(columna_pk.in_(lote)) for lote in trocear(ids)]
+
+
+def _en_orden(ids, objetos, columna_pk):
+    encontrados = {getattr(objeto, columna_pk.key): objeto for objeto in objetos}
+    return [encontrados[id_] for id_ in ids if id_ in encontrados]
+
+
+def buscar_por_ids(session, modelo, columna_pk, ids, include=()):
+    """
+    Busca varios registros de `modelo` por clave primaria con una consulta IN (...) por bloque de IDs.
+
+    Args:
+        session (Session): Sesión de la base de datos
+        modelo: Modelo a consultar
+        columna_pk: Columna de la clave primaria (p. ej. Cliente.id_cliente)
+        ids (Iterable[int] | str): IDs a buscar ("1,2,3" o lista); los repetidos se ignoran
+        include (Iterable[str] | str): Relaciones a cargar por adelantado (ver RELACIONES)
+
+    Returns:
+        list: Registros encontrados en el orden de `ids`; los IDs inexistentes se omiten
+
+    Raises:
+        ValueError: Si algún ID no es un entero o se pide una relación que no existe
+        SQLAlchemyError: Si falla la consulta
+    """
+    ids, consultas = _consultas_por_ids(modelo, columna_pk, ids, include)
+    objetos = [objeto for consulta in consultas for objeto in session.execute(consulta).unique().scalars()]
+    return _en_orden(ids, objetos, columna_pk)
+
+
+async def buscar_por_ids_async(session, modelo, columna_pk, ids, include=()):
+    """Variante asíncrona de `buscar_por_ids`; requiere una AsyncSession."""
+    ids, consultas = _consultas_por_ids(modelo, columna_pk, ids, include)
+    objetos = []
+    for consulta in consultas:
+        objetos.extend((await session.execute(consulta)).unique().scalars())
+    return _en_orden(ids, objetos, columna_pk)
+
+
+def serializar(objeto, include=()):
+    """to_dict() del objeto con las relaciones de `include` (ya cargadas) embebidas."""
+    datos = objeto.to_dict()
+    for nombre in parsear_include(include):
+        relacionado = getattr(objeto, nombre)
+        if isinstance(relacionado, list):
+            datos[nombre] = [elemento.to_dict() for elemento in relacionado]
+        else:
+            datos[nombre] = relacionado.to_dict() if relacionado is not None else None
+    return datos
+
+
+def tablas_consultadas(modelo, include=()):
+    """Tablas que lee un listado de `modelo` con las relaciones de `include` (para su ETag)."""
+    disponibles = RELACIONES[modelo]
+    tablas = [modelo.__tablename__]
+    for nombre in parsear_include(include):
+        if nombre in disponibles:
+            tablas.append(disponibles[nombre].property.mapper.class_.__tablename__)
+    return tablas
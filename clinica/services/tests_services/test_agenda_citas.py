@@ -0,0 +1,169 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica.services.gestion_de_citas import GestionCitas
+from clinica.utils.agenda_citas import AgendaCitas, AgendasCitas, CitaSolapadaError, agendas_citas
+
+
+class TestAgendaCitas(unittest.TestCase):
+    """Índice en memoria de huecos ocupados y comprobación de solapes al reservar."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add(Cliente(id_cliente=1, nombre_cliente="Ana López", dni="12345678Z", telefono="600000001"))
+        # Las mascotas 1 y 4 comparten la consulta_1; la 2 va a la consulta_2
+        for id_mascota in (1, 2, 4):
+            self.session.add(Mascota(id_mascota=id_mascota, nombre_mascota=f"Mascota {id_mascota}", id_cliente=1))
+        self.session.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", descripcion="Rabia", precio=50,
+                                     estado="Activo", id_cliente=1))
+        self.session.add(Cita(id_cita=1, fecha=datetime(2024, 11, 11, 10, 0), descripcion="Revisión",
+                              estado="Pendiente", id_mascota=1, id_cliente=1, id_tratamiento=1))
+        self.session.commit()
+        self.gestion = GestionCitas(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _registrar(self, fecha, id_mascota):
+        return self.gestion.registrar_cita({
+            "fecha": fecha, "descripcion": "Consulta", "estado": "Pendiente",
+            "id_mascota": id_mascota, "id_cliente": 1, "id_tratamiento": 1,
+        })
+
+    def test_solapes_y_huecos(self):
+        agenda = AgendaCitas()
+        agenda.cargar([(1, datetime(2024, 11, 11, 10, 0), 1, "Pendiente"),
+                       (2, datetime(2024, 11, 11, 11, 0), 2, "Pendiente"),
+                       (3, datetime(2024, 11, 11, 12, 0), 4, "Cancelada")])
+
+        self.assertEqual(agenda.conflictos(datetime(2024, 11, 11, 10, 30), 4), {"consulta": [1], "mascota": []})
+        self.assertEqual(agenda.conflictos(datetime(2024, 11, 11, 9, 30), 1), {"consulta": [1], "mascota": [1]})
+        # Las citas son de una hora: a las 11:00 la consulta vuelve a estar libre
+        self.assertEqual(agenda.conflictos(datetime(2024, 11, 11, 11, 0), 1), {"consulta": [], "mascota": []})
+        self.assertEqual(agenda.conflictos(datetime(2024, 11, 11, 10, 0), 1, excluir=1), {"consulta": [], "mascota": []})
+
+        huecos = agenda.huecos_libres(datetime(2024, 11, 11, 9, 10), 3, id_mascota=4)
+        self.assertEqual([h["inicio"].strftime("%H:%M") for h in huecos], ["11:00", "11:30", "12:00"])
+        self.assertEqual({h["recurso"] for h in huecos}, {"consulta_1"})
+
+        # Sin mascota vale cualquier consulta; después del cierre se pasa al día siguiente
+        huecos = agenda.huecos_libres(datetime(2024, 11, 11, 19, 0), 2)
+        self.assertEqual([(h["inicio"], h["recurso"]) for h in huecos],
+                         [(datetime(2024, 11, 11, 19, 0), "consulta_0"), (datetime(2024, 11, 12, 8, 0), "consulta_0")])
+
+        agenda.actualizar(1, datetime(2024, 11, 11, 10, 0), 1, "Cancelada")
+        self.assertEqual(agenda.conflictos(datetime(2024, 11, 11, 10, 0), 4), {"consulta": [], "mascota": []})
+
+    def test_registrar_y_modificar_rechazan_solapes(self):
+        with self.assertRaises(ValueError) as contexto:
+            self._registrar(datetime(2024, 11, 11, 10, 30), 4)
+        self.assertIn("consulta_1", str(contexto.exception))
+        with self.assertRaises(ValueError):
+            self._registrar(datetime(2024, 11, 11, 9, 30), 1)
+
+        self._registrar(datetime(2024, 11, 11, 10, 30), 2)
+        cita = self._registrar(datetime(2024, 11, 11, 11, 0), 4)
+        with self.assertRaises(ValueError):
+            self.gestion.modificar_cita(cita.id_cita, {"fecha": datetime(2024, 11, 11, 10, 30)})
+        self.assertEqual(self.session.get(Cita, cita.id_cita).fecha, datetime(2024, 11, 11, 11, 0))
+
+        # Moverse dentro de su propio hueco y liberar un hueco cancelando
+        self.gestion.modificar_cita(1, {"fecha": datetime(2024, 11, 11, 9, 45)})
+        self.gestion.cancelar_cita(1)
+        self._registrar(datetime(2024, 11, 11, 9, 30), 4)
+        self.assertEqual(self.gestion.citas_solapadas(datetime(2024, 11, 11, 10, 0), 1), [4])
+
+    def test_indice_desfasado_se_reconstruye(self):
+        agendas_citas.de(self.session)
+        # Un borrado que no pasa por los servicios deja el índice desfasado
+        self.session.delete(self.session.get(Cita, 1))
+        self.session.commit()
+
+        self._registrar(datetime(2024, 11, 11, 10, 0), 1)
+        self.assertEqual(len(agendas_citas.de(self.session).conflictos(datetime(2024, 11, 11, 10, 0), 1)["mascota"]), 1)
+
+    def test_cita_que_el_indice_no_ve_se_comprueba_en_la_tabla(self):
+        agendas_citas.de(self.session)
+        # Un alta de otro worker: este proceso no la ve en su índice
+        self.session.add(Cita(id_cita=2, fecha=datetime(2024, 11, 11, 12, 0), descripcion="Otro worker",
+                              estado="Pendiente", id_mascota=4, id_cliente=1, id_tratamiento=1))
+        self.session.commit()
+
+        with self.assertRaises(CitaSolapadaError):
+            self._registrar(datetime(2024, 11, 11, 12, 30), 1)
+        # Y queda corregida en el índice para los huecos libres
+        self.assertEqual(agendas_citas.de(self.session).conflictos(datetime(2024, 11, 11, 12, 30), 1)["consulta"], [2])
+
+    def test_finalizar_una_cita_cancelada_comprueba_su_hueco(self):
+        self.gestion.cancelar_cita(1)
+        self._registrar(datetime(2024, 11, 11, 10, 30), 4)
+
+        with self.assertRaises(CitaSolapadaError):
+            self.gestion.finalizar_cita(1, "Tarjeta")
+        self.assertEqual(self.session.get(Cita, 1).estado, "Cancelada")
+
+    def test_reservas_simultaneas_del_mismo_hueco(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        engine = create_engine(f"sqlite:///{os.path.join(directorio.name, 'agenda.db')}",
+                               connect_args={"check_same_thread": False})
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        Sesiones = sessionmaker(bind=engine)
+        with Sesiones() as session:
+            session.add(Cliente(id_cliente=1, nombre_cliente="Ana López", dni="12345678Z", telefono="600000001"))
+            session.add(Mascota(id_mascota=1, nombre_mascota="Luna", id_cliente=1))
+            session.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", descripcion="Rabia", precio=50,
+                                    estado="Activo", id_cliente=1))
+            session.commit()
+
+        # Cada reserva espera a la otra justo después de comprobar el hueco: sin el cerrojo de
+        # escritura las dos lo verían libre y se guardarían las dos
+        barrera = threading.Barrier(2, timeout=0.5)
+        conflictos_original = AgendasCitas.conflictos
+
+        def conflictos_y_esperar(agendas, *args, **kwargs):
+            conflictos = conflictos_original(agendas, *args, **kwargs)
+            try:
+                barrera.wait()
+            except threading.BrokenBarrierError:
+                pass
+            return conflictos
+
+        resultados = []
+
+        def reservar():
+            with Sesiones() as session:
+                try:
+                    GestionCitas(session).registrar_cita({
+                        "fecha": datetime(2024, 11, 11, 10, 0), "descripcion": f"Reserva {threading.get_ident()}",
+                        "estado": "Pendiente", "id_mascota": 1, "id_cliente": 1, "id_tratamiento": 1,
+                    })
+                    resultados.append("ok")
+                except CitaSolapadaError:
+                    resultados.append("solapada")
+
+        with patch.object(AgendasCitas, "conflictos", conflictos_y_esperar):
+            hilos = [threading.Thread(target=reservar) for _ in range(2)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+        self.assertEqual(sorted(resultados), ["ok", "solapada"])
+        with Sesiones() as session:
+            self.assertEqual(session.query(Cita).count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
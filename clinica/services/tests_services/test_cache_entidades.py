@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cita, Cliente, Mascota
+from clinica.services.gestion_clientes import GestionClientes
+from clinica.services.gestion_mascotas import GestionMascotas
+from clinica.utils.cache_entidades import BackendCache, BackendMemoria, BackendRedis, CacheEntidades, cache_entidades
+
+
+class RedisEnMemoria:
+    """Cliente mínimo con la interfaz de redis-py que usa BackendRedis."""
+
+    def __init__(self):
+        self.datos = {}
+        self.hilos = set()
+
+    def get(self, clave):
+        self.hilos.add(threading.get_ident())
+        return self.datos.get(clave)
+
+    def set(self, clave, valor, ex=None):
+        self.datos[clave] = valor.encode()
+
+    def delete(self, *claves):
+        for clave in claves:
+            self.datos.pop(clave, None)
+
+    def incr(self, clave):
+        self.datos[clave] = str(int(self.datos.get(clave, 0)) + 1).encode()
+        return int(self.datos[clave])
+
+    def scan_iter(self, patron):
+        return [c for c in self.datos if c.startswith(patron.rstrip("*"))]
+
+
+class TestCacheEntidades(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([
+            Cliente(id_cliente=1, nombre_cliente="Ana", edad=34, dni="00000001R", telefono="600000001"),
+            Mascota(id_mascota=1, nombre_mascota="Luna", raza="Beagle", edad=2, estado="Vivo", id_cliente=1),
+            Cita(id_cita=1, descripcion="Consulta", estado="Pendiente", id_mascota=1, id_cliente=1),
+        ])
+        self.session.commit()
+        cache_entidades.limpiar()
+        self.addCleanup(cache_entidades.limpiar)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_lectura_e_invalidacion_al_modificar(self):
+        gestion = GestionClientes(self.session)
+        self.assertEqual(gestion.obtener_cliente_serializado(1)["nombre_cliente"], "Ana")
+        self.assertEqual(gestion.obtener_cliente_serializado(1)["nombre_cliente"], "Ana")
+        self.assertIsNone(gestion.obtener_cliente_serializado(99))
+        self.assertEqual((cache_entidades.metricas()["aciertos"], cache_entidades.metricas()["fallos"]), (1, 2))
+
+        # La copia devuelta no altera la entrada guardada
+        gestion.obtener_cliente_serializado(1)["nombre_cliente"] = "Otra"
+        self.assertEqual(gestion.obtener_cliente_serializado(1)["nombre_cliente"], "Ana")
+
+        gestion.modificar_cliente(1, {"nombre_cliente": "Ana María"})
+        self.assertEqual(gestion.obtener_cliente_serializado(1)["nombre_cliente"], "Ana María")
+
+    def test_eliminar_invalida_las_tablas_que_quedan_huerfanas(self):
+        gestion = GestionMascotas(self.session)
+        self.assertEqual(cache_entidades.obtener("cita", 1, lambda: self.session.get(Cita, 1).to_dict())["id_mascota"], 1)
+
+        gestion.eliminar_mascota(1)
+        self.assertIsNone(gestion.obtener_mascota_serializado(1))
+        self.assertIsNone(cache_entidades.obtener("cita", 1, lambda: self.session.get(Cita, 1).to_dict())["id_mascota"])
+
+    def test_backends(self):
+        for backend in (BackendMemoria(max_entradas=2, ttl=60), BackendRedis(RedisEnMemoria())):
+            cache = CacheEntidades(backend=backend, ttl=60)
+            cargas = []
+            cargar = lambda: cargas.append(1) or {"id": 1}
+            self.assertEqual(cache.obtener("cliente", 1, cargar), {"id": 1})
+            self.assertEqual(cache.obtener("cliente", 1, cargar), {"id": 1})
+            cache.invalidar("cliente")
+            cache.obtener("cliente", 1, cargar)
+            self.assertEqual(len(cargas), 2, type(backend).__name__)
+
+        # LRU acotada
+        cache = CacheEntidades(backend=BackendMemoria(max_entradas=2, ttl=60))
+        for id_cliente in (1, 2, 3):
+            cache.obtener("cliente", id_cliente, lambda: {"id": id_cliente})
+        cache.obtener("cliente", 1, lambda: {"id": 1})
+        self.assertEqual(cache.metricas()["fallos"], 4)
+
+        # Un backend incompleto falla al crearlo, no en la primera llamada
+        class BackendIncompleto(BackendCache):
+            def get(self, clave):
+                return None
+
+        with self.assertRaises(TypeError):
+            BackendIncompleto()
+
+    def test_escritura_durante_la_carga_no_deja_el_registro_antiguo(self):
+        for backend in (BackendMemoria(ttl=60), BackendRedis(RedisEnMemoria())):
+            cache = CacheEntidades(backend=backend, ttl=60)
+
+            def cargar_y_modificar():
+                # Una escritura termina e invalida el registro mientras se carga la versión anterior
+                cache.invalidar("cliente", 1)
+                return {"nombre": "Ana"}
+
+            self.assertEqual(cache.obtener("cliente", 1, cargar_y_modificar), {"nombre": "Ana"})
+            self.assertEqual(cache.obtener("cliente", 1, lambda: {"nombre": "Ana María"}), {"nombre": "Ana María"})
+            self.assertEqual(cache.obtener("cliente", 1, lambda: None), {"nombre": "Ana María"}, type(backend).__name__)
+
+    def test_redis_fuera_del_bucle_de_eventos(self):
+        redis = RedisEnMemoria()
+        cache = CacheEntidades(backend=BackendRedis(redis), ttl=60)
+
+        async def cargar():
+            return {"id": 1}
+
+        async def leer():
+            self.assertEqual(await cache.obtener_async("cliente", 1, cargar), {"id": 1})
+            self.assertEqual(await cache.obtener_async("cliente", 1, cargar), {"id": 1})
+            return threading.get_ident()
+
+        hilo_del_bucle = asyncio.run(leer())
+        self.assertTrue(redis.hilos)
+        self.assertNotIn(hilo_del_bucle, redis.hilos)
+
+
+if __name__ == '__main__':
+    unittest.main()
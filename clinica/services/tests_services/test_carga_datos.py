@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cita, Cliente
+from clinica.database import cargar_datos_masivo
+
+
+class TestCargaDatosMasiva(unittest.TestCase):
+
+    def setUp(self):
+        # Base de datos en memoria nueva para cada prueba
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_inserta_y_actualiza_por_lotes(self):
+        clientes = [
+            {"id_cliente": i, "nombre_cliente": f"Cliente {i}", "edad": 30, "dni": f"{i:08d}A",
+             "direccion": "Calle Falsa 123", "telefono": f"6{i:08d}"}
+            for i in range(1, 8)
+        ]
+        resumen = cargar_datos_masivo(self.session, Cliente, clientes, "id_cliente", tamano_lote=3)
+        self.assertEqual(resumen, {"insertados": 7, "actualizados": 0, "descartados": 0})
+
+        # Actualización parcial: solo cambia la columna presente en el registro
+        resumen = cargar_datos_masivo(
+            self.session, Cliente,
+            [{"id_cliente": 2, "nombre_cliente": "Nombre nuevo"}, {"id_cliente": 8, "nombre_cliente": "Otro"}],
+            "id_cliente",
+        )
+        self.assertEqual(resumen, {"insertados": 1, "actualizados": 1, "descartados": 0})
+
+        cliente = self.session.query(Cliente).filter_by(id_cliente=2).one()
+        self.assertEqual(cliente.nombre_cliente, "Nombre nuevo")
+        self.assertEqual(cliente.dni, "00000002A")
+        self.assertEqual(self.session.query(Cliente).count(), 8)
+
+    def test_parsea_fechas_iso_y_descarta_sin_clave(self):
+        citas = [
+            {"id_cita": 1, "fecha": "2024-12-01T10:30:00", "descripcion": "Vacunación", "estado": "Pendiente"},
+            {"id_cita": 2, "fecha": "2024-12-02 09:00:00", "descripcion": "Revisión", "estado": "Pendiente"},
+            {"fecha": "2024-12-03 09:00:00", "descripcion": "Sin clave", "estado": "Pendiente"},
+            {"id_cita": 3, "fecha": "no es una fecha", "descripcion": "Fecha errónea", "estado": "Pendiente",
+             "campo_desconocido": "se ignora"},
+        ]
+        resumen = cargar_datos_masivo(self.session, Cita, citas, "id_cita")
+
+        self.assertEqual(resumen["descartados"], 1)
+        fechas = {c.id_cita: c.fecha for c in self.session.query(Cita)}
+        self.assertEqual(fechas[1], datetime(2024, 12, 1, 10, 30))
+        self.assertEqual(fechas[2], datetime(2024, 12, 2, 9, 0))
+        self.assertIsNone(fechas[3])
+
+
+if __name__ == '__main__':
+    unittest.main()
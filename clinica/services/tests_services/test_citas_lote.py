@@ -0,0 +1,107 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cita, Cliente, Mascota, ResumenCitasDia, ResumenIngresosMetodoPago, Tratamiento
+from clinica.services.gestion_de_citas import ERROR_LOTE_ATOMICO, GestionCitas
+from clinica.utils.agenda_citas import agendas_citas
+
+
+class TestCitasLote(unittest.TestCase):
+    """Alta y cambio de estado de citas por lotes: validación conjunta y una sola transacción."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add(Cliente(id_cliente=1, nombre_cliente="Ana López", dni="12345678Z", telefono="600000001"))
+        # Las mascotas 1 y 4 comparten la consulta_1; la 2 va a la consulta_2
+        for id_mascota in (1, 2, 4):
+            self.session.add(Mascota(id_mascota=id_mascota, nombre_mascota=f"Mascota {id_mascota}", id_cliente=1))
+        self.session.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", descripcion="Rabia", precio=50,
+                                     estado="Activo", id_cliente=1))
+        self.session.add(Cita(id_cita=1, fecha=datetime(2024, 11, 11, 10, 0), descripcion="Revisión",
+                              estado="Pendiente", id_mascota=1, id_cliente=1, id_tratamiento=1))
+        self.session.commit()
+        self.gestion = GestionCitas(self.session)
+
+        self.sentencias = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, sql, *args: self.sentencias.append(sql))
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    @staticmethod
+    def _cita(fecha, id_mascota, descripcion="Consulta", estado="Pendiente"):
+        return {"fecha": fecha, "descripcion": descripcion, "estado": estado,
+                "id_mascota": id_mascota, "id_cliente": 1, "id_tratamiento": 1}
+
+    def test_registrar_lote_informa_de_cada_cita(self):
+        lote = [
+            self._cita(datetime(2024, 11, 11, 12, 0), 2),
+            self._cita(datetime(2024, 11, 11, 10, 0), 1, descripcion="Revisión"),  # duplicada en la tabla
+            self._cita(datetime(2024, 11, 11, 12, 30), 2),                          # se solapa con la primera
+            self._cita(datetime(2024, 11, 11, 10, 30), 4),                          # consulta_1 ocupada
+            {"fecha": datetime(2024, 11, 12, 9, 0), "id_mascota": 4},               # faltan campos
+            self._cita(datetime(2024, 11, 12, 9, 0), 4),
+            self._cita(datetime(2024, 11, 12, 9, 0), 4),                            # duplicada en el lote
+        ]
+        resultados = self.gestion.registrar_citas_lote(lote)
+
+        self.assertEqual([r["ok"] for r in resultados], [True, False, False, False, False, True, False])
+        self.assertIn("Ya existe", resultados[1]["error"])
+        self.assertIn("posición 0 del lote", resultados[2]["error"])
+        self.assertIn("consulta_1", resultados[3]["error"])
+        self.assertIn("obligatorio", resultados[4]["error"])
+        self.assertIn("Ya existe", resultados[6]["error"])
+
+        # Una sola consulta de duplicados para todo el lote
+        self.assertEqual(sum(1 for sql in self.sentencias if "(cita.fecha, cita.descripcion" in sql), 1)
+        ids = [r["id_cita"] for r in resultados if r["ok"]]
+        self.assertEqual(self.session.scalars(select(Cita.fecha).where(Cita.id_cita.in_(ids))).all(),
+                         [datetime(2024, 11, 11, 12, 0), datetime(2024, 11, 12, 9, 0)])
+        self.assertEqual(self.session.get(ResumenCitasDia, ("2024-11-12", "Pendiente")).total, 1)
+        self.assertEqual(agendas_citas.de(self.session).conflictos(datetime(2024, 11, 12, 9, 0), 1)["consulta"],
+                         [ids[1]])
+
+    def test_lote_atomico_no_guarda_nada_si_algo_falla(self):
+        resultados = self.gestion.registrar_citas_lote([
+            self._cita(datetime(2024, 11, 13, 9, 0), 2),
+            self._cita(datetime(2024, 11, 11, 10, 0), 4),
+        ], atomico=True)
+
+        self.assertEqual(resultados[0]["error"], ERROR_LOTE_ATOMICO)
+        self.assertFalse(resultados[1]["ok"])
+        self.assertEqual(self.session.query(Cita).count(), 1)
+
+        with self.assertRaises(ValueError):
+            self.gestion.registrar_citas_lote([])
+
+    def test_cambiar_estado_lote(self):
+        self.gestion.registrar_citas_lote([self._cita(datetime(2024, 11, 11, 12, 0), 2),
+                                           self._cita(datetime(2024, 11, 11, 12, 0), 4)])
+
+        with self.assertRaises(ValueError):
+            self.gestion.cambiar_estado_lote([1, 2], "Finalizada")
+
+        resultados = self.gestion.cambiar_estado_lote([1, 2, 99, 2], "Finalizada", metodo_pago="Tarjeta")
+        self.assertEqual([(r["id_cita"], r["ok"]) for r in resultados], [(1, True), (2, True), (99, False)])
+        self.assertEqual(resultados[2]["error"], "Cita no encontrada.")
+        ingresos = self.session.get(ResumenIngresosMetodoPago, "Tarjeta")
+        self.assertEqual((ingresos.citas, ingresos.ingresos), (2, 100))
+
+        # Se cancela la 1 y la 4 (misma consulta) ocupa su hueco: reactivar la 1 ya no es posible
+        self.gestion.cambiar_estado_lote([1], "Cancelada")
+        self.gestion.registrar_cita(self._cita(datetime(2024, 11, 11, 10, 0), 4))
+        resultados = self.gestion.cambiar_estado_lote([1, 3], "Pendiente", atomico=True)
+        self.assertIn("consulta_1", resultados[0]["error"])
+        self.assertEqual(resultados[1]["error"], ERROR_LOTE_ATOMICO)
+        self.assertEqual(self.session.get(Cita, 3).estado, "Pendiente")
+        self.assertEqual(self.session.get(Cita, 1).estado, "Cancelada")
+
+
+if __name__ == '__main__':
+    unittest.main()
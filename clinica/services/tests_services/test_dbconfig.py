@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from clinica import dbconfig
+from clinica.dbconfig import aplicar_pragmas, comprobar_pragmas, pragmas_en_vigor
+
+
+class TestPerfilSQLite(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directorio.name, 'perfil.sqlite')}")
+        event.listen(self.engine, "connect", aplicar_pragmas)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directorio.cleanup()
+
+    def test_pragmas_aplicados_en_cada_conexion(self):
+        with self.engine.connect() as conexion:
+            pragmas = pragmas_en_vigor(conexion)
+
+        self.assertEqual(pragmas["journal_mode"], "wal")
+        self.assertEqual(pragmas["synchronous"], "NORMAL")
+        self.assertEqual(pragmas["temp_store"], "MEMORY")
+        self.assertEqual(pragmas["busy_timeout"], dbconfig.PRAGMAS_SQLITE["busy_timeout"])
+        self.assertEqual(comprobar_pragmas(self.engine)["diferencias"], {})
+
+    def test_comprobacion_detecta_diferencias(self):
+        sin_perfil = create_engine("sqlite:///:memory:")
+        with patch.dict(dbconfig.PRAGMAS_SQLITE, {"synchronous": "NORMAL"}):
+            resultado = comprobar_pragmas(sin_perfil)
+        sin_perfil.dispose()
+
+        # Sin el evento de conexión SQLite mantiene synchronous=FULL
+        self.assertEqual(resultado["diferencias"]["synchronous"], ("NORMAL", "FULL"))
+
+    def test_motor_asincrono_reutiliza_conexiones(self):
+        # Con un pool las conexiones aiosqlite (y sus PRAGMAs) no se abren en cada petición
+        self.assertIsInstance(dbconfig.async_engine.pool, AsyncAdaptedQueuePool)
+        self.assertEqual(dbconfig.async_engine.pool.size(), dbconfig.PERFIL_MOTOR["pool_size"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import json
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from unittest.mock import patch
+from clinica.dbconfig import Base
+from clinica.services.gestion_mascotas import GestionMascotas
+from clinica.utils.diario_cambios import DiarioCambios
+
+
+class TestDiarioCambios(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.diario = DiarioCambios(self.directorio.name)
+        # Snapshot inicial con dos clientes
+        with open(os.path.join(self.directorio.name, "datos_clientes.json"), 'w', encoding='utf-8') as f:
+            json.dump([
+                {"id_cliente": 1, "nombre_cliente": "Ana", "telefono": "600000001"},
+                {"id_cliente": 2, "nombre_cliente": "Luis", "telefono": "600000002"},
+            ], f)
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def leer_snapshot(self, archivo):
+        with open(os.path.join(self.directorio.name, archivo), encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_registrar_asigna_secuencias_consecutivas(self):
+        self.assertEqual(self.diario.registrar("cliente", "upsert", 1, {"id_cliente": 1}), 1)
+        self.assertEqual(self.diario.registrar("cliente", "delete", 2), 2)
+
+        # Un diario nuevo sobre el mismo directorio continúa la secuencia
+        otro = DiarioCambios(self.directorio.name)
+        self.assertEqual(otro.registrar("cliente", "delete", 1), 3)
+
+    def test_compactar_aplica_cambios_en_orden_y_vacia_el_diario(self):
+        self.diario.registrar("cliente", "upsert", 1, {"id_cliente": 1, "nombre_cliente": "Ana María"})
+        self.diario.registrar("cliente", "delete", 2)
+        self.diario.registrar("cliente", "upsert", 3, {"id_cliente": 3, "nombre_cliente": "Eva"})
+        self.diario.registrar("mascota", "upsert", 7, {"id_mascota": 7, "nombre_mascota": "Toby"})
+
+        self.assertEqual(self.diario.compactar(), 4)
+
+        clientes = self.leer_snapshot("datos_clientes.json")
+        self.assertEqual([c["id_cliente"] for c in clientes], [1, 3])
+        self.assertEqual(clientes[0]["nombre_cliente"], "Ana María")
+        self.assertEqual(clientes[0]["telefono"], "600000001")
+        self.assertEqual(self.leer_snapshot("datos_mascotas.json"), [{"id_mascota": 7, "nombre_mascota": "Toby"}])
+        self.assertFalse(os.path.exists(self.diario.ruta))
+        self.assertEqual(self.diario.compactar(), 0)
+
+    def test_compactacion_interrumpida_no_reaplica_cambios(self):
+        self.diario.registrar("cliente", "delete", 1)
+        self.diario.compactar()
+        # Simula una caída tras escribir el snapshot pero antes de borrar el diario
+        with open(self.diario.ruta_compactando, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"seq": 1, "tabla": "cliente", "op": "upsert", "id": 1, "datos": {"id_cliente": 1}}) + "\n")
+            f.write('{"seq": 2, "tabla": "cli')
+
+        self.assertEqual(self.diario.compactar(), 0)
+        self.assertEqual([c["id_cliente"] for c in self.leer_snapshot("datos_clientes.json")], [2])
+
+    def test_escrituras_del_servicio_van_al_diario(self):
+        engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        gestion = GestionMascotas(session)
+
+        with patch("clinica.services.gestion_clientes.diario_cambios", self.diario), \
+                patch("clinica.services.gestion_mascotas.diario_cambios", self.diario), \
+                patch.object(GestionMascotas, "exportar_mascotas_a_json") as exportar:
+            cliente = gestion.registrar_cliente({
+                'nombre_cliente': 'Marta Ruiz', 'edad': 40, 'dni': '12345678Z',
+                'direccion': 'Calle Sol 1', 'telefono': '600111222'
+            })
+            mascota = gestion.registrar_mascota(cliente.id_cliente, {
+                'nombre_mascota': 'Kira', 'raza': 'Beagle', 'edad': 2, 'afeccion': 'Ninguna', 'estado': 'Vivo'
+            })
+            gestion.modificar_mascota(mascota.id_mascota, {'edad': 3})
+            gestion.eliminar_mascota(mascota.id_mascota)
+
+        exportar.assert_not_called()
+        cambios = self.diario._leer(self.diario.ruta)
+        self.assertEqual([(c["tabla"], c["op"]) for c in cambios],
+                         [("cliente", "upsert"), ("mascota", "upsert"), ("mascota", "upsert"), ("mascota", "delete")])
+        self.assertEqual(cambios[2]["datos"]["edad"], 3)
+        session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import json
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cliente
+from clinica.utils.exportacion import exportar_consulta_json
+
+
+class TestExportacionStreaming(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(cls.engine)
+        cls.Session = sessionmaker(bind=cls.engine)
+        session = cls.Session()
+        session.add_all([
+            Cliente(id_cliente=i, nombre_cliente=f"Cliente {i}", edad=40, dni=f"{i:08d}Z",
+                    direccion="Calle Mayor 1", telefono=f"6{i:08d}")
+            for i in range(1, 26)
+        ])
+        session.commit()
+        session.close()
+
+    def setUp(self):
+        self.session = self.Session()
+        self.directorio = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.session.close()
+        self.directorio.cleanup()
+
+    def test_exporta_array_json_por_lotes(self):
+        ruta = os.path.join(self.directorio.name, "clientes.json")
+        resumen = exportar_consulta_json(self.session.query(Cliente), ruta, lote=7)
+
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        self.assertEqual(resumen["registros"], 25)
+        self.assertEqual(resumen["bytes"], os.path.getsize(ruta))
+        self.assertEqual([c["id_cliente"] for c in datos], list(range(1, 26)))
+        self.assertEqual(datos[0]["telefono"], "600000001")
+        # Solo queda el archivo final, sin temporales
+        self.assertEqual(os.listdir(self.directorio.name), ["clientes.json"])
+
+    def test_exporta_ndjson(self):
+        ruta = os.path.join(self.directorio.name, "clientes.ndjson")
+        resumen = exportar_consulta_json(self.session.query(Cliente).filter(Cliente.id_cliente <= 3), ruta, formato="ndjson")
+
+        with open(ruta, encoding='utf-8') as f:
+            lineas = [json.loads(linea) for linea in f]
+        self.assertEqual(resumen["registros"], 3)
+        self.assertEqual([c["id_cliente"] for c in lineas], [1, 2, 3])
+
+    def test_consulta_vacia_genera_array_vacio(self):
+        ruta = os.path.join(self.directorio.name, "vacio.json")
+        resumen = exportar_consulta_json(self.session.query(Cliente).filter(Cliente.id_cliente < 0), ruta)
+
+        with open(ruta, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), [])
+        self.assertEqual(resumen["registros"], 0)
+
+    def test_error_conserva_el_archivo_anterior(self):
+        ruta = os.path.join(self.directorio.name, "clientes.json")
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write('["anterior"]')
+
+        with patch("clinica.utils.exportacion.json.dumps", side_effect=RuntimeError("fallo al serializar")):
+            with self.assertRaises(RuntimeError):
+                exportar_consulta_json(self.session.query(Cliente), ruta)
+
+        with open(ruta, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), ["anterior"])
+        self.assertEqual(os.listdir(self.directorio.name), ["clientes.json"])
+
+    def test_permisos_como_open(self):
+        umask_anterior = os.umask(0o022)
+        try:
+            ruta = os.path.join(self.directorio.name, "clientes.json")
+            exportar_consulta_json(self.session.query(Cliente), ruta)
+        finally:
+            os.umask(umask_anterior)
+        self.assertEqual(stat.S_IMODE(os.stat(ruta).st_mode), 0o644)
+
+    def test_formato_no_valido(self):
+        with self.assertRaises(ValueError):
+            exportar_consulta_json(self.session.query(Cliente), os.path.join(self.directorio.name, "x.csv"), formato="csv")
+
+
+if __name__ == '__main__':
+    unittest.main()
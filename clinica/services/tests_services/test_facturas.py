@@ -0,0 +1,81 @@
+import io
+import re
+import unittest
+import zipfile
+from datetime import date, datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica.services.gestion_facturas import GestionFacturas
+from clinica.utils.facturas import empaquetar_zip, renderizar_facturas, renderizar_trozo
+
+
+class TestFacturas(unittest.TestCase):
+    """Datos de las facturas con una sola consulta y dibujado en memoria con la plantilla compartida."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add(Cliente(id_cliente=1, nombre_cliente="Ana López", dni="12345678Z",
+                                 direccion="Calle Mayor 1", telefono="600000001"))
+        self.session.add(Mascota(id_mascota=1, nombre_mascota="Luna", raza="Beagle", edad=4, id_cliente=1))
+        self.session.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", descripcion="Rabia",
+                                     precio=40, estado="Activo", id_cliente=1))
+        self.session.add(Tratamiento(id_tratamiento=2, nombre_tratamiento="Revisión", descripcion="Anual",
+                                     precio=25.5, estado="Activo", id_cliente=1))
+        self.session.add(Tratamiento(id_tratamiento=3, nombre_tratamiento="Sin citas", descripcion="",
+                                     precio=10, estado="Activo", id_cliente=1))
+        for id_cita, fecha, estado, id_tratamiento in (
+            (1, datetime(2024, 11, 20, 10, 0), "Finalizada", 1),
+            (2, datetime(2024, 11, 5, 9, 0), "Finalizada", 2),
+            (3, datetime(2024, 11, 6, 9, 0), "Pendiente", 2),
+            (4, datetime(2024, 12, 1, 9, 0), "Finalizada", 1),
+        ):
+            self.session.add(Cita(id_cita=id_cita, fecha=fecha, descripcion="Consulta", estado=estado,
+                                  metodo_pago="Tarjeta" if estado == "Finalizada" else None,
+                                  id_mascota=1, id_cliente=1, id_tratamiento=id_tratamiento))
+        self.session.commit()
+        self.gestion = GestionFacturas(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_datos_factura(self):
+        sentencias = []
+        event.listen(self.engine, "before_cursor_execute", lambda conn, cursor, sql, *args: sentencias.append(sql))
+        datos = self.gestion.datos_factura(1)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertEqual((datos["id_cita"], datos["nombre_cliente"], datos["nombre_mascota"], datos["precio"]),
+                         (1, "Ana López", "Luna", 40))
+        self.assertEqual(datos["fecha_factura"], date.today())
+        self.assertEqual(self.gestion.datos_factura(99), {"error": "Tratamiento no encontrado"})
+        self.assertEqual(self.gestion.datos_factura(3), {"error": "Cita no encontrada"})
+
+    def test_facturas_del_mes(self):
+        facturas = self.gestion.facturas_del_mes(2024, 11)
+        self.assertEqual([f["id_cita"] for f in facturas], [2, 1])
+        self.assertEqual(facturas[0]["fecha_factura"], date(2024, 11, 5))
+        self.assertEqual([f["id_cita"] for f in self.gestion.facturas_del_mes(2024, 12)], [4])
+        with self.assertRaises(ValueError):
+            self.gestion.facturas_del_mes(2024, 13)
+
+    def test_renderizar(self):
+        facturas = self.gestion.facturas_del_mes(2024, 11)
+        pdf = renderizar_facturas(facturas * 5)
+
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertEqual(len(re.findall(rb"/Type /Page\b(?!s)", pdf)), 10)
+        # La plantilla se guarda una sola vez aunque la usen todas las páginas
+        self.assertEqual(pdf.count(b"/Subtype /Form"), 1)
+
+        with zipfile.ZipFile(io.BytesIO(empaquetar_zip(renderizar_trozo(facturas)))) as archivo_zip:
+            self.assertEqual(archivo_zip.namelist(), ["factura_2.pdf", "factura_1.pdf"])
+            self.assertTrue(archivo_zip.read("factura_1.pdf").startswith(b"%PDF"))
+
+
+if __name__ == '__main__':
+    unittest.main()
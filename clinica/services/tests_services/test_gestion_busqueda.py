@@ -0,0 +1,69 @@
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cliente, Mascota
+from clinica.services.gestion_busqueda import GestionBusqueda, expresion_fts
+
+
+class TestGestionBusqueda(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([
+            Cliente(id_cliente=1, nombre_cliente="José Pérez", edad=34, dni="00000001R", telefono="600000001",
+                    direccion="Calle Ana 3"),
+            Cliente(id_cliente=2, nombre_cliente="Ana Anabel", edad=41, dni="00000002W", telefono="611111111"),
+            Mascota(id_mascota=1, nombre_mascota="Luna", raza="Beagle", edad=2, estado="Vivo", id_cliente=1),
+            Mascota(id_mascota=2, nombre_mascota="Coco", raza="Pastor Alemán", edad=7, estado="Vivo",
+                    afeccion="Otitis", id_cliente=2),
+        ])
+        self.session.commit()
+        self.gestion = GestionBusqueda(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _ids(self, texto, **kwargs):
+        return [(r["tipo"], r["id"]) for r in self.gestion.buscar(texto, **kwargs)]
+
+    def test_prefijos_sin_acentos_ni_mayusculas(self):
+        self.assertEqual(self._ids("jose PER"), [("cliente", 1)])
+        self.assertEqual(self._ids("alem"), [("mascota", 2)])
+        self.assertEqual(self._ids("6111"), [("cliente", 2)])
+        self.assertEqual(self._ids("gato"), [])
+
+    def test_ordena_por_relevancia_y_limita(self):
+        # "Ana" en el nombre pesa más que en la dirección
+        self.assertEqual(self._ids("ana"), [("cliente", 2), ("cliente", 1)])
+        self.assertEqual(self._ids("ana", limite=1), [("cliente", 2)])
+        self.assertEqual(self._ids("o", tipos=["mascotas"]), [("mascota", 2)])
+
+        resultado = self.gestion.buscar("luna")[0]
+        self.assertEqual(resultado["mascota"]["nombre_mascota"], "Luna")
+        self.assertIsInstance(resultado["puntuacion"], float)
+
+    def test_triggers_mantienen_el_indice(self):
+        mascota = self.session.get(Mascota, 1)
+        mascota.nombre_mascota = "Nube"
+        self.session.add(Cliente(id_cliente=3, nombre_cliente="Lucía Nuñez", edad=20, dni="00000003A", telefono="622"))
+        self.session.delete(self.session.get(Cliente, 2))
+        self.session.commit()
+
+        self.assertEqual(self._ids("luna"), [])
+        self.assertCountEqual(self._ids("nu"), [("mascota", 1), ("cliente", 3)])
+        self.assertEqual(self._ids("anabel"), [])
+
+    def test_texto_no_valido(self):
+        self.assertEqual(expresion_fts('ana "OR" (pe'), '"ana"* "OR"* "pe"*')
+        with self.assertRaises(ValueError):
+            self.gestion.buscar(" *() ")
+        with self.assertRaises(ValueError):
+            self.gestion.buscar("ana", tipos=["facturas"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica.services.gestion_estadisticas import GestionEstadisticas
+from clinica.services.gestion_resumenes import GestionResumenes
+
+
+class TestGestionEstadisticas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(cls.engine)
+        cls.Session = sessionmaker(bind=cls.engine)
+
+        session = cls.Session()
+        session.add_all([
+            Cliente(id_cliente=1, nombre_cliente="Ana", edad=34, dni="00000001R", telefono="600000001"),
+            Cliente(id_cliente=2, nombre_cliente="Luis", edad=41, dni="00000002W", telefono="600000002"),
+            Mascota(id_mascota=1, nombre_mascota="Luna", raza="Beagle", edad=2, estado="Vivo", id_cliente=1),
+            Mascota(id_mascota=2, nombre_mascota="Coco", raza="Beagle", edad=7, estado="Vivo", id_cliente=1),
+            Mascota(id_mascota=3, nombre_mascota="Toby", raza="Boxer", edad=12, estado="Fallecido", id_cliente=2),
+            Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", precio=10, estado="Activo", id_cliente=1),
+            Tratamiento(id_tratamiento=2, nombre_tratamiento="Cirugía", precio=20, estado="Activo", id_cliente=1),
+            Tratamiento(id_tratamiento=3, nombre_tratamiento="Revisión", precio=40, estado="Finalizado", id_cliente=2),
+            # 2024-11-11 es lunes y 2024-11-16 sábado
+            Cita(fecha=datetime(2024, 11, 11, 9, 0), estado="Pendiente", id_mascota=1, id_cliente=1, id_tratamiento=1),
+            Cita(fecha=datetime(2024, 11, 11, 12, 0), estado="Finalizada", metodo_pago="Tarjeta",
+                 id_mascota=2, id_cliente=1, id_tratamiento=1),
+            Cita(fecha=datetime(2024, 11, 16, 10, 0), estado="Finalizada", metodo_pago="Bizum",
+                 id_mascota=3, id_cliente=2, id_tratamiento=2),
+        ])
+        session.commit()
+        GestionResumenes(session).reconstruir()
+        session.close()
+
+    def setUp(self):
+        self.session = self.Session()
+        self.gestion = GestionEstadisticas(self.session)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_kpis(self):
+        self.assertEqual(self.gestion.kpis(), {
+            "total_clientes": 2, "total_mascotas": 3, "tratamientos_activos": 2,
+            "total_citas": 3, "citas_pendientes": 1,
+        })
+
+    def test_agrupaciones(self):
+        stats = self.gestion.resumen(top_n=1, ancho_edad=5)
+
+        self.assertEqual(stats["mascotas"]["por_raza"][0], {"raza": "Beagle", "total": 2})
+        self.assertEqual(stats["mascotas"]["edades"], [
+            {"desde": 0, "hasta": 4, "total": 1}, {"desde": 5, "hasta": 9, "total": 1},
+            {"desde": 10, "hasta": 14, "total": 1},
+        ])
+        self.assertEqual(stats["clientes"]["top_por_mascotas"], [{"id_cliente": 1, "nombre_cliente": "Ana", "mascotas": 2}])
+        self.assertEqual(stats["citas"]["por_dia"], [{"dia": "2024-11-11", "total": 2}, {"dia": "2024-11-16", "total": 1}])
+        por_dia_semana = {d["dia_semana"]: d["total"] for d in stats["citas"]["por_dia_semana"]}
+        self.assertEqual((por_dia_semana["Lunes"], por_dia_semana["Sábado"], por_dia_semana["Domingo"]), (2, 1, 0))
+        self.assertEqual(stats["tratamientos"]["mas_utilizados"], [{"nombre_tratamiento": "Vacuna", "citas": 2}])
+        self.assertEqual(stats["citas"]["ingresos_por_metodo_pago"], [
+            {"metodo_pago": "Bizum", "citas": 1, "ingresos": 20}, {"metodo_pago": "Tarjeta", "citas": 1, "ingresos": 10},
+        ])
+
+    def test_cuantiles_de_precio(self):
+        cuantiles = self.gestion.cuantiles_precio_tratamientos()
+
+        self.assertEqual(cuantiles["total"], 3)
+        self.assertAlmostEqual(cuantiles["media"], 23.33)
+        self.assertEqual(cuantiles["cuantiles"], {"0.0": 10, "0.25": 15.0, "0.5": 20, "0.75": 30.0, "1.0": 40})
+
+    def test_secciones(self):
+        self.assertEqual(list(self.gestion.resumen(secciones=["kpis"])), ["kpis"])
+        with self.assertRaises(ValueError):
+            self.gestion.resumen(secciones=["inventario"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cliente, Tratamiento, ResumenCitasDia, ResumenIngresosMetodoPago, ResumenMascotasCliente
+from clinica.services.gestion_clientes import GestionClientes
+from clinica.services.gestion_de_citas import GestionCitas
+from clinica.services.gestion_mascotas import GestionMascotas
+from clinica.services.gestion_resumenes import GestionResumenes
+from clinica.services.gestion_tratamiento import GestionTratamientos
+
+
+class TestGestionResumenes(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([
+            Cliente(id_cliente=1, nombre_cliente="Ana", edad=34, dni="00000001R", telefono="600000001"),
+            Cliente(id_cliente=2, nombre_cliente="Luis", edad=41, dni="00000002W", telefono="600000002"),
+            Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", precio=10, estado="Activo", id_cliente=1),
+            Tratamiento(id_tratamiento=2, nombre_tratamiento="Cirugía", precio=200, estado="Activo", id_cliente=2),
+        ])
+        self.session.commit()
+        self.resumenes = GestionResumenes(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _cita(self, fecha, id_tratamiento=1, id_mascota=1, id_cliente=1):
+        return GestionCitas(self.session).registrar_cita({
+            "fecha": fecha, "descripcion": "Consulta", "estado": "Pendiente",
+            "id_mascota": id_mascota, "id_cliente": id_cliente, "id_tratamiento": id_tratamiento,
+        })
+
+    def assertConsistente(self):
+        self.assertEqual(self.resumenes.comprobar(), {"citas_dia": [], "ingresos_metodo_pago": [], "mascotas_cliente": []})
+
+    def test_citas_incrementales(self):
+        gestion = GestionCitas(self.session)
+        cita_1 = self._cita(datetime(2024, 11, 11, 9, 0))
+        cita_2 = self._cita(datetime(2024, 11, 11, 12, 0), id_tratamiento=2)
+        self._cita(datetime(2024, 11, 12, 10, 0))
+
+        gestion.finalizar_cita(cita_1.id_cita, "Tarjeta")
+        gestion.finalizar_cita(cita_2.id_cita, "Tarjeta")
+        gestion.modificar_cita(cita_2.id_cita, {"fecha": datetime(2024, 11, 13, 8, 0), "metodo_pago": "Bizum"})
+
+        filas = {(r.dia, r.estado): r.total for r in self.session.execute(select(ResumenCitasDia)).scalars()}
+        self.assertEqual(filas, {("2024-11-11", "Finalizada"): 1, ("2024-11-12", "Pendiente"): 1,
+                                 ("2024-11-13", "Finalizada"): 1})
+        ingresos = {r.metodo_pago: (r.citas, r.ingresos) for r in self.session.execute(select(ResumenIngresosMetodoPago)).scalars()}
+        self.assertEqual(ingresos, {"Tarjeta": (1, 10), "Bizum": (1, 200)})
+        self.assertConsistente()
+
+        gestion.cancelar_cita(cita_1.id_cita)
+        self.assertIsNone(self.session.get(ResumenIngresosMetodoPago, "Tarjeta"))
+        self.assertConsistente()
+
+    def test_cambio_de_precio(self):
+        cita = self._cita(datetime(2024, 11, 11, 9, 0), id_tratamiento=2)
+        GestionCitas(self.session).finalizar_cita(cita.id_cita, "Efectivo")
+
+        GestionTratamientos(self.session).modificar_tratamiento(2, {"precio": 150})
+        self.assertEqual(self.session.get(ResumenIngresosMetodoPago, "Efectivo").ingresos, 150)
+        self.assertConsistente()
+
+        GestionTratamientos(self.session).dar_baja_tratamiento("Cirugía")
+        self.assertEqual(self.session.get(ResumenIngresosMetodoPago, "Efectivo").ingresos, 0)
+        self.assertConsistente()
+
+    def test_mascotas_por_cliente(self):
+        gestion = GestionMascotas(self.session)
+        luna = gestion.registrar_mascota(1, {"nombre_mascota": "Luna", "raza": "Beagle", "edad": 2, "estado": "Vivo"})
+        gestion.registrar_mascota(1, {"nombre_mascota": "Coco", "raza": "Beagle", "edad": 7, "estado": "Vivo"})
+        self.assertEqual(self.session.get(ResumenMascotasCliente, 1).mascotas, 2)
+
+        gestion.modificar_mascota(luna.id_mascota, {"id_cliente": 2})
+        self.assertEqual((self.session.get(ResumenMascotasCliente, 1).mascotas,
+                          self.session.get(ResumenMascotasCliente, 2).mascotas), (1, 1))
+
+        gestion.eliminar_mascota(luna.id_mascota)
+        self.assertIsNone(self.session.get(ResumenMascotasCliente, 2))
+        self.assertConsistente()
+
+        GestionClientes(self.session).eliminar_cliente(1)
+        self.assertIsNone(self.session.get(ResumenMascotasCliente, 1))
+        self.assertConsistente()
+
+    def test_comprobar_y_reconstruir(self):
+        self._cita(datetime(2024, 11, 11, 9, 0))
+        # Escritura que no pasa por los servicios
+        self.session.execute(ResumenCitasDia.__table__.delete())
+        self.session.commit()
+
+        diferencias = self.resumenes.comprobar()
+        self.assertEqual(diferencias["citas_dia"], [{"clave": ["2024-11-11", "Pendiente"], "esperado": (1,), "actual": None}])
+
+        self.assertEqual(self.resumenes.reconstruir(), {"citas_dia": 1, "ingresos_metodo_pago": 0, "mascotas_cliente": 0})
+        self.assertConsistente()
+
+
+if __name__ == '__main__':
+    unittest.main()
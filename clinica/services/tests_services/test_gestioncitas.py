@@ -3,11 +3,15 @@ import tempfile
 import json
 import unittest
 from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.exc import SQLAlchemyError,IntegrityError
+from clinica.dbconfig import Base
 from clinica.models.tabla_citas import Cita
-from clinica.services.gestion_de_citas import GestionCitas
-from datetime import datetime
+from clinica.models import Cliente, Mascota, Tratamiento
+from clinica.services.gestion_de_citas import GestionCitas, invalidar_totales_citas
+from datetime import date, datetime
 
 
 class TestGestionCitas(unittest.TestCase):
@@ -39,7 +43,7 @@ class TestGestionCitas(unittest.TestCase):
             "id_cliente": 1,
             "id_tratamiento": 1,
         })
-        self.db_session.query().all.return_value = [cita_mock]
+        self.db_session.query().yield_per.return_value = [cita_mock]
 
         # Crear un archivo temporal
         with tempfile.NamedTemporaryFile(delete=False, suffix='.json') as temp_file:
@@ -299,6 +303,200 @@ class TestGestionCitas(unittest.TestCase):
         self.assertEqual(resultado["citas"][1]["descripcion"], "Chequeo dental")  # Verificar descripción de la segunda cita
 
 
+class TestPaginacionCitas(unittest.TestCase):
+    """Paginación en SQL de ver_todas_las_citas sobre una base de datos en memoria."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(cls.engine)
+        cls.Session = sessionmaker(bind=cls.engine)
+
+    def setUp(self):
+        self.session = self.Session()
+        self.gestion_citas = GestionCitas(self.session)
+        # Dos citas comparten fecha para comprobar el desempate por id_cita
+        fechas = [datetime(2024, 11, 10, 10, 0), datetime(2024, 11, 10, 10, 0),
+                  datetime(2024, 11, 11, 9, 0), datetime(2024, 11, 9, 12, 0), datetime(2024, 11, 12, 8, 0)]
+        for i, fecha in enumerate(fechas):
+            self.session.add(Cita(
+                fecha=fecha, descripcion=f"Cita {i}", estado="Pendiente" if i % 2 else "Finalizada",
+                id_mascota=1, id_cliente=1, id_tratamiento=1
+            ))
+        self.session.commit()
+        invalidar_totales_citas()
+
+    def tearDown(self):
+        self.session.query(Cita).delete()
+        self.session.commit()
+        self.session.close()
+        invalidar_totales_citas()
+
+    def test_paginacion_por_desplazamiento(self):
+        resultado = self.gestion_citas.ver_todas_las_citas(skip=1, limit=2)
+
+        self.assertEqual(len(resultado["citas"]), 2)
+        self.assertEqual(resultado["total"], 5)
+        self.assertEqual(resultado["citas"][0]["fecha"], "2024-11-10T10:00:00")
+        self.assertIsNotNone(resultado["next_cursor"])
+
+    def test_paginacion_por_cursor_recorre_todas_las_citas(self):
+        vistas = []
+        cursor = None
+        while True:
+            resultado = self.gestion_citas.ver_todas_las_citas(limit=2, cursor=cursor, incluir_total=False)
+            vistas.extend(cita["id_cita"] for cita in resultado["citas"])
+            self.assertIsNone(resultado["total"])
+            cursor = resultado["next_cursor"]
+            if cursor is None:
+                break
+
+        esperadas = [c.id_cita for c in self.session.query(Cita).order_by(Cita.fecha, Cita.id_cita)]
+        self.assertEqual(vistas, esperadas)
+
+    def test_cursor_con_filtro_de_estado(self):
+        primera = self.gestion_citas.ver_todas_las_citas(estado="Finalizada", limit=1)
+        segunda = self.gestion_citas.ver_todas_las_citas(estado="Finalizada", limit=5, cursor=primera["next_cursor"])
+
+        self.assertEqual(primera["total"], 3)
+        self.assertEqual(len(segunda["citas"]), 2)
+        self.assertTrue(all(c["estado"] == "Finalizada" for c in segunda["citas"]))
+        self.assertIsNone(segunda["next_cursor"])
+
+    def test_total_cacheado_se_invalida_al_registrar(self):
+        self.assertEqual(self.gestion_citas.ver_todas_las_citas(limit=1)["total"], 5)
+
+        self.gestion_citas.registrar_cita({
+            'fecha': datetime(2024, 11, 13, 10, 0), 'descripcion': 'Revisión', 'id_mascota': 2,
+            'id_cliente': 2, 'id_tratamiento': 1, 'estado': 'Pendiente'
+        })
+
+        self.assertEqual(self.gestion_citas.ver_todas_las_citas(limit=1)["total"], 6)
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(ValueError):
+            self.gestion_citas.ver_todas_las_citas(limit=2, cursor="no-es-un-cursor")
+
+
+class TestCitasAsincronas(unittest.IsolatedAsyncioTestCase):
+    """Las variantes asíncronas devuelven lo mismo que las síncronas sobre la misma base de datos."""
+
+    async def asyncSetUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        ruta_db = os.path.join(self.directorio.name, 'citas.sqlite')
+
+        self.engine = create_engine(f'sqlite:///{ruta_db}', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        for i in range(5):
+            self.session.add(Cita(
+                fecha=datetime(2024, 11, 10 + i % 3, 9 + i, 0), descripcion=f"Cita {i}",
+                estado="Pendiente" if i % 2 else "Finalizada", id_mascota=i, id_cliente=1, id_tratamiento=1
+            ))
+        self.session.commit()
+
+        self.async_engine = create_async_engine(f'sqlite+aiosqlite:///{ruta_db}', echo=False)
+        self.async_session = async_sessionmaker(bind=self.async_engine, expire_on_commit=False)()
+        invalidar_totales_citas()
+
+    async def asyncTearDown(self):
+        await self.async_session.close()
+        await self.async_engine.dispose()
+        self.session.close()
+        self.engine.dispose()
+        self.directorio.cleanup()
+        invalidar_totales_citas()
+
+    async def test_ver_todas_las_citas_async_igual_que_sincrona(self):
+        sincrona = GestionCitas(self.session)
+        asincrona = GestionCitas(self.async_session)
+
+        for parametros in ({}, {"limit": 2}, {"estado": "Pendiente", "limit": 1}, {"skip": 3, "limit": 10}):
+            esperado = sincrona.ver_todas_las_citas(**parametros)
+            obtenido = await asincrona.ver_todas_las_citas_async(**parametros)
+            if "limit" not in parametros:
+                # Sin paginación el orden no está garantizado
+                esperado["citas"].sort(key=lambda c: c["id_cita"])
+                obtenido["citas"].sort(key=lambda c: c["id_cita"])
+            self.assertEqual(obtenido, esperado, parametros)
+
+        cursor = (await asincrona.ver_todas_las_citas_async(limit=2))["next_cursor"]
+        self.assertEqual(
+            (await asincrona.ver_todas_las_citas_async(limit=2, cursor=cursor))["citas"],
+            sincrona.ver_todas_las_citas(limit=2, cursor=cursor)["citas"],
+        )
+
+    async def test_busquedas_async(self):
+        gestion_citas = GestionCitas(self.async_session)
+
+        cita = await gestion_citas.buscar_cita_async(3, 1)
+        self.assertEqual(cita.descripcion, "Cita 3")
+        self.assertEqual((await gestion_citas.buscar_cita_por_id_async(cita.id_cita)).id_cita, cita.id_cita)
+        self.assertIsNone(await gestion_citas.buscar_cita_por_id_async(999))
+
+
+
+class TestCitasDetalladas(unittest.TestCase):
+    """Listado de citas con cliente, mascota y tratamiento embebidos en una sola consulta."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(cls.engine)
+        cls.Session = sessionmaker(bind=cls.engine)
+
+        session = cls.Session()
+        session.add_all([
+            Cliente(id_cliente=1, nombre_cliente="Ana López", dni="12345678Z", telefono="600000001"),
+            Cliente(id_cliente=2, nombre_cliente="Luis Gil", dni="87654321X", telefono="600000002"),
+            Mascota(id_mascota=1, nombre_mascota="Luna", raza="Beagle", id_cliente=1),
+            Mascota(id_mascota=2, nombre_mascota="Toby", raza="Boxer", id_cliente=2),
+            Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", precio=30, estado="Activo"),
+        ])
+        for i in range(6):
+            session.add(Cita(
+                fecha=datetime(2024, 11, 10 + i % 2, 9 + i, 0), descripcion=f"Cita {i}",
+                estado="Pendiente" if i < 3 else "Finalizada",
+                id_mascota=1 + i % 2, id_cliente=1 + i % 2, id_tratamiento=1
+            ))
+        session.commit()
+        session.close()
+
+    def setUp(self):
+        self.session = self.Session()
+        self.gestion_citas = GestionCitas(self.session)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_una_sola_consulta_para_todas_las_citas(self):
+        sentencias = []
+        capturar = lambda *args: sentencias.append(args[2])
+        event.listen(self.engine, "before_cursor_execute", capturar)
+        try:
+            citas = self.gestion_citas.ver_citas_detalladas()
+        finally:
+            event.remove(self.engine, "before_cursor_execute", capturar)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertEqual(len(citas), 6)
+        self.assertEqual(citas[0]["cliente"]["nombre_cliente"], "Ana López")
+        self.assertEqual(citas[0]["mascota"]["nombre_mascota"], "Luna")
+        self.assertEqual(citas[0]["tratamiento"]["precio"], 30)
+
+    def test_filtros_en_sql(self):
+        citas = self.gestion_citas.ver_citas_detalladas(nombre_cliente="luis", estado="Finalizada")
+        self.assertEqual([c["descripcion"] for c in citas], ["Cita 3", "Cita 5"])
+
+        citas = self.gestion_citas.ver_citas_detalladas(dni="5678z", fecha=date(2024, 11, 10))
+        self.assertEqual([c["descripcion"] for c in citas], ["Cita 0", "Cita 2", "Cita 4"])
+
+        self.assertEqual(len(self.gestion_citas.ver_citas_detalladas(skip=1, limit=2)), 2)
+
+        # % y _ se buscan literalmente, no como comodines
+        self.assertEqual(self.gestion_citas.ver_citas_detalladas(nombre_cliente="%"), [])
+        self.assertEqual(self.gestion_citas.ver_citas_detalladas(dni="_"), [])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -324,7 +324,13 @@ class TestGestionClientes(unittest.TestCase):
         self.gestion_clientes.registrar_cliente(cliente_data_2)
         self.session.commit()
         
-        with unittest.mock.patch('builtins.input', return_value='1'):
+        # El servicio nunca pide una selección por consola: devuelve todas las coincidencias
+        with unittest.mock.patch('builtins.input', side_effect=AssertionError("input() no debe llamarse")):
+            pagina = self.gestion_clientes.buscar_clientes_por_nombre('Luis')
+            self.assertFalse(pagina['hay_mas'])
+            self.assertCountEqual([r['cliente'].nombre_cliente for r in pagina['resultados']],
+                                  ['Luis Fernández', 'Luis Borro'])
+
             resultado = self.gestion_clientes.buscar_cliente_por_nombre('Luis')
             self.assertIsNotNone(resultado)
             self.assertEqual(resultado['cliente'].nombre_cliente, 'Luis Fernández')
@@ -372,4 +378,18 @@ class TestGestionClientes(unittest.TestCase):
             clientes = self.gestion_clientes.listar_clientes()
             self.assertEqual(len(clientes), 0)
 
-    
\ No newline at end of file
+    def test_buscar_clientes_por_ids(self):
+        # Más IDs que variables admite una sentencia: la consulta se parte en bloques
+        self.session.add_all([
+            ClienteModel(id_cliente=i, nombre_cliente=f"Cliente {i}", edad=30, dni=f"{i:08d}Z", telefono=f"6{i:08d}")
+            for i in range(1, 1001)
+        ])
+        self.session.commit()
+
+        ids = list(range(1000, 0, -1)) + [5000]
+        clientes = self.gestion_clientes.buscar_clientes_por_ids(ids)
+        self.assertEqual([c.id_cliente for c in clientes], list(range(1000, 0, -1)))
+
+        self.assertEqual([c.id_cliente for c in self.gestion_clientes.buscar_clientes_por_ids("3,1,3")], [3, 1])
+        with self.assertRaises(ValueError):
+            self.gestion_clientes.buscar_clientes_por_ids("1,dos")
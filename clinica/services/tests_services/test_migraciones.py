@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, event, inspect
+from clinica.dbconfig import Base
+from clinica.migraciones import VERSION_ACTUAL, MIGRACIONES, aplicar_migraciones, historial, version_del_esquema
+
+
+class TestMigraciones(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directorio.name, 'migraciones.sqlite')}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directorio.cleanup()
+
+    def test_base_de_datos_nueva(self):
+        aplicadas = aplicar_migraciones(self.engine)
+
+        self.assertEqual(aplicadas, [nombre for _, nombre, _ in MIGRACIONES])
+        self.assertEqual(version_del_esquema(self.engine), VERSION_ACTUAL)
+        self.assertEqual([m["version"] for m in historial(self.engine)], [v for v, _, _ in MIGRACIONES])
+        self.assertTrue({"cliente", "mascota", "cita", "tratamiento", "producto"} <= set(inspect(self.engine).get_table_names()))
+
+    def test_esquema_al_dia_solo_lee_la_version(self):
+        aplicar_migraciones(self.engine)
+
+        sentencias = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: sentencias.append(args[2]))
+        self.assertEqual(aplicar_migraciones(self.engine), [])
+        self.assertEqual(sentencias, ["PRAGMA user_version"])
+
+    def test_base_de_datos_anterior_recibe_los_indices(self):
+        # Base de datos creada con create_all antes de existir los índices secundarios
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conexion:
+            for indice in ("ix_cita_estado_fecha", "ix_mascota_id_cliente", "ix_cliente_dni"):
+                conexion.exec_driver_sql(f"DROP INDEX {indice}")
+
+        aplicar_migraciones(self.engine)
+
+        inspector = inspect(self.engine)
+        self.assertIn("ix_cita_estado_fecha", {i["name"] for i in inspector.get_indexes("cita")})
+        self.assertIn("ix_mascota_id_cliente", {i["name"] for i in inspector.get_indexes("mascota")})
+        indices_cliente = {i["name"]: i for i in inspector.get_indexes("cliente")}
+        self.assertTrue(indices_cliente["ix_cliente_dni"]["unique"])
+
+    def test_base_de_datos_anterior_recibe_el_indice_de_busqueda(self):
+        # Base de datos en la versión 3, con datos y sin los índices FTS5
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conexion:
+            for tabla in ("busqueda_cliente", "busqueda_mascota"):
+                for sufijo in ("ai", "ad", "au"):
+                    conexion.exec_driver_sql(f"DROP TRIGGER {tabla}_{sufijo}")
+                conexion.exec_driver_sql(f"DROP TABLE {tabla}")
+            conexion.exec_driver_sql("INSERT INTO cliente (id_cliente, nombre_cliente, dni) VALUES (1, 'Íñigo', '1X')")
+            conexion.exec_driver_sql("PRAGMA user_version = 3")
+
+        self.assertEqual(aplicar_migraciones(self.engine), ["indice_busqueda", "series_citas"])
+
+        with self.engine.begin() as conexion:
+            # Las filas existentes quedan indexadas y los triggers indexan las nuevas
+            conexion.exec_driver_sql("INSERT INTO cliente (id_cliente, nombre_cliente, dni) VALUES (2, 'Inés', '2X')")
+            encontrados = conexion.exec_driver_sql(
+                "SELECT rowid FROM busqueda_cliente WHERE busqueda_cliente MATCH 'in*' ORDER BY rowid").scalars().all()
+        self.assertEqual(encontrados, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cliente, Mascota, Cita, Tratamiento
+from clinica.services.gestion_clientes import GestionClientes
+from clinica.services.gestion_mascotas import GestionMascotas
+from clinica.services.gestion_de_citas import GestionCitas, invalidar_totales_citas
+from clinica.services.gestion_tratamiento import GestionTratamientos
+
+
+class TestPlanConsultas(unittest.TestCase):
+    """Cada consulta de los servicios debe resolverse con un índice y no recorriendo la tabla."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(cls.engine)
+        cls.Session = sessionmaker(bind=cls.engine)
+
+        session = cls.Session()
+        session.add(Cliente(id_cliente=1, nombre_cliente="Ana López", edad=40, dni="12345678Z",
+                            direccion="Calle Mayor 1", telefono="600000001"))
+        session.add(Mascota(id_mascota=1, nombre_mascota="Luna", raza="Beagle", edad=3,
+                            afeccion="Ninguna", estado="Vivo", id_cliente=1))
+        session.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", descripcion="Rabia",
+                                precio=50, estado="Activo", id_cliente=1))
+        session.add(Cita(id_cita=1, fecha=datetime(2024, 11, 10, 10, 0), descripcion="Revisión",
+                         estado="Pendiente", id_mascota=1, id_cliente=1, id_tratamiento=1))
+        # Segunda cita para que el listado paginado tenga siguiente página y cursor
+        session.add(Cita(id_cita=2, fecha=datetime(2024, 11, 12, 10, 0), descripcion="Control",
+                         estado="Pendiente", id_mascota=1, id_cliente=1, id_tratamiento=1))
+        session.commit()
+        session.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+
+    def setUp(self):
+        self.session = self.Session()
+        self.sentencias = []
+        event.listen(self.engine, "before_cursor_execute", self._capturar)
+        invalidar_totales_citas()
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self._capturar)
+        self.session.rollback()
+        self.session.close()
+        invalidar_totales_citas()
+
+    def _capturar(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.sentencias.append((statement, parameters))
+
+    def assertUsaIndices(self, operacion):
+        """Ejecuta `operacion` y comprueba el plan de cada SELECT que emite."""
+        self.sentencias.clear()
+        operacion()
+        sentencias = list(self.sentencias)
+        self.assertTrue(sentencias, "La operación no ha emitido ninguna consulta")
+
+        with self.engine.connect() as conexion:
+            for sentencia, parametros in sentencias:
+                plan = [fila[3] for fila in conexion.exec_driver_sql(f"EXPLAIN QUERY PLAN {sentencia}", parametros)]
+                for paso in plan:
+                    self.assertFalse(paso.startswith("SCAN") and "USING" not in paso,
+                                     f"Recorrido completo '{paso}' en: {sentencia}")
+                    self.assertNotIn("TEMP B-TREE", paso, f"Ordenación sin índice en: {sentencia}")
+
+    def test_duplicados_de_cliente(self):
+        gestion = GestionClientes(self.session)
+        self.assertUsaIndices(lambda: gestion.registrar_cliente({
+            "nombre_cliente": "Ana López", "edad": 40, "dni": "12345678Z",
+            "direccion": "Calle Mayor 1", "telefono": "600000001",
+        }))
+        self.assertUsaIndices(lambda: gestion.buscar_cliente("12345678Z"))
+
+    def test_mascotas_por_cliente(self):
+        gestion = GestionMascotas(self.session)
+        self.assertUsaIndices(lambda: gestion.listar_mascotas_por_cliente(1))
+
+    def test_buscar_cita(self):
+        gestion = GestionCitas(self.session)
+        self.assertUsaIndices(lambda: gestion.buscar_cita(1, 1))
+
+    def test_listado_de_citas_paginado(self):
+        gestion = GestionCitas(self.session)
+        self.assertUsaIndices(lambda: gestion.ver_todas_las_citas(estado="Pendiente", limit=10))
+        self.assertUsaIndices(lambda: gestion.ver_todas_las_citas(limit=10, incluir_total=False))
+
+        cursor = GestionCitas(self.session).ver_todas_las_citas(limit=1, incluir_total=False)["next_cursor"]
+        self.assertIsNotNone(cursor)
+        self.assertUsaIndices(lambda: gestion.ver_todas_las_citas(estado="Pendiente", limit=10, cursor=cursor))
+
+    def test_calendario_de_citas(self):
+        gestion = GestionCitas(self.session)
+        self.assertUsaIndices(lambda: gestion.calendario_citas(datetime(2024, 11, 4), datetime(2024, 11, 11)))
+        self.assertUsaIndices(lambda: gestion.calendario_citas(datetime(2024, 11, 4), datetime(2024, 11, 11),
+                                                               recurso="consulta_1"))
+
+    def test_datos_de_factura(self):
+        gestion = GestionTratamientos(self.session)
+        self.assertUsaIndices(lambda: gestion.obtener_datos_factura(1))
+
+    def test_busquedas_por_nombre_sin_consultas_por_fila(self):
+        # Aquí solo se comprueba que las relaciones de todas las coincidencias no se cargan fila a fila
+        self.session.add(Cliente(id_cliente=2, nombre_cliente="Ana Ruiz", dni="87654321X", telefono="600000002"))
+        self.session.add(Mascota(id_mascota=2, nombre_mascota="Luna", raza="Boxer", id_cliente=2))
+        self.session.flush()
+        self.sentencias.clear()
+
+        resultados = GestionMascotas(self.session).buscar_mascotas_por_nombre("Luna")["resultados"]
+        self.assertCountEqual([r["cliente"] for r in resultados], ["Ana López", "Ana Ruiz"])
+        self.assertEqual(len(self.sentencias), 1)
+
+        self.sentencias.clear()
+        resultados = GestionClientes(self.session).buscar_clientes_por_nombre("Ana")["resultados"]
+        self.assertEqual([r["mascotas"] for r in resultados], [["Luna"], ["Luna"]])
+        self.assertEqual(len(self.sentencias), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cliente, Mascota
+from clinica.services.gestion_clientes import GestionClientes
+from clinica.services.gestion_mascotas import GestionMascotas
+from clinica.utils.seleccion_cli import seleccionar_cliente_por_nombre, seleccionar_mascota_por_nombre
+
+
+class TestBusquedaPorNombre(unittest.TestCase):
+    """Búsquedas por nombre paginadas de los servicios y su selección interactiva por consola."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([
+            Cliente(id_cliente=1, nombre_cliente="José Pérez", edad=34, dni="00000001R", telefono="600000001",
+                    direccion="Calle Ana 3"),
+            Cliente(id_cliente=2, nombre_cliente="Ana Anabel", edad=41, dni="00000002W", telefono="611111111"),
+            Cliente(id_cliente=3, nombre_cliente="Ana Ruiz", edad=29, dni="00000003A", telefono="622222222"),
+            Mascota(id_mascota=1, nombre_mascota="Luna", raza="Beagle", edad=2, estado="Vivo", id_cliente=2),
+            Mascota(id_mascota=2, nombre_mascota="Luna Llena", raza="Galgo", edad=7, estado="Vivo", id_cliente=3),
+        ])
+        self.session.commit()
+        self.gestion_clientes = GestionClientes(self.session)
+        self.gestion_mascotas = GestionMascotas(self.session)
+
+        # Ningún servicio puede bloquearse esperando una respuesta por consola
+        parche = patch('builtins.input', side_effect=AssertionError("input() no debe llamarse"))
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_busqueda_paginada_solo_por_nombre(self):
+        # "Calle Ana" es una dirección: no cuenta en la búsqueda por nombre
+        pagina = self.gestion_clientes.buscar_clientes_por_nombre("ana", limite=1)
+        self.assertTrue(pagina["hay_mas"])
+        self.assertEqual([r["cliente"].id_cliente for r in pagina["resultados"]], [2])
+        self.assertEqual(pagina["resultados"][0]["mascotas"], ["Luna"])
+
+        pagina = self.gestion_clientes.buscar_clientes_por_nombre("ana", limite=1, desplazamiento=1)
+        self.assertFalse(pagina["hay_mas"])
+        self.assertEqual([r["cliente"].id_cliente for r in pagina["resultados"]], [3])
+
+        pagina = self.gestion_mascotas.buscar_mascotas_por_nombre("LUNA")
+        self.assertEqual([(r["mascota"].id_mascota, r["cliente"]) for r in pagina["resultados"]],
+                         [(1, "Ana Anabel"), (2, "Ana Ruiz")])
+
+        with self.assertRaises(ValueError):
+            self.gestion_clientes.buscar_clientes_por_nombre("  ")
+
+    def test_seleccion_por_consola(self):
+        with patch('builtins.print'):
+            elegido = seleccionar_cliente_por_nombre(self.gestion_clientes, "ana", entrada=lambda _: "2")
+            self.assertEqual(elegido["cliente"].nombre_cliente, "Ana Ruiz")
+            self.assertIsNone(seleccionar_cliente_por_nombre(self.gestion_clientes, "ana", entrada=lambda _: "0"))
+            self.assertIsNone(seleccionar_cliente_por_nombre(self.gestion_clientes, "ana", entrada=lambda _: "x"))
+            self.assertIsNone(seleccionar_mascota_por_nombre(self.gestion_mascotas, "luna", entrada=lambda _: "9"))
+
+        # Con una sola coincidencia no se pregunta
+        elegido = seleccionar_mascota_por_nombre(self.gestion_mascotas, "llena", entrada=None)
+        self.assertEqual(elegido["mascota"].id_mascota, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from clinica.dbconfig import Base
+from clinica.models import Cita, Cliente, Mascota, OcurrenciaSerie, Tratamiento
+from clinica.services.gestion_series import GestionSeries
+from clinica.utils.recurrencia import iterar_ocurrencias, normalizar_regla
+
+
+class TestSeriesCitas(unittest.TestCase):
+    """Series de citas recurrentes: expansión perezosa, disponibilidad por lotes y confirmación."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:', echo=False)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add(Cliente(id_cliente=1, nombre_cliente="Ana López", dni="12345678Z", telefono="600000001"))
+        # Las mascotas 1 y 4 comparten la consulta_1
+        for id_mascota in (1, 4):
+            self.session.add(Mascota(id_mascota=id_mascota, nombre_mascota=f"Mascota {id_mascota}", id_cliente=1))
+        self.session.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Insulina", descripcion="Control",
+                                     precio=30, estado="Activo", id_cliente=1))
+        # Ocupa la consulta_1 el lunes 18 a las 10:30
+        self.session.add(Cita(id_cita=1, fecha=datetime(2024, 11, 18, 10, 30), descripcion="Vacuna",
+                              estado="Pendiente", id_mascota=4, id_cliente=1, id_tratamiento=1))
+        self.session.commit()
+        self.gestion = GestionSeries(self.session)
+        self.serie = self.gestion.crear_serie({
+            "regla": "freq=weekly;count=52", "inicio": datetime(2024, 11, 11, 10, 0),
+            "descripcion": "Control de glucosa", "id_mascota": 1, "id_cliente": 1, "id_tratamiento": 1,
+        })
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_reglas(self):
+        self.assertEqual(normalizar_regla("FREQ=WEEKLY;BYDAY=TH,MO;UNTIL=20241130"),
+                         "FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,TH;UNTIL=20241130T000000")
+        fechas = iterar_ocurrencias("FREQ=WEEKLY;BYDAY=MO,TH;COUNT=5", datetime(2024, 11, 11, 9, 0),
+                                    datetime(2024, 11, 15), datetime(2024, 12, 31))
+        self.assertEqual([f.day for f in fechas], [18, 21, 25])
+        # Los meses sin día 31 se saltan
+        fechas = iterar_ocurrencias("FREQ=MONTHLY;UNTIL=20250501", datetime(2025, 1, 31, 9, 0))
+        self.assertEqual([f.month for f in fechas], [1, 3])
+
+        for regla in ("FREQ=WEEKLY", "FREQ=YEARLY;COUNT=2", "FREQ=MONTHLY;BYDAY=MO;COUNT=2",
+                      "FREQ=DAILY;COUNT=2;UNTIL=20250101", "FREQ=DAILY;BYHOUR=9;COUNT=2", "FREQ=DAILY;COUNT=0"):
+            with self.assertRaises(ValueError):
+                normalizar_regla(regla)
+
+        # UNTIL tiene el mismo límite de citas que COUNT
+        with self.assertRaises(ValueError):
+            list(iterar_ocurrencias("FREQ=DAILY;UNTIL=29991231", datetime(2024, 11, 11, 9, 0)))
+        with self.assertRaises(ValueError):
+            self.gestion.crear_serie({
+                "regla": "FREQ=DAILY;UNTIL=29991231", "inicio": datetime(2024, 11, 11, 10, 0),
+                "descripcion": "Sin fin", "id_mascota": 1, "id_cliente": 1, "id_tratamiento": 1,
+            })
+
+    def test_ocurrencias_de_una_ventana(self):
+        sentencias = []
+        event.listen(self.engine, "before_cursor_execute", lambda conn, cursor, sql, *args: sentencias.append(sql))
+        ocurrencias = list(self.gestion.ocurrencias(self.serie.id_serie, datetime(2024, 11, 11),
+                                                    datetime(2024, 12, 2), tamano_lote=2))
+
+        self.assertEqual([(o["fecha"].day, o["estado"]) for o in ocurrencias],
+                         [(11, "libre"), (18, "ocupada"), (25, "libre")])
+        self.assertEqual(ocurrencias[1]["conflictos"], [1])
+        # Dos lotes: en cada uno una consulta de ocurrencias confirmadas y otra de citas
+        self.assertEqual(sum(1 for sql in sentencias if "FROM cita" in sql), 2)
+
+        self.assertIsNone(self.gestion.ocurrencias(99, datetime(2024, 11, 11), datetime(2024, 12, 2)))
+        with self.assertRaises(ValueError):
+            self.gestion.ocurrencias(self.serie.id_serie, datetime(2024, 11, 11), datetime(2026, 11, 11))
+
+    def test_confirmar_ocurrencias(self):
+        fechas = [datetime(2024, 11, 11, 10, 0), datetime(2024, 11, 18, 10, 0),
+                  datetime(2024, 11, 19, 10, 0), datetime(2024, 11, 25, 10, 0)]
+        resultados = self.gestion.confirmar_ocurrencias(self.serie.id_serie, fechas)
+
+        self.assertEqual([r["ok"] for r in resultados], [True, False, False, True])
+        self.assertIn("consulta_1", resultados[1]["error"])
+        self.assertIn("no es una ocurrencia", resultados[2]["error"])
+        ocurrencias = self.session.query(OcurrenciaSerie).order_by(OcurrenciaSerie.ocurrencia).all()
+        self.assertEqual([(o.id_cita, o.cita.descripcion) for o in ocurrencias],
+                         [(resultados[0]["id_cita"], "Control de glucosa"), (resultados[3]["id_cita"], "Control de glucosa")])
+
+        # Confirmar otra vez no duplica y la ventana las muestra como confirmadas
+        resultados = self.gestion.confirmar_ocurrencias(self.serie.id_serie, fechas[:1])
+        self.assertIn("ya está confirmada", resultados[0]["error"])
+        estados = [o["estado"] for o in self.gestion.ocurrencias(self.serie.id_serie, datetime(2024, 11, 11),
+                                                                   datetime(2024, 12, 2))]
+        self.assertEqual(estados, ["confirmada", "ocupada", "confirmada"])
+        self.assertEqual(self.session.query(Cita).count(), 3)
+
+        # Las fechas no pueden abarcar más que una ventana de ocurrencias
+        with self.assertRaises(ValueError):
+            self.gestion.confirmar_ocurrencias(self.serie.id_serie, [fechas[0], datetime(2025, 11, 24, 10, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,7 +32,7 @@ class TestGestionTratamientos(unittest.TestCase):
             "descripcion": "Vacunación general",
             "precio": 50
         })
-        self.db_session.query().all.return_value = [tratamiento_mock]
+        self.db_session.query().yield_per.return_value = [tratamiento_mock]
 
         # Usar un archivo temporal para la exportación
         with tempfile.NamedTemporaryFile(delete=False, suffix='.json') as temp_file:
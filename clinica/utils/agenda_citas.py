@@ -0,0 +1,258 @@
+import threading
+import weakref
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sortedcontainers import SortedList
+from sqlalchemy import event, or_, select
+from clinica.models import Cita
+
+# Cada mascota se atiende siempre en la misma consulta y cada cita ocupa una hora
+NUMERO_CONSULTAS = 3
+DURACION_CITA = timedelta(hours=1)
+
+# Horario en el que se ofrecen huecos (el mismo que muestra el calendario) y granularidad
+HORA_APERTURA = time(8, 0)
+HORA_CIERRE = time(20, 0)
+PASO_HUECOS = timedelta(minutes=30)
+MAX_DIAS_HUECOS = 92
+
+# Las citas en estos estados no ocupan su hueco
+ESTADOS_LIBRES = ("Cancelada",)
+
+
+class CitaSolapadaError(ValueError):
+    """La cita se solaparía con otra de la misma mascota o de su consulta."""
+
+
+def consulta_de_mascota(id_mascota):
+    """Recurso del calendario ("consulta_N") en el que se atiende la mascota."""
+    return f"consulta_{id_mascota % NUMERO_CONSULTAS}"
+
+
+def numero_consulta(recurso):
+    """
+    Número de consulta de un recurso "consulta_N".
+
+    Raises:
+        ValueError: Si el recurso no es una consulta existente
+    """
+    prefijo, _, numero = recurso.partition("_")
+    if prefijo != "consulta" or not numero.isdigit() or int(numero) >= NUMERO_CONSULTAS:
+        raise ValueError(f"Recurso '{recurso}' no válido. Recursos disponibles: "
+                         f"{', '.join(f'consulta_{n}' for n in range(NUMERO_CONSULTAS))}")
+    return int(numero)
+
+
+def _claves(id_mascota):
+    return ("consulta", id_mascota % NUMERO_CONSULTAS), ("mascota", id_mascota)
+
+
+class AgendaCitas:
+    """
+    Índice en memoria de los huecos ocupados de una base de datos, por consulta y por mascota.
+
+    Cada consulta y cada mascota tienen una lista ordenada (SortedList) de (inicio, id_cita). Como
+    todas las citas duran DURACION_CITA, una cita se solapa con [inicio, inicio + duración) solo si
+    empieza a menos de una duración de `inicio`: basta una búsqueda binaria, O(log n), para
+    encontrarlas. Las altas y bajas del índice también son O(log n).
+    """
+
+    def __init__(self, duracion=DURACION_CITA):
+        self.duracion = duracion
+        self._lock = threading.RLock()
+        self._ocupados = defaultdict(SortedList)  # ("consulta", n) | ("mascota", id) -> [(inicio, id_cita)]
+        self._citas = {}  # id_cita -> (inicio, id_mascota)
+
+    def cargar(self, filas):
+        """Añade filas (id_cita, fecha, id_mascota, estado) al índice."""
+        for id_cita, fecha, id_mascota, estado in filas:
+            self.actualizar(id_cita, fecha, id_mascota, estado)
+
+    def actualizar(self, id_cita, fecha, id_mascota, estado):
+        """Refleja el estado actual de una cita: la añade, la mueve o libera su hueco."""
+        with self._lock:
+            self.eliminar(id_cita)
+            if id_cita is None or fecha is None or id_mascota is None or estado in ESTADOS_LIBRES:
+                return
+            for clave in _claves(id_mascota):
+                self._ocupados[clave].add((fecha, id_cita))
+            self._citas[id_cita] = (fecha, id_mascota)
+
+    def eliminar(self, id_cita):
+        with self._lock:
+            ocupada = self._citas.pop(id_cita, None)
+            if ocupada:
+                fecha, id_mascota = ocupada
+                for clave in _claves(id_mascota):
+                    self._ocupados[clave].discard((fecha, id_cita))
+
+    def cita(self, id_cita):
+        """(inicio, id_mascota) con que la cita está en el índice, o None si no ocupa hueco."""
+        return self._citas.get(id_cita)
+
+    def _solapes(self, clave, inicio, excluir=None):
+        lista = self._ocupados.get(clave)
+        if not lista:
+            return []
+        solapes = []
+        posicion = lista.bisect_right((inicio - self.duracion, float("inf")))
+        for fecha, id_cita in lista.islice(posicion):
+            if fecha >= inicio + self.duracion:
+                break
+            if id_cita != excluir:
+                solapes.append(id_cita)
+        return solapes
+
+    def conflictos(self, inicio, id_mascota, excluir=None):
+        """
+        Citas que se solapan con una cita de la mascota que empiece en `inicio`.
+
+        Args:
+            inicio (datetime): Inicio de la cita propuesta
+            id_mascota (int): Mascota; determina también la consulta
+            excluir (int, optional): Cita que se está moviendo y no cuenta como conflicto
+
+        Returns:
+            dict: {"consulta": [id_cita], "mascota": [id_cita]}; listas vacías si no hay solape
+        """
+        with self._lock:
+            consulta, mascota = _claves(id_mascota)
+            return {"consulta": self._solapes(consulta, inicio, excluir),
+                    "mascota": self._solapes(mascota, inicio, excluir)}
+
+    def huecos_libres(self, desde, cantidad, id_mascota=None, recurso=None, dias=MAX_DIAS_HUECOS):
+        """
+        Los `cantidad` primeros huecos libres a partir de `desde`, en pasos de PASO_HUECOS.
+
+        Con `id_mascota` el hueco tiene que estar libre en su consulta y para la mascota; con
+        `recurso`, en esa consulta; sin ninguno de los dos, en cualquier consulta (la primera libre).
+        Solo se ofrecen huecos dentro del horario y en los `dias` siguientes a `desde`.
+
+        Returns:
+            list[dict]: {"inicio", "fin", "recurso"} por orden de inicio
+        """
+        if id_mascota is not None:
+            consultas = [id_mascota % NUMERO_CONSULTAS]
+        elif recurso:
+            consultas = [numero_consulta(recurso)]
+        else:
+            consultas = list(range(NUMERO_CONSULTAS))
+
+        # Primer múltiplo de PASO_HUECOS desde la medianoche
+        dia = datetime.combine(desde.date(), time.min)
+        paso = PASO_HUECOS.total_seconds()
+        inicio = dia + timedelta(seconds=-(-(desde - dia).total_seconds() // paso) * paso)
+        limite = desde + timedelta(days=dias)
+
+        huecos = []
+        with self._lock:
+            while len(huecos) < cantidad and inicio < limite:
+                apertura = datetime.combine(inicio.date(), HORA_APERTURA)
+                if inicio < apertura:
+                    inicio = apertura
+                    continue
+                if inicio + self.duracion > datetime.combine(inicio.date(), HORA_CIERRE):
+                    inicio = datetime.combine(inicio.date() + timedelta(days=1), HORA_APERTURA)
+                    continue
+
+                mascota_libre = id_mascota is None or not self._solapes(("mascota", id_mascota), inicio)
+                libre = next((n for n in consultas if not self._solapes(("consulta", n), inicio)), None)
+                if mascota_libre and libre is not None:
+                    huecos.append({"inicio": inicio, "fin": inicio + self.duracion, "recurso": f"consulta_{libre}"})
+                inicio += PASO_HUECOS
+        return huecos
+
+
+class AgendasCitas:
+    """
+    Una AgendaCitas por base de datos (motor de SQLAlchemy), construida al arrancar la API o la
+    primera vez que se usa, y actualizada por GestionCitas en cada escritura.
+
+    El índice solo ve las escrituras hechas a través de los servicios de este proceso, así que
+    no decide si una cita se solapa: `conflictos` lo consulta en la tabla `cita` con una consulta
+    por rango (dentro de la transacción de escritura de GestionCitas, que en SQLite tiene el
+    cerrojo de escritura) y corrige en el índice las citas en las que no coinciden. El índice
+    sirve para proponer huecos libres sin ir a la base de datos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agendas = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _motor(db_session):
+        bind = db_session.get_bind()
+        return getattr(bind, "engine", bind)
+
+    @staticmethod
+    def _filas(db_session, *condiciones):
+        consulta = select(Cita.id_cita, Cita.fecha, Cita.id_mascota, Cita.estado).where(*condiciones)
+        return db_session.execute(consulta)
+
+    def reconstruir(self, db_session):
+        """Vuelve a leer de `cita` todos los huecos ocupados y devuelve la agenda nueva."""
+        agenda = AgendaCitas()
+        agenda.cargar(self._filas(db_session, Cita.fecha.isnot(None), Cita.estado.notin_(ESTADOS_LIBRES)))
+        with self._lock:
+            self._agendas[self._motor(db_session)] = agenda
+        return agenda
+
+    def de(self, db_session):
+        """Agenda de la base de datos de la sesión; se construye si aún no existe."""
+        with self._lock:
+            agenda = self._agendas.get(self._motor(db_session))
+        return agenda if agenda is not None else self.reconstruir(db_session)
+
+    def descartar(self, motor):
+        with self._lock:
+            self._agendas.pop(getattr(motor, "engine", motor), None)
+
+    def ocupados(self, db_session, desde, hasta, id_mascota=None):
+        """
+        AgendaCitas con las citas de la tabla que pueden solaparse con una cita que empiece entre
+        `desde` y `hasta`; con `id_mascota`, solo las de la mascota y las de su consulta.
+
+        Es una sola consulta por rango sobre el índice de `fecha`.
+        """
+        condiciones = [Cita.fecha > desde - DURACION_CITA, Cita.fecha < hasta + DURACION_CITA,
+                       Cita.estado.notin_(ESTADOS_LIBRES)]
+        if id_mascota is not None:
+            condiciones.append(or_(Cita.id_mascota == id_mascota,
+                                   Cita.id_mascota % NUMERO_CONSULTAS == id_mascota % NUMERO_CONSULTAS))
+        agenda = AgendaCitas()
+        agenda.cargar(self._filas(db_session, *condiciones))
+        return agenda
+
+    def conflictos(self, db_session, inicio, id_mascota, excluir=None):
+        """
+        Citas de la tabla `cita` que se solapan con una cita de la mascota que empiece en `inicio`.
+
+        Si el índice en memoria no da los mismos solapes (escrituras de otro proceso), se corrigen
+        en él las citas que difieren.
+
+        Returns:
+            dict: {"consulta": [id_cita], "mascota": [id_cita]}
+        """
+        conflictos = self.ocupados(db_session, inicio, inicio, id_mascota).conflictos(inicio, id_mascota, excluir)
+        agenda = self.de(db_session)
+        en_agenda = agenda.conflictos(inicio, id_mascota, excluir)
+        if en_agenda != conflictos:
+            distintas = (set(en_agenda["consulta"]) | set(en_agenda["mascota"])) ^ (
+                set(conflictos["consulta"]) | set(conflictos["mascota"]))
+            filas = self._filas(db_session, Cita.id_cita.in_(distintas)).all()
+            for id_cita in distintas - {fila.id_cita for fila in filas}:
+                agenda.eliminar(id_cita)
+            agenda.cargar(filas)
+        return conflictos
+
+
+agendas_citas = AgendasCitas()
+
+
+# Al crear o borrar la tabla `cita` (bases de datos nuevas, tests) el índice de ese motor deja de valer
+def _descartar_agenda(target, connection, **kw):
+    agendas_citas.descartar(connection.engine)
+
+
+event.listen(Cita.__table__, "after_create", _descartar_agenda)
+event.listen(Cita.__table__, "after_drop", _descartar_agenda)
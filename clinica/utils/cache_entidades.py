@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Segundos que vive una entrada y número máximo de entradas del backend en memoria
+TTL_CACHE = float(os.getenv("CLINICA_CACHE_TTL", "300"))
+MAX_ENTRADAS_CACHE = int(os.getenv("CLINICA_CACHE_MAX_ENTRADAS", "2048"))
+
+# "memoria" o una URL redis://host:puerto/db para compartir la caché entre workers
+URL_CACHE = os.getenv("CLINICA_CACHE_URL", "memoria")
+
+
+class BackendCache(ABC):
+    """
+    Interfaz mínima que necesita CacheEntidades de un almacén clave-valor con caducidad.
+
+    Un backend que no implemente todos los métodos no se puede instanciar.
+    """
+
+    # True si sus llamadas hacen E/S (red): en las rutas asíncronas se ejecutan en un hilo
+    bloqueante = False
+
+    @abstractmethod
+    def get(self, clave):
+        """Devuelve el valor guardado o None."""
+
+    @abstractmethod
+    def set(self, clave, valor, ttl):
+        """Guarda `valor` con una caducidad de `ttl` segundos."""
+
+    @abstractmethod
+    def delete(self, *claves):
+        """Elimina las claves indicadas."""
+
+    @abstractmethod
+    def incr(self, clave):
+        """Incrementa un contador entero (sin caducidad) y devuelve el nuevo valor."""
+
+    @abstractmethod
+    def clear(self):
+        """Vacía el almacén."""
+
+
+class BackendMemoria(BackendCache):
+    """LRU con caducidad en el propio proceso (cachetools.TTLCache protegida con un cerrojo)."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_CACHE, ttl=TTL_CACHE):
+        self._datos = TTLCache(maxsize=max_entradas, ttl=ttl)
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            if clave in self._contadores:
+                return self._contadores[clave]
+            valor = self._datos.get(clave)
+        # Copia para que quien la reciba no modifique la entrada guardada
+        return dict(valor) if isinstance(valor, dict) else valor
+
+    def set(self, clave, valor, ttl):
+        # TTLCache usa una caducidad común; `ttl` solo lo respetan los backends externos
+        with self._lock:
+            self._datos[clave] = dict(valor) if isinstance(valor, dict) else valor
+
+    def delete(self, *claves):
+        with self._lock:
+            for clave in claves:
+                self._datos.pop(clave, None)
+
+    def incr(self, clave):
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + 1
+            return self._contadores[clave]
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+            self._contadores.clear()
+
+
+class BackendRedis(BackendCache):
+    """
+    Backend sobre un cliente con la interfaz de redis-py (get/set/delete/incr).
+
+    Sirve para que varios workers de la API compartan la caché y sus invalidaciones. Los valores
+    se guardan como JSON.
+    """
+
+    bloqueante = True
+
+    def __init__(self, cliente, prefijo="clinica:"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    def get(self, clave):
+        valor = self.cliente.get(self.prefijo + clave)
+        return json.loads(valor) if valor is not None else None
+
+    def set(self, clave, valor, ttl):
+        self.cliente.set(self.prefijo + clave, json.dumps(valor, ensure_ascii=False), ex=max(1, int(ttl)))
+
+    def delete(self, *claves):
+        if claves:
+            self.cliente.delete(*(self.prefijo + clave for clave in claves))
+
+    def incr(self, clave):
+        return int(self.cliente.incr(self.prefijo + clave))
+
+    def clear(self):
+        claves = list(self.cliente.scan_iter(self.prefijo + "*"))
+        if claves:
+            self.cliente.delete(*claves)
+
+
+def crear_backend(url=URL_CACHE):
+    """Backend según CLINICA_CACHE_URL: "memoria" (por defecto) o redis://..."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CLINICA_CACHE_URL apunta a Redis pero el paquete 'redis' no está instalado.") from e
+        return BackendRedis(redis.Redis.from_url(url))
+    return BackendMemoria()
+
+
+class CacheEntidades:
+    """
+    Caché de lectura de entidades serializadas (to_dict()) por tabla e ID.
+
+    Los servicios la consultan en `obtener_*_serializado`: si el registro no está se carga de la
+    base de datos y se guarda. Las escrituras de los servicios invalidan el registro tras su
+    commit subiendo su versión; los borrados que dejan huérfanos a registros de otras tablas
+    invalidan esas tablas completas subiendo su generación. Versión y generación forman parte de
+    la clave y se leen antes de cargar, así que una carga que se cruza con una escritura guarda su
+    resultado bajo la clave anterior, que ya no lee nadie.
+    """
+
+    def __init__(self, backend=None, ttl=TTL_CACHE):
+        self.backend = backend or crear_backend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._metricas = {"aciertos": 0, "fallos": 0, "invalidaciones": 0, "errores": 0}
+
+    def _clave(self, tabla, id_registro):
+        generacion = self.backend.get(f"gen:{tabla}") or 0
+        version = self.backend.get(f"ver:{tabla}:{id_registro}") or 0
+        return f"{tabla}:{generacion}:{id_registro}:{version}"
+
+    def _leer(self, tabla, id_registro):
+        """Clave vigente del registro y su valor guardado (None si no está)."""
+        clave = self._clave(tabla, id_registro)
+        return clave, self.backend.get(clave)
+
+    def _guardar(self, clave, valor, tabla, id_registro):
+        try:
+            self.backend.set(clave, valor, self.ttl)
+        except Exception as e:
+            logger.error(f"Error al guardar en la caché {tabla} {id_registro}: {e}")
+            self._contar("errores")
+
+    async def _sin_bloquear(self, funcion, *args):
+        """Llama a `funcion` en un hilo si el backend hace E/S, para no parar el bucle de eventos."""
+        if self.backend.bloqueante:
+            return await asyncio.to_thread(funcion, *args)
+        return funcion(*args)
+
+    def _contar(self, metrica):
+        with self._lock:
+            self._metricas[metrica] += 1
+
+    def obtener(self, tabla, id_registro, cargar):
+        """
+        Devuelve el registro serializado de la caché o, si no está, el resultado de `cargar()`.
+
+        Args:
+            tabla (str): Nombre de la tabla
+            id_registro (int): Clave primaria
+            cargar (callable): Función sin argumentos que devuelve el dict del registro o None
+
+        Returns:
+            dict | None: None si el registro no existe (los ausentes no se guardan)
+        """
+        try:
+            clave, valor = self._leer(tabla, id_registro)
+        except Exception as e:
+            # La caché nunca debe tumbar una lectura: se va directamente a la base de datos
+            logger.error(f"Error al leer la caché de {tabla} {id_registro}: {e}")
+            self._contar("errores")
+            return cargar()
+
+        if valor is not None:
+            self._contar("aciertos")
+            return valor
+
+        self._contar("fallos")
+        valor = cargar()
+        if valor is not None:
+            self._guardar(clave, valor, tabla, id_registro)
+        return valor
+
+    async def obtener_async(self, tabla, id_registro, cargar):
+        """Como `obtener`, con `cargar` una corrutina; las llamadas a Redis se hacen en un hilo."""
+        try:
+            clave, valor = await self._sin_bloquear(self._leer, tabla, id_registro)
+        except Exception as e:
+            logger.error(f"Error al leer la caché de {tabla} {id_registro}: {e}")
+            self._contar("errores")
+            return await cargar()
+
+        if valor is not None:
+            self._contar("aciertos")
+            return valor
+
+        self._contar("fallos")
+        valor = await cargar()
+        if valor is not None:
+            await self._sin_bloquear(self._guardar, clave, valor, tabla, id_registro)
+        return valor
+
+    def invalidar(self, tabla, *ids):
+        """Descarta los registros `ids` de `tabla`, o la tabla entera si no se indican IDs."""
+        try:
+            if ids:
+                anteriores = [self._clave(tabla, id_registro) for id_registro in ids]
+                # Primero la versión, para que las lecturas posteriores ya usen la clave nueva
+                for id_registro in ids:
+                    self.backend.incr(f"ver:{tabla}:{id_registro}")
+                self.backend.delete(*anteriores)
+            else:
+                self.backend.incr(f"gen:{tabla}")
+            self._contar("invalidaciones")
+        except Exception as e:
+            logger.error(f"Error al invalidar la caché de {tabla}: {e}")
+            self._contar("errores")
+
+    def metricas(self):
+        """Aciertos, fallos, invalidaciones y errores desde el arranque, con la tasa de aciertos."""
+        with self._lock:
+            metricas = dict(self._metricas)
+        consultas = metricas["aciertos"] + metricas["fallos"]
+        metricas["tasa_aciertos"] = round(metricas["aciertos"] / consultas, 4) if consultas else None
+        return metricas
+
+    def limpiar(self):
+        """Vacía la caché y reinicia las métricas."""
+        self.backend.clear()
+        with self._lock:
+            self._metricas = dict.fromkeys(self._metricas, 0)
+
+
+# Caché compartida por los servicios
+cache_entidades = CacheEntidades()
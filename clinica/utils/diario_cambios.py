@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from clinica.utils.exportacion import escribir_registros_json
+
+logger = logging.getLogger(__name__)
+
+# Carpeta 'data' con los snapshots JSON de cada tabla
+RUTA_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Snapshot JSON y clave primaria de cada tabla registrada en el diario
+SNAPSHOTS = {
+    "cliente": ("datos_clientes.json", "id_cliente"),
+    "mascota": ("datos_mascotas.json", "id_mascota"),
+    "cita": ("datos_citas.json", "id_cita"),
+    "tratamiento": ("datos_tratamientos.json", "id_tratamiento"),
+}
+
+# Segundos entre compactaciones del hilo en segundo plano
+INTERVALO_COMPACTACION = float(os.getenv("CLINICA_INTERVALO_COMPACTACION", "60"))
+
+
+class DiarioCambios:
+    """
+    Diario de cambios en NDJSON con número de secuencia.
+
+    Cada escritura en los servicios añade una línea compacta al diario en lugar de volver a
+    exportar la tabla completa. Un compactador aplica periódicamente los cambios pendientes
+    sobre los snapshots `datos_*.json` y vacía el diario, de modo que el coste de una
+    modificación ya no depende del tamaño de la tabla.
+
+    El número de secuencia es único dentro de un proceso; el diario está pensado para un único
+    proceso escritor por directorio.
+    """
+
+    def __init__(self, directorio=RUTA_DATA, nombre="cambios.ndjson"):
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, nombre)
+        self.ruta_compactando = self.ruta + ".compactando"
+        self.ruta_estado = os.path.join(directorio, "cambios.estado.json")
+        self._lock = threading.Lock()
+        self._lock_compactacion = threading.Lock()
+        self._seq = None
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def registrar(self, tabla, operacion, clave, datos=None):
+        """
+        Añade un cambio al diario.
+
+        Args:
+            tabla (str): Nombre de la tabla ("cliente", "mascota", "cita", "tratamiento")
+            operacion (str): "upsert" o "delete"
+            clave: Clave primaria del registro
+            datos (dict, optional): Estado completo del registro para "upsert"
+
+        Returns:
+            int | None: Número de secuencia asignado, o None si no se pudo registrar
+        """
+        if clave is None:
+            return None
+
+        with self._lock:
+            try:
+                if self._seq is None:
+                    self._seq = self._ultima_secuencia()
+                cambio = {"seq": self._seq + 1, "ts": round(time.time(), 3), "tabla": tabla, "op": operacion, "id": clave}
+                if datos is not None:
+                    cambio["datos"] = datos
+
+                os.makedirs(self.directorio, exist_ok=True)
+                with open(self.ruta, 'a', encoding='utf-8') as archivo:
+                    archivo.write(json.dumps(cambio, ensure_ascii=False, separators=(",", ":")) + "\n")
+                self._seq += 1
+                return self._seq
+            except (OSError, TypeError, ValueError) as e:
+                # La base de datos sigue siendo la fuente de verdad; una exportación completa rehace los snapshots
+                logger.error(f"No se pudo registrar el cambio {operacion} de {tabla} {clave} en el diario: {e}")
+                return None
+
+    def compactar(self):
+        """
+        Aplica los cambios pendientes del diario sobre los snapshots JSON y vacía el diario.
+
+        Returns:
+            int: Número de cambios aplicados
+        """
+        with self._lock_compactacion:
+            with self._lock:
+                # Los cambios que lleguen durante la compactación van a un diario nuevo
+                if os.path.exists(self.ruta) and not os.path.exists(self.ruta_compactando):
+                    os.replace(self.ruta, self.ruta_compactando)
+
+            if not os.path.exists(self.ruta_compactando):
+                return 0
+
+            aplicado = self._leer_estado()
+            cambios = [c for c in self._leer(self.ruta_compactando) if c["seq"] > aplicado]
+            cambios.sort(key=lambda c: c["seq"])
+
+            por_tabla = {}
+            for cambio in cambios:
+                por_tabla.setdefault(cambio["tabla"], []).append(cambio)
+            for tabla, cambios_tabla in por_tabla.items():
+                self._aplicar(tabla, cambios_tabla)
+
+            if cambios:
+                self._guardar_estado(cambios[-1]["seq"])
+            os.unlink(self.ruta_compactando)
+
+            logger.info(f"Diario compactado: {len(cambios)} cambios aplicados en {sorted(por_tabla)}.")
+            return len(cambios)
+
+    def iniciar_compactador(self, intervalo=INTERVALO_COMPACTACION):
+        """Arranca un hilo en segundo plano que compacta el diario cada `intervalo` segundos."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle_compactacion, args=(intervalo,),
+                                      name="compactador-diario", daemon=True)
+        self._hilo.start()
+
+    def detener_compactador(self):
+        """Detiene el hilo compactador y aplica los cambios que queden pendientes."""
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join()
+            self._hilo = None
+        self.compactar()
+
+    def _bucle_compactacion(self, intervalo):
+        while not self._parar.wait(intervalo):
+            try:
+                self.compactar()
+            except Exception as e:
+                logger.error(f"Error al compactar el diario de cambios: {e}", exc_info=True)
+
+    def _aplicar(self, tabla, cambios):
+        """Aplica una lista ordenada de cambios sobre el snapshot de `tabla`."""
+        if tabla not in SNAPSHOTS:
+            logger.warning(f"Tabla '{tabla}' sin snapshot; se ignoran {len(cambios)} cambios.")
+            return
+
+        archivo, clave = SNAPSHOTS[tabla]
+        ruta = os.path.join(self.directorio, archivo)
+
+        registros = {}
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                for registro in json.load(f):
+                    registros[registro[clave]] = registro
+
+        for cambio in cambios:
+            if cambio["op"] == "delete":
+                registros.pop(cambio["id"], None)
+            else:
+                registros.setdefault(cambio["id"], {}).update(cambio.get("datos") or {})
+
+        escribir_registros_json(registros.values(), ruta)
+
+    def _leer(self, ruta):
+        """Lee los cambios de un diario ignorando líneas incompletas (p. ej. tras una caída)."""
+        if not os.path.exists(ruta):
+            return []
+        cambios = []
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for numero, linea in enumerate(f, start=1):
+                try:
+                    cambios.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    logger.warning(f"Línea {numero} del diario {ruta} no válida; se ignora.")
+        return cambios
+
+    def _leer_estado(self):
+        """Devuelve la última secuencia aplicada a los snapshots."""
+        if not os.path.exists(self.ruta_estado):
+            return 0
+        with open(self.ruta_estado, 'r', encoding='utf-8') as f:
+            return json.load(f).get("seq", 0)
+
+    def _guardar_estado(self, seq):
+        ruta_temporal = self.ruta_estado + ".tmp"
+        with open(ruta_temporal, 'w', encoding='utf-8') as f:
+            json.dump({"seq": seq}, f)
+        os.replace(ruta_temporal, self.ruta_estado)
+
+    def _ultima_secuencia(self):
+        ultima = self._leer_estado()
+        for ruta in (self.ruta_compactando, self.ruta):
+            for cambio in self._leer(ruta):
+                ultima = max(ultima, cambio["seq"])
+        return ultima
+
+
+# Diario compartido por los servicios
+diario_cambios = DiarioCambios(os.getenv("CLINICA_DIARIO_DIR", RUTA_DATA))
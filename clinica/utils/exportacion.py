@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+
+# Registros que se leen de la base de datos en cada viaje del cursor
+LOTE_EXPORTACION = 1000
+
+FORMATOS_EXPORTACION = ("json", "ndjson")
+
+
+def _permisos_por_defecto():
+    """Permisos que tendría un archivo nuevo creado con open(): 0o666 menos la umask del proceso."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def escribir_registros_json(registros, ruta_json, formato="json"):
+    """
+    Escribe un iterable de diccionarios en `ruta_json` de forma incremental y atómica.
+
+    Se escribe en un archivo temporal del mismo directorio que después se renombra sobre
+    `ruta_json`; si algo falla, el archivo anterior queda intacto.
+
+    Args:
+        registros (Iterable[dict]): Registros a escribir
+        ruta_json (str): Ruta del archivo de destino
+        formato (str): "json" (array, un registro por línea) o "ndjson" (un objeto por línea)
+
+    Returns:
+        dict: {"ruta", "registros", "bytes"}
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato '{formato}' no válido. Formatos aceptados: {', '.join(FORMATOS_EXPORTACION)}.")
+
+    directorio = os.path.dirname(os.path.abspath(ruta_json))
+    os.makedirs(directorio, exist_ok=True)
+
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=directorio, prefix=".exportacion_", suffix=".tmp")
+    escritos = 0
+    try:
+        try:
+            archivo = open(descriptor, 'w', encoding='utf-8')
+        except BaseException:
+            os.close(descriptor)
+            raise
+
+        with archivo:
+            if formato == "json":
+                archivo.write("[")
+            for registro in registros:
+                texto = json.dumps(registro, ensure_ascii=False)
+                if formato == "json":
+                    archivo.write(("\n    " if escritos == 0 else ",\n    ") + texto)
+                else:
+                    archivo.write(texto + "\n")
+                escritos += 1
+            if formato == "json":
+                archivo.write("\n]\n" if escritos else "]\n")
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+        # mkstemp crea el archivo con 0600 y os.replace conserva esos permisos
+        os.chmod(ruta_temporal, _permisos_por_defecto())
+        bytes_escritos = os.path.getsize(ruta_temporal)
+        os.replace(ruta_temporal, ruta_json)
+    except BaseException:
+        if os.path.exists(ruta_temporal):
+            os.unlink(ruta_temporal)
+        raise
+
+    return {"ruta": ruta_json, "registros": escritos, "bytes": bytes_escritos}
+
+
+def exportar_consulta_json(query, ruta_json, formato="json", lote=LOTE_EXPORTACION):
+    """
+    Exporta los resultados de `query` a un archivo escribiendo registro a registro.
+
+    Los registros se leen con `yield_per` y se serializan con su `to_dict()`, de modo que
+    la memoria no crece con el tamaño de la tabla.
+
+    Args:
+        query (Query): Consulta ORM cuyos resultados implementan `to_dict()`
+        ruta_json (str): Ruta del archivo de destino
+        formato (str): "json" (array) o "ndjson" (un objeto por línea)
+        lote (int): Registros por lote leídos de la base de datos
+
+    Returns:
+        dict: {"ruta", "registros", "bytes"}
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato '{formato}' no válido. Formatos aceptados: {', '.join(FORMATOS_EXPORTACION)}.")
+    return escribir_registros_json((registro.to_dict() for registro in query.yield_per(lote)), ruta_json, formato)
@@ -0,0 +1,210 @@
+"""
+Motor de facturas en PDF.
+
+La parte fija de la factura (cabecera de la clínica, títulos de las secciones, líneas de la tabla y
+pie) se dibuja una sola vez por documento como un XObject de formulario de reportlab y cada página
+lo reutiliza con `doForm`; solo se dibujan en cada página los datos de la factura. En un PDF de
+varias páginas la plantilla se guarda una vez en el fichero.
+
+Todo se genera en memoria (BytesIO). Las funciones de este módulo reciben diccionarios con los datos
+ya leídos (ver GestionFacturas), así que se pueden ejecutar en otro proceso: el pool de procesos de
+`renderizar_en_pool` saca el dibujado, que es CPU puro, del bucle de eventos de la API.
+"""
+
+import asyncio
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from io import BytesIO
+from multiprocessing import get_context
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+ANCHO, ALTO = letter
+PLANTILLA = "plantilla_factura"
+
+# Procesos del pool de dibujado; con 0 se dibuja en un hilo del propio proceso
+PROCESOS_FACTURAS = int(os.getenv("CLINICA_FACTURAS_PROCESOS", str(min(4, os.cpu_count() or 1))))
+# Facturas que dibuja cada tarea del pool al generar un ZIP
+TAMANO_TROZO_FACTURAS = 50
+
+FORMATOS_LOTE = ("zip", "pdf")
+
+_pool = None
+
+
+def _dibujar_plantilla(c):
+    """Parte fija de la factura, igual en todas las páginas."""
+    c.setFont("Helvetica-Bold", 24)
+    c.drawString(50, ALTO - 50, "UFVVet Clínica Veterinaria")
+
+    c.setFont("Helvetica", 12)
+    c.drawString(50, ALTO - 70, "Calle de la Mascota Feliz, 123")
+    c.drawString(50, ALTO - 85, "28223 Madrid")
+    c.drawString(50, ALTO - 100, "Tel: +34 123 456 789")
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(400, ALTO - 50, "FACTURA")
+
+    c.line(50, ALTO - 120, ANCHO - 50, ALTO - 120)
+
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, ALTO - 150, "Datos del Cliente")
+    c.drawString(50, ALTO - 245, "Datos de la Mascota")
+    c.drawString(50, ALTO - 325, "Detalles del Tratamiento")
+
+    # Cabecera de la tabla
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, ALTO - 345, "Descripción")
+    c.drawString(400, ALTO - 345, "Precio")
+    c.line(50, ALTO - 350, ANCHO - 50, ALTO - 350)
+
+    # Línea y etiqueta del total
+    c.line(50, ALTO - 410, ANCHO - 50, ALTO - 410)
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(350, ALTO - 430, "Total:")
+
+    # Pie de página
+    c.setFont("Helvetica-Oblique", 10)
+    c.drawString(50, 50, "Gracias por confiar en UFVVet Clínica Veterinaria")
+    c.drawString(50, 35, "Este documento sirve como comprobante de pago")
+
+
+def _nuevo_documento(salida):
+    """Canvas sobre `salida` con la plantilla ya definida."""
+    c = canvas.Canvas(salida, pagesize=letter)
+    c.beginForm(PLANTILLA)
+    _dibujar_plantilla(c)
+    c.endForm()
+    return c
+
+
+def _dibujar_factura(c, datos):
+    """Una página: la plantilla más los datos de la factura."""
+    c.doForm(PLANTILLA)
+
+    fecha = datos.get("fecha_factura") or date.today()
+    c.setFont("Helvetica", 12)
+    c.drawString(400, ALTO - 70, f"Fecha: {fecha:%d/%m/%Y}")
+    c.drawString(400, ALTO - 85, f"Nº Factura: {datos['id_cita']}")
+
+    c.drawString(50, ALTO - 170, f"Nombre: {datos['nombre_cliente']}")
+    c.drawString(50, ALTO - 185, f"DNI: {datos['dni']}")
+    c.drawString(50, ALTO - 200, f"Dirección: {datos['direccion']}")
+    c.drawString(50, ALTO - 215, f"Teléfono: {datos['telefono']}")
+
+    c.drawString(50, ALTO - 265, f"Nombre: {datos['nombre_mascota']}")
+    c.drawString(50, ALTO - 280, f"Raza: {datos['raza']}")
+    c.drawString(50, ALTO - 295, f"Edad: {datos['edad']} años")
+
+    descripcion = datos.get("descripcion") or ""
+    precio = datos.get("precio") or 0
+    c.drawString(50, ALTO - 370, datos['nombre_tratamiento'])
+    c.drawString(50, ALTO - 385, descripcion[:50] + "..." if len(descripcion) > 50 else descripcion)
+    c.drawRightString(500, ALTO - 370, f"{precio:.2f} €")
+
+    c.setFont("Helvetica-Bold", 14)
+    c.drawRightString(500, ALTO - 430, f"{precio:.2f} €")
+
+    c.setFont("Helvetica", 12)
+    c.drawString(50, ALTO - 460, f"Método de pago: {datos['metodo_pago']}")
+    c.showPage()
+
+
+def nombre_factura(datos):
+    """Nombre del fichero de la factura dentro de un ZIP."""
+    return f"factura_{datos['id_cita']}.pdf"
+
+
+def renderizar_facturas(facturas):
+    """
+    Dibuja las facturas en un único PDF, una por página.
+
+    Args:
+        facturas (list[dict]): Datos de cada factura (ver GestionFacturas)
+
+    Returns:
+        bytes: El PDF
+    """
+    salida = BytesIO()
+    c = _nuevo_documento(salida)
+    for datos in facturas:
+        _dibujar_factura(c, datos)
+    c.save()
+    return salida.getvalue()
+
+
+def renderizar_factura(datos):
+    """PDF de una sola factura."""
+    return renderizar_facturas([datos])
+
+
+def renderizar_trozo(facturas):
+    """[(nombre, pdf)] con un PDF por factura; es la tarea que ejecuta el pool al generar un ZIP."""
+    return [(nombre_factura(datos), renderizar_factura(datos)) for datos in facturas]
+
+
+def empaquetar_zip(archivos):
+    """ZIP con los PDFs; se guardan sin comprimir porque reportlab ya comprime las páginas."""
+    salida = BytesIO()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as archivo_zip:
+        for nombre, contenido in archivos:
+            archivo_zip.writestr(nombre, contenido)
+    return salida.getvalue()
+
+
+def pool_facturas():
+    """Pool de procesos de dibujado, creado la primera vez que se usa; None si está desactivado."""
+    global _pool
+    if PROCESOS_FACTURAS < 1:
+        return None
+    if _pool is None:
+        # spawn: los procesos hijos no heredan los hilos ni las conexiones de la API
+        _pool = ProcessPoolExecutor(max_workers=PROCESOS_FACTURAS, mp_context=get_context("spawn"))
+        logger.info(f"Pool de facturas iniciado con {PROCESOS_FACTURAS} procesos")
+    return _pool
+
+
+def cerrar_pool_facturas():
+    """Detiene el pool de procesos (al cerrar la aplicación)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        logger.info("Pool de facturas detenido")
+
+
+async def renderizar_en_pool(funcion, *args):
+    """Ejecuta `funcion(*args)` en el pool de facturas sin bloquear el bucle de eventos."""
+    pool = pool_facturas()
+    if pool is None:
+        return await asyncio.to_thread(funcion, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, funcion, *args)
+
+
+async def renderizar_lote(facturas, formato="zip"):
+    """
+    Dibuja un lote de facturas en el pool.
+
+    Con "zip" las facturas se reparten en trozos que se dibujan en paralelo y cada una va en su
+    propio PDF. Con "pdf" todas van en un único documento, que se dibuja en una sola tarea para
+    que la plantilla se guarde una sola vez.
+
+    Returns:
+        bytes: El ZIP o el PDF
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    if formato not in FORMATOS_LOTE:
+        raise ValueError(f"Formato '{formato}' no válido. Formatos: {', '.join(FORMATOS_LOTE)}.")
+    if formato == "pdf":
+        return await renderizar_en_pool(renderizar_facturas, facturas)
+
+    trozos = [facturas[i:i + TAMANO_TROZO_FACTURAS] for i in range(0, len(facturas), TAMANO_TROZO_FACTURAS)]
+    resultados = await asyncio.gather(*(renderizar_en_pool(renderizar_trozo, trozo) for trozo in trozos))
+    return empaquetar_zip(archivo for trozo in resultados for archivo in trozo)
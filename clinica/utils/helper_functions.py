@@ -0,0 +1,105 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def codificar_cursor(fecha, id_registro):
+    """
+    Codifica la posición de un registro (fecha, id) en un cursor opaco para la paginación por clave.
+
+    Args:
+        fecha (datetime | None): Fecha del último registro devuelto
+        id_registro (int): ID del último registro devuelto
+
+    Returns:
+        str: Cursor en base64 seguro para URL
+    """
+    carga = json.dumps([fecha.isoformat() if fecha else None, id_registro], separators=(",", ":"))
+    return base64.urlsafe_b64encode(carga.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """
+    Decodifica un cursor generado por `codificar_cursor`.
+
+    Returns:
+        tuple: (fecha, id_registro)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        fecha, id_registro = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return (datetime.fromisoformat(fecha) if fecha else None, int(id_registro))
+    except (ValueError, TypeError) as e:
+        raise ValueError("El cursor de paginación no es válido.") from e
+
+
+# Parámetros por sentencia que se usan como máximo en las consultas IN (...). Las versiones de
+# SQLite anteriores a la 3.32 no admiten más de 999 variables por sentencia.
+MAX_VARIABLES_SQLITE = 900
+
+# Filas que se leen de la base de datos por lote en los listados transmitidos (NDJSON / CSV)
+TAMANO_LOTE_STREAMING = 1000
+
+
+def patron_contiene(texto):
+    """
+    Patrón de LIKE que busca `texto` en cualquier posición, con `%`, `_` y `\\` escapados.
+
+    Se usa con `escape="\\"` para que un `%` o un `_` escritos por el usuario se busquen tal cual
+    en lugar de actuar como comodines.
+    """
+    escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapado}%"
+
+
+def fecha_sin_zona(fecha):
+    """
+    Devuelve `fecha` sin zona horaria, con la misma hora de pared.
+
+    SQLite guarda las fechas sin zona (la hora tal cual llega), así que las que llegan con zona a la
+    API ("...Z", "+02:00") se normalizan a esa misma hora para compararlas con las leídas de la tabla.
+    """
+    if getattr(fecha, "tzinfo", None) is not None:
+        return fecha.replace(tzinfo=None)
+    return fecha
+
+
+def parsear_ids(ids):
+    """
+    Normaliza una lista de IDs ("1,2,3" o iterable) a enteros sin repetidos, en el orden recibido.
+
+    Raises:
+        ValueError: Si algún ID no es un entero
+    """
+    if ids is None:
+        return []
+    if isinstance(ids, str):
+        ids = [valor for valor in ids.split(",") if valor.strip()]
+    try:
+        return list(dict.fromkeys(int(valor) for valor in ids))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Los IDs deben ser números enteros separados por comas.") from e
+
+
+def trocear(valores, tamano=MAX_VARIABLES_SQLITE):
+    """Divide `valores` en listas de como mucho `tamano` elementos."""
+    valores = list(valores)
+    return [valores[i:i + tamano] for i in range(0, len(valores), tamano)]
+
+
+async def iterar_lotes_async(db_session, consulta, tamano_lote=TAMANO_LOTE_STREAMING):
+    """
+    Ejecuta `consulta` con un cursor `yield_per` y la devuelve en lotes de filas (RowMapping).
+
+    Abre una sesión propia sobre el mismo motor que `db_session`: la sesión de la petición se
+    cierra antes de que una StreamingResponse termine de enviarse. La memoria usada depende del
+    tamaño del lote, no del de la tabla.
+    """
+    async with AsyncSession(bind=db_session.bind) as sesion:
+        resultado = await sesion.stream(consulta.execution_options(yield_per=tamano_lote))
+        async for lote in resultado.mappings().partitions(tamano_lote):
+            yield lote
@@ -0,0 +1,154 @@
+"""
+Reglas de recurrencia de las series de citas: un subconjunto de RRULE (RFC 5545).
+
+Se admiten FREQ (DAILY, WEEKLY o MONTHLY), INTERVAL, BYDAY (solo con WEEKLY), COUNT y UNTIL. Toda
+regla tiene que llevar COUNT o UNTIL, de modo que una serie siempre termina. Con MONTHLY la cita
+se repite el mismo día del mes que la primera; los meses que no tienen ese día se saltan.
+
+Las ocurrencias se calculan con dateutil.rrule de forma perezosa: expandir una ventana recorre las
+fechas solo hasta el final de esa ventana, nunca la serie entera. Una serie no puede tener más de
+MAX_OCURRENCIAS_SERIE citas, tanto si termina por COUNT como por UNTIL.
+"""
+
+from datetime import datetime, timedelta
+from itertools import islice, takewhile
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, rrule, weekday
+
+FRECUENCIAS = {"DAILY": DAILY, "WEEKLY": WEEKLY, "MONTHLY": MONTHLY}
+DIAS_SEMANA = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# COUNT máximo de una serie (diez años de citas semanales)
+MAX_OCURRENCIAS_SERIE = 520
+# Ventana máxima que se expande de una vez
+MAX_DIAS_VENTANA = 366
+
+_FORMATOS_UNTIL = ("%Y%m%dT%H%M%S", "%Y%m%d")
+
+
+def parsear_regla(texto):
+    """
+    Valida una regla y la devuelve como diccionario.
+
+    Args:
+        texto (str): Regla "CLAVE=valor;..." (p. ej. "FREQ=WEEKLY;BYDAY=MO,TH;COUNT=10")
+
+    Returns:
+        dict: {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}; BYDAY es una tupla y los ausentes son None
+
+    Raises:
+        ValueError: Si la regla no es válida o usa partes de RRULE que no se admiten
+    """
+    partes = {}
+    for parte in (texto or "").upper().removeprefix("RRULE:").split(";"):
+        if not parte.strip():
+            continue
+        clave, signo, valor = parte.partition("=")
+        clave, valor = clave.strip(), valor.strip()
+        if not signo or not valor:
+            raise ValueError(f"Parte '{parte}' de la regla no válida; se espera CLAVE=valor.")
+        if clave not in ("FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"):
+            raise ValueError(f"'{clave}' no está admitido. Partes admitidas: FREQ, INTERVAL, BYDAY, COUNT, UNTIL.")
+        if clave in partes:
+            raise ValueError(f"'{clave}' aparece más de una vez en la regla.")
+        partes[clave] = valor
+
+    if partes.get("FREQ") not in FRECUENCIAS:
+        raise ValueError(f"FREQ es obligatorio y debe ser uno de: {', '.join(FRECUENCIAS)}.")
+    regla = {"FREQ": partes["FREQ"], "INTERVAL": 1, "BYDAY": None, "COUNT": None, "UNTIL": None}
+
+    for clave in ("INTERVAL", "COUNT"):
+        if clave in partes:
+            if not partes[clave].isdigit() or int(partes[clave]) < 1:
+                raise ValueError(f"{clave} debe ser un entero positivo.")
+            regla[clave] = int(partes[clave])
+    if regla["COUNT"] and regla["COUNT"] > MAX_OCURRENCIAS_SERIE:
+        raise ValueError(f"Una serie admite como mucho {MAX_OCURRENCIAS_SERIE} citas.")
+
+    if "BYDAY" in partes:
+        if regla["FREQ"] != "WEEKLY":
+            raise ValueError("BYDAY solo se admite con FREQ=WEEKLY.")
+        dias = [dia.strip() for dia in partes["BYDAY"].split(",")]
+        desconocidos = [dia for dia in dias if dia not in DIAS_SEMANA]
+        if desconocidos:
+            raise ValueError(f"Días no válidos en BYDAY: {', '.join(desconocidos)}. Días: {', '.join(DIAS_SEMANA)}.")
+        regla["BYDAY"] = tuple(sorted(set(dias), key=DIAS_SEMANA.index))
+
+    if "UNTIL" in partes:
+        for formato in _FORMATOS_UNTIL:
+            try:
+                regla["UNTIL"] = datetime.strptime(partes["UNTIL"].rstrip("Z"), formato)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError("UNTIL debe tener el formato AAAAMMDD o AAAAMMDDTHHMMSS.")
+
+    if (regla["COUNT"] is None) == (regla["UNTIL"] is None):
+        raise ValueError("La regla debe llevar COUNT o UNTIL (solo uno de los dos).")
+    return regla
+
+
+def normalizar_regla(texto):
+    """Valida la regla y la escribe en forma canónica, que es como se guarda en la serie."""
+    regla = parsear_regla(texto)
+    partes = [f"FREQ={regla['FREQ']}", f"INTERVAL={regla['INTERVAL']}"]
+    if regla["BYDAY"]:
+        partes.append(f"BYDAY={','.join(regla['BYDAY'])}")
+    if regla["COUNT"]:
+        partes.append(f"COUNT={regla['COUNT']}")
+    if regla["UNTIL"]:
+        partes.append(f"UNTIL={regla['UNTIL']:%Y%m%dT%H%M%S}")
+    return ";".join(partes)
+
+
+def construir_regla(texto, inicio):
+    """
+    dateutil.rrule de la regla con `inicio` como primera ocurrencia (DTSTART).
+
+    Raises:
+        ValueError: Si la regla no es válida o tiene más de MAX_OCURRENCIAS_SERIE ocurrencias
+    """
+    regla = parsear_regla(texto)
+    reglas = rrule(
+        FRECUENCIAS[regla["FREQ"]],
+        dtstart=inicio,
+        interval=regla["INTERVAL"],
+        byweekday=[weekday(DIAS_SEMANA.index(dia)) for dia in regla["BYDAY"]] if regla["BYDAY"] else None,
+        count=regla["COUNT"],
+        until=regla["UNTIL"],
+    )
+    # COUNT ya se limita en parsear_regla; con UNTIL el número de citas depende de la frecuencia y del
+    # inicio, así que se cuentan (como mucho MAX_OCURRENCIAS_SERIE + 1)
+    if regla["UNTIL"] and sum(1 for _ in islice(reglas, MAX_OCURRENCIAS_SERIE + 1)) > MAX_OCURRENCIAS_SERIE:
+        raise ValueError(f"Una serie admite como mucho {MAX_OCURRENCIAS_SERIE} citas.")
+    return reglas
+
+
+def iterar_ocurrencias(texto, inicio, desde=None, hasta=None):
+    """
+    Generador de las ocurrencias de la regla en [desde, hasta), en orden.
+
+    La regla no se expande entera: se empieza en la primera ocurrencia desde `desde` y se para en
+    la primera que llega a `hasta`.
+
+    Raises:
+        ValueError: Si la regla no es válida
+    """
+    regla = construir_regla(texto, inicio)
+    fechas = regla.xafter(desde, inc=True) if desde is not None else iter(regla)
+    if hasta is None:
+        return fechas
+    return takewhile(lambda fecha: fecha < hasta, fechas)
+
+
+def validar_ventana(desde, hasta, max_dias=MAX_DIAS_VENTANA):
+    """
+    Comprueba que [desde, hasta) es una ventana válida para expandir.
+
+    Raises:
+        ValueError: Si hasta no es posterior a desde o la ventana es demasiado larga
+    """
+    if hasta <= desde:
+        raise ValueError("'hasta' debe ser posterior a 'desde'.")
+    if hasta - desde > timedelta(days=max_dias):
+        raise ValueError(f"La ventana no puede superar {max_dias} días.")
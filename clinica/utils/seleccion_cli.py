@@ -0,0 +1,77 @@
+"""
+Selección interactiva por consola entre varias coincidencias de una búsqueda por nombre.
+
+Los servicios solo devuelven resultados ordenados y paginados; pedir al usuario que elija uno es
+cosa de quien usa la consola, así que vive aquí y nunca en un servicio ni en la API.
+"""
+
+from clinica.services.gestion_busqueda import LIMITE_BUSQUEDA
+
+
+def _seleccionar(resultados, describir, entrada, pregunta):
+    if not resultados:
+        return None
+    if len(resultados) == 1:
+        return resultados[0]
+
+    for idx, resultado in enumerate(resultados, start=1):
+        print(f"{idx}. {describir(resultado)}")
+
+    try:
+        seleccion = int(entrada(pregunta))
+    except ValueError:
+        print("Entrada no válida. Operación cancelada.")
+        return None
+    if seleccion == 0:
+        print("Operación cancelada.")
+        return None
+    if 1 <= seleccion <= len(resultados):
+        return resultados[seleccion - 1]
+    print("Selección no válida. Operación cancelada.")
+    return None
+
+
+def seleccionar_cliente_por_nombre(gestion_clientes, nombre_cliente, entrada=input, limite=LIMITE_BUSQUEDA):
+    """
+    Busca clientes por nombre y, si hay varios, pide por consola que se elija uno.
+
+    Args:
+        gestion_clientes (GestionClientes): Servicio de clientes
+        nombre_cliente (str): Nombre o parte del nombre
+        entrada (callable): Función que lee la selección (por defecto `input`)
+        limite (int): Coincidencias que se muestran como máximo
+
+    Returns:
+        dict | None: {"cliente", "mascotas"} elegido, o None si no hay coincidencias o se cancela
+    """
+    resultados = gestion_clientes.buscar_clientes_por_nombre(nombre_cliente, limite=limite)["resultados"]
+    return _seleccionar(
+        resultados,
+        lambda r: f"Cliente: {r['cliente'].nombre_cliente} - DNI: {r['cliente'].dni} - "
+                  f"Mascotas: {', '.join(r['mascotas']) or 'Sin mascotas'}",
+        entrada,
+        "Seleccione el número del cliente deseado (0 para cancelar): ",
+    )
+
+
+def seleccionar_mascota_por_nombre(gestion_mascotas, nombre_mascota, entrada=input, limite=LIMITE_BUSQUEDA):
+    """
+    Busca mascotas por nombre y, si hay varias, pide por consola que se elija una.
+
+    Args:
+        gestion_mascotas (GestionMascotas): Servicio de mascotas
+        nombre_mascota (str): Nombre o parte del nombre
+        entrada (callable): Función que lee la selección (por defecto `input`)
+        limite (int): Coincidencias que se muestran como máximo
+
+    Returns:
+        dict | None: {"mascota", "cliente"} elegido, o None si no hay coincidencias o se cancela
+    """
+    resultados = gestion_mascotas.buscar_mascotas_por_nombre(nombre_mascota, limite=limite)["resultados"]
+    return _seleccionar(
+        resultados,
+        lambda r: f"Mascota: {r['mascota'].nombre_mascota} - ID: {r['mascota'].id_mascota} - "
+                  f"Estado: {r['mascota'].estado} - Cliente: {r['cliente']}",
+        entrada,
+        "Seleccione el número de la mascota deseada (0 para cancelar): ",
+    )
@@ -0,0 +1,53 @@
+import threading
+import time
+
+# Tablas con contador de versión (nombres de __tablename__)
+TABLAS = ("cliente", "mascota", "tratamiento", "cita")
+
+
+class VersionesTablas:
+    """
+    Contador de versión por tabla para las cabeceras ETag y Last-Modified de la API.
+
+    Los servicios incrementan la versión de cada tabla que modifican después de su commit. Una
+    respuesta de lectura depende solo de las versiones de las tablas que consulta, así que la API
+    puede contestar 304 a un `If-None-Match` comparando contadores en memoria, sin abrir la base de
+    datos.
+
+    Los contadores viven en memoria: cada arranque del proceso usa una época distinta para que no
+    se reutilicen ETags de una ejecución anterior. Como el diario de cambios, están pensados para
+    un único proceso escritor; las escrituras hechas por otro proceso no cambian el ETag.
+    """
+
+    def __init__(self, tablas=TABLAS):
+        self._lock = threading.Lock()
+        ahora = time.time()
+        self._epoca = format(int(ahora * 1000), "x")
+        self._versiones = {tabla: 0 for tabla in tablas}
+        self._modificado = {tabla: ahora for tabla in tablas}
+
+    def incrementar(self, *tablas):
+        """Marca las tablas como modificadas."""
+        ahora = time.time()
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+                self._modificado[tabla] = ahora
+
+    def version(self, tabla):
+        return self._versiones.get(tabla, 0)
+
+    def etag(self, *tablas):
+        """ETag débil que cambia en cuanto cambia cualquiera de las tablas."""
+        with self._lock:
+            partes = "-".join(f"{tabla}.{self._versiones.get(tabla, 0)}" for tabla in sorted(set(tablas)))
+        return f'W/"{self._epoca}-{partes}"'
+
+    def ultima_modificacion(self, *tablas):
+        """Instante (epoch) de la última escritura en cualquiera de las tablas."""
+        with self._lock:
+            return max(self._modificado.get(tabla, 0) for tabla in tablas)
+
+
+# Contadores compartidos por los servicios y la API
+versiones_tablas = VersionesTablas()
@@ -0,0 +1,60 @@
+"""
+Peticiones GET condicionales (ETag / If-None-Match y Last-Modified / If-Modified-Since).
+
+Los endpoints de lectura llaman a `respuesta_no_modificada` antes de consultar la base de datos.
+El ETag sale de los contadores de versión de las tablas que lee el endpoint, de modo que un
+cliente que ya tiene la última versión recibe un 304 sin cuerpo y sin tocar el ORM.
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+from clinica.utils.versiones_tablas import versiones_tablas
+
+
+def _etag_coincide(if_none_match, etag):
+    """Comparación débil de ETags (RFC 9110, 13.1.2)."""
+    if if_none_match.strip() == "*":
+        return True
+    propio = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == propio for candidato in if_none_match.split(","))
+
+
+def _no_modificado_desde(if_modified_since, ultima_modificacion):
+    try:
+        return int(ultima_modificacion) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def respuesta_no_modificada(request: Request, response: Response, *tablas, variante=None):
+    """
+    Añade ETag, Last-Modified y Cache-Control a `response` según la versión de `tablas`.
+
+    Los endpoints con varias representaciones según Accept (JSON, NDJSON, CSV) pasan `variante`:
+    se añade al ETag para que cada representación tenga el suyo, junto con `Vary: Accept`.
+
+    Returns:
+        Response | None: Un 304 si la copia del cliente sigue siendo válida; None si hay que
+        generar la respuesta completa
+    """
+    etag = versiones_tablas.etag(*tablas)
+    if variante:
+        etag = f'{etag[:-1]}-{variante}"'
+    ultima_modificacion = versiones_tablas.ultima_modificacion(*tablas)
+    cabeceras = {
+        "ETag": etag,
+        "Last-Modified": formatdate(ultima_modificacion, usegmt=True),
+        # El cliente puede guardar la respuesta pero debe revalidarla en cada uso
+        "Cache-Control": "no-cache",
+    }
+    if variante:
+        cabeceras["Vary"] = "Accept"
+    response.headers.update(cabeceras)
+
+    # If-Modified-Since solo se tiene en cuenta si no hay If-None-Match
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        no_modificado = _etag_coincide(if_none_match, etag)
+    else:
+        no_modificado = _no_modificado_desde(request.headers.get("if-modified-since"), ultima_modificacion)
+    return Response(status_code=304, headers=cabeceras) if no_modificado else None
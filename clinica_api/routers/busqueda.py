@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from clinica.dbconfig import get_async_db
+from clinica.services.gestion_busqueda import GestionBusqueda, TIPOS_BUSQUEDA, LIMITE_BUSQUEDA
+from clinica_api.condicionales import respuesta_no_modificada
+from clinica_api.schemas import ResultadoBusqueda
+from typing import List, Optional
+import logging
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/buscar",
+    tags=["Búsqueda"],
+    responses={
+        400: {"description": "Texto o tipo de búsqueda no válidos"},
+        500: {"description": "Error interno del servidor"}
+    }
+)
+
+@router.get("/",
+           response_model=List[ResultadoBusqueda],
+           response_model_exclude_unset=True,
+           summary="Buscar clientes y mascotas",
+           description="Búsqueda de texto completo sobre el nombre, DNI, teléfono y dirección de los clientes y "
+                       "el nombre, raza y afección de las mascotas. Cada palabra se busca como prefijo, sin "
+                       "distinguir mayúsculas ni acentos, y los resultados se ordenan por relevancia.")
+async def buscar(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a buscar"),
+    tipo: Optional[str] = Query(None, description=f"Tipos separados por comas: {', '.join(TIPOS_BUSQUEDA)} (por defecto, todos)"),
+    limit: int = Query(LIMITE_BUSQUEDA, ge=1, le=100, description="Número máximo de resultados"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    no_modificado = respuesta_no_modificada(request, response, "cliente", "mascota")
+    if no_modificado:
+        return no_modificado
+    try:
+        tipos = [t.strip() for t in tipo.split(",") if t.strip()] if tipo else None
+        return await GestionBusqueda(db).buscar_async(q, tipos=tipos, limite=limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
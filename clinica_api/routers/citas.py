@@ -1,12 +1,22 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from clinica.models import tabla_citas
+from clinica.models import Cita, tabla_citas
 from clinica.services.gestion_de_citas import GestionCitas
-from clinica.dbconfig import SessionLocal
-from clinica_api.schemas import CitaCreate, CitaUpdate, CitaResponse
+from clinica.services.gestion_series import GestionSeries
+from clinica.services.opciones_carga import serializar, tablas_consultadas
+from clinica.utils.agenda_citas import CitaSolapadaError
+from clinica_api.condicionales import respuesta_no_modificada
+from clinica_api.serializacion import formato_streaming, respuesta_json, respuesta_streaming
+from clinica.dbconfig import SessionLocal, get_async_db
+from clinica_api.schemas import (CitaCreate, CitaUpdate, CitaResponse, CitaDetalladaResponse, CitasLote,
+                                 ConfirmacionSerie, ConsultaPorIds, Disponibilidad, EstadoLote, EventoCalendario,
+                                 OcurrenciaSerieResponse, RespuestaLote, SerieCitaCreate, SerieCitaResponse)
 from typing import List, Optional
+from datetime import date, datetime
 import logging
 
 # Configuración del logger
@@ -30,11 +40,23 @@ def get_db():
     finally:
         db.close()
 
+def _validar_cita_lote(datos):
+    """Valida una cita de un lote contra CitaCreate y resume sus errores en un ValueError de una línea."""
+    try:
+        return CitaCreate.model_validate(datos).model_dump()
+    except ValidationError as ve:
+        raise ValueError("; ".join(f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}"
+                                   for error in ve.errors()))
+
+def _respuesta_lote(resultados):
+    correctas = sum(1 for resultado in resultados if resultado["ok"])
+    return {"correctas": correctas, "errores": len(resultados) - correctas, "resultados": resultados}
+
 @router.post("/exportar", 
             response_model=dict,
             summary="Exportar citas a JSON",
             description="Exporta todas las citas almacenadas en la base de datos a un archivo JSON")
-async def exportar_citas_a_json(db: Session = Depends(get_db)):
+def exportar_citas_a_json(db: Session = Depends(get_db)):
     gestion_citas = GestionCitas(db)
     try:
         # Asegurarse de que el directorio existe
@@ -67,7 +89,7 @@ async def exportar_citas_a_json(db: Session = Depends(get_db)):
            response_model=dict,
            summary="Obtener IDs de ejemplo",
            description="Obtiene IDs de ejemplo de una cita para referencia")
-async def obtener_ids(db: Session = Depends(get_db)):
+def obtener_ids(db: Session = Depends(get_db)):
     try:
         cita = db.query(tabla_citas).first()
         if not cita:
@@ -88,7 +110,7 @@ async def obtener_ids(db: Session = Depends(get_db)):
             status_code=201,
             summary="Registrar nueva cita",
             description="Crea una nueva cita en el sistema")
-async def registrar_cita(
+def registrar_cita(
     cita: CitaCreate, 
     db: Session = Depends(get_db)
 ):
@@ -109,23 +131,285 @@ async def registrar_cita(
         raise HTTPException(status_code=500, detail=f"Error inesperado: {str(e)}")
 
 @router.get("/", 
-           response_model=List[CitaResponse],
+           response_model=List[CitaDetalladaResponse],
+           response_model_exclude_unset=True,
            summary="Listar citas",
-           description="Obtiene todas las citas con opción de filtrado por estado")
+           description="Obtiene las citas paginadas con opción de filtrado por estado. "
+                       "El cursor de la página siguiente se devuelve en la cabecera X-Next-Cursor "
+                       "y, si se solicita, el total en X-Total-Count. Con `include` se embeben el "
+                       "cliente, la mascota o el tratamiento en el mismo SELECT. Con `ids` se devuelven "
+                       "solo esas citas, en ese orden y sin paginar. Con `Accept: application/x-ndjson` o "
+                       "`text/csv` se transmiten por lotes todas las citas (con el filtro `estado`) sin paginar.")
 async def ver_todas_las_citas(
+    request: Request,
+    response: Response,
     estado: Optional[str] = Query(None, description="Estado de la cita (Pendiente, Finalizada, Cancelada)"),
-    skip: int = Query(0, description="Número de registros a saltar"),
-    limit: int = Query(100, description="Número máximo de registros a retornar"),
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de la cabecera X-Next-Cursor (tiene prioridad sobre skip)"),
+    incluir_total: bool = Query(False, description="Incluye el total de citas en la cabecera X-Total-Count"),
+    include: Optional[str] = Query(None, description="Relaciones separadas por comas: cliente, mascota, tratamiento"),
+    ids: Optional[str] = Query(None, description="IDs de cita separados por comas (1,2,3)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    formato = formato_streaming(request, include, ids)
+    no_modificado = respuesta_no_modificada(request, response, *tablas_consultadas(Cita, include),
+                                            variante=formato or "json")
+    if no_modificado:
+        return no_modificado
     gestion_citas = GestionCitas(db)
+    if formato:
+        return respuesta_streaming(gestion_citas.iterar_citas_async(estado=estado), CitaResponse,
+                                   formato, response, nombre="citas")
     try:
-        logger.info(f"Consultando citas con filtros - Estado: {estado}, Skip: {skip}, Limit: {limit}")
-        citas = gestion_citas.ver_todas_las_citas(estado=estado)
-        return [CitaResponse.model_validate(cita) for cita in citas["citas"]]
+        if ids is not None:
+            citas = await gestion_citas.buscar_citas_por_ids_async(ids, include=include)
+            return [serializar(cita, include) for cita in citas]
+        logger.info(f"Consultando citas con filtros - Estado: {estado}, Skip: {skip}, Limit: {limit}, Cursor: {cursor}")
+        citas = await gestion_citas.ver_todas_las_citas_async(
+            estado=estado,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            incluir_total=incluir_total,
+            include=include,
+            columnas=not include
+        )
+        if "error" in citas:
+            raise HTTPException(status_code=500, detail=f"Error al listar citas: {citas['error']}")
+
+        if citas["next_cursor"]:
+            response.headers["X-Next-Cursor"] = citas["next_cursor"]
+        if citas["total"] is not None:
+            response.headers["X-Total-Count"] = str(citas["total"])
+        if include:
+            # FastAPI valida los diccionarios contra response_model una sola vez
+            return citas["citas"]
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        logger.warning(f"Parámetros de paginación no válidos: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Error al listar citas: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al listar citas: {str(e)}")
+    # Sin relaciones llegan filas de columnas: se validan en bloque y se codifican con orjson.
+    # Fuera del try porque ValidationError hereda de ValueError y no es un error del cliente.
+    return respuesta_json(citas["citas"], CitaResponse, response)
+
+@router.post("/por_ids",
+            response_model=List[CitaDetalladaResponse],
+            response_model_exclude_unset=True,
+            summary="Buscar citas por lista de IDs",
+            description="Igual que `GET /citas/?ids=...` pero con los IDs en el cuerpo, para listas largas.")
+async def buscar_citas_por_ids(consulta: ConsultaPorIds, db: AsyncSession = Depends(get_async_db)):
+    gestion_citas = GestionCitas(db)
+    try:
+        citas = await gestion_citas.buscar_citas_por_ids_async(consulta.ids, include=consulta.include)
+        return [serializar(cita, consulta.include) for cita in citas]
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al buscar citas por IDs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al buscar citas: {str(e)}")
+
+@router.get("/calendario",
+           response_model=List[EventoCalendario],
+           summary="Eventos del calendario de citas",
+           description="Devuelve, listas para el calendario, las citas que se solapan con la ventana "
+                       "[desde, hasta) (como mucho 92 días), ordenadas por fecha. Con `recurso` solo las "
+                       "de esa consulta (consulta_0, consulta_1...).")
+async def calendario_citas(
+    request: Request,
+    response: Response,
+    desde: datetime = Query(..., description="Inicio de la ventana visible (ISO 8601)"),
+    hasta: datetime = Query(..., description="Fin de la ventana, excluido (ISO 8601)"),
+    recurso: Optional[str] = Query(None, description="Consulta del calendario (consulta_N)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    no_modificado = respuesta_no_modificada(request, response, "cita", "cliente", "mascota")
+    if no_modificado:
+        return no_modificado
+    gestion_citas = GestionCitas(db)
+    try:
+        eventos = await gestion_citas.calendario_citas_async(desde, hasta, recurso)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al cargar el calendario: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al cargar el calendario: {str(e)}")
+    return respuesta_json(eventos, EventoCalendario, response)
+
+@router.get("/disponibilidad",
+           response_model=Disponibilidad,
+           summary="Huecos libres y comprobación de solapes",
+           description="Devuelve los próximos `cantidad` huecos libres desde `desde` (por defecto, ahora) en el "
+                       "horario de la clínica: para la mascota y su consulta si se indica `id_mascota`, en la "
+                       "consulta `recurso` o en cualquiera. Con `fecha` e `id_mascota` indica además si una cita "
+                       "a esa hora se solaparía con otra y con cuáles.")
+def disponibilidad_citas(
+    desde: Optional[datetime] = Query(None, description="Primer instante a considerar (ISO 8601)"),
+    cantidad: int = Query(10, ge=1, le=100, description="Número de huecos a devolver"),
+    id_mascota: Optional[int] = Query(None, gt=0, description="Mascota de la cita"),
+    recurso: Optional[str] = Query(None, description="Consulta (consulta_N)"),
+    fecha: Optional[datetime] = Query(None, description="Inicio de una cita propuesta, para comprobar solapes"),
+    db: Session = Depends(get_db)
+):
+    gestion_citas = GestionCitas(db)
+    try:
+        disponibilidad = {"libre": None, "conflictos": []}
+        if fecha is not None:
+            if id_mascota is None:
+                raise ValueError("Para comprobar solapes hay que indicar 'id_mascota'.")
+            ids = gestion_citas.citas_solapadas(fecha, id_mascota)
+            disponibilidad = {"libre": not ids, "conflictos": ids}
+        disponibilidad["huecos"] = gestion_citas.huecos_disponibles(
+            desde or fecha or datetime.now(), cantidad, id_mascota=id_mascota, recurso=recurso)
+        return disponibilidad
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al consultar la disponibilidad: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al consultar la disponibilidad: {str(e)}")
+
+@router.post("/batch",
+            response_model=RespuestaLote,
+            summary="Registrar un lote de citas",
+            description="Valida todas las citas juntas (duplicados con una consulta por bloque, solapes entre "
+                        "ellas y con la agenda) y guarda las válidas en una sola transacción. Devuelve el "
+                        "resultado de cada cita; con `atomico` no se guarda ninguna si alguna falla.")
+def registrar_citas_lote(lote: CitasLote, db: Session = Depends(get_db)):
+    gestion_citas = GestionCitas(db)
+    try:
+        logger.info(f"Registrando lote de {len(lote.citas)} citas (atómico: {lote.atomico})")
+        resultados = gestion_citas.registrar_citas_lote(lote.citas, atomico=lote.atomico, validar=_validar_cita_lote)
+    except ValueError as ve:
+        logger.error(f"Error de validación al registrar el lote de citas: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al registrar el lote de citas: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al registrar el lote de citas: {str(e)}")
+    return _respuesta_lote(resultados)
+
+@router.put("/batch/estado",
+           response_model=RespuestaLote,
+           summary="Cambiar el estado de un lote de citas",
+           description="Cambia el estado de varias citas en una sola transacción. Finalizar exige "
+                       "`metodo_pago` y reactivar una cita cancelada comprueba que su hueco sigue libre. "
+                       "Devuelve el resultado de cada cita; con `atomico` no se cambia ninguna si alguna falla.")
+def cambiar_estado_lote(lote: EstadoLote, db: Session = Depends(get_db)):
+    gestion_citas = GestionCitas(db)
+    try:
+        logger.info(f"Cambiando a '{lote.estado}' el estado de {len(lote.ids)} citas")
+        resultados = gestion_citas.cambiar_estado_lote(lote.ids, lote.estado, metodo_pago=lote.metodo_pago,
+                                                       atomico=lote.atomico)
+    except ValueError as ve:
+        logger.error(f"Error de validación al cambiar el estado del lote: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al cambiar el estado del lote de citas: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al cambiar el estado de las citas: {str(e)}")
+    return _respuesta_lote(resultados)
+
+@router.post("/series",
+            response_model=SerieCitaResponse,
+            status_code=201,
+            summary="Crear una serie de citas",
+            description="Registra una serie de citas recurrentes con una regla RRULE (FREQ DAILY, WEEKLY o "
+                        "MONTHLY, INTERVAL, BYDAY, y COUNT o UNTIL). No crea ninguna cita hasta que se "
+                        "confirman sus ocurrencias.")
+def crear_serie(serie: SerieCitaCreate, db: Session = Depends(get_db)):
+    gestion_series = GestionSeries(db)
+    try:
+        logger.info(f"Creando serie de citas: {serie.model_dump()}")
+        nueva_serie = gestion_series.crear_serie(serie.model_dump())
+    except ValueError as ve:
+        logger.error(f"Error de validación al crear la serie: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al crear la serie de citas: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al crear la serie de citas: {str(e)}")
+    return SerieCitaResponse.model_validate(nueva_serie)
+
+@router.get("/series/{id_serie}/ocurrencias",
+           response_model=List[OcurrenciaSerieResponse],
+           summary="Ocurrencias de una serie",
+           description="Calcula las ocurrencias de la serie en [desde, hasta) e indica si cada una ya está "
+                       "confirmada, está libre o se solaparía con otras citas (con una consulta por lote de "
+                       "ocurrencias).")
+def ocurrencias_serie(
+    id_serie: int,
+    desde: datetime = Query(..., description="Inicio de la ventana (incluido)"),
+    hasta: datetime = Query(..., description="Fin de la ventana (excluido)"),
+    db: Session = Depends(get_db)
+):
+    gestion_series = GestionSeries(db)
+    try:
+        ocurrencias = gestion_series.ocurrencias(id_serie, desde, hasta)
+        if ocurrencias is None:
+            raise HTTPException(status_code=404, detail="Serie no encontrada")
+        return list(ocurrencias)
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al calcular las ocurrencias: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al calcular las ocurrencias: {str(e)}")
+
+@router.post("/series/{id_serie}/confirmar",
+            response_model=RespuestaLote,
+            summary="Confirmar ocurrencias de una serie",
+            description="Crea en una sola transacción las citas de las ocurrencias indicadas y devuelve el "
+                        "resultado de cada una; con `atomico` no se crea ninguna si alguna falla.")
+def confirmar_ocurrencias(id_serie: int, confirmacion: ConfirmacionSerie, db: Session = Depends(get_db)):
+    gestion_series = GestionSeries(db)
+    try:
+        logger.info(f"Confirmando {len(confirmacion.fechas)} ocurrencias de la serie {id_serie}")
+        resultados = gestion_series.confirmar_ocurrencias(id_serie, confirmacion.fechas, atomico=confirmacion.atomico)
+    except ValueError as ve:
+        logger.error(f"Error de validación al confirmar ocurrencias: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al confirmar ocurrencias de la serie: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al confirmar las ocurrencias: {str(e)}")
+    if resultados is None:
+        raise HTTPException(status_code=404, detail="Serie no encontrada")
+    return _respuesta_lote(resultados)
+
+@router.get("/detalladas",
+           response_model=List[CitaDetalladaResponse],
+           summary="Listar citas con sus datos relacionados",
+           description="Devuelve las citas con el cliente, la mascota y el tratamiento embebidos, obtenidos "
+                       "con una sola consulta JOIN. Los filtros se aplican en la base de datos.")
+async def ver_citas_detalladas(
+    request: Request,
+    response: Response,
+    estado: Optional[str] = Query(None, description="Estado de la cita"),
+    nombre_cliente: Optional[str] = Query(None, description="Parte del nombre del cliente"),
+    dni: Optional[str] = Query(None, description="Parte del DNI del cliente"),
+    fecha: Optional[date] = Query(None, description="Día de la cita (YYYY-MM-DD)"),
+    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    no_modificado = respuesta_no_modificada(request, response, "cita", "cliente", "mascota", "tratamiento")
+    if no_modificado:
+        return no_modificado
+    gestion_citas = GestionCitas(db)
+    try:
+        logger.info(f"Consultando citas detalladas - Estado: {estado}, Cliente: {nombre_cliente}, DNI: {dni}, Fecha: {fecha}")
+        return await gestion_citas.ver_citas_detalladas_async(
+            estado=estado,
+            nombre_cliente=nombre_cliente,
+            dni=dni,
+            fecha=fecha,
+            skip=skip,
+            limit=limit
+        )
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al listar citas detalladas: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al listar citas: {str(e)}")
 
 @router.get("/buscar/{id_mascota}/{id_cliente}", 
            response_model=CitaResponse,
@@ -134,12 +418,12 @@ async def ver_todas_las_citas(
 async def buscar_cita(
     id_mascota: int, 
     id_cliente: int, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     gestion_citas = GestionCitas(db)
     try:
         logger.info(f"Buscando cita - ID Mascota: {id_mascota}, ID Cliente: {id_cliente}")
-        cita = gestion_citas.buscar_cita(id_mascota, id_cliente)
+        cita = await gestion_citas.buscar_cita_async(id_mascota, id_cliente)
         if not cita:
             logger.warning(f"No se encontró cita para Mascota ID: {id_mascota}, Cliente ID: {id_cliente}")
             raise HTTPException(status_code=404, detail="Cita no encontrada")
@@ -152,7 +436,7 @@ async def buscar_cita(
            response_model=CitaResponse,
            summary="Modificar cita",
            description="Actualiza los datos de una cita existente")
-async def modificar_cita(
+def modificar_cita(
     id_cita: int, 
     cita: CitaUpdate, 
     db: Session = Depends(get_db)
@@ -166,6 +450,11 @@ async def modificar_cita(
             raise HTTPException(status_code=404, detail="Cita no encontrada")
         logger.info(f"Cita ID: {id_cita} modificada exitosamente")
         return CitaResponse.model_validate(resultado)
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        logger.warning(f"No se puede modificar la cita ID {id_cita}: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Error al modificar cita: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al modificar cita: {str(e)}")
@@ -174,7 +463,7 @@ async def modificar_cita(
               response_model=dict,
               summary="Cancelar cita",
               description="Cancela una cita existente")
-async def cancelar_cita(id_cita: int, db: Session = Depends(get_db)):
+def cancelar_cita(id_cita: int, db: Session = Depends(get_db)):
     gestion_citas = GestionCitas(db)
     try:
         logger.info(f"Cancelando cita ID: {id_cita}")
@@ -192,7 +481,7 @@ async def cancelar_cita(id_cita: int, db: Session = Depends(get_db)):
            response_model=dict,
            summary="Finalizar cita",
            description="Finaliza una cita y registra el método de pago")
-async def finalizar_cita(
+def finalizar_cita(
     id_cita: int,
     metodo_pago: str = Query(..., description="Método de pago utilizado (Efectivo, Tarjeta, Bizum, Transferencia)"),
     db: Session = Depends(get_db)
@@ -211,6 +500,9 @@ async def finalizar_cita(
             "message": "Cita finalizada con éxito",
             "cita": CitaResponse.model_validate(resultado)
         }
+    except CitaSolapadaError as cse:
+        logger.error(f"Conflicto al finalizar cita: {str(cse)}")
+        raise HTTPException(status_code=409, detail=str(cse))
     except ValueError as ve:
         logger.error(f"Error de validación al finalizar cita: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
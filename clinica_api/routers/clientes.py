@@ -1,10 +1,15 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from clinica.services.gestion_clientes import GestionClientes
-from clinica.dbconfig import SessionLocal
-from clinica_api.schemas import ClienteCreate, ClienteUpdate, ClienteResponse
+from clinica.dbconfig import SessionLocal, get_async_db
+from clinica.models import Cliente
+from clinica.services.opciones_carga import serializar, tablas_consultadas
+from clinica_api.condicionales import respuesta_no_modificada
+from clinica_api.serializacion import formato_streaming, respuesta_json, respuesta_streaming
+from clinica_api.schemas import ClienteCreate, ClienteUpdate, ClienteResponse, ClienteConRelaciones, ConsultaPorIds
 from typing import List, Optional
 import logging
 
@@ -30,7 +35,7 @@ def get_db():
             response_model=dict,
             summary="Exportar clientes a JSON",
             description="Exporta todos los clientes de la base de datos a un archivo JSON.")
-async def exportar_clientes(db: Session = Depends(get_db)):
+def exportar_clientes(db: Session = Depends(get_db)):
     gestion_clientes = GestionClientes(db)
     try:
         ruta_exportada = os.path.join(os.getcwd(), 'clinica/data/tabla_clientes.json')
@@ -52,7 +57,7 @@ async def exportar_clientes(db: Session = Depends(get_db)):
             status_code=201,  # Cambiamos a 201 Created para seguir convenciones REST
             summary="Registrar nuevo cliente",
             description="Crea un nuevo cliente en el sistema.")
-async def registrar_cliente(
+def registrar_cliente(
     cliente: ClienteCreate, 
     db: Session = Depends(get_db)
 ):
@@ -82,7 +87,7 @@ async def registrar_cliente(
            response_model=ClienteResponse,
            summary="Modificar cliente existente",
            description="Actualiza los datos de un cliente existente.")
-async def modificar_cliente(
+def modificar_cliente(
     id_cliente: int, 
     cliente: ClienteUpdate, 
     db: Session = Depends(get_db)
@@ -107,17 +112,45 @@ async def modificar_cliente(
         )
 
 @router.get("/", 
-           response_model=List[ClienteResponse],
+           response_model=List[ClienteConRelaciones],
+           response_model_exclude_unset=True,
            summary="Listar todos los clientes",
-           description="Obtiene una lista de todos los clientes registrados.")
-async def listar_clientes(db: Session = Depends(get_db)):
+           description="Obtiene una lista de todos los clientes registrados. Con `include` se embeben "
+                       "sus mascotas, citas o tratamientos, cargados con una consulta adicional por relación. "
+                       "Con `ids` solo se devuelven esos clientes, en ese orden. Con `Accept: application/x-ndjson` "
+                       "o `text/csv` la tabla completa (con el filtro `nombre`) se transmite por lotes.")
+async def listar_clientes(
+    request: Request,
+    response: Response,
+    include: Optional[str] = Query(None, description="Relaciones separadas por comas: mascotas, citas, tratamientos"),
+    ids: Optional[str] = Query(None, description="IDs de cliente separados por comas (1,2,3)"),
+    nombre: Optional[str] = Query(None, description="Parte del nombre del cliente"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    formato = formato_streaming(request, include, ids)
+    no_modificado = respuesta_no_modificada(request, response, *tablas_consultadas(Cliente, include),
+                                            variante=formato or "json")
+    if no_modificado:
+        return no_modificado
     gestion_clientes = GestionClientes(db)
+    if formato:
+        return respuesta_streaming(gestion_clientes.iterar_clientes_async(nombre=nombre), ClienteResponse,
+                                   formato, response, nombre="clientes")
+    if not include and ids is None:
+        # Listado plano: filas de columnas validadas en bloque y codificadas con orjson
+        filas = await gestion_clientes.listar_clientes_filas_async(nombre=nombre)
+        return respuesta_json(filas, ClienteResponse, response)
     try:
-        clientes = gestion_clientes.listar_clientes()
+        if ids is not None:
+            clientes = await gestion_clientes.buscar_clientes_por_ids_async(ids, include=include)
+        else:
+            clientes = await gestion_clientes.listar_clientes_async(include=include, nombre=nombre)
         if not clientes:
             logger.warning("No se encontraron clientes registrados")
             return []
-        return [ClienteResponse.model_validate(cliente) for cliente in clientes]
+        return [serializar(cliente, include) for cliente in clientes]
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Error al listar clientes: {str(e)}")
         raise HTTPException(
@@ -125,13 +158,34 @@ async def listar_clientes(db: Session = Depends(get_db)):
             detail=f"Error al listar clientes: {str(e)}"
         )
 
+@router.post("/por_ids",
+            response_model=List[ClienteConRelaciones],
+            response_model_exclude_unset=True,
+            summary="Buscar clientes por lista de IDs",
+            description="Igual que `GET /clientes/?ids=...` pero con los IDs en el cuerpo, para listas largas.")
+async def buscar_clientes_por_ids(consulta: ConsultaPorIds, db: AsyncSession = Depends(get_async_db)):
+    gestion_clientes = GestionClientes(db)
+    try:
+        clientes = await gestion_clientes.buscar_clientes_por_ids_async(consulta.ids, include=consulta.include)
+        return [serializar(cliente, consulta.include) for cliente in clientes]
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al buscar clientes por IDs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al buscar clientes: {str(e)}")
+
 @router.get("/buscar", 
            response_model=List[ClienteResponse],
            summary="Buscar clientes",
-           description="Busca clientes por nombre o DNI.")
-async def buscar_clientes(
+           description="Busca clientes por DNI o por nombre. Por nombre devuelve todas las coincidencias, "
+                       "de más a menos relevante, por páginas de `limit`; si hay más, la cabecera "
+                       "X-Next-Offset trae el `skip` de la página siguiente.")
+def buscar_clientes(
+    response: Response,
     nombre: Optional[str] = Query(None, description="Nombre del cliente"),
     dni: Optional[str] = Query(None, description="DNI del cliente"),
+    skip: int = Query(0, ge=0, description="Coincidencias por nombre que se saltan"),
+    limit: int = Query(20, ge=1, le=100, description="Coincidencias por nombre por página"),
     db: Session = Depends(get_db)
 ):
     gestion_clientes = GestionClientes(db)
@@ -140,13 +194,20 @@ async def buscar_clientes(
             cliente = gestion_clientes.buscar_cliente(dni)
             return [ClienteResponse.model_validate(cliente)] if cliente else []
         elif nombre:
-            clientes = gestion_clientes.buscar_cliente_por_nombre(nombre)
-            return [ClienteResponse.model_validate(cliente) for cliente in clientes]
+            try:
+                pagina = gestion_clientes.buscar_clientes_por_nombre(nombre, limite=limit, desplazamiento=skip)
+            except ValueError as ve:
+                raise HTTPException(status_code=400, detail=str(ve))
+            if pagina["hay_mas"]:
+                response.headers["X-Next-Offset"] = str(skip + limit)
+            return [ClienteResponse.model_validate(resultado["cliente"]) for resultado in pagina["resultados"]]
         else:
             raise HTTPException(
                 status_code=400, 
                 detail="Debe proporcionar al menos un criterio de búsqueda"
             )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en búsqueda de clientes: {str(e)}")
         raise HTTPException(
@@ -158,7 +219,7 @@ async def buscar_clientes(
               response_model=dict,
               summary="Eliminar cliente",
               description="Elimina un cliente del sistema.")
-async def eliminar_cliente(id_cliente: int, db: Session = Depends(get_db)):
+def eliminar_cliente(id_cliente: int, db: Session = Depends(get_db)):
     gestion_clientes = GestionClientes(db)
     try:
         resultado = gestion_clientes.eliminar_cliente(id_cliente)
@@ -180,11 +241,16 @@ async def eliminar_cliente(id_cliente: int, db: Session = Depends(get_db)):
            description="Obtiene los datos de un cliente específico por su ID.")
 async def obtener_cliente_por_id(
     id_cliente: int, 
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    no_modificado = respuesta_no_modificada(request, response, "cliente")
+    if no_modificado:
+        return no_modificado
     gestion_clientes = GestionClientes(db)
     try:
-        cliente = gestion_clientes.buscar_cliente_por_id(id_cliente)
+        cliente = await gestion_clientes.obtener_cliente_serializado_async(id_cliente)
         if not cliente:
             raise HTTPException(status_code=404, detail="Cliente no encontrado")
         return ClienteResponse.model_validate(cliente)
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from clinica.dbconfig import get_db
+from clinica.services.gestion_estadisticas import GestionEstadisticas, SECCIONES
+from clinica.utils.versiones_tablas import TABLAS
+from clinica_api.condicionales import respuesta_no_modificada
+from typing import Optional
+import logging
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["Estadísticas"],
+    responses={
+        400: {"description": "Parámetros no válidos"},
+        500: {"description": "Error interno del servidor"}
+    }
+)
+
+@router.get("/",
+           response_model=dict,
+           summary="Estadísticas del dashboard",
+           description="Devuelve los agregados del dashboard (KPIs, distribuciones, histogramas y rankings) "
+                       "calculados en SQL. Con `secciones` se limita la respuesta a las secciones indicadas.")
+def obtener_estadisticas(
+    request: Request,
+    response: Response,
+    secciones: Optional[str] = Query(None, description=f"Secciones separadas por comas: {', '.join(SECCIONES)}"),
+    top_n: int = Query(10, ge=1, le=100, description="Número de elementos de los rankings"),
+    ancho_edad: int = Query(1, ge=1, le=50, description="Años por intervalo en los histogramas de edad"),
+    db: Session = Depends(get_db)
+):
+    no_modificado = respuesta_no_modificada(request, response, *TABLAS)
+    if no_modificado:
+        return no_modificado
+    gestion_estadisticas = GestionEstadisticas(db)
+    try:
+        pedidas = [s.strip() for s in secciones.split(",") if s.strip()] if secciones else SECCIONES
+        return gestion_estadisticas.resumen(secciones=pedidas, top_n=top_n, ancho_edad=ancho_edad)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al calcular estadísticas: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error al calcular las estadísticas")
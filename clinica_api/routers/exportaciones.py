@@ -1,16 +1,31 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from clinica.database import exportar_todos_json
+from clinica.utils.diario_cambios import diario_cambios
+from clinica.utils.exportacion import FORMATOS_EXPORTACION
 
 router = APIRouter()
 
 @router.post("/exportar_todos_json", tags=["Exportaciones"])
-async def exportar_datos():
+def exportar_datos(
+    formato: str = Query("json", description=f"Formato de salida: {', '.join(FORMATOS_EXPORTACION)}")
+):
     """Endpoint para exportar todos los datos a archivos JSON"""
+    if formato not in FORMATOS_EXPORTACION:
+        raise HTTPException(status_code=400, detail=f"Formato '{formato}' no válido")
     try:
-        exito = exportar_todos_json()
-        if exito:
-            return {"mensaje": "Exportación realizada con éxito"}
+        resumen = exportar_todos_json(formato=formato)
+        if resumen:
+            return {"mensaje": "Exportación realizada con éxito", "tablas": resumen}
         else:
             raise HTTPException(status_code=500, detail="Error al exportar los datos")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al exportar los datos: {str(e)}")
+
+@router.post("/compactar_diario", tags=["Exportaciones"])
+def compactar_diario():
+    """Aplica de inmediato el diario de cambios pendiente sobre los snapshots JSON"""
+    try:
+        aplicados = diario_cambios.compactar()
+        return {"mensaje": "Diario compactado con éxito", "cambios_aplicados": aplicados}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al compactar el diario: {str(e)}")
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from clinica.dbconfig import get_async_db
+from clinica.services.gestion_facturas import GestionFacturas
+from clinica.utils.facturas import renderizar_lote
+from clinica_api.schemas import LoteFacturas
+import logging
+import time
+
+# Configuración del logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/facturas",
+    tags=["Facturas"],
+    responses={
+        404: {"description": "No hay facturas"},
+        500: {"description": "Error interno del servidor"}
+    }
+)
+
+TIPOS_LOTE = {"zip": "application/zip", "pdf": "application/pdf"}
+
+
+@router.post("/lote",
+            response_class=Response,
+            responses={200: {"content": {tipo: {} for tipo in TIPOS_LOTE.values()},
+                             "description": "Facturas del mes en un ZIP o en un PDF de varias páginas"}},
+            summary="Facturas de un mes",
+            description="Genera las facturas de las citas finalizadas en el mes, en un ZIP con un PDF por "
+                        "factura o en un único PDF con una página por factura. Las facturas se dibujan en "
+                        "el pool de procesos; las cabeceras X-Facturas, X-Tiempo-Render-Ms y "
+                        "X-Facturas-Por-Segundo indican cuántas se han generado y a qué ritmo.")
+async def generar_facturas_lote(lote: LoteFacturas, db: AsyncSession = Depends(get_async_db)):
+    try:
+        facturas = await GestionFacturas(db).facturas_del_mes_async(lote.anio, lote.mes)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al obtener las facturas de {lote.mes:02d}/{lote.anio}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not facturas:
+        raise HTTPException(status_code=404, detail=f"No hay citas finalizadas en {lote.mes:02d}/{lote.anio}")
+
+    inicio = time.perf_counter()
+    try:
+        contenido = await renderizar_lote(facturas, lote.formato)
+    except Exception as e:
+        logger.error(f"Error al generar las facturas de {lote.mes:02d}/{lote.anio}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    segundos = time.perf_counter() - inicio
+    por_segundo = len(facturas) / segundos if segundos > 0 else float(len(facturas))
+    logger.info(f"{len(facturas)} facturas de {lote.mes:02d}/{lote.anio} generadas en {segundos:.2f} s "
+                f"({por_segundo:.1f} facturas/s, {len(contenido)} bytes)")
+
+    return Response(
+        content=contenido,
+        media_type=TIPOS_LOTE[lote.formato],
+        headers={
+            "Content-Disposition": f'attachment; filename="facturas_{lote.anio}_{lote.mes:02d}.{lote.formato}"',
+            "X-Facturas": str(len(facturas)),
+            "X-Tiempo-Render-Ms": f"{segundos * 1000:.0f}",
+            "X-Facturas-Por-Segundo": f"{por_segundo:.1f}",
+        }
+    )
@@ -1,10 +1,15 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from clinica.services.gestion_mascotas import GestionMascotas
-from clinica.dbconfig import SessionLocal
-from clinica_api.schemas import MascotaCreate, MascotaUpdate, MascotaResponse
+from clinica.dbconfig import SessionLocal, get_async_db
+from clinica.models import Mascota
+from clinica.services.opciones_carga import serializar, tablas_consultadas
+from clinica_api.condicionales import respuesta_no_modificada
+from clinica_api.serializacion import formato_streaming, respuesta_json, respuesta_streaming
+from clinica_api.schemas import MascotaCreate, MascotaUpdate, MascotaResponse, MascotaConRelaciones, ConsultaPorIds
 from typing import List, Optional
 import logging
 
@@ -33,7 +38,7 @@ def get_db():
            response_model=dict,
            summary="Exportar mascotas a JSON",
            description="Exporta todas las mascotas registradas a un archivo JSON")
-async def exportar_mascotas(db: Session = Depends(get_db)):
+def exportar_mascotas(db: Session = Depends(get_db)):
    gestion_mascotas = GestionMascotas(db)
    try:
        ruta_exportada = os.path.abspath('clinica/data/tabla_mascotas.json')
@@ -55,7 +60,7 @@ async def exportar_mascotas(db: Session = Depends(get_db)):
            status_code=201,
            summary="Registrar nueva mascota",
            description="Registra una nueva mascota en el sistema")
-async def registrar_mascota(
+def registrar_mascota(
    mascota: MascotaCreate, 
    db: Session = Depends(get_db)
 ):
@@ -87,7 +92,7 @@ async def registrar_mascota(
           response_model=MascotaResponse,
           summary="Modificar mascota",
           description="Actualiza los datos de una mascota existente")
-async def modificar_mascota(
+def modificar_mascota(
    id_mascota: int, 
    mascota: MascotaUpdate, 
    db: Session = Depends(get_db)
@@ -120,7 +125,7 @@ async def modificar_mascota(
              response_model=dict,
              summary="Eliminar mascota",
              description="Elimina una mascota del sistema")
-async def eliminar_mascota(id_mascota: int, db: Session = Depends(get_db)):
+def eliminar_mascota(id_mascota: int, db: Session = Depends(get_db)):
    gestion_mascotas = GestionMascotas(db)
    try:
        logger.info(f"Eliminando mascota ID: {id_mascota}")
@@ -143,18 +148,47 @@ async def eliminar_mascota(id_mascota: int, db: Session = Depends(get_db)):
        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", 
-          response_model=List[MascotaResponse],
+          response_model=List[MascotaConRelaciones],
+          response_model_exclude_unset=True,
           summary="Listar mascotas",
-          description="Obtiene la lista de todas las mascotas registradas")
+          description="Obtiene la lista de todas las mascotas registradas. Con `include` se embeben su "
+                      "cliente (JOIN) o sus citas (una consulta adicional). Con `ids` solo se devuelven "
+                      "esas mascotas, en ese orden. Con `Accept: application/x-ndjson` o `text/csv` la tabla "
+                      "completa (con los filtros) se transmite por lotes.")
 async def listar_mascotas(
+   request: Request,
+   response: Response,
    skip: int = Query(0, description="Número de registros a saltar"),
    limit: int = Query(100, description="Número máximo de registros a retornar"),
-   db: Session = Depends(get_db)
+   include: Optional[str] = Query(None, description="Relaciones separadas por comas: cliente, citas"),
+   ids: Optional[str] = Query(None, description="IDs de mascota separados por comas (1,2,3)"),
+   nombre: Optional[str] = Query(None, description="Parte del nombre de la mascota"),
+   raza: Optional[str] = Query(None, description="Parte de la raza de la mascota"),
+   estado: Optional[str] = Query(None, description="Estado de la mascota (Vivo, Fallecido)"),
+   db: AsyncSession = Depends(get_async_db)
 ):
+   formato = formato_streaming(request, include, ids)
+   no_modificado = respuesta_no_modificada(request, response, *tablas_consultadas(Mascota, include),
+                                           variante=formato or "json")
+   if no_modificado:
+       return no_modificado
    gestion_mascotas = GestionMascotas(db)
+   filtros = {"nombre": nombre, "raza": raza, "estado": estado}
+   if formato:
+       return respuesta_streaming(gestion_mascotas.iterar_mascotas_async(**filtros), MascotaResponse,
+                                  formato, response, nombre="mascotas")
+   if not include and ids is None:
+       # Listado plano: filas de columnas validadas en bloque y codificadas con orjson
+       return respuesta_json(await gestion_mascotas.listar_mascotas_filas_async(**filtros), MascotaResponse, response)
    try:
        logger.info("Consultando lista de mascotas")
-       return gestion_mascotas.listar_mascotas()
+       if ids is not None:
+           mascotas = await gestion_mascotas.buscar_mascotas_por_ids_async(ids, include=include)
+       else:
+           mascotas = await gestion_mascotas.listar_mascotas_async(include=include, **filtros)
+       return [serializar(mascota, include) for mascota in mascotas]
+   except ValueError as ve:
+       raise HTTPException(status_code=400, detail=str(ve))
    except SQLAlchemyError as e:
        logger.error(f"Error de base de datos al listar mascotas: {str(e)}")
        raise HTTPException(
@@ -165,21 +199,51 @@ async def listar_mascotas(
        logger.error(f"Error inesperado al listar mascotas: {str(e)}")
        raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/por_ids",
+           response_model=List[MascotaConRelaciones],
+           response_model_exclude_unset=True,
+           summary="Buscar mascotas por lista de IDs",
+           description="Igual que `GET /mascotas/?ids=...` pero con los IDs en el cuerpo, para listas largas.")
+async def buscar_mascotas_por_ids(consulta: ConsultaPorIds, db: AsyncSession = Depends(get_async_db)):
+   gestion_mascotas = GestionMascotas(db)
+   try:
+       mascotas = await gestion_mascotas.buscar_mascotas_por_ids_async(consulta.ids, include=consulta.include)
+       return [serializar(mascota, consulta.include) for mascota in mascotas]
+   except ValueError as ve:
+       raise HTTPException(status_code=400, detail=str(ve))
+   except Exception as e:
+       logger.error(f"Error inesperado al buscar mascotas por IDs: {str(e)}")
+       raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/buscar_por_nombre/{nombre_mascota}",
-          summary="Buscar mascota por nombre",
-          description="Busca una mascota por su nombre")
-async def buscar_mascota_por_nombre(
+          response_model=List[MascotaConRelaciones],
+          response_model_exclude_unset=True,
+          summary="Buscar mascotas por nombre",
+          description="Devuelve las mascotas cuyo nombre coincide, de más a menos relevante y con su cliente, "
+                      "por páginas de `limit`; si hay más, la cabecera X-Next-Offset trae el `skip` de la "
+                      "página siguiente.")
+def buscar_mascota_por_nombre(
    nombre_mascota: str, 
+   response: Response,
+   skip: int = Query(0, ge=0, description="Coincidencias que se saltan"),
+   limit: int = Query(20, ge=1, le=100, description="Coincidencias por página"),
    db: Session = Depends(get_db)
 ):
    gestion_mascotas = GestionMascotas(db)
    try:
        logger.info(f"Buscando mascota por nombre: {nombre_mascota}")
-       resultado = gestion_mascotas.buscar_mascota_por_nombre(nombre_mascota)
-       if resultado is None:
+       try:
+           pagina = gestion_mascotas.buscar_mascotas_por_nombre(nombre_mascota, limite=limit, desplazamiento=skip)
+       except ValueError as ve:
+           raise HTTPException(status_code=400, detail=str(ve))
+       if not pagina["resultados"] and skip == 0:
            logger.warning(f"No se encontró mascota con nombre: {nombre_mascota}")
            raise HTTPException(status_code=404, detail="Mascota no encontrada")
-       return resultado
+       if pagina["hay_mas"]:
+           response.headers["X-Next-Offset"] = str(skip + limit)
+       return [serializar(resultado["mascota"], ("cliente",)) for resultado in pagina["resultados"]]
+   except HTTPException:
+       raise
    except SQLAlchemyError as e:
        logger.error(f"Error de base de datos al buscar mascota: {str(e)}")
        raise HTTPException(
@@ -196,12 +260,17 @@ async def buscar_mascota_por_nombre(
            description="Obtiene la lista de mascotas pertenecientes a un cliente específico")
 async def listar_mascotas_por_cliente(
     id_cliente: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    no_modificado = respuesta_no_modificada(request, response, "mascota")
+    if no_modificado:
+        return no_modificado
     gestion_mascotas = GestionMascotas(db)
     try:
         logger.info(f"Consultando mascotas del cliente ID: {id_cliente}")
-        mascotas = gestion_mascotas.listar_mascotas_por_cliente(id_cliente)
+        mascotas = await gestion_mascotas.listar_mascotas_por_cliente_async(id_cliente)
         return [MascotaResponse.model_validate(mascota) for mascota in mascotas]
     except SQLAlchemyError as e:
         logger.error(f"Error de base de datos al listar mascotas por cliente: {str(e)}")
@@ -217,7 +286,7 @@ async def listar_mascotas_por_cliente(
           response_model=dict,
           summary="Marcar mascota como fallecida",
           description="Actualiza el estado de una mascota a fallecido")
-async def marcar_mascota_como_fallecido(
+def marcar_mascota_como_fallecido(
    id_cliente: int, 
    nombre_mascota: str, 
    db: Session = Depends(get_db)
@@ -247,7 +316,7 @@ async def marcar_mascota_como_fallecido(
         response_model=List[MascotaResponse],
         summary="Buscar mascotas",
         description="Busca mascotas por nombre y/o raza")
-async def buscar_mascotas(
+def buscar_mascotas(
     nombre: Optional[str] = Query(None, description="Nombre de la mascota"),
     raza: Optional[str] = Query(None, description="Raza de la mascota"),
     db: Session = Depends(get_db)
@@ -267,11 +336,16 @@ async def buscar_mascotas(
            description="Obtiene los datos de una mascota específica por su ID.")
 async def obtener_mascota_por_id(
     id_mascota: int, 
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    no_modificado = respuesta_no_modificada(request, response, "mascota")
+    if no_modificado:
+        return no_modificado
     gestion_mascotas = GestionMascotas(db)
     try:
-        mascota = gestion_mascotas.buscar_mascota_por_id(id_mascota)
+        mascota = await gestion_mascotas.obtener_mascota_serializado_async(id_mascota)
         if not mascota:
             raise HTTPException(status_code=404, detail="Mascota no encontrada")
         return MascotaResponse.model_validate(mascota)
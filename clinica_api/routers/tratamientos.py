@@ -1,22 +1,20 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from fastapi.responses import FileResponse
-from clinica.dbconfig import SessionLocal
-from clinica.models import Cliente, Mascota, Tratamiento, Cita
+from clinica.dbconfig import SessionLocal, get_async_db
+from clinica.models import Tratamiento
+from clinica.services.gestion_facturas import GestionFacturas
 from clinica.services.gestion_tratamiento import GestionTratamientos
-from clinica_api.schemas import TratamientoResponse, TratamientoCreate, TratamientoUpdate
+from clinica.services.opciones_carga import serializar, tablas_consultadas
+from clinica.utils.facturas import renderizar_en_pool, renderizar_factura
+from clinica_api.condicionales import respuesta_no_modificada
+from clinica_api.serializacion import formato_streaming, respuesta_json, respuesta_streaming
+from clinica_api.schemas import TratamientoResponse, TratamientoCreate, TratamientoUpdate, TratamientoConRelaciones, ConsultaPorIds
 from typing import List, Optional
-import tempfile
 import shutil
-from starlette.background import BackgroundTask
 import logging
-from datetime import datetime
-import time
 
 # Configuración del logger
 logger = logging.getLogger(__name__)
@@ -43,7 +41,7 @@ def get_db():
            response_model=dict,
            summary="Exportar tratamientos a JSON",
            description="Exporta todos los tratamientos registrados a un archivo JSON")
-async def exportar_tratamientos_a_json(db: Session = Depends(get_db)):
+def exportar_tratamientos_a_json(db: Session = Depends(get_db)):
    gestion_tratamientos = GestionTratamientos(db)
    try:
        ruta_exportada = os.path.join(os.getcwd(), 'clinica/data/tabla_tratamientos.json')
@@ -61,21 +59,49 @@ async def exportar_tratamientos_a_json(db: Session = Depends(get_db)):
        )
 
 @router.get("/", 
-          response_model=List[TratamientoResponse],
+          response_model=List[TratamientoConRelaciones],
+          response_model_exclude_unset=True,
           summary="Listar tratamientos",
-          description="Obtiene todos los tratamientos registrados en el sistema")
-async def listar_tratamientos(db: Session = Depends(get_db)):
+          description="Obtiene todos los tratamientos registrados en el sistema. Con `include` se embeben "
+                      "su cliente (JOIN) o sus citas (una consulta adicional). Con `ids` solo se devuelven "
+                      "esos tratamientos, en ese orden. Con `Accept: application/x-ndjson` o `text/csv` la "
+                      "tabla completa (con el filtro `estado`) se transmite por lotes.")
+async def listar_tratamientos(
+    request: Request,
+    response: Response,
+    include: Optional[str] = Query(None, description="Relaciones separadas por comas: cliente, citas"),
+    ids: Optional[str] = Query(None, description="IDs de tratamiento separados por comas (1,2,3)"),
+    estado: Optional[str] = Query(None, description="Estado del tratamiento (Activo, Finalizada, Cancelada)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    formato = formato_streaming(request, include, ids)
+    no_modificado = respuesta_no_modificada(request, response, *tablas_consultadas(Tratamiento, include),
+                                            variante=formato or "json")
+    if no_modificado:
+        return no_modificado
+    gestion_tratamientos = GestionTratamientos(db)
+    if formato:
+        return respuesta_streaming(gestion_tratamientos.iterar_tratamientos_async(estado=estado), TratamientoResponse,
+                                   formato, response, nombre="tratamientos")
+    if not include and ids is None:
+        # Listado plano: filas de columnas validadas en bloque y codificadas con orjson
+        filas = await gestion_tratamientos.listar_tratamientos_filas_async(estado=estado)
+        return respuesta_json(filas, TratamientoResponse, response)
     try:
-        gestion_tratamientos = GestionTratamientos(db)
-        tratamientos = gestion_tratamientos.listar_tratamientos()
+        if ids is not None:
+            tratamientos = await gestion_tratamientos.buscar_tratamientos_por_ids_async(ids, include=include)
+        else:
+            tratamientos = await gestion_tratamientos.listar_tratamientos_async(include=include, estado=estado)
         
         if not tratamientos:
             logger.warning("No se encontraron tratamientos registrados")
             return []
             
         logger.info(f"Se encontraron {len(tratamientos)} tratamientos")
-        return [TratamientoResponse.model_validate(t) for t in tratamientos]
+        return [serializar(t, include) for t in tratamientos]
         
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Error al listar tratamientos: {str(e)}")
         raise HTTPException(
@@ -83,12 +109,31 @@ async def listar_tratamientos(db: Session = Depends(get_db)):
             detail=f"Error al listar tratamientos: {str(e)}"
         )
 
+@router.post("/por_ids",
+           response_model=List[TratamientoConRelaciones],
+           response_model_exclude_unset=True,
+           summary="Buscar tratamientos por lista de IDs",
+           description="Igual que `GET /tratamientos/?ids=...` pero con los IDs en el cuerpo, para listas largas.")
+async def buscar_tratamientos_por_ids(consulta: ConsultaPorIds, db: AsyncSession = Depends(get_async_db)):
+    try:
+        gestion_tratamientos = GestionTratamientos(db)
+        tratamientos = await gestion_tratamientos.buscar_tratamientos_por_ids_async(consulta.ids, include=consulta.include)
+        return [serializar(t, consulta.include) for t in tratamientos]
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error al buscar tratamientos por IDs: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al buscar tratamientos: {str(e)}"
+        )
+
 @router.post("/", 
            response_model=TratamientoResponse,
            status_code=201,
            summary="Dar de alta tratamiento",
            description="Registra un nuevo tratamiento en el sistema")
-async def dar_alta_tratamiento(
+def dar_alta_tratamiento(
    tratamiento: TratamientoCreate, 
    db: Session = Depends(get_db)
 ):
@@ -113,7 +158,7 @@ async def dar_alta_tratamiento(
           response_model=TratamientoResponse,
           summary="Modificar tratamiento",
           description="Actualiza los datos de un tratamiento existente")
-async def modificar_tratamiento(
+def modificar_tratamiento(
    id_tratamiento: int,
    tratamiento: TratamientoUpdate,
    db: Session = Depends(get_db)
@@ -140,7 +185,7 @@ async def modificar_tratamiento(
              response_model=dict,
              summary="Dar de baja tratamiento",
              description="Da de baja un tratamiento existente")
-async def dar_baja_tratamiento(
+def dar_baja_tratamiento(
    nombre_tratamiento: str,
    db: Session = Depends(get_db)
 ):
@@ -164,7 +209,7 @@ async def dar_baja_tratamiento(
           response_model=dict,
           summary="Validar tratamiento Finalizada",
           description="Verifica si un tratamiento está Finalizada")
-async def validar_tratamiento_Finalizada(
+def validar_tratamiento_Finalizada(
    id_tratamiento: int,
    db: Session = Depends(get_db)
 ):
@@ -196,11 +241,16 @@ async def validar_tratamiento_Finalizada(
            description="Obtiene los datos de un tratamiento específico por su ID.")
 async def obtener_tratamiento_por_id(
     id_tratamiento: int, 
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    no_modificado = respuesta_no_modificada(request, response, "tratamiento")
+    if no_modificado:
+        return no_modificado
     gestion_tratamientos = GestionTratamientos(db)
     try:
-        tratamiento = gestion_tratamientos.buscar_tratamiento_por_id(id_tratamiento)
+        tratamiento = await gestion_tratamientos.obtener_tratamiento_serializado_async(id_tratamiento)
         if not tratamiento:
             raise HTTPException(status_code=404, detail="Tratamiento no encontrado")
         return TratamientoResponse.model_validate(tratamiento)
@@ -209,142 +259,28 @@ async def obtener_tratamiento_por_id(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/factura/generar/{id_tratamiento}",
-            response_class=FileResponse,
+            response_class=Response,
+            responses={200: {"content": {"application/pdf": {}}, "description": "Factura en PDF"},
+                       404: {"description": "Tratamiento, cita, cliente o mascota no encontrados"}},
             summary="Generar factura PDF",
-            description="Genera una factura en formato PDF para un tratamiento")
-async def generar_factura(id_tratamiento: int, db: Session = Depends(get_db)):
+            description="Genera una factura en formato PDF para un tratamiento. Los datos se leen con una "
+                        "sola consulta y el PDF se dibuja en memoria en el pool de procesos de facturas.")
+async def generar_factura(id_tratamiento: int, db: AsyncSession = Depends(get_async_db)):
+    logger.info(f"Generando factura PDF para tratamiento ID: {id_tratamiento}")
     try:
-        logger.info(f"Generando factura PDF para tratamiento ID: {id_tratamiento}")
-        
-        # Obtener los datos necesarios
-        tratamiento = db.query(Tratamiento).filter_by(id_tratamiento=id_tratamiento).first()
-        if not tratamiento:
-            raise HTTPException(status_code=404, detail="Tratamiento no encontrado")
-
-        cita = db.query(Cita).filter_by(id_tratamiento=id_tratamiento).first()
-        if not cita:
-            raise HTTPException(status_code=404, detail="Cita no encontrada")
-
-        cliente = db.query(Cliente).filter_by(id_cliente=cita.id_cliente).first()
-        mascota = db.query(Mascota).filter_by(id_mascota=cita.id_mascota).first()
-        
-        if not cliente or not mascota:
-            raise HTTPException(status_code=404, detail="Cliente o mascota no encontrados")
-
-        # Crear directorio temporal
-        temp_dir = tempfile.gettempdir()
-        pdf_filename = f"factura_{id_tratamiento}_{int(time.time())}.pdf"
-        pdf_path = os.path.join(temp_dir, pdf_filename)
-        
-        logger.info(f"Generando PDF en: {pdf_path}")
-
-        # Generar PDF
-        c = canvas.Canvas(pdf_path, pagesize=letter)
-        width, height = letter
-
-        # Encabezado
-        c.setFont("Helvetica-Bold", 24)
-        c.drawString(50, height - 50, "UFVVet Clínica Veterinaria")
-        
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 70, "Calle de la Mascota Feliz, 123")
-        c.drawString(50, height - 85, "28223 Madrid")
-        c.drawString(50, height - 100, "Tel: +34 123 456 789")
-
-        # Información de la factura
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(400, height - 50, "FACTURA")
-        
-        c.setFont("Helvetica", 12)
-        fecha_actual = datetime.now().strftime("%d/%m/%Y")
-        c.drawString(400, height - 70, f"Fecha: {fecha_actual}")
-        c.drawString(400, height - 85, f"Nº Factura: {cita.id_cita}")
-
-        # Información del cliente
-        c.line(50, height - 120, width - 50, height - 120)
-        
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, height - 150, "Datos del Cliente")
-        
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 170, f"Nombre: {cliente.nombre_cliente}")
-        c.drawString(50, height - 185, f"DNI: {cliente.dni}")
-        c.drawString(50, height - 200, f"Dirección: {cliente.direccion}")
-        c.drawString(50, height - 215, f"Teléfono: {cliente.telefono}")
-
-        # Información de la mascota
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, height - 245, "Datos de la Mascota")
-        
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 265, f"Nombre: {mascota.nombre_mascota}")
-        c.drawString(50, height - 280, f"Raza: {mascota.raza}")
-        c.drawString(50, height - 295, f"Edad: {mascota.edad} años")
-
-        # Detalles del tratamiento
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, height - 325, "Detalles del Tratamiento")
-        
-        # Cabecera de la tabla
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(50, height - 345, "Descripción")
-        c.drawString(400, height - 345, "Precio")
-        
-        c.line(50, height - 350, width - 50, height - 350)
-        
-        # Contenido del tratamiento
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 370, tratamiento.nombre_tratamiento)
-        c.drawString(50, height - 385, tratamiento.descripcion[:50] + "..." if len(tratamiento.descripcion) > 50 else tratamiento.descripcion)
-        c.drawRightString(500, height - 370, f"{tratamiento.precio:.2f} €")
-
-        # Línea total
-        c.line(50, height - 410, width - 50, height - 410)
-        
-        # Total
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(350, height - 430, "Total:")
-        c.drawRightString(500, height - 430, f"{tratamiento.precio:.2f} €")
-
-        # Método de pago
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 460, f"Método de pago: {cita.metodo_pago}")
-
-        # Pie de página
-        c.setFont("Helvetica-Oblique", 10)
-        c.drawString(50, 50, "Gracias por confiar en UFVVet Clínica Veterinaria")
-        c.drawString(50, 35, "Este documento sirve como comprobante de pago")
-
-        logger.info(f"Intentando guardar archivo PDF en: {pdf_path}")
-        c.save()
-     # Verificar que el archivo se creó correctamente
-        if not os.path.exists(pdf_path):
-            logger.error(f"No se pudo generar el archivo PDF en {pdf_path}")
-            raise HTTPException(status_code=500, detail="Error al generar el PDF")
-
-        file_size = os.path.getsize(pdf_path)
-        logger.info(f"PDF generado correctamente. Tamaño: {file_size} bytes")
-
-        def cleanup():
-            try:
-                os.unlink(pdf_path)
-                logger.info(f"Archivo temporal eliminado: {pdf_path}")
-            except Exception as e:
-                logger.error(f"Error al eliminar archivo temporal: {str(e)}")
-
-        return FileResponse(
-            path=pdf_path,
-            filename=f"factura_{id_tratamiento}.pdf",
-            media_type="application/pdf",
-            background=BackgroundTask(cleanup)
-        )
-
+        datos = await GestionFacturas(db).datos_factura_async(id_tratamiento)
+        if "error" in datos:
+            raise HTTPException(status_code=404, detail=datos["error"])
+        pdf = await renderizar_en_pool(renderizar_factura, datos)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al generar factura: {str(e)}")
-        # Intentar limpiar el archivo si existe
-        if 'pdf_path' in locals() and os.path.exists(pdf_path):
-            try:
-                os.unlink(pdf_path)
-            except:
-                pass
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"PDF generado correctamente. Tamaño: {len(pdf)} bytes")
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="factura_{id_tratamiento}.pdf"'}
+    )
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # ========================
@@ -159,6 +159,47 @@ class CitaResponse(CitaBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+# Entidades embebidas en el listado detallado de citas; sin validadores porque solo reflejan
+# lo que ya está guardado en la base de datos
+class ClienteEmbebido(BaseModel):
+    id_cliente: int
+    nombre_cliente: Optional[str] = None
+    edad: Optional[int] = None
+    dni: Optional[str] = None
+    direccion: Optional[str] = None
+    telefono: Optional[str] = None
+
+class MascotaEmbebida(BaseModel):
+    id_mascota: int
+    nombre_mascota: Optional[str] = None
+    raza: Optional[str] = None
+    edad: Optional[int] = None
+    afeccion: Optional[str] = None
+    estado: Optional[str] = None
+    id_cliente: Optional[int] = None
+
+class TratamientoEmbebido(BaseModel):
+    id_tratamiento: int
+    nombre_tratamiento: Optional[str] = None
+    descripcion: Optional[str] = None
+    precio: Optional[float] = None
+    estado: Optional[str] = None
+
+class CitaEmbebida(BaseModel):
+    id_cita: int
+    fecha: Optional[datetime] = None
+    descripcion: Optional[str] = None
+    estado: Optional[str] = None
+    metodo_pago: Optional[str] = None
+    id_mascota: Optional[int] = None
+    id_cliente: Optional[int] = None
+    id_tratamiento: Optional[int] = None
+
+class CitaDetalladaResponse(CitaResponse):
+    cliente: Optional[ClienteEmbebido] = Field(None, description="Cliente de la cita")
+    mascota: Optional[MascotaEmbebida] = Field(None, description="Mascota de la cita")
+    tratamiento: Optional[TratamientoEmbebido] = Field(None, description="Tratamiento de la cita")
+
 # ========================
 # Tratamiento Schemas
 # ========================
@@ -192,4 +233,161 @@ class TratamientoUpdate(BaseModel):
 class TratamientoResponse(TratamientoBase):
     id_tratamiento: int = Field(..., description="ID único del tratamiento")
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# ========================
+# Respuestas con relaciones (parámetro include de los listados)
+# ========================
+# Las relaciones solo aparecen en la respuesta si se piden (response_model_exclude_unset)
+
+class ClienteConRelaciones(ClienteResponse):
+    mascotas: Optional[List[MascotaEmbebida]] = None
+    citas: Optional[List[CitaEmbebida]] = None
+    tratamientos: Optional[List[TratamientoEmbebido]] = None
+
+class MascotaConRelaciones(MascotaResponse):
+    cliente: Optional[ClienteEmbebido] = None
+    citas: Optional[List[CitaEmbebida]] = None
+
+class TratamientoConRelaciones(TratamientoResponse):
+    cliente: Optional[ClienteEmbebido] = None
+    citas: Optional[List[CitaEmbebida]] = None
+
+# ========================
+# Consultas por lista de IDs
+# ========================
+
+class ConsultaPorIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=10000, description="IDs a buscar; los inexistentes se omiten")
+    include: Optional[str] = Field(None, description="Relaciones a embeber, separadas por comas")
+
+# ========================
+# Búsqueda de texto completo
+# ========================
+
+class ResultadoBusqueda(BaseModel):
+    tipo: str = Field(..., description="Tabla del resultado: cliente o mascota")
+    id: int = Field(..., description="ID del cliente o de la mascota")
+    puntuacion: float = Field(..., description="Relevancia (bm25 cambiado de signo; mayor es mejor)")
+    cliente: Optional[ClienteEmbebido] = None
+    mascota: Optional[MascotaEmbebida] = None
+
+# ========================
+# Calendario de citas
+# ========================
+
+class PropiedadesEvento(BaseModel):
+    id_cita: int
+    cliente: str = ""
+    mascota: str = ""
+    estado: Optional[str] = None
+
+class EventoCalendario(BaseModel):
+    id: int = Field(..., description="ID de la cita")
+    title: str = Field(..., description="Descripción de la cita")
+    start: datetime
+    end: datetime
+    color: str = Field(..., description="Color según el estado de la cita")
+    resourceId: str = Field(..., description="Consulta en la que se atiende (consulta_N)")
+    extendedProps: PropiedadesEvento
+
+class HuecoLibre(BaseModel):
+    inicio: datetime
+    fin: datetime
+    recurso: str = Field(..., description="Consulta libre en ese horario (consulta_N)")
+
+class Disponibilidad(BaseModel):
+    libre: Optional[bool] = Field(None, description="Si la cita propuesta (fecha) no se solapa con ninguna; solo con fecha")
+    conflictos: List[int] = Field([], description="IDs de las citas con las que se solaparía")
+    huecos: List[HuecoLibre]
+
+# ========================
+# Operaciones por lotes de citas
+# ========================
+
+class CitasLote(BaseModel):
+    # Cada cita se valida contra CitaCreate por separado para informar de sus errores sin
+    # rechazar el lote entero
+    citas: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000, description="Citas a registrar (campos de CitaCreate)")
+    atomico: bool = Field(False, description="Si alguna cita no es válida no se registra ninguna")
+
+class EstadoLote(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="IDs de las citas a cambiar")
+    estado: str = Field(..., description="Estado nuevo de las citas")
+    metodo_pago: Optional[str] = Field(None, description="Método de pago; obligatorio para finalizar")
+    atomico: bool = Field(False, description="Si alguna cita no puede cambiar no se cambia ninguna")
+
+    @field_validator("estado")
+    @classmethod
+    def validar_estado_cita(cls, value: str) -> str:
+        estados_validos = ["Pendiente", "Confirmada", "En Proceso", "Finalizada", "Cancelada"]
+        if value not in estados_validos:
+            raise ValueError(f"Estado '{value}' no es válido. Debe ser uno de: {', '.join(estados_validos)}")
+        return value
+
+    @field_validator("metodo_pago")
+    @classmethod
+    def validar_metodo_pago(cls, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return value
+        metodos_validos = ["Efectivo", "Tarjeta", "Bizum", "Transferencia"]
+        if value not in metodos_validos:
+            raise ValueError(f"Método de pago '{value}' no es válido. Debe ser uno de: {', '.join(metodos_validos)}")
+        return value
+
+class ResultadoLote(BaseModel):
+    indice: int = Field(..., description="Posición de la cita en el lote")
+    ok: bool
+    id_cita: Optional[int] = Field(None, description="ID de la cita registrada o cambiada")
+    error: Optional[str] = None
+
+class RespuestaLote(BaseModel):
+    correctas: int = Field(..., description="Citas guardadas")
+    errores: int = Field(..., description="Citas rechazadas")
+    resultados: List[ResultadoLote]
+
+# ========================
+# Series de citas recurrentes
+# ========================
+
+class SerieCitaCreate(BaseModel):
+    regla: str = Field(..., description="Regla RRULE: FREQ (DAILY, WEEKLY, MONTHLY), INTERVAL, BYDAY, COUNT o UNTIL",
+                       examples=["FREQ=WEEKLY;BYDAY=MO;COUNT=12"])
+    inicio: datetime = Field(..., description="Fecha y hora de la primera cita de la serie")
+    descripcion: str = Field(..., min_length=0, max_length=500, description="Descripción de cada cita")
+    id_mascota: int = Field(..., gt=0, description="ID de la mascota")
+    id_cliente: int = Field(..., gt=0, description="ID del cliente")
+    id_tratamiento: int = Field(..., gt=0, description="ID del tratamiento")
+
+class SerieCitaResponse(SerieCitaCreate):
+    id_serie: int = Field(..., description="ID único de la serie")
+
+    model_config = ConfigDict(from_attributes=True)
+
+class OcurrenciaSerieResponse(BaseModel):
+    fecha: datetime
+    fin: datetime
+    estado: str = Field(..., description="confirmada, libre u ocupada")
+    id_cita: Optional[int] = Field(None, description="Cita creada al confirmar la ocurrencia")
+    conflictos: List[int] = Field([], description="IDs de las citas con las que se solaparía")
+
+class ConfirmacionSerie(BaseModel):
+    fechas: List[datetime] = Field(..., min_length=1, max_length=1000, description="Ocurrencias a confirmar")
+    atomico: bool = Field(False, description="Si alguna ocurrencia no se puede confirmar no se confirma ninguna")
+
+# ========================
+# Facturas
+# ========================
+
+class LoteFacturas(BaseModel):
+    anio: int = Field(..., ge=2000, le=2100, description="Año de las citas a facturar")
+    mes: int = Field(..., ge=1, le=12, description="Mes de las citas a facturar")
+    formato: str = Field("zip", description="zip (un PDF por factura) o pdf (un solo PDF con una página por factura)")
+
+    @field_validator("formato")
+    @classmethod
+    def validar_formato(cls, value: str) -> str:
+        formatos_validos = ["zip", "pdf"]
+        if value not in formatos_validos:
+            raise ValueError(f"Formato '{value}' no es válido. Debe ser uno de: {', '.join(formatos_validos)}")
+        return value
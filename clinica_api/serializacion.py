@@ -0,0 +1,138 @@
+"""
+Serialización rápida de listados sin relaciones.
+
+Por la ruta normal cada fila pasa por el ORM (objeto Cliente), por `to_dict()` y por la validación
+de `response_model` antes de codificarse con `json.dumps`. Para un listado plano nada de eso hace
+falta: el servicio devuelve las filas de columnas de un SELECT de Core, aquí se validan todas de
+una vez con un `TypeAdapter` del modelo de respuesta y se codifican con orjson. El endpoint
+devuelve directamente la `Response`, así que FastAPI no vuelve a validarla; `response_model` se
+mantiene en el decorador solo para la documentación.
+
+Con `Accept: application/x-ndjson` o `text/csv` los listados se transmiten con una
+StreamingResponse: las filas llegan del servicio en lotes (cursor `yield_per`) y cada lote se valida
+y se codifica según llega, así que el primer byte y la memoria no dependen del tamaño de la tabla.
+"""
+
+import csv
+import io
+from functools import lru_cache
+from typing import List
+import orjson
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+
+# Representaciones transmitidas por lotes de los listados, por tipo MIME de la cabecera Accept
+FORMATOS_STREAMING = ("application/x-ndjson", "text/csv")
+
+
+@lru_cache(maxsize=None)
+def adaptador_lista(modelo):
+    """TypeAdapter de `List[modelo]`, construido una sola vez por modelo."""
+    return TypeAdapter(List[modelo])
+
+
+def codificar_lista(filas, modelo):
+    """
+    Valida `filas` (diccionarios o RowMapping) contra `modelo` y devuelve el JSON en bytes.
+
+    Raises:
+        pydantic.ValidationError: Si alguna fila no cumple el modelo
+    """
+    adaptador = adaptador_lista(modelo)
+    return orjson.dumps(adaptador.dump_python(adaptador.validate_python(filas)))
+
+
+def respuesta_json(filas, modelo, response=None):
+    """
+    Response JSON ya codificada con las filas validadas.
+
+    Las cabeceras que el endpoint haya puesto en el `response` inyectado (ETag, X-Next-Cursor...)
+    se copian, porque FastAPI no las añade cuando el endpoint devuelve su propia Response.
+    """
+    respuesta = Response(content=codificar_lista(filas, modelo), media_type="application/json")
+    if response is not None:
+        respuesta.headers.update(response.headers)
+    return respuesta
+
+
+def formato_streaming(request: Request, include=None, ids=None):
+    """
+    Formato transmitido que pide la cabecera Accept, o None si hay que responder JSON.
+
+    Se elige el tipo aceptado de mayor calidad (q); a igualdad, el primero. `application/json` y
+    los comodines dan JSON.
+
+    Raises:
+        HTTPException: 406 si se pide NDJSON o CSV junto con `include` o `ids`, que solo se sirven
+        en JSON
+    """
+    aceptados = []
+    for posicion, parte in enumerate(request.headers.get("accept", "").split(",")):
+        tipo, *parametros = [trozo.strip() for trozo in parte.split(";")]
+        calidad = 1.0
+        for parametro in parametros:
+            nombre, _, valor = parametro.partition("=")
+            if nombre.strip() == "q":
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    calidad = 0.0
+        if tipo and calidad > 0:
+            aceptados.append((-calidad, posicion, tipo.lower()))
+
+    formato = None
+    for _, _, tipo in sorted(aceptados):
+        if tipo in FORMATOS_STREAMING:
+            formato = tipo
+            break
+        if tipo in ("application/json", "application/*", "*/*"):
+            break
+
+    if formato and (include or ids is not None):
+        raise HTTPException(status_code=406, detail="NDJSON y CSV solo están disponibles para el listado sin include ni ids.")
+    return formato
+
+
+async def _lotes_validados(lotes, modelo):
+    adaptador = adaptador_lista(modelo)
+    async for lote in lotes:
+        yield adaptador.dump_python(adaptador.validate_python(lote), mode="json")
+
+
+async def _ndjson(lotes, modelo):
+    async for filas in _lotes_validados(lotes, modelo):
+        yield b"".join(orjson.dumps(fila) + b"\n" for fila in filas)
+
+
+async def _csv(lotes, modelo):
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=list(modelo.model_fields))
+    # La cabecera sale antes de la primera consulta
+    escritor.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+    async for filas in _lotes_validados(lotes, modelo):
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(filas)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def respuesta_streaming(lotes, modelo, formato, response=None, nombre=None):
+    """
+    StreamingResponse NDJSON (una fila JSON por línea) o CSV (con cabecera) de los lotes de filas.
+
+    Args:
+        lotes: Iterador asíncrono de lotes de filas, como los `iterar_*_async` de los servicios
+        modelo: Modelo de respuesta con el que se valida cada fila
+        formato (str): Uno de FORMATOS_STREAMING
+        response (Response): Response inyectado cuyas cabeceras se copian
+        nombre (str): Nombre del fichero CSV sugerido en Content-Disposition
+    """
+    codificador = _csv if formato == "text/csv" else _ndjson
+    respuesta = StreamingResponse(codificador(lotes, modelo), media_type=formato)
+    if response is not None:
+        respuesta.headers.update(response.headers)
+    if formato == "text/csv" and nombre:
+        respuesta.headers["Content-Disposition"] = f'attachment; filename="{nombre}.csv"'
+    return respuesta
@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import tempfile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from httpx import AsyncClient, ASGITransport
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from server import app
+from clinica.dbconfig import Base, get_async_db
+
+
+class PruebaAPI(unittest.IsolatedAsyncioTestCase):
+    """Base de los tests de endpoints contra una base de datos SQLite temporal.
+
+    Crea el esquema, llama a `poblar` con una sesión síncrona y redirige a esa base de datos
+    `get_async_db` y el `get_db` de cada router de `routers`. Las dependencias sustituidas
+    se restauran al terminar cada test.
+    """
+    nombre_db = "pruebas.db"
+    routers = ()
+
+    async def asyncSetUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta_db = os.path.join(self.directorio.name, self.nombre_db)
+        self.engine = create_engine(f"sqlite:///{self.ruta_db}")
+        self.Session = sessionmaker(bind=self.engine)
+        self.crear_db()
+
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.ruta_db}")
+        self.AsyncSession = async_sessionmaker(bind=self.async_engine, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with self.AsyncSession() as db:
+                yield db
+
+        def override_get_db():
+            db = self.Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        overrides = {get_async_db: override_get_async_db}
+        overrides.update((router.get_db, override_get_db) for router in self.routers)
+        self.overrides_anteriores = {dependencia: app.dependency_overrides.get(dependencia)
+                                     for dependencia in overrides}
+        app.dependency_overrides.update(overrides)
+        self.client = AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        for dependencia, anterior in self.overrides_anteriores.items():
+            if anterior:
+                app.dependency_overrides[dependencia] = anterior
+            else:
+                app.dependency_overrides.pop(dependencia, None)
+        await self.async_engine.dispose()
+        self.engine.dispose()
+        self.directorio.cleanup()
+
+    def crear_db(self):
+        Base.metadata.create_all(bind=self.engine)
+        with self.Session() as db:
+            self.poblar(db)
+            db.commit()
+
+    def poblar(self, db):
+        """Añade a `db` los datos de partida del test; por defecto la base de datos queda vacía."""
@@ -0,0 +1,62 @@
+import unittest
+from clinica.models import Cliente, Mascota
+from clinica_api.routers import clientes, mascotas
+from clinica_api.tests_fastapi.base import PruebaAPI
+
+
+class TestBusqueda(PruebaAPI):
+    nombre_db = "busqueda.db"
+    routers = (clientes, mascotas)
+
+    def poblar(self, db):
+        db.add(Cliente(id_cliente=1, nombre_cliente="Juan Pérez", edad=30, dni="12345678Z", telefono="600123456",
+                       direccion="Calle Mayor 1"))
+        db.add(Mascota(id_mascota=1, nombre_mascota="Firulais", raza="Labrador", edad=3, estado="Vivo", id_cliente=1))
+        db.add(Mascota(id_mascota=2, nombre_mascota="Juanita", raza="Persa", edad=5, estado="Vivo", id_cliente=1))
+
+    async def test_buscar(self):
+        response = await self.client.get("/buscar/", params={"q": "juan"})
+        self.assertEqual(response.status_code, 200)
+        resultados = response.json()
+        self.assertCountEqual([(r["tipo"], r["id"]) for r in resultados], [("cliente", 1), ("mascota", 2)])
+        cliente = next(r for r in resultados if r["tipo"] == "cliente")
+        self.assertEqual(cliente["cliente"]["dni"], "12345678Z")
+        self.assertNotIn("mascota", cliente)
+        self.assertIn("ETag", response.headers)
+
+        response = await self.client.get("/buscar/", params={"q": "perez 1234", "tipo": "clientes"})
+        self.assertEqual([r["id"] for r in response.json()], [1])
+
+        response = await self.client.get("/buscar/", params={"q": "labra", "tipo": "mascotas", "limit": 1})
+        self.assertEqual([r["mascota"]["nombre_mascota"] for r in response.json()], ["Firulais"])
+
+    async def test_busquedas_por_nombre_paginadas(self):
+        response = await self.client.get("/mascotas/buscar_por_nombre/f", params={"limit": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(m["nombre_mascota"], m["cliente"]["nombre_cliente"]) for m in response.json()],
+                         [("Firulais", "Juan Pérez")])
+        self.assertNotIn("X-Next-Offset", response.headers)
+
+        response = await self.client.get("/mascotas/buscar_por_nombre/gato")
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.client.get("/clientes/buscar", params={"nombre": "JUAN", "limit": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["dni"] for c in response.json()], ["12345678Z"])
+
+        response = await self.client.get("/clientes/buscar", params={"nombre": "!!"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.get("/clientes/buscar")
+        self.assertEqual(response.status_code, 400)
+
+    async def test_parametros_no_validos(self):
+        response = await self.client.get("/buscar/", params={"q": "juan", "tipo": "facturas"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.get("/buscar/", params={"q": "%%"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.get("/buscar/")
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime
+from clinica.models import Cita, Cliente, Mascota
+from clinica_api.routers import citas
+from clinica_api.tests_fastapi.base import PruebaAPI
+
+
+class TestCalendario(PruebaAPI):
+    nombre_db = "calendario.db"
+    routers = (citas,)
+
+    def poblar(self, db):
+        db.add(Cliente(id_cliente=1, nombre_cliente="Juan Pérez", edad=30, dni="12345678Z", telefono="600123456"))
+        db.add(Mascota(id_mascota=1, nombre_mascota="Firulais", raza="Labrador", estado="Vivo", id_cliente=1))
+        db.add(Mascota(id_mascota=2, nombre_mascota="Juanita", raza="Persa", estado="Vivo", id_cliente=1))
+        db.add_all([
+            # Empieza antes de la ventana pero termina dentro
+            Cita(id_cita=1, fecha=datetime(2024, 11, 3, 23, 30), descripcion="Urgencia", estado="Finalizada",
+                 id_mascota=1, id_cliente=1),
+            Cita(id_cita=2, fecha=datetime(2024, 11, 5, 10), descripcion="Vacuna", estado="Pendiente",
+                 id_mascota=2, id_cliente=1),
+            Cita(id_cita=3, fecha=datetime(2024, 11, 11, 9), descripcion="Revisión", estado="Pendiente",
+                 id_mascota=1, id_cliente=1),
+        ])
+
+    async def test_eventos_de_la_ventana(self):
+        semana = {"desde": "2024-11-04T00:00:00", "hasta": "2024-11-11T00:00:00"}
+        response = await self.client.get("/citas/calendario", params=semana)
+        self.assertEqual(response.status_code, 200)
+        eventos = response.json()
+        self.assertEqual([e["id"] for e in eventos], [1, 2])
+        self.assertEqual(eventos[1], {
+            "id": 2, "title": "Vacuna", "start": "2024-11-05T10:00:00", "end": "2024-11-05T11:00:00",
+            "color": "#FFBD45", "resourceId": "consulta_2",
+            "extendedProps": {"id_cita": 2, "cliente": "Juan Pérez", "mascota": "Juanita", "estado": "Pendiente"},
+        })
+
+        response = await self.client.get("/citas/calendario", params={**semana, "recurso": "consulta_1"})
+        self.assertEqual([e["id"] for e in response.json()], [1])
+
+        response = await self.client.get("/citas/calendario", params=semana,
+                                         headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_disponibilidad(self):
+        response = await self.client.get("/citas/disponibilidad", params={
+            "fecha": "2024-11-05T10:30:00", "id_mascota": 2, "cantidad": 2})
+        self.assertEqual(response.status_code, 200)
+        disponibilidad = response.json()
+        self.assertEqual((disponibilidad["libre"], disponibilidad["conflictos"]), (False, [2]))
+        self.assertEqual([h["inicio"] for h in disponibilidad["huecos"]], ["2024-11-05T11:00:00", "2024-11-05T11:30:00"])
+        self.assertEqual(disponibilidad["huecos"][0]["recurso"], "consulta_2")
+
+        response = await self.client.get("/citas/disponibilidad", params={
+            "desde": "2024-11-11T08:30:00", "recurso": "consulta_1", "cantidad": 1})
+        self.assertEqual(response.json(), {"libre": None, "conflictos": [], "huecos": [
+            {"inicio": "2024-11-11T10:00:00", "fin": "2024-11-11T11:00:00", "recurso": "consulta_1"}]})
+
+        response = await self.client.get("/citas/disponibilidad", params={"fecha": "2024-11-05T10:30:00"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_parametros_no_validos(self):
+        response = await self.client.get("/citas/calendario", params={"desde": "2024-11-11T00:00", "hasta": "2024-11-04T00:00"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.get("/citas/calendario", params={"desde": "2024-01-01T00:00", "hasta": "2024-12-31T00:00"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.get("/citas/calendario", params={"desde": "2024-11-04T00:00", "hasta": "2024-11-11T00:00",
+                                                                      "recurso": "quirofano"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.get("/citas/calendario")
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,10 +8,9 @@ import json
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from httpx import AsyncClient, ASGITransport
-from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 from server import app
-from clinica.dbconfig import Base, get_db
+from clinica.dbconfig import Base, get_db, async_engine
 import asyncio
 
 # Configuración para la base de datos de pruebas
@@ -50,6 +49,10 @@ class TestCitas(unittest.IsolatedAsyncioTestCase):
         # Crear tratamiento único asociado al cliente
         self.id_tratamiento = await self.crear_tratamiento(self.id_cliente)
 
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await async_engine.dispose()
+
     async def crear_cliente(self):
         # Generar un DNI válido
         numeros_dni = str(random.randint(10000000, 99999999))
@@ -95,6 +98,12 @@ class TestCitas(unittest.IsolatedAsyncioTestCase):
 
         return id_mascota
 
+    async def hueco_libre(self):
+        # Las citas que se solapan con otra de la mascota o de su consulta se rechazan
+        response = await self.client.get("/citas/disponibilidad", params={"id_mascota": self.id_mascota, "cantidad": 1})
+        assert response.status_code == 200, f"Error al consultar la disponibilidad: {response.text}"
+        return response.json()["huecos"][0]["inicio"]
+
     async def crear_tratamiento(self, id_cliente):
         # Usar un nombre único para el tratamiento
         tratamiento_unico = f"Vacunación-{uuid.uuid4()}"
@@ -162,7 +171,7 @@ class TestCitas(unittest.IsolatedAsyncioTestCase):
             "id_mascota": self.id_mascota,
             "id_cliente": self.id_cliente,
             "id_tratamiento": self.id_tratamiento,
-            "fecha": datetime.now().isoformat(),
+            "fecha": await self.hueco_libre(),
             "descripcion": "Cita de vacunación"
         }
 
@@ -193,6 +202,25 @@ class TestCitas(unittest.IsolatedAsyncioTestCase):
         data = response.json()
         self.assertIsInstance(data, list)
 
+    async def test_ver_citas_paginadas_con_cursor(self):
+        await self.test_registrar_cita()
+        await self.test_registrar_cita()
+
+        response = await self.client.get("/citas/", params={"limit": 1, "incluir_total": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertGreaterEqual(int(response.headers["X-Total-Count"]), 2)
+        cursor = response.headers.get("X-Next-Cursor")
+        self.assertIsNotNone(cursor)
+
+        siguiente = await self.client.get("/citas/", params={"limit": 1, "cursor": cursor})
+        self.assertEqual(siguiente.status_code, 200)
+        self.assertEqual(len(siguiente.json()), 1)
+        self.assertNotEqual(siguiente.json()[0]["id_cita"], response.json()[0]["id_cita"])
+
+        invalido = await self.client.get("/citas/", params={"cursor": "no-es-un-cursor"})
+        self.assertEqual(invalido.status_code, 400)
+
     async def test_buscar_cita(self):
         await self.test_registrar_cita()
         response = await self.client.get(f"/citas/buscar/{self.id_mascota}/{self.id_cliente}")
@@ -0,0 +1,113 @@
+import unittest
+from clinica.dbconfig import async_engine
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica_api.routers import citas
+from clinica_api.tests_fastapi.base import PruebaAPI
+
+
+class TestCitasLote(PruebaAPI):
+    nombre_db = "lote.db"
+    routers = (citas,)
+
+    def poblar(self, db):
+        db.add(Cliente(id_cliente=1, nombre_cliente="Juan Pérez", edad=30, dni="12345678Z", telefono="600123456"))
+        db.add(Mascota(id_mascota=1, nombre_mascota="Firulais", raza="Labrador", estado="Vivo", id_cliente=1))
+        db.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", descripcion="Rabia", precio=40,
+                           estado="Activo", id_cliente=1))
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        await async_engine.dispose()
+
+    async def test_registrar_y_finalizar_lote(self):
+        cita = {"descripcion": "Vacunación anual", "estado": "Pendiente",
+                "id_mascota": 1, "id_cliente": 1, "id_tratamiento": 1}
+        response = await self.client.post("/citas/batch", json={"citas": [
+            {**cita, "fecha": "2024-11-11T10:00:00"},
+            {**cita, "fecha": "2024-11-11T10:30:00"},
+            {**cita, "fecha": "2024-11-12T10:00:00", "estado": "Inventado"},
+            {**cita, "fecha": "2024-11-13T10:00:00"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        respuesta = response.json()
+        self.assertEqual((respuesta["correctas"], respuesta["errores"]), (2, 2))
+        self.assertEqual([r["ok"] for r in respuesta["resultados"]], [True, False, False, True])
+        self.assertIn("estado", respuesta["resultados"][2]["error"])
+
+        ids = [r["id_cita"] for r in respuesta["resultados"] if r["ok"]]
+        response = await self.client.put("/citas/batch/estado",
+                                          json={"ids": ids, "estado": "Finalizada", "metodo_pago": "Bizum"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["correctas"], 2)
+        with self.Session() as db:
+            self.assertEqual({c.metodo_pago for c in db.query(Cita).filter(Cita.id_cita.in_(ids))}, {"Bizum"})
+
+        response = await self.client.put("/citas/batch/estado", json={"ids": ids, "estado": "Finalizada"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.post("/citas/batch", json={"citas": []})
+        self.assertEqual(response.status_code, 422)
+
+    async def test_serie_de_citas(self):
+        response = await self.client.post("/citas/series", json={
+            "regla": "FREQ=WEEKLY;INTERVAL=2;COUNT=3", "inicio": "2024-11-04T09:00:00",
+            "descripcion": "Control quincenal", "id_mascota": 1, "id_cliente": 1, "id_tratamiento": 1})
+        self.assertEqual(response.status_code, 201)
+        serie = response.json()
+        self.assertEqual(serie["regla"], "FREQ=WEEKLY;INTERVAL=2;COUNT=3")
+
+        ventana = {"desde": "2024-11-01T00:00:00", "hasta": "2025-01-01T00:00:00"}
+        ruta = f"/citas/series/{serie['id_serie']}"
+        response = await self.client.get(f"{ruta}/ocurrencias", params=ventana)
+        self.assertEqual(response.status_code, 200)
+        ocurrencias = response.json()
+        self.assertEqual([o["fecha"] for o in ocurrencias],
+                         ["2024-11-04T09:00:00", "2024-11-18T09:00:00", "2024-12-02T09:00:00"])
+        self.assertEqual({o["estado"] for o in ocurrencias}, {"libre"})
+
+        response = await self.client.post(f"{ruta}/confirmar", json={"fechas": [ocurrencias[1]["fecha"]]})
+        self.assertEqual(response.json()["correctas"], 1)
+        response = await self.client.get(f"{ruta}/ocurrencias", params=ventana)
+        self.assertEqual([o["estado"] for o in response.json()], ["libre", "confirmada", "libre"])
+
+        response = await self.client.get("/citas/series/99/ocurrencias", params=ventana)
+        self.assertEqual(response.status_code, 404)
+        response = await self.client.post("/citas/series", json={**serie, "regla": "FREQ=HOURLY;COUNT=2"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_fecha_con_zona_horaria(self):
+        cita = {"descripcion": "Revisión", "estado": "Pendiente",
+                "id_mascota": 1, "id_cliente": 1, "id_tratamiento": 1}
+        response = await self.client.post("/citas/", json={**cita, "fecha": "2030-01-07T10:30:00Z"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["fecha"], "2030-01-07T10:30:00")
+
+        # Se compara con la agenda sin zona: solapa con la cita recién reservada
+        response = await self.client.get("/citas/disponibilidad",
+                                         params={"fecha": "2030-01-07T10:00:00+00:00", "id_mascota": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["libre"])
+        response = await self.client.post("/citas/", json={**cita, "fecha": "2030-01-07T10:45:00+00:00"})
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.client.post("/citas/batch", json={"citas": [
+            {**cita, "fecha": "2030-01-08T10:00:00Z"},
+            {**cita, "fecha": "2030-01-08T10:15:00Z"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["ok"] for r in response.json()["resultados"]], [True, False])
+
+    async def test_finalizar_cita_cancelada_con_el_hueco_ocupado(self):
+        cita = {"descripcion": "Revisión", "estado": "Pendiente", "fecha": "2030-02-04T10:00:00",
+                "id_mascota": 1, "id_cliente": 1, "id_tratamiento": 1}
+        id_cita = (await self.client.post("/citas/", json=cita)).json()["id_cita"]
+        response = await self.client.delete(f"/citas/{id_cita}")
+        self.assertEqual(response.status_code, 200)
+        response = await self.client.post("/citas/", json={**cita, "descripcion": "Vacuna"})
+        self.assertEqual(response.status_code, 201)
+
+        response = await self.client.put(f"/citas/finalizar/{id_cita}", params={"metodo_pago": "Tarjeta"})
+        self.assertEqual(response.status_code, 409)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from httpx import AsyncClient, ASGITransport
 from server import app  
-from clinica.dbconfig import Base, get_db
+from clinica.dbconfig import Base, get_db, async_engine
 from clinica_api.schemas import ClienteCreate, ClienteUpdate
 import os
 import asyncio
@@ -51,6 +51,7 @@ class TestClientes(unittest.IsolatedAsyncioTestCase):
 
     async def asyncTearDown(self):
         await self.client.aclose()
+        await async_engine.dispose()
 
     async def test_registrar_cliente(self):
         nuevo_cliente = {
@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import tempfile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from httpx import AsyncClient, ASGITransport
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+from server import app
+from clinica.dbconfig import Base, get_db, async_engine
+from clinica.models import Cliente, Mascota
+
+
+class TestEstadisticas(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directorio.name, 'stats.db')}",
+                                    connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        db = TestingSessionLocal()
+        db.add(Cliente(id_cliente=1, nombre_cliente="Juan Perez", edad=30, dni="12345678Z", telefono="600123456"))
+        db.add(Mascota(nombre_mascota="Firulais", raza="Labrador", edad=3, estado="Vivo", id_cliente=1))
+        db.commit()
+        db.close()
+
+        def override_get_db():
+            db = TestingSessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        self.override_anterior = app.dependency_overrides.get(get_db)
+        app.dependency_overrides[get_db] = override_get_db
+        self.client = AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await async_engine.dispose()
+        if self.override_anterior:
+            app.dependency_overrides[get_db] = self.override_anterior
+        else:
+            app.dependency_overrides.pop(get_db, None)
+        self.engine.dispose()
+        self.directorio.cleanup()
+
+    async def test_obtener_estadisticas(self):
+        response = await self.client.get("/stats/")
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(set(data), {"kpis", "clientes", "mascotas", "tratamientos", "citas"})
+        self.assertEqual(data["kpis"]["total_clientes"], 1)
+        self.assertEqual(data["mascotas"]["por_raza"], [{"raza": "Labrador", "total": 1}])
+
+    async def test_obtener_secciones(self):
+        response = await self.client.get("/stats/", params={"secciones": "kpis"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()), ["kpis"])
+
+        response = await self.client.get("/stats/", params={"secciones": "inventario"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
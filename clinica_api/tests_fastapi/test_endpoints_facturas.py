@@ -0,0 +1,59 @@
+import io
+import unittest
+import zipfile
+from datetime import datetime
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica.utils.facturas import cerrar_pool_facturas
+from clinica_api.tests_fastapi.base import PruebaAPI
+
+
+class TestFacturas(PruebaAPI):
+    nombre_db = "facturas.db"
+
+    def poblar(self, db):
+        db.add(Cliente(id_cliente=1, nombre_cliente="Juan Pérez", edad=30, dni="12345678Z", telefono="600123456"))
+        db.add(Mascota(id_mascota=1, nombre_mascota="Firulais", raza="Labrador", edad=5, estado="Vivo", id_cliente=1))
+        db.add(Tratamiento(id_tratamiento=1, nombre_tratamiento="Vacuna", descripcion="Rabia", precio=40,
+                           estado="Activo", id_cliente=1))
+        db.add_all(
+            Cita(id_cita=dia, fecha=datetime(2024, 11, dia, 10), descripcion="Vacunación", estado="Finalizada",
+                 metodo_pago="Tarjeta", id_mascota=1, id_cliente=1, id_tratamiento=1)
+            for dia in range(1, 4)
+        )
+
+    async def asyncTearDown(self):
+        cerrar_pool_facturas()
+        await super().asyncTearDown()
+
+    async def test_lote_de_facturas(self):
+        response = await self.client.post("/facturas/lote", json={"anio": 2024, "mes": 11})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/zip")
+        self.assertEqual(response.headers["x-facturas"], "3")
+        self.assertGreater(float(response.headers["x-facturas-por-segundo"]), 0)
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archivo_zip:
+            self.assertEqual(archivo_zip.namelist(), ["factura_1.pdf", "factura_2.pdf", "factura_3.pdf"])
+
+        response = await self.client.post("/facturas/lote", json={"anio": 2024, "mes": 11, "formato": "pdf"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/pdf")
+        self.assertEqual(response.content.count(b"/Type /Page\n"), 3)
+
+        response = await self.client.post("/facturas/lote", json={"anio": 2024, "mes": 12})
+        self.assertEqual(response.status_code, 404)
+        response = await self.client.post("/facturas/lote", json={"anio": 2024, "mes": 11, "formato": "docx"})
+        self.assertEqual(response.status_code, 422)
+
+    async def test_generar_factura(self):
+        response = await self.client.get("/tratamientos/factura/generar/1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/pdf")
+        self.assertIn('filename="factura_1.pdf"', response.headers["content-disposition"])
+        self.assertTrue(response.content.startswith(b"%PDF"))
+
+        response = await self.client.get("/tratamientos/factura/generar/99")
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
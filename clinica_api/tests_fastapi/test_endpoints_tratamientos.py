@@ -5,7 +5,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from httpx import AsyncClient, ASGITransport
 from server import app 
-from clinica.dbconfig import Base, get_db
+from clinica.dbconfig import Base, get_db, async_engine
 from clinica_api.schemas import TratamientoCreate, TratamientoUpdate    
 import os
 import asyncio
@@ -66,6 +66,7 @@ class TestTratamientos(unittest.IsolatedAsyncioTestCase):
 
     async def asyncTearDown(self):
         await self.client.aclose()
+        await async_engine.dispose()
 
 
     async def test_exportar_tratamientos_a_json_endpoint(self):
@@ -0,0 +1,32 @@
+import unittest
+import json
+from clinica.benchmarks.benchmark_listados import generar, ruta_columnas, ruta_orm
+from clinica_api.tests_fastapi.base import PruebaAPI
+
+# Las medidas de tiempo están en clinica/benchmarks/benchmark_listados.py
+FILAS = 200
+
+
+class TestRendimientoListados(PruebaAPI):
+    """La ruta de columnas + orjson del listado de clientes produce el mismo JSON que la ruta ORM."""
+    nombre_db = "rendimiento.sqlite"
+
+    def crear_db(self):
+        generar(self.ruta_db, FILAS)
+
+    async def test_mismo_json_que_la_ruta_orm(self):
+        esperado = json.loads(await ruta_orm(self.AsyncSession))
+        self.assertEqual(len(esperado), FILAS)
+        self.assertEqual(json.loads(await ruta_columnas(self.AsyncSession)), esperado)
+
+        response = await self.client.get("/clientes/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertIn("ETag", response.headers)
+        self.assertEqual(response.json(), esperado)
+        # Los validadores del modelo de respuesta se siguen aplicando (DNI en mayúsculas)
+        self.assertEqual(response.json()[0]["dni"], "00000001Z")
+
+
+if __name__ == "__main__":
+    unittest.main()
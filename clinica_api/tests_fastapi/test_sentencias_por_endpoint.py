@@ -0,0 +1,188 @@
+import unittest
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import event
+from clinica.models import Cita, Cliente, Mascota, Tratamiento
+from clinica.services.gestion_clientes import GestionClientes
+from clinica.services.gestion_de_citas import invalidar_totales_citas
+from clinica.services.gestion_mascotas import GestionMascotas
+from clinica.services.gestion_tratamiento import GestionTratamientos
+from clinica.utils.cache_entidades import cache_entidades
+from clinica_api.tests_fastapi.base import PruebaAPI
+
+# Sentencias SQL que puede ejecutar cada endpoint, sea cual sea el número de filas.
+# Si un cambio hace que un endpoint cargue relaciones fila a fila, este test falla.
+PRESUPUESTO = {
+    "/clientes/": 1,
+    "/clientes/?include=mascotas,citas,tratamientos": 4,
+    "/mascotas/": 1,
+    "/mascotas/?include=cliente,citas": 2,
+    "/tratamientos/": 1,
+    "/tratamientos/?include=cliente,citas": 2,
+    "/citas/?limit=1": 1,
+    "/citas/?include=cliente,mascota,tratamiento": 1,
+    "/citas/?include=cliente&incluir_total=true&estado=Pendiente": 2,
+    "/citas/detalladas": 1,
+    "/citas/calendario?desde=2024-11-04T00:00:00&hasta=2024-11-11T00:00:00": 1,
+    "/clientes/1": 1,
+    "/clientes/?ids=2,1&include=mascotas": 2,
+    "/mascotas/?ids=12,11&include=cliente": 1,
+    "/tratamientos/?ids=1,2": 1,
+    "/citas/?ids=1,2,3&include=mascota": 1,
+    "/mascotas/cliente/1": 2,
+}
+
+
+class TestSentenciasPorEndpoint(PruebaAPI):
+    nombre_db = "sentencias.sqlite"
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.sentencias = []
+        event.listen(self.async_engine.sync_engine, "before_cursor_execute", self._capturar)
+
+    async def asyncTearDown(self):
+        event.remove(self.async_engine.sync_engine, "before_cursor_execute", self._capturar)
+        await super().asyncTearDown()
+
+    def _capturar(self, conn, cursor, statement, parameters, context, executemany):
+        self.sentencias.append(statement)
+
+    def _sembrar(self, clientes):
+        """Añade `clientes` clientes, cada uno con dos mascotas, un tratamiento y dos citas."""
+        session = self.Session()
+        inicio = session.query(Cliente).count()
+        for i in range(inicio + 1, inicio + clientes + 1):
+            session.add(Cliente(id_cliente=i, nombre_cliente=f"Cliente {i}", edad=30, dni=f"{i:08d}Z",
+                                direccion="Calle Mayor 1", telefono=f"6{i:08d}"))
+            session.add(Tratamiento(id_tratamiento=i, nombre_tratamiento=f"Tratamiento {i}", precio=20,
+                                    descripcion="Tratamiento de prueba", estado="Activo", id_cliente=i))
+            for j in (1, 2):
+                id_mascota = i * 10 + j
+                session.add(Mascota(id_mascota=id_mascota, nombre_mascota=f"Mascota {id_mascota}", raza="Beagle",
+                                    edad=3, estado="Vivo", id_cliente=i))
+                session.add(Cita(fecha=datetime(2024, 11, 10, 9 + j), descripcion="Revisión anual", estado="Pendiente",
+                                 id_mascota=id_mascota, id_cliente=i, id_tratamiento=i))
+        session.commit()
+        session.close()
+
+    async def _contar(self, ruta):
+        # Sin totales ni entidades cacheados de peticiones anteriores, para contar siempre las consultas
+        invalidar_totales_citas()
+        cache_entidades.limpiar()
+        self.sentencias.clear()
+        response = await self.client.get(ruta)
+        self.assertEqual(response.status_code, 200, f"{ruta}: {response.text}")
+        return len(self.sentencias), response.json()
+
+    async def test_sentencias_constantes(self):
+        self._sembrar(2)
+        con_pocas_filas = {ruta: (await self._contar(ruta))[0] for ruta in PRESUPUESTO}
+
+        self._sembrar(20)
+        con_muchas_filas = {ruta: (await self._contar(ruta))[0] for ruta in PRESUPUESTO}
+
+        self.assertEqual(con_pocas_filas, PRESUPUESTO)
+        self.assertEqual(con_muchas_filas, PRESUPUESTO)
+
+    async def test_include_embebe_las_relaciones(self):
+        self._sembrar(1)
+
+        _, clientes = await self._contar("/clientes/?include=mascotas")
+        self.assertEqual([m["id_mascota"] for m in clientes[0]["mascotas"]], [11, 12])
+        self.assertNotIn("citas", clientes[0])
+
+        _, mascotas = await self._contar("/mascotas/")
+        self.assertNotIn("cliente", mascotas[0])
+
+        _, citas = await self._contar("/citas/?include=tratamiento")
+        self.assertEqual(citas[0]["tratamiento"]["nombre_tratamiento"], "Tratamiento 1")
+
+        response = await self.client.get("/clientes/", params={"include": "facturas"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_busqueda_por_ids(self):
+        self._sembrar(3)
+
+        _, clientes = await self._contar("/clientes/?ids=3,1,99")
+        self.assertEqual([c["id_cliente"] for c in clientes], [3, 1])
+
+        self.sentencias.clear()
+        response = await self.client.post("/mascotas/por_ids", json={"ids": [32, 11], "include": "cliente"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(m["id_mascota"], m["cliente"]["id_cliente"]) for m in response.json()], [(32, 3), (11, 1)])
+        self.assertEqual(len(self.sentencias), 1)
+
+        response = await self.client.post("/citas/por_ids", json={"ids": []})
+        self.assertEqual(response.status_code, 422)
+        response = await self.client.get("/tratamientos/", params={"ids": "1,x"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_peticion_condicional_sin_consultas(self):
+        self._sembrar(1)
+        ruta = "/clientes/?include=mascotas"
+        response = await self.client.get(ruta)
+        etag = response.headers["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn("Last-Modified", response.headers)
+
+        self.sentencias.clear()
+        response = await self.client.get(ruta, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.sentencias, [])
+
+        # Escribir en una tabla incluida cambia el ETag; en otra tabla, no
+        session = self.Session()
+        GestionTratamientos(session).modificar_tratamiento(1, {"precio": 25})
+        response = await self.client.get(ruta, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        GestionMascotas(session).modificar_mascota(11, {"edad": 4})
+        session.close()
+        response = await self.client.get(ruta, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    async def test_listados_transmitidos(self):
+        self._sembrar(3)
+        esperado = (await self.client.get("/clientes/")).json()
+
+        self.sentencias.clear()
+        response = await self.client.get("/clientes/", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual([json.loads(linea) for linea in response.text.splitlines()], esperado)
+        self.assertEqual(len(self.sentencias), 1)
+
+        # Los filtros se aplican también al transmitir
+        response = await self.client.get("/mascotas/", params={"raza": "beag", "nombre": "31"},
+                                         headers={"Accept": "text/csv, application/json;q=0.5"})
+        self.assertTrue(response.headers["content-type"].startswith("text/csv"))
+        self.assertIn('filename="mascotas.csv"', response.headers["Content-Disposition"])
+        filas = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual([(f["id_mascota"], f["nombre_mascota"]) for f in filas], [("31", "Mascota 31")])
+
+        response = await self.client.get("/citas/", params={"estado": "Cancelada"}, headers={"Accept": "text/csv"})
+        self.assertEqual(response.text.splitlines(), [
+            "fecha,descripcion,estado,id_mascota,id_cliente,id_tratamiento,metodo_pago,id_cita"])
+
+        # Cada representación tiene su ETag
+        json_etag = (await self.client.get("/citas/")).headers["ETag"]
+        self.assertNotEqual(response.headers["ETag"], json_etag)
+        self.assertEqual(response.headers["Vary"], "Accept")
+
+        response = await self.client.get("/clientes/", params={"include": "mascotas"}, headers={"Accept": "text/csv"})
+        self.assertEqual(response.status_code, 406)
+
+    async def test_lotes_del_cursor(self):
+        self._sembrar(5)
+        async with self.AsyncSession() as db:
+            lotes = [lote async for lote in GestionClientes(db).iterar_clientes_async(tamano_lote=2)]
+        self.assertEqual([[fila["id_cliente"] for fila in lote] for lote in lotes], [[1, 2], [3, 4], [5]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# El diario de cambios global se crea al importar clinica.utils.diario_cambios y, por defecto,
+# escribe en clinica/data; su compactación acabaría llevando los datos de las pruebas a los
+# snapshots datos_*.json versionados. Las pruebas lo apuntan a un directorio temporal antes de
+# importar nada de la aplicación.
+_DIRECTORIO_DIARIO = tempfile.mkdtemp(prefix="clinica_diario_")
+os.environ["CLINICA_DIARIO_DIR"] = _DIRECTORIO_DIARIO
+atexit.register(shutil.rmtree, _DIRECTORIO_DIARIO, ignore_errors=True)
+
+# Igual con la base de datos de la aplicación: las pruebas trabajan sobre una copia temporal de
+# clinica_db.sqlite para que las migraciones y las escrituras no modifiquen el archivo versionado.
+_DIRECTORIO_DB = tempfile.mkdtemp(prefix="clinica_db_")
+os.environ["CLINICA_DB_PATH"] = os.path.join(_DIRECTORIO_DB, "clinica_db.sqlite")
+shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "clinica_db.sqlite"),
+                os.environ["CLINICA_DB_PATH"])
+atexit.register(shutil.rmtree, _DIRECTORIO_DB, ignore_errors=True)
+
+
+def pytest_sessionstart(session):
+    # Las pruebas de los endpoints usan ASGITransport, que no ejecuta el lifespan: se aplican aquí
+    # las migraciones de arranque a la copia de la base de datos, igual que al iniciar la API
+    from clinica.migraciones import aplicar_migraciones
+    aplicar_migraciones()
@@ -1,10 +1,10 @@
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from clinica.dbconfig import Base, engine, SessionLocal
-from clinica_api.routers import clientes, citas, mascotas, tratamientos, exportaciones
+from clinica.dbconfig import Base, engine, async_engine, SessionLocal, comprobar_pragmas, pragmas_en_vigor
+from clinica_api.routers import clientes, citas, mascotas, tratamientos, exportaciones, estadisticas, busqueda, facturas
 from clinica.models import Cliente
 from clinica.database import (
     cargar_todos_los_datos, 
@@ -12,6 +12,11 @@ from clinica.database import (
     DATABASE_PATH, 
     RUTA_DATA
 )
+from clinica.migraciones import aplicar_migraciones
+from clinica.utils.cache_entidades import cache_entidades
+from clinica.utils.agenda_citas import agendas_citas
+from clinica.utils.diario_cambios import diario_cambios
+from clinica.utils.facturas import cerrar_pool_facturas
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
@@ -57,6 +62,8 @@ def init_db():
             logger.info("Datos iniciales cargados exitosamente")
         else:
             logger.info("Base de datos existente encontrada")
+            # Migraciones pendientes del esquema; si ya está al día solo se lee la versión
+            aplicar_migraciones()
             
             # Verificar si hay datos
             db = SessionLocal()
@@ -82,11 +89,21 @@ async def lifespan(app: FastAPI):
     try:
         # Llamada a la función de inicialización síncrona
         init_db()
+        # PRAGMAs de SQLite en vigor tras arrancar; /health los expone
+        app.state.comprobacion_pragmas = comprobar_pragmas()
+        # Agenda en memoria de los huecos ocupados, para los solapes y /citas/disponibilidad
+        with SessionLocal() as db:
+            agendas_citas.reconstruir(db)
+        # Compactación periódica del diario de cambios sobre los snapshots JSON
+        diario_cambios.iniciar_compactador()
         yield
     except Exception as e:
         logger.error(f"Error durante la inicialización de la aplicación: {str(e)}")
         raise
     finally:
+        diario_cambios.detener_compactador()
+        cerrar_pool_facturas()
+        await async_engine.dispose()
         logger.info("Cerrando la aplicación...")
 
 # Instancia de FastAPI
@@ -123,6 +140,9 @@ app.include_router(clientes.router)
 app.include_router(mascotas.router)
 app.include_router(citas.router)
 app.include_router(tratamientos.router)
+app.include_router(estadisticas.router)
+app.include_router(busqueda.router)
+app.include_router(facturas.router)
 app.include_router(exportaciones.router, prefix="/api")
 
 @app.get("/", tags=["Root"])
@@ -147,10 +167,12 @@ async def debug_routes():
     ]
 
 @app.get("/health", tags=["Health"])
-async def health_check(db: Session = Depends(get_db)):
+def health_check(db: Session = Depends(get_db)):
     """Verificación completa del estado de la aplicación."""
     try:
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
+        pragmas = pragmas_en_vigor(db.connection())
+        comprobacion = getattr(app.state, "comprobacion_pragmas", {})
         
         inspector = inspect(engine)
         required_tables = {"cliente", "mascota", "cita", "tratamiento", "producto"}
@@ -161,13 +183,17 @@ async def health_check(db: Session = Depends(get_db)):
             return {
                 "status": "warning",
                 "database": "connected",
-                "missing_tables": list(missing_tables)
+                "missing_tables": list(missing_tables),
+                "pragmas": pragmas
             }
 
         return {
             "status": "healthy",
             "database": "connected",
-            "tables": list(existing_tables)
+            "tables": list(existing_tables),
+            "pragmas": pragmas,
+            "pragmas_distintos_al_arrancar": comprobacion.get("diferencias", {}),
+            "cache_entidades": cache_entidades.metricas()
         }
     except Exception as e:
         logger.error(f"Error en health check: {str(e)}")
@@ -2,17 +2,77 @@ import streamlit as st
 import logging
 import pandas as pd
 from streamlit_calendar import calendar
-from datetime import datetime, timedelta
-import requests
+from datetime import date, datetime, time, timedelta
+import cliente_api as api
 import json
-import tempfile
-import os
+import threading
 
 
 # Configuración del logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Vistas del calendario (etiqueta -> vista de FullCalendar)
+VISTAS_CALENDARIO = {"Semana": "timeGridWeek", "Mes": "dayGridMonth"}
+
+# Series de citas: frecuencias (etiqueta -> FREQ), días de la semana (etiqueta -> BYDAY) y
+# días de ocurrencias que se revisan de una vez antes de confirmarlas
+FRECUENCIAS_SERIE = {"Semanal": "WEEKLY", "Mensual": "MONTHLY", "Diaria": "DAILY"}
+DIAS_SERIE = {"Lunes": "MO", "Martes": "TU", "Miércoles": "WE", "Jueves": "TH", "Viernes": "FR", "Sábado": "SA"}
+DIAS_REVISION_SERIE = 92
+
+
+def ventana_calendario(ancla, vista):
+    """
+    Ventana [desde, hasta) que muestra la vista del calendario alrededor del día `ancla`.
+
+    Las semanas empiezan en lunes; la vista de mes abarca las semanas completas que la cuadrícula
+    muestra del mes anterior y del siguiente.
+    """
+    if vista == "dayGridMonth":
+        primero = ancla.replace(day=1)
+        siguiente = (primero + timedelta(days=32)).replace(day=1)
+        desde = primero - timedelta(days=primero.weekday())
+        hasta = siguiente + timedelta(days=(7 - siguiente.weekday()) % 7)
+    else:
+        desde = ancla - timedelta(days=ancla.weekday())
+        hasta = desde + timedelta(days=7)
+    return datetime.combine(desde, time.min), datetime.combine(hasta, time.min)
+
+
+def desplazar_ancla(ancla, vista, pasos):
+    """Día de referencia `pasos` semanas o meses antes (negativo) o después."""
+    if vista == "dayGridMonth":
+        mes = ancla.month - 1 + pasos
+        return date(ancla.year + mes // 12, mes % 12 + 1, 1)
+    return ancla + timedelta(weeks=pasos)
+
+
+def cargar_eventos(desde, hasta):
+    """Eventos de la API para la ventana [desde, hasta); la caché de cliente_api evita repetir la descarga."""
+    return api.get("/citas/calendario", params={"desde": desde.isoformat(), "hasta": hasta.isoformat()})
+
+
+def regla_serie(frecuencia, intervalo, numero_citas, dias=()):
+    """Regla RRULE de una serie a partir de los campos del formulario."""
+    partes = [f"FREQ={FRECUENCIAS_SERIE[frecuencia]}", f"INTERVAL={intervalo}"]
+    if dias and FRECUENCIAS_SERIE[frecuencia] == "WEEKLY":
+        partes.append(f"BYDAY={','.join(DIAS_SERIE[dia] for dia in dias)}")
+    partes.append(f"COUNT={numero_citas}")
+    return ";".join(partes)
+
+
+def precargar_ventanas_adyacentes(ancla, vista):
+    """Descarga en segundo plano las ventanas anterior y siguiente para que navegar no espere a la API."""
+    def precargar():
+        for pasos in (-1, 1):
+            try:
+                cargar_eventos(*ventana_calendario(desplazar_ancla(ancla, vista, pasos), vista))
+            except Exception as e:
+                logger.warning(f"No se pudo precargar el calendario: {e}")
+
+    threading.Thread(target=precargar, daemon=True).start()
+
 def show():
     st.markdown("""
     <style>
@@ -144,6 +204,7 @@ def show():
     tabs = st.tabs([
         "🗓️ Calendario de Citas",
         "📝 Nueva Cita",
+        "🔁 Serie de Citas",
         "📋 Lista de Citas"
     ])
 
@@ -159,44 +220,40 @@ def show():
         show_nueva_cita()
 
     with tabs[2]:
+        show_serie_citas()
+
+    with tabs[3]:
         show_citas_list()
         
 
 def show_calendar():
     """Muestra el calendario interactivo con las citas programadas"""
 
+    # Ventana visible: vista y día de referencia, guardados entre ejecuciones de la página
+    ancla = st.session_state.setdefault("calendario_ancla", date.today())
+    col_anterior, col_hoy, col_siguiente, col_vista = st.columns([1, 1, 1, 3])
+    with col_vista:
+        etiqueta = st.radio("Vista", list(VISTAS_CALENDARIO), horizontal=True, label_visibility="collapsed",
+                            key="calendario_vista")
+    vista = VISTAS_CALENDARIO[etiqueta]
+    with col_anterior:
+        if st.button("◀ Anterior", key="calendario_anterior"):
+            ancla = desplazar_ancla(ancla, vista, -1)
+    with col_hoy:
+        if st.button("Hoy", key="calendario_hoy"):
+            ancla = date.today()
+    with col_siguiente:
+        if st.button("Siguiente ▶", key="calendario_siguiente"):
+            ancla = desplazar_ancla(ancla, vista, 1)
+    st.session_state["calendario_ancla"] = ancla
+    desde, hasta = ventana_calendario(ancla, vista)
+
     def cargar_citas():
         try:
-            response = requests.get("http://fastapi:8000/citas/")
+            # La API devuelve solo las citas de la ventana, ya como eventos del calendario
+            response = cargar_eventos(desde, hasta)
             if response.status_code == 200:
-                citas = response.json()
-                eventos = []
-                for cita in citas:
-                    colores = {
-                        "Pendiente": "#FFBD45",
-                        "Confirmada": "#3DD56D",
-                        "Finalizada": "#3D9DF3",
-                        "Cancelada": "#FF4B4B"
-                    }
-                    
-                    fecha_inicio = datetime.fromisoformat(cita['fecha'])
-                    fecha_fin = fecha_inicio + timedelta(hours=1)
-                    
-                    evento = {
-                        "title": f"{cita['descripcion']}",
-                        "color": colores.get(cita['estado'], "#FF6C6C"),
-                        "start": fecha_inicio.isoformat(),
-                        "end": fecha_fin.isoformat(),
-                        "resourceId": f"consulta_{cita['id_mascota'] % 3}",
-                        "extendedProps": {
-                            "id_cita": cita['id_cita'],
-                            "cliente": cita.get('cliente', ''),
-                            "mascota": cita.get('mascota', ''),
-                            "estado": cita['estado']
-                        }
-                    }
-                    eventos.append(evento)
-                return eventos
+                return response.json()
             else:
                 st.error(f"Error al cargar citas: {response.status_code}")
                 return []
@@ -211,12 +268,15 @@ def show_calendar():
         "selectable": True,
         "slotMinTime": "08:00:00",  # Hora inicial del calendario
         "slotMaxTime": "20:00:00",  # Hora final del calendario
-        "initialView": "timeGridWeek",  # Vista inicial (semana)
+        "initialView": vista,  # Vista elegida (semana o mes)
+        "initialDate": desde.date().isoformat(),  # Ventana cargada desde la API
+        "firstDay": 1,  # Las semanas empiezan en lunes, como la ventana pedida
         "resourceGroupField": "building",
         "headerToolbar": {
-            "left": "prev,next",
+            # La navegación se hace con los botones de la página para pedir cada ventana a la API
+            "left": "",
             "center": "title",
-            "right": "dayGridMonth,timeGridWeek"  # Opciones de vista
+            "right": ""
         },
         "slotDuration": "00:30:00",  # Duración de cada intervalo (30 minutos)
         "slotLabelInterval": "00:30:00",  # Intervalo entre etiquetas (opcional)
@@ -335,19 +395,16 @@ def show_calendar():
         }
     """
 
-    # Renderizar el calendario
+    # Renderizar el calendario; cada ventana es una instancia distinta del componente
     events = cargar_citas()
+    precargar_ventanas_adyacentes(ancla, vista)
     state = calendar(
-        events=st.session_state.get("events", events),
+        events=events,
         options=calendar_options,
         custom_css=custom_calendar_css,
-        key='calendar'
+        key=f"calendar_{vista}_{desde.date().isoformat()}"
     )
 
-    # Manejo de eventos
-    if state.get("eventsSet") is not None:
-        st.session_state["events"] = state["eventsSet"]
-
     if state.get('select') is not None:
         st.session_state["time_inicial"] = datetime.fromisoformat(state["select"]["start"])
         st.session_state["time_final"] = datetime.fromisoformat(state["select"]["end"])
@@ -379,7 +436,7 @@ def show_nueva_cita():
 
             # Cliente - Celda independiente
             try:
-                response = requests.get("http://fastapi:8000/clientes/")
+                response = api.get("/clientes/")
                 if response.status_code == 200:
                     clientes = response.json()
                     cliente_nombres = ["Seleccione un cliente"] + [
@@ -397,7 +454,7 @@ def show_nueva_cita():
 
             # Mascota - Celda independiente
             try:
-                mascota_response = requests.get("http://fastapi:8000/mascotas/")
+                mascota_response = api.get("/mascotas/")
                 if mascota_response.status_code == 200:
                     mascotas = mascota_response.json()
 
@@ -436,7 +493,7 @@ def show_nueva_cita():
 
             # Tratamiento
             try:
-                response = requests.get("http://fastapi:8000/tratamientos/")
+                response = api.get("/tratamientos/")
                 if response.status_code == 200:
                     tratamientos = response.json()
                     tratamiento_nombres = ["Seleccione un tratamiento"] + [
@@ -495,7 +552,7 @@ def show_nueva_cita():
                 }
 
                 # Enviar datos al backend
-                response = requests.post("http://fastapi:8000/citas/", json=cita_data)
+                response = api.post("/citas/", json=cita_data)
                 if response.status_code == 201:
                     st.success("¡Cita registrada exitosamente!")
                 else:
@@ -506,6 +563,108 @@ def show_nueva_cita():
 
 
 
+def show_serie_citas():
+    """
+    Crea una serie de citas recurrentes, muestra sus próximas ocurrencias con su disponibilidad y
+    confirma las elegidas. Las citas solo se crean al confirmar.
+    """
+    st.title("Serie de Citas 🔁")
+
+    # Los tres listados se piden una vez por ejecución de la página y pasan por la caché de cliente_api
+    respuestas = {recurso: api.get(f"/{recurso}/") for recurso in ("clientes", "mascotas", "tratamientos")}
+    if any(response.status_code != 200 for response in respuestas.values()):
+        st.error("Error al cargar clientes, mascotas o tratamientos.")
+        return
+    clientes = {c['id_cliente']: c for c in respuestas["clientes"].json()}
+    mascotas = respuestas["mascotas"].json()
+    tratamientos = respuestas["tratamientos"].json()
+
+    with st.form("form_serie_citas"):
+        col1, col2 = st.columns(2)
+        with col1:
+            mascota = st.selectbox(
+                "Mascota",
+                options=mascotas,
+                format_func=lambda m: f"{m['nombre_mascota']} ({m['raza']}) - Cliente: "
+                                      f"{clientes.get(m['id_cliente'], {}).get('nombre_cliente', 'Desconocido')}",
+                key="serie_mascota"
+            )
+            tratamiento = st.selectbox(
+                "Tratamiento",
+                options=tratamientos,
+                format_func=lambda t: t['nombre_tratamiento'],
+                key="serie_tratamiento"
+            )
+            descripcion = st.text_area("Descripción de cada cita", key="serie_descripcion")
+        with col2:
+            fecha = st.date_input("Primera cita", min_value=datetime.today(), format="DD/MM/YYYY", key="serie_fecha")
+            hora = st.time_input("Hora", time(10, 0), key="serie_hora")
+            frecuencia = st.selectbox("Frecuencia", options=list(FRECUENCIAS_SERIE), key="serie_frecuencia")
+            intervalo = st.number_input("Cada cuántos periodos", min_value=1, max_value=12, value=1, key="serie_intervalo")
+            dias = st.multiselect("Días (solo semanal)", options=list(DIAS_SERIE), key="serie_dias")
+            numero_citas = st.number_input("Número de citas", min_value=1, max_value=520, value=12, key="serie_numero")
+
+        if st.form_submit_button("🔁 Crear Serie"):
+            if not mascota or not tratamiento:
+                st.error("Por favor, seleccione una mascota y un tratamiento.")
+            else:
+                response = api.post("/citas/series", json={
+                    "regla": regla_serie(frecuencia, intervalo, numero_citas, dias),
+                    "inicio": datetime.combine(fecha, hora).isoformat(),
+                    "descripcion": descripcion,
+                    "id_mascota": mascota['id_mascota'],
+                    "id_cliente": mascota['id_cliente'],
+                    "id_tratamiento": tratamiento['id_tratamiento'],
+                })
+                if response.status_code == 201:
+                    st.session_state.serie_actual = response.json()
+                    st.success("Serie creada. Revise las ocurrencias y confirme las que quiera reservar.")
+                else:
+                    st.error(f"Error al crear la serie: {response.text}")
+
+    serie = st.session_state.get("serie_actual")
+    if not serie:
+        return
+
+    desde = max(datetime.fromisoformat(serie["inicio"]), datetime.combine(date.today(), time.min))
+    hasta = desde + timedelta(days=DIAS_REVISION_SERIE)
+    st.markdown(f"### Ocurrencias hasta el {hasta:%d/%m/%Y}")
+    response = api.get(f"/citas/series/{serie['id_serie']}/ocurrencias", ttl=0,
+                       params={"desde": desde.isoformat(), "hasta": hasta.isoformat()})
+    if response.status_code != 200:
+        st.error(f"Error al cargar las ocurrencias: {response.text}")
+        return
+    ocurrencias = response.json()
+    if not ocurrencias:
+        st.info("La serie no tiene ocurrencias en este periodo.")
+        return
+
+    st.dataframe(pd.DataFrame([{
+        "Fecha": datetime.fromisoformat(o["fecha"]).strftime("%d/%m/%Y %H:%M"),
+        "Estado": o["estado"].capitalize(),
+        "Cita": o["id_cita"] or "",
+        "Se solapa con": ", ".join(str(c) for c in o["conflictos"]),
+    } for o in ocurrencias]), hide_index=True, use_container_width=True)
+
+    libres = [o["fecha"] for o in ocurrencias if o["estado"] == "libre"]
+    elegidas = st.multiselect(
+        "Ocurrencias a confirmar",
+        options=libres,
+        default=libres,
+        format_func=lambda f: datetime.fromisoformat(f).strftime("%d/%m/%Y %H:%M"),
+        key=f"serie_elegidas_{serie['id_serie']}"
+    )
+    if st.button("✅ Confirmar ocurrencias", disabled=not elegidas, key="serie_confirmar"):
+        response = api.post(f"/citas/series/{serie['id_serie']}/confirmar", json={"fechas": elegidas})
+        if response.status_code == 200:
+            resultado = response.json()
+            st.success(f"{resultado['correctas']} citas creadas.")
+            for fallo in (r for r in resultado["resultados"] if not r["ok"]):
+                st.warning(f"{datetime.fromisoformat(elegidas[fallo['indice']]):%d/%m/%Y %H:%M}: {fallo['error']}")
+        else:
+            st.error(f"Error al confirmar las ocurrencias: {response.text}")
+
+
 def show_finalize_form(cita):
     """Muestra el formulario para finalizar una cita y generar factura"""
     with st.container():
@@ -539,34 +698,26 @@ def show_finalize_form(cita):
             if st.button("✅ Confirmar y Generar Factura", key=f"confirm_{cita['id_cita']}"):
                 try:
                     # Finalizar la cita
-                    response = requests.put(
-                        f"http://fastapi:8000/citas/finalizar/{cita['id_cita']}",
+                    response = api.put(
+                        f"/citas/finalizar/{cita['id_cita']}",
                         params={"metodo_pago": metodo_pago}
                     )
                     
                     if response.status_code == 200:
                         # Generar y descargar factura
-                        factura_response = requests.get(
-                            f"http://fastapi:8000/tratamientos/factura/generar/{cita['id_tratamiento']}"
+                        factura_response = api.get(
+                            f"/tratamientos/factura/generar/{cita['id_tratamiento']}", ttl=0
                         )
                         if factura_response.status_code == 200:
                             st.success("✅ Cita finalizada exitosamente")
 
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                                tmp_file.write(factura_response.content)
-                                tmp_file.flush()
-
-                            # Descargar el archivo temporal
-                            with open(tmp_file.name, "rb") as file:
-                                st.download_button(
-                                    label="📥 Descargar Factura",
-                                    data=file,
-                                    file_name=f"factura_cita_{cita['id_cita']}.pdf",
-                                    mime="application/pdf"
-                                )
-
-                            # Eliminar el archivo temporal
-                            os.unlink(tmp_file.name)
+                            # La API devuelve el PDF generado en memoria
+                            st.download_button(
+                                label="📥 Descargar Factura",
+                                data=factura_response.content,
+                                file_name=f"factura_cita_{cita['id_cita']}.pdf",
+                                mime="application/pdf"
+                            )
                         else:
                             st.error("❌ Error al generar la factura")
 
@@ -622,97 +773,87 @@ def show_citas_list():
             key="estado_filtro"
         )
 
+    if fecha_filtro:
+        try:
+            datetime.strptime(fecha_filtro.strip(), "%Y-%m-%d")
+        except ValueError:
+            st.warning("La fecha debe tener el formato YYYY-MM-DD")
+            return
+
+    # Los filtros se aplican en la API, que devuelve cada cita con su cliente, mascota y
+    # tratamiento en una sola petición
+    params = {"limit": 1000}
+    if nombre_filtro:
+        params["nombre_cliente"] = nombre_filtro.strip()
+    if dni_filtro:
+        params["dni"] = dni_filtro.strip()
+    if fecha_filtro:
+        params["fecha"] = fecha_filtro.strip()
+    if estado_filtro != "Todos":
+        params["estado"] = estado_filtro
+
     try:
-        # Obtener todas las citas
-        response = requests.get("http://fastapi:8000/citas/")
+        response = api.get("/citas/detalladas", params=params, timeout=10)
         if response.status_code == 200:
-            citas = response.json()
-            if citas:
-                citas_filtradas = []
-                for cita in citas:
-                    # Obtener datos relacionados usando los endpoints específicos
-                    cliente_response = requests.get(f"http://fastapi:8000/clientes/{cita['id_cliente']}")
-                    mascota_response = requests.get(f"http://fastapi:8000/mascotas/{cita['id_mascota']}")
-                    tratamiento_response = requests.get(f"http://fastapi:8000/tratamientos/{cita['id_tratamiento']}")
-
-                    if cliente_response.status_code == 200 and mascota_response.status_code == 200 and tratamiento_response.status_code == 200:
-                        cliente = cliente_response.json()
-                        mascota = mascota_response.json()
-                        tratamiento = tratamiento_response.json()
-                    else:
-                        st.error("Error al cargar los datos relacionados para una cita.")
-                        continue
-
-                    # Aplicar filtros
-                    if nombre_filtro and nombre_filtro.lower() not in cliente['nombre_cliente'].lower():
-                        continue
-                    if dni_filtro and dni_filtro.lower() not in cliente['dni'].lower():
-                        continue
-                    if fecha_filtro and fecha_filtro not in cita['fecha']:
-                        continue
-                    if estado_filtro != "Todos" and estado_filtro != cita['estado']:
-                        continue
-                    
-                    citas_filtradas.append({**cita, 'cliente': cliente, 'mascota': mascota, 'tratamiento': tratamiento})
-
-                if not citas_filtradas:
-                    st.info("No se encontraron citas con los filtros especificados")
-                    return
+            citas_filtradas = response.json()
+            if not citas_filtradas:
+                st.info("No se encontraron citas con los filtros especificados")
+                return
 
-                for cita in citas_filtradas:
-                    with st.container():
+            for cita in citas_filtradas:
+                with st.container():
+                    st.markdown("""
+                        <div style="border:1px solid #ddd; border-radius:10px; padding:15px; 
+                        margin-bottom:20px; background-color:#f8f9fa;">
+                    """, unsafe_allow_html=True)
+                    
+                    cols = st.columns([3, 2, 2])
+                    
+                    with cols[0]:
+                        st.markdown(f"### 📅 {cita['fecha']}")
+                        st.write(f"👤 **Cliente:** {(cita['cliente'] or {}).get('nombre_cliente', '-')}")
+                        st.write(f"🐾 **Mascota:** {(cita['mascota'] or {}).get('nombre_mascota', '-')}")
+
+                    with cols[1]:
+                        st.write(f"🏥 **Tratamiento:** {(cita['tratamiento'] or {}).get('nombre_tratamiento', '-')}")
+                        st.write(f"📝 **Descripción:** {cita['descripcion']}")
+                        if cita['metodo_pago']:
+                            st.write(f"💰 **Método de Pago:** {cita['metodo_pago']}")
+
+                    with cols[2]:
+                        # Botones de acción
                         st.markdown("""
-                            <div style="border:1px solid #ddd; border-radius:10px; padding:15px; 
-                            margin-bottom:20px; background-color:#f8f9fa;">
-                        """, unsafe_allow_html=True)
-                        
-                        cols = st.columns([3, 2, 2])
-                        
-                        with cols[0]:
-                            st.markdown(f"### 📅 {cita['fecha']}")
-                            st.write(f"👤 **Cliente:** {cita['cliente']['nombre_cliente']}")
-                            st.write(f"🐾 **Mascota:** {cita['mascota']['nombre_mascota']}")
-
-                        with cols[1]:
-                            st.write(f"🏥 **Tratamiento:** {cita['tratamiento']['nombre_tratamiento']}")
-                            st.write(f"📝 **Descripción:** {cita['descripcion']}")
-                            if cita['metodo_pago']:
-                                st.write(f"💰 **Método de Pago:** {cita['metodo_pago']}")
-
-                        with cols[2]:
-                            # Botones de acción
-                            st.markdown("""
-                                <style>
-                                .action-button {
-                                    width: 100%;
-                                    margin: 5px 0;
-                                    padding: 10px;
-                                    border-radius: 5px;
-                                    text-align: center;
-                                }
-                                </style>
-                            """, unsafe_allow_html=True)
-
-                            # Estado de la cita
-                            estado_color = {
-                                "Pendiente": "🟡",
-                                "Confirmada": "🟢",
-                                "Finalizada": "🔵",
-                                "Cancelada": "🔴"
+                            <style>
+                            .action-button {
+                                width: 100%;
+                                margin: 5px 0;
+                                padding: 10px;
+                                border-radius: 5px;
+                                text-align: center;
                             }
-                            st.write(f"Estado: {estado_color.get(cita['estado'], '⚪')} {cita['estado']}")
+                            </style>
+                        """, unsafe_allow_html=True)
+
+                        # Estado de la cita
+                        estado_color = {
+                            "Pendiente": "🟡",
+                            "Confirmada": "🟢",
+                            "Finalizada": "🔵",
+                            "Cancelada": "🔴"
+                        }
+                        st.write(f"Estado: {estado_color.get(cita['estado'], '⚪')} {cita['estado']}")
 
-                            # Botones
-                            if st.button("✏️ Editar", key=f"edit_{cita['id_cita']}", use_container_width=True):
-                                show_edit_form(cita)
+                        # Botones
+                        if st.button("✏️ Editar", key=f"edit_{cita['id_cita']}", use_container_width=True):
+                            show_edit_form(cita)
 
-                            if cita['estado'] not in ['Finalizada', 'Cancelada']:
-                                if st.button("❌ Cancelar", key=f"delete_{cita['id_cita']}", use_container_width=True):
-                                    cancel_cita(cita['id_cita'])
-                                
-                                if st.button("✅ Finalizar", key=f"finish_{cita['id_cita']}", use_container_width=True):
-                                    show_finalize_form(cita)
-                        st.markdown("</div>", unsafe_allow_html=True)
+                        if cita['estado'] not in ['Finalizada', 'Cancelada']:
+                            if st.button("❌ Cancelar", key=f"delete_{cita['id_cita']}", use_container_width=True):
+                                cancel_cita(cita['id_cita'])
+                            
+                            if st.button("✅ Finalizar", key=f"finish_{cita['id_cita']}", use_container_width=True):
+                                show_finalize_form(cita)
+                    st.markdown("</div>", unsafe_allow_html=True)
 
         else:
             st.error("Error al cargar la lista de citas")
@@ -726,7 +867,7 @@ def obtener_datos_cliente(id_cliente):
     Obtiene los datos de un cliente específico de la lista de clientes
     """
     try:
-        response = requests.get("http://fastapi:8000/clientes/")
+        response = api.get("/clientes/")
         if response.status_code == 200:
             clientes = response.json()
             cliente = next((c for c in clientes if c['id_cliente'] == id_cliente), None)
@@ -756,7 +897,7 @@ def show_edit_form(cita):
                 "descripcion": descripcion,
                 "estado": estado
             }
-            response = requests.put(f"http://fastapi:8000/citas/{cita['id_cita']}", json=updated_cita)
+            response = api.put(f"/citas/{cita['id_cita']}", json=updated_cita)
             if response.status_code == 200:
                 st.success("Cita actualizada exitosamente")
                 st.rerun()
@@ -769,7 +910,7 @@ def cancel_cita(id_cita):
     """
     Cancela una cita existente
     """
-    response = requests.delete(f"http://fastapi:8000/citas/{id_cita}")
+    response = api.delete(f"/citas/{id_cita}")
     if response.status_code == 200:
         st.success("Cita cancelada exitosamente")
         st.rerun()
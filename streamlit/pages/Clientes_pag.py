@@ -2,7 +2,7 @@ import streamlit as st
 from streamlit_extras.add_vertical_space import add_vertical_space
 import pandas as pd
 from datetime import datetime
-import requests
+import cliente_api as api
 import logging
 import json
 
@@ -13,6 +13,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Máximo de clientes que devuelve la búsqueda por nombre o DNI (el tope de /buscar/)
+LIMITE_BUSQUEDA = 100
 
 
 def show():
@@ -257,7 +259,7 @@ def show_nuevo_cliente():
                 "telefono": telefono
             }
 
-            response = requests.post("http://fastapi:8000/clientes/", json=cliente_data)
+            response = api.post("/clientes/", json=cliente_data)
             if response.status_code == 201:
                 st.success("¡Cliente registrado exitosamente! 🥳")
             else:
@@ -317,30 +319,21 @@ def show_lista_clientes():
         )
 
     try:
-        # Obtener todos los clientes
-        response = requests.get("http://fastapi:8000/clientes/")
+        # Obtener todos los clientes; si se filtra por mascota, con sus mascotas embebidas
+        params = {"include": "mascotas"} if mascota_filtro or raza_filtro else None
+        response = api.get("/clientes/", params=params)
         if response.status_code == 200:
             clientes = response.json()
             if clientes:
                 # Lista para almacenar los IDs de clientes que coinciden con los filtros de mascota
                 clientes_filtrados_ids = set()
                 
-                # Si hay filtros de mascota, buscar primero las mascotas que coinciden
                 if mascota_filtro or raza_filtro:
                     for cliente in clientes:
-                        try:
-                            mascotas_response = requests.get(
-                                f"http://fastapi:8000/mascotas/cliente/{cliente['id_cliente']}"
-                            )
-                            if mascotas_response.status_code == 200:
-                                mascotas = mascotas_response.json()
-                                for mascota in mascotas:
-                                    if (mascota_filtro.lower() in mascota['nombre_mascota'].lower() or not mascota_filtro) and \
-                                       (raza_filtro.lower() in mascota['raza'].lower() or not raza_filtro):
-                                        clientes_filtrados_ids.add(cliente['id_cliente'])
-                        except Exception as e:
-                            logger.error(f"Error al obtener mascotas del cliente {cliente['id_cliente']}: {str(e)}")
-                            st.error(f"Error al obtener mascotas del cliente {cliente['id_cliente']}")
+                        for mascota in cliente.get('mascotas', []):
+                            if (mascota_filtro.lower() in mascota['nombre_mascota'].lower() or not mascota_filtro) and \
+                               (raza_filtro.lower() in mascota['raza'].lower() or not raza_filtro):
+                                clientes_filtrados_ids.add(cliente['id_cliente'])
                 clientes_filtrados = []
                 for cliente in clientes:
                     if nombre_filtro and nombre_filtro.lower() not in cliente['nombre_cliente'].lower():
@@ -411,20 +404,6 @@ def show_lista_clientes():
                                 if st.button("➕ Añadir Mascota", key=f"add_mascota_{cliente['id_cliente']}"):
                                     show_add_mascota_form(cliente['id_cliente'])
 
-                                try:
-                                    mascotas_response = requests.get(
-                                        f"http://fastapi:8000/mascotas/cliente/{cliente['id_cliente']}"
-                                    )
-                                    if mascotas_response.status_code == 200:
-                                        mascotas = mascotas_response.json()
-                                        for mascota in mascotas:
-                                            if (mascota_filtro.lower() in mascota['nombre_mascota'].lower() or not mascota_filtro) and \
-                                               (raza_filtro.lower() in mascota['raza'].lower() or not raza_filtro):
-                                                clientes_filtrados_ids.add(cliente['id_cliente'])
-                                except Exception as e:
-                                    logger.error(f"Error al obtener mascotas del cliente {cliente['id_cliente']}: {str(e)}")
-                                    st.error(f"Error al obtener mascotas del cliente {cliente['id_cliente']}")
-
                         # Confirmación de eliminación de cliente
                         if (st.session_state.confirmar_eliminacion and 
                             st.session_state.cliente_a_eliminar and 
@@ -435,8 +414,8 @@ def show_lista_clientes():
                             with col1:
                                 if st.button("Sí", key=f"confirm_yes_{cliente['id_cliente']}"):
                                     try:
-                                        response = requests.delete(
-                                            f"http://fastapi:8000/clientes/{cliente['id_cliente']}"
+                                        response = api.delete(
+                                            f"/clientes/{cliente['id_cliente']}"
                                         )
                                         if response.status_code == 200:
                                             st.success("Cliente eliminado exitosamente")
@@ -462,7 +441,7 @@ def mostrar_mascotas(cliente_id):
     Muestra las mascotas de un cliente.
     """
     try:
-        mascotas_response = requests.get(f"http://fastapi:8000/mascotas/cliente/{cliente_id}")
+        mascotas_response = api.get(f"/mascotas/cliente/{cliente_id}")
         if mascotas_response.status_code == 200:
             mascotas = mascotas_response.json()
             if mascotas:
@@ -533,8 +512,8 @@ def show_add_mascota_form(id_cliente):
             }
 
             try:
-                response = requests.post(
-                    "http://fastapi:8000/mascotas/",
+                response = api.post(
+                    "/mascotas/",
                     json=mascota_data
                 )
                 if response.status_code == 201:
@@ -568,8 +547,8 @@ def show_edit_mascota_form(mascota):
             }
             
             try:
-                response = requests.put(
-                    f"http://fastapi:8000/mascotas/{mascota['id_mascota']}",
+                response = api.put(
+                    f"/mascotas/{mascota['id_mascota']}",
                     json=mascota_actualizada
                 )
                 if response.status_code == 200:
@@ -585,7 +564,7 @@ def delete_mascota(id_mascota):
     Elimina una mascota
     """
     try:
-        response = requests.delete(f"http://fastapi:8000/mascotas/{id_mascota}")
+        response = api.delete(f"/mascotas/{id_mascota}")
         if response.status_code == 200:
             st.success("Mascota eliminada exitosamente")
             st.rerun()
@@ -627,8 +606,8 @@ def show_edit_form(cliente):
                 "telefono": telefono
             }
             
-            response = requests.put(
-                f"http://fastapi:8000/clientes/{cliente['id_cliente']}", 
+            response = api.put(
+                f"/clientes/{cliente['id_cliente']}", 
                 json=cliente_actualizado
             )
             
@@ -643,7 +622,7 @@ def delete_cliente(id_cliente):
     Elimina un cliente
     """
     try:
-        response = requests.delete(f"http://fastapi:8000/clientes/{id_cliente}")
+        response = api.delete(f"/clientes/{id_cliente}")
         if response.status_code == 200:
             st.success("Cliente eliminado exitosamente")
             st.rerun()
@@ -668,9 +647,9 @@ def show_buscar_cliente():
     if st.button("Buscar"):
         try:
             if dni_buscar:
-                response = requests.get(f"http://fastapi:8000/clientes/buscar", params={"dni": dni_buscar})
+                response = api.get(f"/clientes/buscar", params={"dni": dni_buscar})
             elif nombre_buscar:
-                response = requests.get(f"http://fastapi:8000/clientes/buscar", params={"nombre": nombre_buscar})
+                response = api.get(f"/clientes/buscar", params={"nombre": nombre_buscar})
             else:
                 st.warning("Por favor, ingrese un DNI o nombre para buscar")
                 return
@@ -701,21 +680,27 @@ def cargar_y_filtrar_clientes(nombre_filtro="", dni_filtro="", mascota_filtro=""
     Carga y filtra la lista de clientes según los criterios especificados
     """
     try:
-        # Obtener todos los clientes
-        response = requests.get("http://fastapi:8000/clientes/")
+        if nombre_filtro or dni_filtro:
+            # El índice de texto completo de la API devuelve solo los candidatos, sin descargar la tabla
+            response = api.get("/buscar/", params={"q": f"{nombre_filtro} {dni_filtro}", "tipo": "clientes",
+                                                   "limit": LIMITE_BUSQUEDA})
+        else:
+            response = api.get("/clientes/")
         if response.status_code != 200:
             st.error("Error al cargar la lista de clientes")
             return []
 
         clientes = response.json()
+        if nombre_filtro or dni_filtro:
+            clientes = [resultado["cliente"] for resultado in clientes]
         if not clientes:
             return []
 
         # Si hay filtros de mascota, obtener las mascotas que coinciden
         clientes_filtrados_ids = set()
         if mascota_filtro or raza_filtro:
-            mascotas_response = requests.get(
-                "http://fastapi:8000/mascotas/buscar",
+            mascotas_response = api.get(
+                "/mascotas/buscar",
                 params={
                     "nombre": mascota_filtro if mascota_filtro else None,
                     "raza": raza_filtro if raza_filtro else None
@@ -2,12 +2,24 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-import requests
+import cliente_api as api
 from datetime import datetime, timedelta
 
+def obtener_estadisticas():
+    """Descarga en una sola petición los agregados que calcula la API para todo el dashboard."""
+    response = api.get("/stats/", params={"top_n": 10}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
 def show():
     st.title("Dashboard Analítico 📊")
     
+    try:
+        stats = obtener_estadisticas()
+    except Exception as e:
+        st.error(f"Error al cargar datos: {str(e)}")
+        return
+
     # Navegación
     tabs = st.tabs([
         "📈 Resumen General",
@@ -18,178 +30,180 @@ def show():
     ])
 
     with tabs[0]:
-        show_resumen_general()
+        show_resumen_general(stats)
     with tabs[1]:
-        show_analisis_clientes()
+        show_analisis_clientes(stats)
     with tabs[2]:
-        show_analisis_mascotas()
+        show_analisis_mascotas(stats)
     with tabs[3]:
-        show_analisis_tratamientos()
+        show_analisis_tratamientos(stats)
     with tabs[4]:
-        show_analisis_citas()
+        show_analisis_citas(stats)
 
-def show_resumen_general():
+def show_resumen_general(stats):
     st.header("Resumen General")
     
     try:
         col1, col2, col3, col4 = st.columns(4)
         
         # KPIs
-        clientes = requests.get("http://fastapi:8000/clientes/").json()
-        mascotas = requests.get("http://fastapi:8000/mascotas/").json()
-        tratamientos = requests.get("http://fastapi:8000/tratamientos/").json()
-        citas = requests.get("http://fastapi:8000/citas/").json()
+        kpis = stats["kpis"]
         
         with col1:
-            st.metric("Total Clientes", len(clientes))
+            st.metric("Total Clientes", kpis["total_clientes"])
         with col2:
-            st.metric("Total Mascotas", len(mascotas))
+            st.metric("Total Mascotas", kpis["total_mascotas"])
         with col3:
-            st.metric("Tratamientos Activos", len([t for t in tratamientos if t['estado'] == 'Activo']))
+            st.metric("Tratamientos Activos", kpis["tratamientos_activos"])
         with col4:
-            citas_pendientes = len([c for c in citas if c['estado'] == 'Pendiente'])
-            st.metric("Citas Pendientes", citas_pendientes)
+            st.metric("Citas Pendientes", kpis["citas_pendientes"])
         
         # Gráficos de resumen
         col1, col2 = st.columns(2)
         
         with col1:
             # Distribución de mascotas por estado
-            df_mascotas = pd.DataFrame(mascotas)
-            fig = px.pie(df_mascotas, names='estado', title='Estado de Mascotas')
-            st.plotly_chart(fig, use_container_width=True)
+            df_estados = pd.DataFrame(stats["mascotas"]["por_estado"])
+            if not df_estados.empty:
+                fig = px.pie(df_estados, names='estado', values='total', title='Estado de Mascotas')
+                st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Evolución de citas en el tiempo
-            df_citas = pd.DataFrame(citas)
-            df_citas['fecha'] = pd.to_datetime(df_citas['fecha'])
-            fig = px.line(df_citas.groupby('fecha').size().reset_index(), 
-                         x='fecha', y=0, title='Evolución de Citas')
-            st.plotly_chart(fig, use_container_width=True)
+            df_citas = pd.DataFrame(stats["citas"]["por_dia"])
+            if not df_citas.empty:
+                fig = px.line(df_citas, x='dia', y='total', title='Evolución de Citas')
+                st.plotly_chart(fig, use_container_width=True)
             
     except Exception as e:
         st.error(f"Error al cargar datos: {str(e)}")
 
-def show_analisis_clientes():
+def show_analisis_clientes(stats):
     st.header("Análisis de Clientes")
     
     try:
-        clientes = requests.get("http://fastapi:8000/clientes/").json()
-        mascotas = requests.get("http://fastapi:8000/mascotas/").json()
-        
         # Distribución de edad de clientes
-        df_clientes = pd.DataFrame(clientes)
-        fig = px.histogram(df_clientes, x='edad', title='Distribución de Edad de Clientes',
-                          nbins=20)
-        st.plotly_chart(fig, use_container_width=True)
+        df_edades = pd.DataFrame(stats["clientes"]["edades"])
+        if not df_edades.empty:
+            fig = px.bar(df_edades, x='desde', y='total', title='Distribución de Edad de Clientes',
+                         labels={'desde': 'edad', 'total': 'clientes'})
+            st.plotly_chart(fig, use_container_width=True)
         
         # Clientes con más mascotas
-        df_mascotas = pd.DataFrame(mascotas)
-        mascotas_por_cliente = df_mascotas.groupby('id_cliente').size().reset_index()
-        mascotas_por_cliente.columns = ['id_cliente', 'cantidad_mascotas']
-        
-        # Unir con datos de clientes
-        df_clientes_mascotas = pd.merge(mascotas_por_cliente, df_clientes, on='id_cliente')
-        fig = px.bar(df_clientes_mascotas.nlargest(10, 'cantidad_mascotas'),
-                     x='nombre_cliente', y='cantidad_mascotas',
-                     title='Top 10 Clientes por Número de Mascotas')
-        fig.update_xaxes(tickangle=45)
-        st.plotly_chart(fig, use_container_width=True)
+        df_top = pd.DataFrame(stats["clientes"]["top_por_mascotas"])
+        if not df_top.empty:
+            fig = px.bar(df_top, x='nombre_cliente', y='mascotas',
+                         title='Top 10 Clientes por Número de Mascotas')
+            fig.update_xaxes(tickangle=45)
+            st.plotly_chart(fig, use_container_width=True)
         
     except Exception as e:
         st.error(f"Error al cargar datos: {str(e)}")
 
-def show_analisis_mascotas():
+def show_analisis_mascotas(stats):
     st.header("Análisis de Mascotas")
     
     try:
-        mascotas = requests.get("http://fastapi:8000/mascotas/").json()
-        df_mascotas = pd.DataFrame(mascotas)
+        mascotas = stats["mascotas"]
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Distribución de razas
-            fig = px.pie(df_mascotas, names='raza', title='Distribución de Razas')
-            st.plotly_chart(fig, use_container_width=True)
+            df_razas = pd.DataFrame(mascotas["por_raza"])
+            if not df_razas.empty:
+                fig = px.pie(df_razas, names='raza', values='total', title='Distribución de Razas')
+                st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Distribución de edades
-            fig = px.histogram(df_mascotas, x='edad', title='Distribución de Edad de Mascotas')
-            st.plotly_chart(fig, use_container_width=True)
+            df_edades = pd.DataFrame(mascotas["edades"])
+            if not df_edades.empty:
+                fig = px.bar(df_edades, x='desde', y='total', title='Distribución de Edad de Mascotas',
+                             labels={'desde': 'edad', 'total': 'mascotas'})
+                st.plotly_chart(fig, use_container_width=True)
         
         # Condiciones médicas más comunes
-        if 'afeccion' in df_mascotas.columns:
-            afecciones = df_mascotas['afeccion'].value_counts()
-            fig = px.bar(afecciones, title='Condiciones Médicas Más Comunes')
+        df_afecciones = pd.DataFrame(mascotas["afecciones"])
+        if not df_afecciones.empty:
+            fig = px.bar(df_afecciones, x='afeccion', y='total', title='Condiciones Médicas Más Comunes')
             st.plotly_chart(fig, use_container_width=True)
             
     except Exception as e:
         st.error(f"Error al cargar datos: {str(e)}")
 
-def show_analisis_tratamientos():
+def show_analisis_tratamientos(stats):
     st.header("Análisis de Tratamientos")
     
     try:
-        tratamientos = requests.get("http://fastapi:8000/tratamientos/").json()
-        df_tratamientos = pd.DataFrame(tratamientos)
+        tratamientos = stats["tratamientos"]
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Distribución de estados de tratamientos
-            fig = px.pie(df_tratamientos, names='estado', 
-                        title='Estado de Tratamientos')
-            st.plotly_chart(fig, use_container_width=True)
+            df_estados = pd.DataFrame(tratamientos["por_estado"])
+            if not df_estados.empty:
+                fig = px.pie(df_estados, names='estado', values='total',
+                            title='Estado de Tratamientos')
+                st.plotly_chart(fig, use_container_width=True)
         
         with col2:
-            # Distribución de precios
-            fig = px.box(df_tratamientos, y='precio', 
-                        title='Distribución de Precios de Tratamientos')
-            st.plotly_chart(fig, use_container_width=True)
+            # Distribución de precios a partir de los cuartiles calculados en la API
+            cuantiles = tratamientos["cuantiles_precio"]["cuantiles"]
+            if cuantiles:
+                fig = go.Figure(go.Box(
+                    name='precio',
+                    q1=[cuantiles["0.25"]], median=[cuantiles["0.5"]], q3=[cuantiles["0.75"]],
+                    lowerfence=[cuantiles["0.0"]], upperfence=[cuantiles["1.0"]],
+                    mean=[tratamientos["cuantiles_precio"]["media"]]
+                ))
+                fig.update_layout(title='Distribución de Precios de Tratamientos')
+                st.plotly_chart(fig, use_container_width=True)
         
         # Tratamientos más comunes
-        tratamientos_comunes = df_tratamientos['nombre_tratamiento'].value_counts()
-        fig = px.bar(tratamientos_comunes.head(10), 
-                    title='Tratamientos Más Comunes')
-        st.plotly_chart(fig, use_container_width=True)
+        df_comunes = pd.DataFrame(tratamientos["mas_utilizados"])
+        if not df_comunes.empty:
+            fig = px.bar(df_comunes, x='nombre_tratamiento', y='citas',
+                        title='Tratamientos Más Comunes')
+            st.plotly_chart(fig, use_container_width=True)
         
     except Exception as e:
         st.error(f"Error al cargar datos: {str(e)}")
 
-def show_analisis_citas():
+def show_analisis_citas(stats):
     st.header("Análisis de Citas")
     
     try:
-        citas = requests.get("http://fastapi:8000/citas/").json()
-        df_citas = pd.DataFrame(citas)
-        df_citas['fecha'] = pd.to_datetime(df_citas['fecha'])
+        citas = stats["citas"]
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Estado de citas
-            fig = px.pie(df_citas, names='estado', 
-                        title='Estado de Citas')
-            st.plotly_chart(fig, use_container_width=True)
+            df_estados = pd.DataFrame(citas["por_estado"])
+            if not df_estados.empty:
+                fig = px.pie(df_estados, names='estado', values='total',
+                            title='Estado de Citas')
+                st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Citas por día de la semana
-            df_citas['dia_semana'] = df_citas['fecha'].dt.day_name()
-            citas_por_dia = df_citas['dia_semana'].value_counts()
-            fig = px.bar(citas_por_dia, title='Citas por Día de la Semana')
+            df_semana = pd.DataFrame(citas["por_dia_semana"])
+            fig = px.bar(df_semana, x='dia_semana', y='total', title='Citas por Día de la Semana')
             st.plotly_chart(fig, use_container_width=True)
             
         # Tendencia de citas en el tiempo
-        citas_por_fecha = df_citas.groupby('fecha').size().reset_index()
-        fig = px.line(citas_por_fecha, x='fecha', y=0, 
-                     title='Evolución de Citas en el Tiempo')
-        st.plotly_chart(fig, use_container_width=True)
+        df_dias = pd.DataFrame(citas["por_dia"])
+        if not df_dias.empty:
+            fig = px.line(df_dias, x='dia', y='total', 
+                         title='Evolución de Citas en el Tiempo')
+            st.plotly_chart(fig, use_container_width=True)
         
         # Métodos de pago más utilizados
-        if 'metodo_pago' in df_citas.columns:
-            pagos = df_citas['metodo_pago'].value_counts()
-            fig = px.pie(values=pagos.values, names=pagos.index, 
+        df_pagos = pd.DataFrame([p for p in citas["por_metodo_pago"] if p["metodo_pago"]])
+        if not df_pagos.empty:
+            fig = px.pie(df_pagos, values='total', names='metodo_pago', 
                         title='Métodos de Pago Utilizados')
             st.plotly_chart(fig, use_container_width=True)
             
@@ -1,5 +1,5 @@
 import streamlit as st
-import requests
+import cliente_api as api
 import plotly.express as px
 import pandas as pd
 from datetime import datetime
@@ -165,16 +165,24 @@ def show_mascotas_list():
         )
 
     try:
-        response = requests.get("http://fastapi:8000/mascotas/")
+        response = api.get("/mascotas/")
         if response.status_code == 200:
             mascotas = response.json()
             if mascotas:
+                # Los dueños de todas las mascotas se piden en una sola llamada
+                ids_clientes = sorted({m['id_cliente'] for m in mascotas if m.get('id_cliente') is not None})
+                clientes_por_id = {}
+                if ids_clientes:
+                    clientes_response = api.get(
+                        "/clientes/", params={"ids": ",".join(map(str, ids_clientes))}
+                    )
+                    if clientes_response.status_code == 200:
+                        clientes_por_id = {c['id_cliente']: c for c in clientes_response.json()}
+
                 mascotas_filtradas = []
                 for mascota in mascotas:
-                    cliente_response = requests.get(f"http://fastapi:8000/clientes/{mascota['id_cliente']}")
-                    if cliente_response.status_code == 200:
-                        cliente = cliente_response.json()
-                        
+                    cliente = clientes_por_id.get(mascota['id_cliente'])
+                    if cliente:
                         if nombre_filtro and nombre_filtro.lower() not in mascota['nombre_mascota'].lower():
                             continue
                         if raza_filtro and raza_filtro.lower() not in mascota['raza'].lower():
@@ -227,7 +235,7 @@ def show_mascotas_list():
                             st.markdown("</div>", unsafe_allow_html=True)
                     
                     if st.button("📥 Exportar Mascotas"):
-                        response = requests.post("http://fastapi:8000/mascotas/exportar")
+                        response = api.post("/mascotas/exportar")
                         if response.status_code == 200:
                             st.success("Mascotas exportadas exitosamente")
                         else:
@@ -256,7 +264,7 @@ def show_nueva_mascota():
             estado = st.selectbox("Estado", ["Vivo", "Fallecido"])
             
             try:
-                response = requests.get("http://fastapi:8000/clientes/")
+                response = api.get("/clientes/")
                 if response.status_code == 200:
                     clientes = response.json()
                     cliente_opciones = ["Seleccione un cliente"] + [
@@ -288,7 +296,7 @@ def show_nueva_mascota():
                     "id_cliente": id_cliente
                 }
 
-                response = requests.post("http://fastapi:8000/mascotas/", json=mascota_data)
+                response = api.post("/mascotas/", json=mascota_data)
                 if response.status_code == 201:
                     st.success("¡Mascota registrada exitosamente!")
                 else:
@@ -316,8 +324,8 @@ def show_edit_form(mascota):
             }
             
             try:
-                response = requests.put(
-                    f"http://fastapi:8000/mascotas/{mascota['id_mascota']}",
+                response = api.put(
+                    f"/mascotas/{mascota['id_mascota']}",
                     json=mascota_actualizada
                 )
                 if response.status_code == 200:
@@ -330,7 +338,7 @@ def show_edit_form(mascota):
 
 def delete_mascota(id_mascota):
     try:
-        response = requests.delete(f"http://fastapi:8000/mascotas/{id_mascota}")
+        response = api.delete(f"/mascotas/{id_mascota}")
         if response.status_code == 200:
             st.success("Mascota eliminada exitosamente")
             st.rerun()
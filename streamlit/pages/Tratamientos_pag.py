@@ -1,5 +1,5 @@
 import streamlit as st
-import requests
+import cliente_api as api
 import logging
 from datetime import datetime
 from streamlit_extras.add_vertical_space import add_vertical_space
@@ -219,7 +219,7 @@ def show_new_treatment():
 
         # Cliente
         try:
-            response = requests.get("http://fastapi:8000/clientes/")
+            response = api.get("/clientes/")
             if response.status_code == 200:
                 clientes = response.json()
                 cliente_opciones = ["Seleccione un cliente"] + [
@@ -265,8 +265,8 @@ def show_new_treatment():
                     "id_cliente": id_cliente,
                 }
 
-                response = requests.post(
-                    "http://fastapi:8000/tratamientos/", json=tratamiento_data
+                response = api.post(
+                    "/tratamientos/", json=tratamiento_data
                 )
 
                 if response.status_code == 201:
@@ -308,7 +308,7 @@ def show_tratamientos_list():
     )
 
     try:
-        response = requests.get("http://fastapi:8000/tratamientos/")
+        response = api.get("/tratamientos/")
         if response.status_code == 200:
             tratamientos = response.json()
             if tratamientos:
@@ -378,8 +378,8 @@ def show_edit_form(tratamiento):
         submitted = st.form_submit_button("Guardar Cambios")
         if submitted:
             try:
-                response = requests.put(
-                    f"http://fastapi:8000/tratamientos/{tratamiento['id_tratamiento']}",
+                response = api.put(
+                    f"/tratamientos/{tratamiento['id_tratamiento']}",
                     json={
                         "nombre_tratamiento": nombre,
                         "descripcion": descripcion,
@@ -398,7 +398,7 @@ def show_edit_form(tratamiento):
 
 def delete_treatment(id_tratamiento):
     try:
-        response = requests.delete(f"http://fastapi:8000/tratamientos/{id_tratamiento}")
+        response = api.delete(f"/tratamientos/{id_tratamiento}")
         if response.status_code == 200:
             st.success("Tratamiento eliminado exitosamente")
             st.rerun()
@@ -428,8 +428,8 @@ def show_edit_form(tratamiento):
                     "estado": estado
                 }
                 
-                response = requests.put(
-                    f"http://fastapi:8000/tratamientos/{tratamiento['id_tratamiento']}",
+                response = api.put(
+                    f"/tratamientos/{tratamiento['id_tratamiento']}",
                     json=datos_actualizados
                 )
                 
@@ -478,8 +478,8 @@ def show_edit_form(tratamiento):
                     "estado": estado
                 }
                 
-                response = requests.put(
-                    f"http://fastapi:8000/tratamientos/{tratamiento['id_tratamiento']}",
+                response = api.put(
+                    f"/tratamientos/{tratamiento['id_tratamiento']}",
                     json=datos_actualizados
                 )
                 
@@ -496,8 +496,8 @@ def delete_treatment(id_tratamiento):
     Elimina un tratamiento
     """
     try:
-        response = requests.delete(
-            f"http://fastapi:8000/tratamientos/{id_tratamiento}"
+        response = api.delete(
+            f"/tratamientos/{id_tratamiento}"
         )
         if response.status_code == 200:
             st.success("Tratamiento eliminado exitosamente")
@@ -0,0 +1,139 @@
+"""
+Cliente HTTP compartido por las páginas de Streamlit para hablar con la API.
+
+Streamlit vuelve a ejecutar la página entera cada vez que cambia un widget. Con llamadas sueltas a
+`requests.get` eso supone abrir una conexión TCP nueva y descargar otra vez todas las tablas por
+cada filtro tocado. Este módulo mantiene una única `requests.Session` con conexiones keep-alive,
+aplica timeouts a todas las peticiones y guarda las respuestas GET durante unos segundos, con la
+ruta y los parámetros como clave. Pasado ese tiempo la respuesta se revalida con `If-None-Match`:
+si la API contesta 304 se reutiliza sin volver a descargarla. Las altas, modificaciones y bajas
+hechas con este mismo cliente invalidan las entradas de los recursos afectados.
+
+Uso desde una página:
+    import cliente_api as api
+    response = api.get("/clientes/", params={"include": "mascotas"})
+    response = api.post("/clientes/", json=cliente_data)
+"""
+
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = os.getenv("API_URL", "http://fastapi:8000")
+
+# (conexión, lectura) en segundos
+TIMEOUT = (3.05, 30)
+
+# Segundos que se reutiliza una respuesta GET y número máximo de respuestas guardadas
+TTL_POR_DEFECTO = 30
+MAX_ENTRADAS = 256
+
+# Recursos cuya caché hay que descartar al escribir en cada recurso. Los listados embeben
+# relaciones (citas con su cliente, clientes con sus mascotas...) y /stats agrega todas las tablas.
+INVALIDA = {
+    "clientes": ("clientes", "mascotas", "tratamientos", "citas", "stats"),
+    "mascotas": ("mascotas", "clientes", "citas", "stats"),
+    "tratamientos": ("tratamientos", "clientes", "citas", "stats"),
+    "citas": ("citas", "clientes", "mascotas", "tratamientos", "stats"),
+}
+
+# POST que solo leen: no invalidan nada
+POST_DE_LECTURA = ("/por_ids",)
+
+_sesion = requests.Session()
+_adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+_sesion.mount("http://", _adaptador)
+_sesion.mount("https://", _adaptador)
+
+# Las sesiones de Streamlit se ejecutan en hilos distintos del mismo proceso
+_cerrojo = threading.Lock()
+_cache = {}  # (ruta, params) -> (caduca, response)
+
+
+def _recurso(ruta):
+    """Primer segmento de la ruta: "/clientes/3" -> "clientes"."""
+    return ruta.strip("/").split("/", 1)[0].split("?", 1)[0]
+
+
+def _clave(ruta, params):
+    if not params:
+        return (ruta, ())
+    return (ruta, tuple(sorted((str(k), str(v)) for k, v in params.items() if v is not None)))
+
+
+def _peticion(metodo, ruta, **kwargs):
+    kwargs.setdefault("timeout", TIMEOUT)
+    return _sesion.request(metodo, f"{API_URL}{ruta}", **kwargs)
+
+
+def get(ruta, params=None, ttl=TTL_POR_DEFECTO, **kwargs):
+    """
+    GET a la API reutilizando la respuesta si se pidió lo mismo hace menos de `ttl` segundos.
+
+    Solo se guardan las respuestas 200. Una respuesta caducada con ETag se revalida con una
+    petición condicional. Con `ttl=0` la petición no pasa por la caché (por ejemplo, para
+    descargar ficheros).
+
+    Returns:
+        requests.Response
+    """
+    if not ttl:
+        return _peticion("GET", ruta, params=params, **kwargs)
+
+    clave = _clave(ruta, params)
+    ahora = time.monotonic()
+    with _cerrojo:
+        entrada = _cache.get(clave)
+    if entrada and entrada[0] > ahora:
+        return entrada[1]
+
+    etag = entrada[1].headers.get("ETag") if entrada else None
+    if etag:
+        kwargs["headers"] = {**kwargs.get("headers", {}), "If-None-Match": etag}
+    response = _peticion("GET", ruta, params=params, **kwargs)
+    if response.status_code == 304 and entrada:
+        response = entrada[1]
+    if response.status_code == 200:
+        with _cerrojo:
+            _cache.pop(clave, None)
+            _cache[clave] = (ahora + ttl, response)
+            while len(_cache) > MAX_ENTRADAS:
+                _cache.pop(next(iter(_cache)))
+    return response
+
+
+def post(ruta, **kwargs):
+    response = _peticion("POST", ruta, **kwargs)
+    if not ruta.rstrip("/").endswith(POST_DE_LECTURA):
+        _invalidar_tras_escritura(ruta, response)
+    return response
+
+
+def put(ruta, **kwargs):
+    response = _peticion("PUT", ruta, **kwargs)
+    _invalidar_tras_escritura(ruta, response)
+    return response
+
+
+def delete(ruta, **kwargs):
+    response = _peticion("DELETE", ruta, **kwargs)
+    _invalidar_tras_escritura(ruta, response)
+    return response
+
+
+def _invalidar_tras_escritura(ruta, response):
+    if response.status_code < 400:
+        recurso = _recurso(ruta)
+        invalidar(*INVALIDA.get(recurso, (recurso,)))
+
+
+def invalidar(*recursos):
+    """Descarta las respuestas guardadas de los recursos indicados, o todas si no se indica ninguno."""
+    with _cerrojo:
+        if not recursos:
+            _cache.clear()
+            return
+        for clave in [c for c in _cache if _recurso(c[0]) in recursos]:
+            del _cache[clave]
@@ -8,10 +8,9 @@ import json
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from httpx import AsyncClient, ASGITransport
-from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 from server import app
-from clinica.dbconfig import Base, get_db
+from clinica.dbconfig import Base, get_db, async_engine
 import asyncio
 
 # Configuración para la base de datos de pruebas
@@ -40,6 +39,10 @@ class TestCitas(unittest.IsolatedAsyncioTestCase):
         self.id_mascota = await self.crear_mascota(self.id_cliente)
         self.id_tratamiento = await self.crear_tratamiento(self.id_cliente)
 
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await async_engine.dispose()
+
     async def crear_cliente(self):
         numeros_dni = str(random.randint(10000000, 99999999))
         letra_dni = random.choice('TRWAGMYFPDXBNJZSQVHLCKE')
@@ -71,6 +74,12 @@ class TestCitas(unittest.IsolatedAsyncioTestCase):
         assert mascota_response.status_code == 201
         return mascota_response.json()["id_mascota"]
 
+    async def hueco_libre(self):
+        # Las citas que se solapan con otra de la mascota o de su consulta se rechazan
+        response = await self.client.get("/citas/disponibilidad", params={"id_mascota": self.id_mascota, "cantidad": 1})
+        assert response.status_code == 200, f"Error al consultar la disponibilidad: {response.text}"
+        return response.json()["huecos"][0]["inicio"]
+
     async def crear_tratamiento(self, id_cliente):
         tratamiento_unico = f"Vacunación-{uuid.uuid4()}"
         nuevo_tratamiento = {
@@ -118,7 +127,7 @@ class TestCitas(unittest.IsolatedAsyncioTestCase):
             "id_mascota": self.id_mascota,
             "id_cliente": self.id_cliente,
             "id_tratamiento": self.id_tratamiento,
-            "fecha": datetime.now().isoformat(),
+            "fecha": await self.hueco_libre(),
             "descripcion": "Cita de vacunación"
         }
 
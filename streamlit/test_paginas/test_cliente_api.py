@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+from unittest.mock import MagicMock, patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../pages')))
+import cliente_api as api
+
+
+def respuesta(status_code=200, datos=None, headers=None):
+    response = MagicMock(status_code=status_code, headers=headers or {})
+    response.json.return_value = datos
+    return response
+
+
+class TestClienteApi(unittest.TestCase):
+    def setUp(self):
+        api.invalidar()
+        parche = patch.object(api._sesion, "request", side_effect=lambda *a, **k: respuesta(datos=[a[0], a[1]]))
+        self.request = parche.start()
+        self.addCleanup(parche.stop)
+        self.addCleanup(api.invalidar)
+
+    def test_get_reutiliza_la_respuesta(self):
+        primera = api.get("/clientes/", params={"include": "mascotas"})
+        segunda = api.get("/clientes/", params={"include": "mascotas"})
+        self.assertIs(primera, segunda)
+        self.assertEqual(self.request.call_count, 1)
+        self.assertEqual(self.request.call_args.kwargs["timeout"], api.TIMEOUT)
+        self.assertEqual(self.request.call_args.args, ("GET", f"{api.API_URL}/clientes/"))
+
+        # Otros parámetros son otra entrada
+        api.get("/clientes/", params={"ids": "1,2"})
+        self.assertEqual(self.request.call_count, 2)
+
+    def test_caducidad_y_ttl_cero(self):
+        with patch.object(api.time, "monotonic", return_value=1000):
+            api.get("/mascotas/", ttl=5)
+        with patch.object(api.time, "monotonic", return_value=1004):
+            api.get("/mascotas/", ttl=5)
+        self.assertEqual(self.request.call_count, 1)
+        with patch.object(api.time, "monotonic", return_value=1006):
+            api.get("/mascotas/", ttl=5)
+        self.assertEqual(self.request.call_count, 2)
+
+        api.get("/tratamientos/factura/generar/1", ttl=0)
+        api.get("/tratamientos/factura/generar/1", ttl=0)
+        self.assertEqual(self.request.call_count, 4)
+
+    def test_revalida_con_etag(self):
+        self.request.side_effect = lambda *a, **k: respuesta(datos=["v1"], headers={"ETag": 'W/"1"'})
+        with patch.object(api.time, "monotonic", return_value=1000):
+            primera = api.get("/clientes/", ttl=5)
+
+        self.request.side_effect = lambda *a, **k: respuesta(status_code=304)
+        with patch.object(api.time, "monotonic", return_value=1010):
+            self.assertIs(api.get("/clientes/", ttl=5), primera)
+        self.assertEqual(self.request.call_args.kwargs["headers"], {"If-None-Match": 'W/"1"'})
+
+        # El 304 renueva la entrada
+        with patch.object(api.time, "monotonic", return_value=1012):
+            api.get("/clientes/", ttl=5)
+        self.assertEqual(self.request.call_count, 2)
+
+    def test_no_guarda_errores(self):
+        self.request.side_effect = lambda *a, **k: respuesta(status_code=500)
+        api.get("/citas/")
+        api.get("/citas/")
+        self.assertEqual(self.request.call_count, 2)
+
+    def test_escrituras_invalidan_recursos_afectados(self):
+        api.get("/mascotas/")
+        api.get("/tratamientos/")
+        api.get("/citas/detalladas")
+
+        api.put("/mascotas/3", json={"edad": 4})
+        api.get("/mascotas/")
+        api.get("/citas/detalladas")
+        api.get("/tratamientos/")
+        # mascotas y citas se vuelven a pedir; tratamientos sigue en caché
+        self.assertEqual([c.args[1] for c in self.request.call_args_list[3:]],
+                         [f"{api.API_URL}/mascotas/3", f"{api.API_URL}/mascotas/", f"{api.API_URL}/citas/detalladas"])
+
+        # Una búsqueda por IDs no invalida nada
+        api.post("/clientes/por_ids", json={"ids": [1]})
+        api.get("/mascotas/")
+        self.assertEqual(self.request.call_count, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
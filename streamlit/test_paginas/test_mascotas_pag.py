@@ -4,7 +4,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from httpx import AsyncClient, ASGITransport
 from server import app  
-from clinica.dbconfig import Base, get_db
+from clinica.dbconfig import Base, get_db, async_engine
 from clinica_api.schemas import MascotaCreate, MascotaUpdate    
 import os
 import asyncio
@@ -57,6 +57,7 @@ class TestMascotas(unittest.IsolatedAsyncioTestCase):
 
     async def asyncTearDown(self):
         await self.client.aclose()
+        await async_engine.dispose()
 
     async def test_registrar_mascota(self):
         nueva_mascota = {
@@ -105,7 +106,7 @@ class TestMascotas(unittest.IsolatedAsyncioTestCase):
         response = await self.client.get(f"/mascotas/buscar_por_nombre/{nombre_mascota}")
         self.assertEqual(response.status_code, 200)
         data = response.json()
-        self.assertEqual(data["nombre_mascota"], nombre_mascota)
+        self.assertEqual(data[0]["nombre_mascota"], nombre_mascota)
 
     async def test_marcar_mascota_como_fallecido(self):
         nombre_mascota = self.mascota_data["nombre_mascota"]